@@ -0,0 +1,127 @@
+"""
+Vocabulario fijo de alérgenos y máscaras de bits para excluirlos.
+
+El campo `alergenos` de una receta es texto libre ("Marisco, glúten"). Al guardar
+la receta (preparar_datos_receta, editar_receta_usuario o la migración) cada
+alérgeno reconocido se lleva a su nombre del vocabulario (los 14 del Reglamento UE
+1169/2011) y se guarda además `mascaraAlergenos`: un entero con un bit por alérgeno
+del vocabulario. Los alérgenos que no se reconocen se conservan tal cual en el texto.
+
+Así, excluir varios alérgenos es un AND-NOT de máscaras en lugar de volver a
+partir y comparar el texto de cada receta en cada petición (ver IndiceBusqueda y
+generar_menu_semanal_automatico).
+"""
+
+import re
+from typing import Any, Dict, List, Tuple
+
+from busqueda_texto import quitar_tildes
+
+# Alérgenos del vocabulario, en el orden de sus bits: (nombre, palabras que lo indican)
+ALERGENOS = (
+    ("Gluten", ("gluten", "trigo", "cebada", "centeno", "avena", "espelta")),
+    ("Crustáceos", ("crustaceos", "crustaceo", "marisco", "mariscos", "gamba", "gambas",
+                    "langostino", "langostinos", "cangrejo", "bogavante", "cigala", "cigalas")),
+    ("Huevo", ("huevo", "huevos")),
+    ("Pescado", ("pescado", "pescados")),
+    ("Cacahuetes", ("cacahuetes", "cacahuete", "mani")),
+    ("Soja", ("soja", "soya")),
+    ("Lácteos", ("lacteos", "lacteo", "leche", "lactosa", "queso", "mantequilla", "nata")),
+    ("Frutos de cáscara", ("frutos de cascara", "frutos secos", "nueces", "nuez", "almendra",
+                           "almendras", "avellana", "avellanas", "pistacho", "pistachos",
+                           "anacardo", "anacardos")),
+    ("Apio", ("apio",)),
+    ("Mostaza", ("mostaza",)),
+    ("Sésamo", ("sesamo",)),
+    ("Sulfitos", ("sulfitos", "sulfito", "dioxido de azufre")),
+    ("Altramuces", ("altramuces", "altramuz")),
+    ("Moluscos", ("moluscos", "molusco", "marisco", "mariscos", "mejillon", "mejillones",
+                  "almeja", "almejas", "calamar", "calamares", "pulpo", "sepia")),
+)
+
+
+def calcular_bits_por_palabra() -> Dict[str, int]:
+    """Palabra normalizada → bits de los alérgenos que indica ("marisco" indica dos)."""
+    bits_por_palabra: Dict[str, int] = {}
+    for bit, (_, palabras) in enumerate(ALERGENOS):
+        for palabra in palabras:
+            bits_por_palabra[palabra] = bits_por_palabra.get(palabra, 0) | 1 << bit
+    return bits_por_palabra
+
+
+BITS_POR_PALABRA = calcular_bits_por_palabra()
+
+
+def clave_alergeno(texto: Any) -> str:
+    """Texto de un alérgeno en minúsculas, sin tildes y con los espacios simplificados."""
+    return quitar_tildes(re.sub(r"\s+", " ", str(texto or "").casefold().strip()))
+
+
+def separar_alergenos(texto: Any) -> List[str]:
+    """Alérgenos de la lista separada por comas, sin vacíos."""
+    return [alergeno.strip() for alergeno in str(texto or "").split(",") if alergeno.strip()]
+
+
+def nombres_alergenos(mascara: int) -> List[str]:
+    """Nombres del vocabulario de los bits de una máscara, en orden."""
+    return [nombre for bit, (nombre, _) in enumerate(ALERGENOS) if mascara >> bit & 1]
+
+
+def normalizar_alergenos(texto: Any) -> Tuple[str, int]:
+    """
+    Lleva los alérgenos de una receta al vocabulario fijo.
+
+    Args:
+        texto (Any): Alérgenos separados por comas, tal como los escribió el usuario
+
+    Returns:
+        Tuple[str, int]: Texto con los nombres del vocabulario y, detrás, los alérgenos no
+        reconocidos; y máscara con los bits de los reconocidos
+    """
+    mascara = 0
+    otros: List[str] = []
+    claves_otros = set()
+    for alergeno in separar_alergenos(texto):
+        clave = clave_alergeno(alergeno)
+        if clave in BITS_POR_PALABRA:
+            mascara |= BITS_POR_PALABRA[clave]
+        elif clave not in claves_otros:
+            claves_otros.add(clave)
+            otros.append(alergeno)
+    return ", ".join(nombres_alergenos(mascara) + otros), mascara
+
+
+def mascara_alergenos(receta: Dict[str, Any]) -> int:
+    """Máscara de alérgenos de una receta; si no la tiene guardada, se calcula de su texto."""
+    mascara = receta.get("mascaraAlergenos")
+    if isinstance(mascara, int):
+        return mascara
+    return normalizar_alergenos(receta.get("alergenos"))[1]
+
+
+def alergenos_fuera_de_vocabulario(receta: Dict[str, Any]) -> List[str]:
+    """Claves de los alérgenos de una receta que no están en el vocabulario."""
+    claves = (clave_alergeno(alergeno) for alergeno in separar_alergenos(receta.get("alergenos")))
+    return [clave for clave in claves if clave not in BITS_POR_PALABRA]
+
+
+def bits_alergenos_buscados(texto: Any) -> int:
+    """
+    Bits de los alérgenos del vocabulario que excluye un filtro. Como el filtro del
+    navegador, basta con una parte del nombre: "glu" excluye el gluten y "marisco"
+    los crustáceos y los moluscos.
+
+    Args:
+        texto (Any): Alérgeno escrito en el filtro
+
+    Returns:
+        int: Máscara con los alérgenos que coinciden (0 si ninguno)
+    """
+    clave = clave_alergeno(texto)
+    if not clave:
+        return 0
+    bits = 0
+    for palabra, bits_palabra in BITS_POR_PALABRA.items():
+        if clave in palabra:
+            bits |= bits_palabra
+    return bits
@@ -0,0 +1,387 @@
+"""
+Backends de persistencia para las recetas.
+
+- AlmacenamientoJSON: reescribe `recetas.json` completo en cada guardado.
+- AlmacenamientoRegistro: añade cada cambio como una línea a un registro
+  (write-ahead log) y lo integra periódicamente en `recetas.json`, que actúa
+  como instantánea compactada.
+- AlmacenamientoSQLite (base_datos.py): guarda cada receta como una fila.
+
+El repositorio en memoria (repositorio_recetas.py) decide qué cambios se han
+producido y se los entrega al backend configurado en MODO_ALMACENAMIENTO.
+"""
+
+import os
+import json
+import zlib
+import shutil
+import tempfile
+import threading
+from typing import Optional, List, Dict, Any, Tuple, Callable, BinaryIO
+
+from constants import *
+
+# orjson es opcional: si está instalado se usa para serializar y parsear más rápido
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# ==================== UTILIDADES DE ARCHIVO ====================
+
+def obtener_firma_archivo(ruta: str) -> Optional[Tuple[int, int, int]]:
+    """
+    Obtiene la firma de un archivo para detectar cambios externos.
+
+    Args:
+        ruta (str): Ruta del archivo
+
+    Returns:
+        Optional[Tuple[int, int, int]]: (mtime en ns, tamaño, inodo) o None si no existe
+    """
+    try:
+        info = os.stat(ruta)
+    except OSError:
+        return None
+    return (info.st_mtime_ns, info.st_size, info.st_ino)
+
+
+def escribir_atomico(ruta: str, contenido: bytes) -> None:
+    """
+    Escribe un archivo de forma atómica: primero en un temporal y después lo renombra.
+    Si el proceso muere a mitad de escritura, el archivo original queda intacto.
+
+    Args:
+        ruta (str): Ruta final del archivo
+        contenido (bytes): Contenido a escribir
+    """
+    _reemplazar_atomico(ruta, lambda archivo: archivo.write(contenido))
+
+
+def copiar_atomico(ruta_origen: str, ruta: str) -> None:
+    """
+    Copia un archivo de forma atómica (ver escribir_atomico), sin leerlo entero en memoria.
+
+    Args:
+        ruta_origen (str): Archivo a copiar
+        ruta (str): Ruta final de la copia
+    """
+    with open(ruta_origen, 'rb') as origen:
+        _reemplazar_atomico(ruta, lambda archivo: shutil.copyfileobj(origen, archivo))
+
+
+def _reemplazar_atomico(ruta: str, escribir: Callable[[BinaryIO], Any]) -> None:
+    """Escribe con `escribir` un temporal del mismo directorio, lo vuelca a disco y lo renombra a `ruta`."""
+    directorio = os.path.dirname(ruta)
+    os.makedirs(directorio, exist_ok=True)
+    # Temporal con nombre único en el mismo directorio (os.replace no cruza sistemas de archivos):
+    # dos escrituras del mismo archivo no comparten temporal
+    descriptor, ruta_temporal = tempfile.mkstemp(prefix=f"{os.path.basename(ruta)}.", suffix=".tmp", dir=directorio)
+    try:
+        with os.fdopen(descriptor, 'wb') as archivo:
+            escribir(archivo)
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        os.replace(ruta_temporal, ruta)
+    finally:
+        if os.path.exists(ruta_temporal):
+            os.remove(ruta_temporal)
+
+
+def serializar_json(datos: Any, formato: str = FORMATO_DATOS) -> bytes:
+    """
+    Serializa datos a JSON en UTF-8 con el formato configurado.
+
+    Args:
+        datos (Any): Datos a serializar
+        formato (str): "legible" (indentado) o "compacto"
+
+    Returns:
+        bytes: JSON codificado en UTF-8
+    """
+    if formato == "compacto":
+        if orjson is not None:
+            return orjson.dumps(datos)
+        return json.dumps(datos, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+    if orjson is not None:
+        return orjson.dumps(datos, option=orjson.OPT_INDENT_2)
+    return json.dumps(datos, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def deserializar_json(contenido: bytes) -> Any:
+    """
+    Parsea JSON en cualquiera de los dos formatos.
+
+    Raises:
+        ValueError: Si el contenido no es JSON válido (json.JSONDecodeError es subclase)
+    """
+    if orjson is not None:
+        return orjson.loads(contenido)
+    return json.loads(contenido)
+
+
+def leer_json(ruta: str, por_defecto: Any = None) -> Any:
+    """
+    Lee y parsea un archivo JSON de datos.
+
+    Args:
+        ruta (str): Ruta del archivo
+        por_defecto (Any): Valor devuelto si el archivo no existe
+
+    Returns:
+        Any: Contenido del archivo
+    """
+    if not os.path.exists(ruta):
+        return por_defecto
+    with open(ruta, 'rb') as archivo:
+        return deserializar_json(archivo.read())
+
+
+def escribir_json(ruta: str, datos: Any) -> None:
+    """Escribe un archivo JSON de datos de forma atómica con el formato configurado."""
+    escribir_atomico(ruta, serializar_json(datos))
+
+
+def serializar_recetas(recetas: List[Dict[str, Any]]) -> bytes:
+    """Serializa la lista de recetas con el mismo formato que el resto de archivos de datos."""
+    return serializar_json(recetas)
+
+
+# ==================== CÁLCULO DE CAMBIOS ====================
+
+def calcular_cambios(anteriores: List[Dict[str, Any]], nuevas: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Calcula las operaciones que transforman la lista anterior en la nueva.
+    Las posiciones son relativas a la lista en el momento de aplicar cada operación.
+
+    Args:
+        anteriores (List[Dict[str, Any]]): Recetas antes del guardado
+        nuevas (List[Dict[str, Any]]): Recetas a guardar
+
+    Returns:
+        List[Dict[str, Any]]: Operaciones "insertar", "reemplazar" y "eliminar"
+    """
+    total_anteriores = len(anteriores)
+    total_nuevas = len(nuevas)
+
+    # Prefijo y sufijo comunes (lo habitual es que solo cambie una receta)
+    inicio = 0
+    limite = min(total_anteriores, total_nuevas)
+    while inicio < limite and (anteriores[inicio] is nuevas[inicio] or anteriores[inicio] == nuevas[inicio]):
+        inicio += 1
+
+    fin = 0
+    while (fin < limite - inicio and
+           (anteriores[total_anteriores - 1 - fin] is nuevas[total_nuevas - 1 - fin] or
+            anteriores[total_anteriores - 1 - fin] == nuevas[total_nuevas - 1 - fin])):
+        fin += 1
+
+    tramo_anterior = anteriores[inicio:total_anteriores - fin]
+    tramo_nuevo = nuevas[inicio:total_nuevas - fin]
+    comunes = min(len(tramo_anterior), len(tramo_nuevo))
+
+    cambios = []
+    for i in range(comunes):
+        if tramo_anterior[i] != tramo_nuevo[i]:
+            cambios.append({"op": "reemplazar", "pos": inicio + i, "receta": tramo_nuevo[i]})
+    for _ in range(len(tramo_anterior) - comunes):
+        cambios.append({"op": "eliminar", "pos": inicio + comunes})
+    for i in range(comunes, len(tramo_nuevo)):
+        cambios.append({"op": "insertar", "pos": inicio + i, "receta": tramo_nuevo[i]})
+    return cambios
+
+
+def aplicar_cambio(recetas: List[Dict[str, Any]], cambio: Dict[str, Any]) -> None:
+    """
+    Aplica una operación del registro sobre una lista de recetas.
+
+    Args:
+        recetas (List[Dict[str, Any]]): Lista a modificar
+        cambio (Dict[str, Any]): Operación calculada por calcular_cambios
+    """
+    operacion = cambio["op"]
+    if operacion == "insertar":
+        recetas.insert(cambio["pos"], cambio["receta"])
+    elif operacion == "reemplazar":
+        recetas[cambio["pos"]] = cambio["receta"]
+    elif operacion == "eliminar":
+        del recetas[cambio["pos"]]
+    else:
+        raise ValueError(f"Operación de registro desconocida: {operacion}")
+
+
+# ==================== BACKEND JSON ====================
+
+class AlmacenamientoJSON:
+    """
+    Guarda las recetas como un único archivo JSON que se reescribe entero.
+    """
+
+    registra_cambios = False
+
+    def __init__(self, ruta: str = RUTA_RECETAS_JSON):
+        self.ruta = ruta
+
+    def firma(self) -> Any:
+        return obtener_firma_archivo(self.ruta)
+
+    def cargar(self) -> List[Dict[str, Any]]:
+        return leer_json(self.ruta, [])
+
+    def guardar(self, recetas: List[Dict[str, Any]], cambios: Optional[List[Dict[str, Any]]] = None) -> None:
+        escribir_atomico(self.ruta, serializar_recetas(recetas))
+
+
+# ==================== BACKEND CON REGISTRO DE CAMBIOS ====================
+
+class AlmacenamientoRegistro:
+    """
+    Guarda cada cambio como una línea JSON añadida al final de un registro.
+
+    La primera línea del registro identifica la instantánea sobre la que se
+    aplica (tamaño y CRC32 de `recetas.json`). Si la instantánea no coincide,
+    el registro ya se integró en una compactación anterior y se descarta.
+    Una última línea incompleta (caída a mitad de escritura) se recorta.
+    """
+
+    registra_cambios = True
+
+    def __init__(self, ruta: str = RUTA_RECETAS_JSON, ruta_registro: Optional[str] = None,
+                 umbral_compactacion: int = UMBRAL_COMPACTACION_REGISTRO):
+        self.ruta = ruta
+        self.ruta_registro = ruta_registro or f"{ruta}.log"
+        self.umbral_compactacion = umbral_compactacion
+        self._lineas_registro = 0
+        self._base: Optional[Dict[str, int]] = None
+        self._registro_valido = False
+        self._compactando = False
+        self._lock = threading.Lock()
+
+    def firma(self) -> Any:
+        return (obtener_firma_archivo(self.ruta), obtener_firma_archivo(self.ruta_registro))
+
+    @staticmethod
+    def _describir_instantanea(contenido: bytes) -> Dict[str, int]:
+        return {"tam": len(contenido), "crc": zlib.crc32(contenido)}
+
+    def cargar(self) -> List[Dict[str, Any]]:
+        contenido = b""
+        if os.path.exists(self.ruta):
+            with open(self.ruta, 'rb') as archivo:
+                contenido = archivo.read()
+        recetas = deserializar_json(contenido) if contenido else []
+        self._base = self._describir_instantanea(contenido)
+        self._lineas_registro = 0
+        self._registro_valido = False
+
+        if not os.path.exists(self.ruta_registro):
+            return recetas
+
+        with open(self.ruta_registro, 'rb') as archivo:
+            contenido_registro = archivo.read()
+        # Una última línea sin salto de línea (caída a mitad de escritura) se recorta antes de
+        # aplicar nada: si no, el siguiente guardado la continuaría en la misma línea
+        fin = contenido_registro.rfind(b"\n") + 1
+        if fin < len(contenido_registro):
+            print(f"{LOG_WARNING} Última línea del registro de recetas incompleta, se descarta")
+            os.truncate(self.ruta_registro, fin)
+        lineas = contenido_registro[:fin].split(b'\n')
+
+        try:
+            cabecera = deserializar_json(lineas[0]) if lineas[0] else {}
+        except ValueError:
+            cabecera = {}
+        if cabecera.get("base") != self._base:
+            print(f"{LOG_INFO} Registro de recetas descartado: ya estaba integrado en la instantánea")
+            return recetas
+
+        self._registro_valido = True
+        bytes_validos = len(lineas[0]) + 1
+        for numero, linea in enumerate(lineas[1:], start=2):
+            if not linea:
+                continue
+            try:
+                cambio = deserializar_json(linea)
+            except ValueError:
+                # Caída a mitad de escritura: recortar la línea incompleta para poder seguir añadiendo
+                print(f"{LOG_WARNING} Línea {numero} del registro de recetas incompleta, se descarta")
+                os.truncate(self.ruta_registro, bytes_validos)
+                break
+            aplicar_cambio(recetas, cambio)
+            self._lineas_registro += 1
+            bytes_validos += len(linea) + 1
+        return recetas
+
+    def guardar(self, recetas: List[Dict[str, Any]], cambios: Optional[List[Dict[str, Any]]] = None) -> None:
+        with self._lock:
+            # Sin cambios calculados (o sin registro válido) se escribe una instantánea completa
+            if cambios is None or self._base is None:
+                self._escribir_instantanea(recetas)
+                return
+            if not cambios:
+                return
+
+            if not self._registro_valido:
+                # Registro inexistente u obsoleto: empezar uno nuevo sobre la instantánea actual
+                self._iniciar_registro()
+
+            # Las líneas del registro siempre van en formato compacto (una por cambio)
+            lineas = b"".join(serializar_json(cambio, "compacto") + b"\n" for cambio in cambios)
+            with open(self.ruta_registro, 'ab') as archivo:
+                archivo.write(lineas)
+                archivo.flush()
+                os.fsync(archivo.fileno())
+            self._lineas_registro += len(cambios)
+
+    def necesita_compactar(self) -> bool:
+        return self._lineas_registro >= self.umbral_compactacion and not self._compactando
+
+    def compactar(self, recetas: List[Dict[str, Any]]) -> None:
+        """
+        Integra el registro en una nueva instantánea y empieza un registro vacío.
+        Debe llamarse sin escrituras concurrentes sobre el repositorio.
+
+        Args:
+            recetas (List[Dict[str, Any]]): Estado actual completo de las recetas
+        """
+        with self._lock:
+            self._compactando = True
+            try:
+                self._escribir_instantanea(recetas)
+            finally:
+                self._compactando = False
+
+    def _escribir_instantanea(self, recetas: List[Dict[str, Any]]) -> None:
+        contenido = serializar_recetas(recetas)
+        escribir_atomico(self.ruta, contenido)
+        self._base = self._describir_instantanea(contenido)
+        # El registro anterior queda obsoleto: su cabecera ya no coincide con la instantánea
+        self._iniciar_registro()
+        print(f"{LOG_SUCCESS} Registro de recetas compactado ({len(recetas)} recetas)")
+
+    def _iniciar_registro(self) -> None:
+        escribir_atomico(self.ruta_registro, serializar_json({"base": self._base}, "compacto") + b"\n")
+        self._lineas_registro = 0
+        self._registro_valido = True
+
+
+def crear_almacenamiento_recetas(modo: str = MODO_ALMACENAMIENTO) -> Any:
+    """
+    Crea el backend de persistencia de recetas según la configuración.
+
+    Args:
+        modo (str): "json", "registro" o "sqlite"
+
+    Returns:
+        Backend de almacenamiento de recetas
+    """
+    if modo == "registro":
+        return AlmacenamientoRegistro(RUTA_RECETAS_JSON, RUTA_REGISTRO_RECETAS)
+    if modo == "sqlite":
+        # Importación diferida: sqlite3 solo se carga si se usa este modo
+        from base_datos import AlmacenamientoSQLite, obtener_base_datos
+        return AlmacenamientoSQLite(obtener_base_datos())
+    if modo != "json":
+        print(f"{LOG_WARNING} Modo de almacenamiento desconocido '{modo}', se usa 'json'")
+    return AlmacenamientoJSON(RUTA_RECETAS_JSON)
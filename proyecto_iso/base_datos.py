@@ -0,0 +1,598 @@
+"""
+Backend SQLite para cuentas, recetas, comentarios y menús semanales.
+
+Se activa con MODO_ALMACENAMIENTO = "sqlite". Mantiene la misma forma de datos
+que los archivos JSON (listas y diccionarios), de modo que utils.py y el
+repositorio de recetas no cambian de interfaz. Cada guardado se traduce en
+sentencias sobre las filas afectadas dentro de una transacción: las recetas
+según los cambios calculados por el repositorio, y las cuentas y menús por
+email (cargar_cuenta, guardar_cuenta, cargar_menu_semanal, guardar_menu_semanal),
+usando los índices en lugar de leer y reescribir todas las filas.
+
+Las recetas se filtran en memoria con los índices del repositorio de recetas
+(repositorio_recetas.py), así que la tabla de recetas solo se indexa por orden.
+Las valoraciones van dentro de cada receta, en su columna "extra".
+
+La primera vez que se crea la base de datos se importan los archivos JSON
+existentes en `datos/`.
+"""
+
+import os
+import json
+import sqlite3
+import threading
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+
+from constants import *
+from almacenamiento import leer_json
+
+
+ESQUEMA_SQL = """
+CREATE TABLE IF NOT EXISTS cuentas (
+    id INTEGER PRIMARY KEY,
+    email TEXT NOT NULL,
+    nombreUsuario TEXT,
+    password TEXT,
+    fotoPerfil TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_cuentas_email ON cuentas (email COLLATE NOCASE);
+
+CREATE TABLE IF NOT EXISTS recetas (
+    id INTEGER PRIMARY KEY,
+    orden REAL NOT NULL,
+    nombreReceta TEXT,
+    descripcion TEXT,
+    ingredientes TEXT,
+    alergenos TEXT,
+    paisOrigen TEXT,
+    pasosAseguir TEXT,
+    turnoComida TEXT,
+    duracion,
+    dificultad TEXT,
+    fotoReceta TEXT,
+    usuario TEXT,
+    publicada INTEGER,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_recetas_orden ON recetas (orden);
+
+CREATE TABLE IF NOT EXISTS recetas_guardadas (
+    receta_id INTEGER NOT NULL REFERENCES recetas (id) ON DELETE CASCADE,
+    posicion INTEGER NOT NULL,
+    email TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_guardadas_receta ON recetas_guardadas (receta_id);
+CREATE INDEX IF NOT EXISTS idx_guardadas_email ON recetas_guardadas (email);
+
+-- Comentarios por id estable de receta (ver comentarios.py)
+CREATE TABLE IF NOT EXISTS comentarios_recetas (
+    id INTEGER PRIMARY KEY,
+    id_receta TEXT NOT NULL,
+    usuario TEXT,
+    texto TEXT,
+    fecha TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_comentarios_recetas_receta ON comentarios_recetas (id_receta, id);
+
+CREATE TABLE IF NOT EXISTS menus_semanales (
+    email TEXT NOT NULL,
+    dia TEXT NOT NULL,
+    turnoComida TEXT NOT NULL,
+    nombreReceta TEXT,
+    PRIMARY KEY (email, dia, turnoComida)
+);
+"""
+
+# Columnas con campo propio; el resto de claves se guardan en la columna JSON "extra"
+COLUMNAS_CUENTA = ["email", "nombreUsuario", "password", "fotoPerfil"]
+COLUMNAS_RECETA = [
+    "nombreReceta", "descripcion", "ingredientes", "alergenos", "paisOrigen",
+    "pasosAseguir", "turnoComida", "duracion", "dificultad", "fotoReceta",
+    "usuario", "publicada"
+]
+COLUMNAS_COMENTARIO = ["usuario", "texto", "fecha"]
+
+
+def separar_extra(datos: Dict[str, Any], columnas: List[str], excluir: tuple = ()) -> Optional[str]:
+    """
+    Obtiene en JSON las claves de un diccionario que no tienen columna propia.
+
+    Args:
+        datos (Dict[str, Any]): Diccionario a guardar
+        columnas (List[str]): Claves con columna propia
+        excluir (tuple): Claves que se guardan en otras tablas
+
+    Returns:
+        Optional[str]: JSON con las claves restantes o None si no hay ninguna
+    """
+    extra = {k: v for k, v in datos.items() if k not in columnas and k not in excluir}
+    return json.dumps(extra, ensure_ascii=False) if extra else None
+
+
+def claves_hijas(receta: Dict[str, Any]) -> tuple:
+    """
+    Claves de la receta que se guardan en tablas hijas (solo usuariosGuardado, que tiene
+    índice por email). Una lista vacía se deja en "extra" para conservar la diferencia
+    entre lista vacía y clave ausente.
+    """
+    guardados = receta.get("usuariosGuardado")
+    return ("usuariosGuardado",) if isinstance(guardados, list) and guardados else ()
+
+
+def fila_a_diccionario(fila: sqlite3.Row, columnas: List[str]) -> Dict[str, Any]:
+    """
+    Reconstruye el diccionario original a partir de una fila y su columna "extra".
+    Las columnas a NULL se omiten, igual que las claves ausentes en el JSON original.
+    """
+    datos = {}
+    for columna in columnas:
+        if fila[columna] is not None:
+            datos[columna] = fila[columna]
+    if fila["extra"]:
+        datos.update(json.loads(fila["extra"]))
+    return datos
+
+
+class BaseDatosSQLite:
+    """
+    Conexión compartida a la base de datos SQLite con el esquema de la aplicación.
+    Todas las operaciones se serializan con un cerrojo porque la conexión se usa desde varios hilos.
+    """
+
+    def __init__(self, ruta: str = RUTA_BASE_DATOS, importar_json: bool = True):
+        self.ruta = ruta
+        self._lock = threading.RLock()
+
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        nueva = not os.path.exists(ruta)
+
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.row_factory = sqlite3.Row
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA foreign_keys=ON")
+        self._conexion.executescript(ESQUEMA_SQL)
+
+        if nueva and importar_json:
+            self.importar_archivos_json()
+
+    def importar_archivos_json(self) -> None:
+        """Importa cuentas, recetas y menús desde los archivos JSON de `datos/` si existen."""
+        cuentas = leer_json(RUTA_CUENTAS_JSON, [])
+        recetas = leer_json(RUTA_RECETAS_JSON, [])
+        menus = leer_json(RUTA_MENUS_SEMANALES_JSON, {})
+
+        self.guardar_cuentas(cuentas)
+        with self._lock, self._conexion:
+            for posicion, receta in enumerate(recetas):
+                self._insertar_receta(receta, float(posicion))
+        self.guardar_menus_semanales(menus)
+        print(f"{LOG_SUCCESS} Base de datos creada a partir de JSON: {len(cuentas)} cuentas, {len(recetas)} recetas, {len(menus)} menús")
+
+    def version_datos(self) -> int:
+        """
+        Devuelve PRAGMA data_version, que cambia cuando otra conexión modifica la base de datos.
+        Sirve como firma para invalidar cachés en memoria.
+        """
+        with self._lock:
+            return self._conexion.execute("PRAGMA data_version").fetchone()[0]
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._conexion.close()
+
+    # ==================== CUENTAS ====================
+
+    def cargar_cuentas(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            filas = self._conexion.execute("SELECT * FROM cuentas ORDER BY id").fetchall()
+        return [fila_a_diccionario(fila, COLUMNAS_CUENTA) for fila in filas]
+
+    def cargar_cuenta(self, email: str) -> Optional[Dict[str, Any]]:
+        """Cuenta de un email (sin distinguir mayúsculas), consultada por idx_cuentas_email."""
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT * FROM cuentas WHERE email = ? COLLATE NOCASE ORDER BY id LIMIT 1", (email,)).fetchone()
+        return fila_a_diccionario(fila, COLUMNAS_CUENTA) if fila else None
+
+    def guardar_cuenta(self, email: str, cuenta: Optional[Dict[str, Any]]) -> None:
+        """
+        Crea o actualiza la fila de la cuenta de un email, o la elimina si `cuenta` es None.
+
+        Args:
+            email (str): Email actual de la cuenta
+            cuenta (Optional[Dict[str, Any]]): Datos completos de la cuenta
+        """
+        with self._lock, self._conexion:
+            self._guardar_cuenta(email, cuenta)
+
+    def _guardar_cuenta(self, email: str, cuenta: Optional[Dict[str, Any]]) -> None:
+        if cuenta is None:
+            self._conexion.execute("DELETE FROM cuentas WHERE email = ? COLLATE NOCASE", (email,))
+            return
+        valores = (cuenta.get("email", ""), cuenta.get("nombreUsuario"), cuenta.get("password"),
+                   cuenta.get("fotoPerfil"), separar_extra(cuenta, COLUMNAS_CUENTA))
+        cursor = self._conexion.execute(
+            "UPDATE cuentas SET email = ?, nombreUsuario = ?, password = ?, fotoPerfil = ?, extra = ? "
+            "WHERE id = (SELECT id FROM cuentas WHERE email = ? COLLATE NOCASE ORDER BY id LIMIT 1)",
+            (*valores, email)
+        )
+        if cursor.rowcount == 0:
+            self._conexion.execute(
+                "INSERT INTO cuentas (email, nombreUsuario, password, fotoPerfil, extra) VALUES (?, ?, ?, ?, ?)", valores)
+
+    def guardar_cambios_cuentas(self, cambios: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """Aplica en una sola transacción los cambios de cuentas por email (None elimina la cuenta)."""
+        with self._lock, self._conexion:
+            for email, cuenta in cambios.items():
+                self._guardar_cuenta(email, cuenta)
+
+    def guardar_cuentas(self, cuentas: List[Dict[str, Any]]) -> None:
+        """Sincroniza la tabla con la lista completa tocando solo las filas que cambian."""
+        with self._lock, self._conexion:
+            existentes: Dict[str, sqlite3.Row] = {}
+            sobrantes = []
+            for fila in self._conexion.execute("SELECT * FROM cuentas ORDER BY id"):
+                if fila["email"].lower() in existentes:
+                    sobrantes.append(fila["id"])
+                else:
+                    existentes[fila["email"].lower()] = fila
+            for cuenta in cuentas:
+                fila = existentes.pop(cuenta.get("email", "").lower(), None)
+                if fila is None or fila_a_diccionario(fila, COLUMNAS_CUENTA) != cuenta:
+                    self._guardar_cuenta(cuenta.get("email", ""), cuenta)
+            sobrantes.extend(fila["id"] for fila in existentes.values())
+            self._conexion.executemany("DELETE FROM cuentas WHERE id = ?", [(fila_id,) for fila_id in sobrantes])
+
+    # ==================== RECETAS ====================
+
+    def cargar_recetas(self) -> List[Tuple[int, float, Dict[str, Any]]]:
+        """
+        Carga todas las recetas en orden, con sus listas de usuarios que las guardaron.
+
+        Returns:
+            List[Tuple[int, float, Dict[str, Any]]]: (id de fila, orden, receta) con la receta
+            en la misma forma que en recetas.json
+        """
+        with self._lock:
+            filas = self._conexion.execute("SELECT * FROM recetas ORDER BY orden").fetchall()
+            guardados = self._conexion.execute(
+                "SELECT receta_id, email FROM recetas_guardadas ORDER BY receta_id, posicion").fetchall()
+
+        recetas = []
+        por_id = {}
+        for fila in filas:
+            receta = fila_a_diccionario(fila, COLUMNAS_RECETA)
+            if "publicada" in receta:
+                receta["publicada"] = bool(receta["publicada"])
+            receta.setdefault("usuariosGuardado", [])
+            por_id[fila["id"]] = receta
+            recetas.append((fila["id"], fila["orden"], receta))
+
+        for fila in guardados:
+            por_id[fila["receta_id"]]["usuariosGuardado"].append(fila["email"])
+
+        return recetas
+
+    def _insertar_receta(self, receta: Dict[str, Any], orden: float) -> int:
+        """Inserta una receta y sus filas hijas. Debe llamarse dentro de una transacción."""
+        valores = [receta.get(columna) for columna in COLUMNAS_RECETA]
+        extra = separar_extra(receta, COLUMNAS_RECETA, claves_hijas(receta))
+        cursor = self._conexion.execute(
+            f"INSERT INTO recetas (orden, {', '.join(COLUMNAS_RECETA)}, extra) "
+            f"VALUES (?, {', '.join('?' for _ in COLUMNAS_RECETA)}, ?)",
+            [orden, *valores, extra]
+        )
+        receta_id = cursor.lastrowid
+        self._insertar_hijas(receta_id, receta)
+        return receta_id
+
+    def _insertar_hijas(self, receta_id: int, receta: Dict[str, Any]) -> None:
+        self._conexion.executemany(
+            "INSERT INTO recetas_guardadas (receta_id, posicion, email) VALUES (?, ?, ?)",
+            [(receta_id, i, email) for i, email in enumerate(receta.get("usuariosGuardado", []) or [])]
+        )
+
+    def _reemplazar_receta(self, receta_id: int, receta: Dict[str, Any]) -> None:
+        """Actualiza una receta y rehace sus filas hijas. Debe llamarse dentro de una transacción."""
+        valores = [receta.get(columna) for columna in COLUMNAS_RECETA]
+        extra = separar_extra(receta, COLUMNAS_RECETA, claves_hijas(receta))
+        self._conexion.execute(
+            f"UPDATE recetas SET {', '.join(f'{c} = ?' for c in COLUMNAS_RECETA)}, extra = ? WHERE id = ?",
+            [*valores, extra, receta_id]
+        )
+        self._conexion.execute("DELETE FROM recetas_guardadas WHERE receta_id = ?", (receta_id,))
+        self._insertar_hijas(receta_id, receta)
+
+    def reemplazar_recetas(self, recetas: List[Dict[str, Any]]) -> List[tuple]:
+        """
+        Sustituye todas las recetas en una única transacción.
+
+        Returns:
+            List[tuple]: (id de fila, orden) de cada receta, en el mismo orden
+        """
+        with self._lock, self._conexion:
+            self._conexion.execute("DELETE FROM recetas")
+            return [(self._insertar_receta(receta, float(i)), float(i)) for i, receta in enumerate(recetas)]
+
+    def aplicar_cambios_recetas(self, cambios: List[Dict[str, Any]], filas: List[tuple]) -> List[tuple]:
+        """
+        Aplica en una transacción los cambios calculados por el repositorio.
+
+        Args:
+            cambios (List[Dict[str, Any]]): Operaciones de almacenamiento.calcular_cambios
+            filas (List[tuple]): (id de fila, orden) de cada receta antes de los cambios
+
+        Returns:
+            List[tuple]: (id de fila, orden) de cada receta después de los cambios
+        """
+        filas = list(filas)
+        with self._lock, self._conexion:
+            for cambio in cambios:
+                posicion = cambio["pos"]
+                if cambio["op"] == "insertar":
+                    anterior = filas[posicion - 1][1] if posicion > 0 else None
+                    siguiente = filas[posicion][1] if posicion < len(filas) else None
+                    if anterior is None and siguiente is None:
+                        orden = 0.0
+                    elif siguiente is None:
+                        orden = anterior + 1
+                    elif anterior is None:
+                        orden = siguiente - 1
+                    else:
+                        orden = (anterior + siguiente) / 2
+                    filas.insert(posicion, (self._insertar_receta(cambio["receta"], orden), orden))
+                elif cambio["op"] == "reemplazar":
+                    self._reemplazar_receta(filas[posicion][0], cambio["receta"])
+                elif cambio["op"] == "eliminar":
+                    self._conexion.execute("DELETE FROM recetas WHERE id = ?", (filas[posicion][0],))
+                    del filas[posicion]
+        return filas
+
+    # ==================== COMENTARIOS ====================
+
+    def anadir_comentarios(self, id_receta: str, comentarios: List[Dict[str, Any]]) -> int:
+        with self._lock, self._conexion:
+            self._conexion.executemany(
+                "INSERT INTO comentarios_recetas (id_receta, usuario, texto, fecha, extra) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (id_receta, c.get("usuario"), c.get("texto"), c.get("fecha"), separar_extra(c, COLUMNAS_COMENTARIO))
+                    for c in comentarios
+                ]
+            )
+            return self._conexion.execute(
+                "SELECT COUNT(*) FROM comentarios_recetas WHERE id_receta = ?", (id_receta,)).fetchone()[0]
+
+    def listar_comentarios(self, id_receta: str, limite: int, desplazamiento: int = 0) -> List[Dict[str, Any]]:
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT * FROM comentarios_recetas WHERE id_receta = ? ORDER BY id DESC LIMIT ? OFFSET ?",
+                (id_receta, limite, desplazamiento)).fetchall()
+        return [fila_a_diccionario(fila, COLUMNAS_COMENTARIO) for fila in filas]
+
+    def contar_comentarios(self, ids_recetas: List[str]) -> Dict[str, int]:
+        totales = dict.fromkeys(ids_recetas, 0)
+        with self._lock:
+            # Por bloques para no superar el límite de parámetros de SQLite
+            for inicio in range(0, len(ids_recetas), 500):
+                bloque = ids_recetas[inicio:inicio + 500]
+                filas = self._conexion.execute(
+                    f"SELECT id_receta, COUNT(*) FROM comentarios_recetas WHERE id_receta IN ({','.join('?' * len(bloque))}) "
+                    "GROUP BY id_receta", bloque).fetchall()
+                totales.update((fila[0], fila[1]) for fila in filas)
+        return totales
+
+    def eliminar_comentarios(self, id_receta: str) -> None:
+        with self._lock, self._conexion:
+            self._conexion.execute("DELETE FROM comentarios_recetas WHERE id_receta = ?", (id_receta,))
+
+    # ==================== MENÚS SEMANALES ====================
+
+    def cargar_menus_semanales(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT email, dia, turnoComida, nombreReceta FROM menus_semanales ORDER BY rowid").fetchall()
+        menus: Dict[str, Dict[str, Any]] = {}
+        for fila in filas:
+            menus.setdefault(fila["email"], {}).setdefault(fila["dia"], {})[fila["turnoComida"]] = fila["nombreReceta"]
+        return menus
+
+    def cargar_menu_semanal(self, email: str) -> Optional[Dict[str, Any]]:
+        """Menú semanal de un email (en minúsculas), consultado por la clave primaria; None si no tiene."""
+        with self._lock:
+            filas = self._conexion.execute(
+                "SELECT dia, turnoComida, nombreReceta FROM menus_semanales WHERE email = ? ORDER BY rowid",
+                (email,)).fetchall()
+        if not filas:
+            return None
+        menu: Dict[str, Any] = {}
+        for fila in filas:
+            menu.setdefault(fila["dia"], {})[fila["turnoComida"]] = fila["nombreReceta"]
+        return menu
+
+    def guardar_menu_semanal(self, email: str, menu: Optional[Dict[str, Any]]) -> None:
+        """
+        Guarda el menú semanal de un email, o lo elimina si `menu` es None. Solo se
+        insertan o actualizan (UPSERT) las comidas que cambian y se borran las que sobran.
+
+        Args:
+            email (str): Email del usuario en minúsculas
+            menu (Optional[Dict[str, Any]]): Menú completo (día → turno → nombre de receta)
+        """
+        with self._lock, self._conexion:
+            self._guardar_menu_semanal(email, menu)
+
+    def _guardar_menu_semanal(self, email: str, menu: Optional[Dict[str, Any]]) -> None:
+        nuevas = {(dia, turno): nombre for dia, comidas in (menu or {}).items() for turno, nombre in comidas.items()}
+        actuales = {
+            (fila["dia"], fila["turnoComida"]): fila["nombreReceta"]
+            for fila in self._conexion.execute(
+                "SELECT dia, turnoComida, nombreReceta FROM menus_semanales WHERE email = ?", (email,))
+        }
+        self._conexion.executemany(
+            "DELETE FROM menus_semanales WHERE email = ? AND dia = ? AND turnoComida = ?",
+            [(email, dia, turno) for dia, turno in actuales.keys() - nuevas.keys()]
+        )
+        self._conexion.executemany(
+            "INSERT INTO menus_semanales (email, dia, turnoComida, nombreReceta) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (email, dia, turnoComida) DO UPDATE SET nombreReceta = excluded.nombreReceta",
+            [
+                (email, dia, turno, nombre) for (dia, turno), nombre in nuevas.items()
+                if (dia, turno) not in actuales or actuales[(dia, turno)] != nombre
+            ]
+        )
+
+    def guardar_cambios_menus(self, cambios: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """Aplica en una sola transacción los cambios de menús por email (None elimina el menú)."""
+        with self._lock, self._conexion:
+            for email, menu in cambios.items():
+                self._guardar_menu_semanal(email, menu)
+
+    def guardar_menus_semanales(self, menus: Dict[str, Dict[str, Any]]) -> None:
+        """Sincroniza la tabla con todos los menús tocando solo las comidas que cambian."""
+        with self._lock, self._conexion:
+            emails = [fila[0] for fila in self._conexion.execute("SELECT DISTINCT email FROM menus_semanales")]
+            for email in dict.fromkeys([*emails, *menus]):
+                self._guardar_menu_semanal(email, menus.get(email))
+
+
+class AlmacenamientoSQLite:
+    """
+    Backend de recetas para el repositorio en memoria respaldado por SQLite.
+    Traduce cada cambio calculado por el repositorio en sentencias sobre la fila afectada.
+    """
+
+    registra_cambios = True
+
+    def __init__(self, base_datos: BaseDatosSQLite):
+        self.base_datos = base_datos
+        self._filas: Optional[List[tuple]] = None
+
+    def firma(self) -> Any:
+        return self.base_datos.version_datos()
+
+    def cargar(self) -> List[Dict[str, Any]]:
+        cargadas = self.base_datos.cargar_recetas()
+        self._filas = [(receta_id, orden) for receta_id, orden, _ in cargadas]
+        return [receta for _, _, receta in cargadas]
+
+    def guardar(self, recetas: List[Dict[str, Any]], cambios: Optional[List[Dict[str, Any]]] = None) -> None:
+        try:
+            if cambios is None or self._filas is None:
+                self._filas = self.base_datos.reemplazar_recetas(recetas)
+            else:
+                self._filas = self.base_datos.aplicar_cambios_recetas(cambios, self._filas)
+        except sqlite3.Error as e:
+            # La transacción se ha deshecho: obligar a recargar las posiciones
+            self._filas = None
+            raise IOError(f"Error de SQLite al guardar recetas: {e}")
+
+
+class AlmacenComentariosSQLite:
+    """Almacén de comentarios (misma interfaz que comentarios.AlmacenComentarios) sobre SQLite."""
+
+    def __init__(self, base_datos: BaseDatosSQLite):
+        self.base_datos = base_datos
+        self._version = 0
+
+    def contar(self, id_receta: str) -> int:
+        return self.contar_varios([id_receta])[id_receta]
+
+    def contar_varios(self, ids_recetas: Iterable[str]) -> Dict[str, int]:
+        return self.base_datos.contar_comentarios(list(ids_recetas))
+
+    def anadir(self, id_receta: str, comentarios: List[Dict[str, Any]]) -> int:
+        try:
+            total = self.base_datos.anadir_comentarios(id_receta, comentarios)
+        except sqlite3.Error as e:
+            raise IOError(f"Error de SQLite al guardar comentarios: {e}")
+        self._version += 1
+        return total
+
+    def listar(self, id_receta: str, limite: int, desplazamiento: int = 0) -> List[Dict[str, Any]]:
+        return self.base_datos.listar_comentarios(id_receta, limite, desplazamiento)
+
+    def eliminar(self, id_receta: str) -> None:
+        try:
+            self.base_datos.eliminar_comentarios(id_receta)
+        except sqlite3.Error as e:
+            raise IOError(f"Error de SQLite al eliminar comentarios: {e}")
+        self._version += 1
+
+    def version(self) -> Tuple[int, int]:
+        # data_version cubre las escrituras de otras conexiones
+        return (self._version, self.base_datos.version_datos())
+
+
+class CuentasSQLite:
+    """Backend de cuentas para datos_usuarios.AlmacenPorEmail: una fila por cuenta."""
+
+    def __init__(self, base_datos: BaseDatosSQLite):
+        self.base_datos = base_datos
+
+    def todos(self) -> List[Dict[str, Any]]:
+        return self.base_datos.cargar_cuentas()
+
+    def leer(self, email: str) -> Optional[Dict[str, Any]]:
+        return self.base_datos.cargar_cuenta(email)
+
+    # El propio backend hace de vista del lote: cada lectura consulta la fila del email
+    get = leer
+
+    def keys(self) -> List[str]:
+        return list(dict.fromkeys(cuenta.get("email", "").lower() for cuenta in self.todos()))
+
+    def abrir_lote(self) -> "CuentasSQLite":
+        return self
+
+    def guardar(self, vista: "CuentasSQLite", cambios: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        try:
+            self.base_datos.guardar_cambios_cuentas(cambios)
+        except sqlite3.Error as e:
+            raise IOError(f"Error de SQLite al guardar cuentas: {e}")
+
+
+class MenusSQLite:
+    """Backend de menús semanales para datos_usuarios.AlmacenPorEmail: una fila por comida."""
+
+    def __init__(self, base_datos: BaseDatosSQLite):
+        self.base_datos = base_datos
+
+    def todos(self) -> Dict[str, Dict[str, Any]]:
+        return self.base_datos.cargar_menus_semanales()
+
+    def leer(self, email: str) -> Optional[Dict[str, Any]]:
+        return self.base_datos.cargar_menu_semanal(email)
+
+    get = leer
+
+    def keys(self) -> List[str]:
+        return list(self.todos())
+
+    def abrir_lote(self) -> "MenusSQLite":
+        return self
+
+    def guardar(self, vista: "MenusSQLite", cambios: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        try:
+            self.base_datos.guardar_cambios_menus(cambios)
+        except sqlite3.Error as e:
+            raise IOError(f"Error de SQLite al guardar menús semanales: {e}")
+
+
+_base_datos: Optional[BaseDatosSQLite] = None
+_lock_base_datos = threading.Lock()
+
+
+def obtener_base_datos() -> BaseDatosSQLite:
+    """
+    Devuelve la base de datos SQLite compartida por el proceso, creándola si hace falta.
+
+    Returns:
+        BaseDatosSQLite: Base de datos configurada en RUTA_BASE_DATOS
+    """
+    global _base_datos
+    with _lock_base_datos:
+        if _base_datos is None:
+            _base_datos = BaseDatosSQLite(RUTA_BASE_DATOS)
+        return _base_datos
@@ -0,0 +1,379 @@
+"""
+Índices para filtrar recetas en el servidor (/api/recetas/buscar).
+
+Aplica los filtros de FILTROS_RECETAS.md con las mismas reglas que el filtrado
+que hacían las páginas en el navegador, pero sin recorrer todas las recetas:
+
+- paisOrigen, dificultad, turnoComida y publicada: cubos hash por valor exacto
+- duracion: array ordenado de duraciones, la duración máxima se busca con bisect
+- ingredientes: listas de recetas por palabra (posting lists); una búsqueda
+  parcial une las listas de las palabras que contienen el texto buscado, que se
+  localizan con un índice de trigramas del vocabulario
+- alergenos: un bitset por alérgeno del vocabulario fijo (alergenos.py), con un bit
+  por receta, y la máscara de alérgenos de cada receta; excluir alérgenos es un
+  AND-NOT. Los alérgenos fuera del vocabulario usan listas de recetas por nombre
+
+Los conjuntos de candidatas se intersecan empezando por el más pequeño, y el
+resto de filtros se comprueban solo sobre las candidatas que quedan.
+
+El índice se construye la primera vez que se filtra (ver
+RepositorioRecetas.indice_busqueda) y, como el de texto libre, las escrituras lo
+actualizan receta a receta sobre una copia en lugar de reconstruirlo.
+"""
+
+import re
+import bisect
+from array import array
+from typing import Optional, List, Dict, Any, Set, Callable, Iterable
+
+from alergenos import (
+    ALERGENOS, mascara_alergenos, alergenos_fuera_de_vocabulario, bits_alergenos_buscados, clave_alergeno
+)
+
+# Palabras de un texto para las listas de ingredientes
+PATRON_PALABRA = re.compile(r"\w+")
+
+
+def normalizar_texto(texto: Any) -> str:
+    """Texto en minúsculas y sin espacios extremos (los filtros no distinguen mayúsculas)."""
+    return str(texto or "").strip().lower()
+
+
+def palabras(texto: Any) -> List[str]:
+    """Palabras en minúsculas de un texto."""
+    return PATRON_PALABRA.findall(normalizar_texto(texto))
+
+
+def duracion_receta(receta: Dict[str, Any]) -> int:
+    """Duración en minutos; como parseInt, toma el número inicial y vale 0 si no hay."""
+    coincidencia = re.match(r"\s*(\d+)", str(receta.get("duracion") or ""))
+    return int(coincidencia.group(1)) if coincidencia else 0
+
+
+def posiciones_bitset(bitset: int) -> List[int]:
+    """Posiciones de los bits a 1 de un bitset, en orden (recorre sus bytes, no sus bits)."""
+    posiciones = []
+    for i, byte in enumerate(bitset.to_bytes((bitset.bit_length() + 7) // 8, "little")):
+        if byte:
+            base = i * 8
+            posiciones.extend(base + bit for bit in range(8) if byte >> bit & 1)
+    return posiciones
+
+
+def trigramas(palabra: str) -> Set[str]:
+    """Grupos de tres letras seguidas de una palabra (vacío si tiene menos de tres)."""
+    return {palabra[i:i + 3] for i in range(len(palabra) - 2)}
+
+
+class IndiceBusqueda:
+    """
+    Índices por campo sobre las recetas de una instantánea. Cada receta tiene un número
+    fijo en el índice (su posición al construirlo o, si se añadió después, el siguiente);
+    al quitarla su número queda vacío, así que las listas de números solo crecen.
+
+    Como los de IndicesRecetas, una vez publicados no se modifican: `copiar` crea unos
+    índices editables que comparten los conjuntos y solo se copian los que se tocan.
+    """
+
+    def __init__(self, recetas: List[Dict[str, Any]] = ()):
+        self.recetas: List[Optional[Dict[str, Any]]] = list(recetas)
+        # identidad de la receta → número
+        self.numeros: Dict[int, int] = {id(receta): numero for numero, receta in enumerate(recetas)}
+        # Bitset de los números ocupados
+        self.vivas = (1 << len(recetas)) - 1
+        self.por_pais: Dict[str, Set[int]] = {}
+        self.por_dificultad: Dict[str, Set[int]] = {}
+        self.por_turno: Dict[str, Set[int]] = {}
+        self.por_publicada: Dict[bool, Set[int]] = {True: set(), False: set()}
+        self.por_autor: Dict[str, Set[int]] = {}
+        self.por_palabra_ingrediente: Dict[str, Set[int]] = {}
+        # Vocabulario de ingredientes por trigrama: palabras que contienen cada grupo de tres letras
+        self.por_trigrama: Dict[str, Set[str]] = {}
+        # Alérgenos del vocabulario: máscara por número y bitset de números por alérgeno
+        self.mascaras_alergenos = array("Q")
+        bits_por_alergeno = [bytearray((len(recetas) + 7) // 8) for _ in ALERGENOS]
+        # Alérgenos fuera del vocabulario
+        self.por_alergeno: Dict[str, Set[int]] = {}
+        self.duracion_por_numero = array("Q")
+        # duración << 32 | número, ordenado: la duración máxima se busca con bisect
+        self.duraciones = array("Q")
+        self._copiadas: set = set()
+
+        duraciones = []
+        for numero, receta in enumerate(recetas):
+            campos = self._campos(receta)
+            for nombre, clave in self._cubos(campos):
+                getattr(self, nombre).setdefault(clave, set()).add(numero)
+            mascara, duracion = campos[6], campos[8]
+            self.mascaras_alergenos.append(mascara)
+            for bit, bits in enumerate(bits_por_alergeno):
+                if mascara >> bit & 1:
+                    bits[numero >> 3] |= 1 << (numero & 7)
+            self.duracion_por_numero.append(duracion)
+            duraciones.append(duracion << 32 | numero)
+        for palabra in self.por_palabra_ingrediente:
+            for trigrama in trigramas(palabra):
+                self.por_trigrama.setdefault(trigrama, set()).add(palabra)
+
+        self.recetas_por_alergeno: List[int] = [int.from_bytes(bits, "little") for bits in bits_por_alergeno]
+        duraciones.sort()
+        self.duraciones = array("Q", duraciones)
+
+    def copiar(self) -> "IndiceBusqueda":
+        """Crea unos índices editables que comparten los conjuntos con estos."""
+        copia = IndiceBusqueda()
+        copia.recetas = list(self.recetas)
+        copia.numeros = dict(self.numeros)
+        copia.vivas = self.vivas
+        for nombre in ("por_pais", "por_dificultad", "por_turno", "por_publicada", "por_autor",
+                       "por_palabra_ingrediente", "por_trigrama", "por_alergeno"):
+            setattr(copia, nombre, dict(getattr(self, nombre)))
+        copia.mascaras_alergenos = array("Q", self.mascaras_alergenos)
+        copia.recetas_por_alergeno = list(self.recetas_por_alergeno)
+        copia.duracion_por_numero = array("Q", self.duracion_por_numero)
+        copia.duraciones = array("Q", self.duraciones)
+        return copia
+
+    @staticmethod
+    def _campos(receta: Dict[str, Any]) -> tuple:
+        """Valores indexados de una receta; si no cambian al editarla, los índices no se tocan."""
+        return (
+            receta.get("paisOrigen") or "", receta.get("dificultad") or "", receta.get("turnoComida") or "",
+            bool(receta.get("publicada", False)), receta.get("usuario", ""),
+            frozenset(palabras(receta.get("ingredientes"))), mascara_alergenos(receta),
+            frozenset(alergenos_fuera_de_vocabulario(receta)), min(duracion_receta(receta), 0xFFFFFFFF),
+        )
+
+    @staticmethod
+    def _cubos(campos: tuple) -> List[tuple]:
+        """Pares (índice, clave) en los que está una receta con esos campos."""
+        pais, dificultad, turno, publicada, autor, palabras_ingredientes, _, fuera_de_vocabulario, _ = campos
+        return [
+            ("por_pais", pais), ("por_dificultad", dificultad), ("por_turno", turno),
+            ("por_publicada", publicada), ("por_autor", autor),
+            *(("por_palabra_ingrediente", palabra) for palabra in palabras_ingredientes),
+            *(("por_alergeno", alergeno) for alergeno in fuera_de_vocabulario),
+        ]
+
+    def _conjunto_editable(self, nombre: str, clave: Any) -> set:
+        """Devuelve el conjunto de una clave copiándolo la primera vez que se modifica."""
+        indice = getattr(self, nombre)
+        if (nombre, clave) not in self._copiadas:
+            indice[clave] = set(indice.get(clave, ()))
+            self._copiadas.add((nombre, clave))
+        return indice[clave]
+
+    def _anadir_a(self, nombre: str, clave: Any, valor: Any) -> None:
+        if nombre == "por_palabra_ingrediente" and clave not in self.por_palabra_ingrediente:
+            for trigrama in trigramas(clave):
+                self._anadir_a("por_trigrama", trigrama, clave)
+        self._conjunto_editable(nombre, clave).add(valor)
+
+    def _quitar_de(self, nombre: str, clave: Any, valor: Any) -> None:
+        conjunto = self._conjunto_editable(nombre, clave)
+        conjunto.discard(valor)
+        if not conjunto:
+            del getattr(self, nombre)[clave]
+            self._copiadas.discard((nombre, clave))
+            if nombre == "por_palabra_ingrediente":
+                for trigrama in trigramas(clave):
+                    self._quitar_de("por_trigrama", trigrama, clave)
+
+    def _marcar_alergenos(self, numero: int, mascara: int, presente: bool) -> None:
+        for bit in range(len(ALERGENOS)):
+            if mascara >> bit & 1:
+                if presente:
+                    self.recetas_por_alergeno[bit] |= 1 << numero
+                else:
+                    self.recetas_por_alergeno[bit] &= ~(1 << numero)
+
+    def _cambiar_duracion(self, numero: int, duracion: int) -> None:
+        anterior = self.duracion_por_numero[numero]
+        del self.duraciones[bisect.bisect_left(self.duraciones, anterior << 32 | numero)]
+        bisect.insort(self.duraciones, duracion << 32 | numero)
+        self.duracion_por_numero[numero] = duracion
+
+    def agregar(self, receta: Dict[str, Any]) -> None:
+        numero = len(self.recetas)
+        campos = self._campos(receta)
+        self.recetas.append(receta)
+        self.numeros[id(receta)] = numero
+        self.vivas |= 1 << numero
+        for nombre, clave in self._cubos(campos):
+            self._anadir_a(nombre, clave, numero)
+        self.mascaras_alergenos.append(campos[6])
+        self._marcar_alergenos(numero, campos[6], True)
+        self.duracion_por_numero.append(campos[8])
+        bisect.insort(self.duraciones, campos[8] << 32 | numero)
+
+    def quitar(self, receta: Dict[str, Any]) -> None:
+        numero = self.numeros.pop(id(receta), None)
+        if numero is None:
+            return
+        for nombre, clave in self._cubos(self._campos(receta)):
+            self._quitar_de(nombre, clave, numero)
+        self._marcar_alergenos(numero, self.mascaras_alergenos[numero], False)
+        self.mascaras_alergenos[numero] = 0
+        del self.duraciones[bisect.bisect_left(self.duraciones, self.duracion_por_numero[numero] << 32 | numero)]
+        self.vivas &= ~(1 << numero)
+        self.recetas[numero] = None
+
+    def sustituir(self, anterior: Dict[str, Any], nueva: Dict[str, Any]) -> None:
+        """Cambia una receta por otra con el mismo número; solo se tocan los índices de los campos que cambian."""
+        numero = self.numeros.pop(id(anterior), None)
+        if numero is None:
+            self.agregar(nueva)
+            return
+        campos_anteriores, campos = self._campos(anterior), self._campos(nueva)
+        if campos != campos_anteriores:
+            cubos_anteriores, cubos = set(self._cubos(campos_anteriores)), set(self._cubos(campos))
+            for nombre, clave in cubos_anteriores - cubos:
+                self._quitar_de(nombre, clave, numero)
+            for nombre, clave in cubos - cubos_anteriores:
+                self._anadir_a(nombre, clave, numero)
+            if campos[6] != campos_anteriores[6]:
+                self._marcar_alergenos(numero, campos_anteriores[6], False)
+                self._marcar_alergenos(numero, campos[6], True)
+                self.mascaras_alergenos[numero] = campos[6]
+            if campos[8] != campos_anteriores[8]:
+                self._cambiar_duracion(numero, campos[8])
+        self.recetas[numero] = nueva
+        self.numeros[id(nueva)] = numero
+
+    def _palabras_con(self, buscada: str) -> Iterable[str]:
+        """
+        Palabras del vocabulario de ingredientes que contienen el texto. Si tiene al menos tres
+        letras, solo se comprueban las palabras que comparten todos sus trigramas; si no, se
+        recorre el vocabulario.
+        """
+        grupos = trigramas(buscada)
+        if not grupos:
+            return [palabra for palabra in self.por_palabra_ingrediente if buscada in palabra]
+        con_trigramas = sorted((self.por_trigrama.get(trigrama, set()) for trigrama in grupos), key=len)
+        candidatas = set(con_trigramas[0])
+        for con_trigrama in con_trigramas[1:]:
+            candidatas &= con_trigrama
+        return [palabra for palabra in candidatas if buscada in palabra]
+
+    def _con_ingrediente(self, ingrediente: str) -> Optional[Set[int]]:
+        """
+        Recetas que pueden contener el texto en sus ingredientes: las que tienen, para cada
+        palabra del texto, alguna palabra que la contiene. Devuelve None si el texto no tiene
+        palabras (solo se puede comprobar receta a receta).
+        """
+        candidatas = None
+        for buscada in sorted(set(palabras(ingrediente)), key=len, reverse=True):
+            con_palabra: Set[int] = set()
+            for palabra in self._palabras_con(buscada):
+                con_palabra |= self.por_palabra_ingrediente[palabra]
+            candidatas = con_palabra if candidatas is None else candidatas & con_palabra
+            if not candidatas:
+                break
+        return candidatas
+
+    def _con_alergeno(self, alergeno: str) -> Set[int]:
+        """Recetas con algún alérgeno fuera del vocabulario que contiene el texto."""
+        excluidas: Set[int] = set()
+        for nombre, posiciones in self.por_alergeno.items():
+            if alergeno in nombre:
+                excluidas |= posiciones
+        return excluidas
+
+    def buscar(self, filtros: Dict[str, Any], autor: Optional[str] = None,
+               excluir_autor: Optional[str] = None, solo_publicadas: bool = False) -> List[Dict[str, Any]]:
+        """
+        Recetas que cumplen todos los filtros.
+
+        Args:
+            filtros (Dict[str, Any]): Filtros de FILTROS_RECETAS.md; las claves vacías no filtran:
+                - ingredientes (List[str]): textos que deben aparecer todos en los ingredientes
+                - alergenos (List[str]): se excluyen las recetas con alguno de ellos
+                - paisOrigen, dificultad, turnoComida (str): valor exacto
+                - duracion (int): duración máxima en minutos
+                - publicada (str): "si" o "no"
+            autor (Optional[str]): Solo recetas de este usuario
+            excluir_autor (Optional[str]): Excluir las recetas de este usuario
+            solo_publicadas (bool): Solo recetas publicadas
+
+        Returns:
+            List[Dict[str, Any]]: Recetas encontradas (solo lectura), por su número en el índice
+        """
+        # Filtros indexados: (tamaño, obtener el conjunto, comprobar una posición)
+        conjuntos: List[tuple] = []
+        comprobaciones: List[Callable[[Dict[str, Any]], bool]] = []
+
+        def cubo(indice: Dict[Any, Set[int]], valor: Any) -> None:
+            posiciones = indice.get(valor, set())
+            conjuntos.append((len(posiciones), lambda: posiciones, posiciones.__contains__))
+
+        if autor is not None:
+            cubo(self.por_autor, autor)
+        if solo_publicadas:
+            cubo(self.por_publicada, True)
+        if filtros.get("publicada") in ("si", "no"):
+            cubo(self.por_publicada, filtros["publicada"] == "si")
+        for campo, indice in (("paisOrigen", self.por_pais), ("dificultad", self.por_dificultad),
+                              ("turnoComida", self.por_turno)):
+            if filtros.get(campo):
+                cubo(indice, filtros[campo])
+
+        duracion_maxima = filtros.get("duracion")
+        if duracion_maxima is not None:
+            fin = bisect.bisect_right(self.duraciones, min(duracion_maxima, 0xFFFFFFFF) << 32 | 0xFFFFFFFF)
+            conjuntos.append((
+                fin,
+                lambda: [clave & 0xFFFFFFFF for clave in self.duraciones[:fin]],
+                lambda posicion: self.duracion_por_numero[posicion] <= duracion_maxima
+            ))
+
+        for ingrediente in filtros.get("ingredientes") or ():
+            texto = normalizar_texto(ingrediente)
+            if not texto:
+                continue
+            posiciones = self._con_ingrediente(texto)
+            if posiciones is not None:
+                conjuntos.append((len(posiciones), lambda posiciones=posiciones: posiciones, posiciones.__contains__))
+            # Las listas por palabra dan un superconjunto: se comprueba el texto completo
+            comprobaciones.append(lambda receta, texto=texto: texto in normalizar_texto(receta.get("ingredientes")))
+
+        excluidas: Set[int] = set()
+        bits_excluidos = 0
+        for alergeno in filtros.get("alergenos") or ():
+            texto = clave_alergeno(alergeno)
+            if texto:
+                bits_excluidos |= bits_alergenos_buscados(texto)
+                excluidas |= self._con_alergeno(texto)
+        if bits_excluidos:
+            # AND-NOT de los bitsets de los alérgenos excluidos sobre todas las recetas
+            con_alergeno = 0
+            for bit in range(len(ALERGENOS)):
+                if bits_excluidos >> bit & 1:
+                    con_alergeno |= self.recetas_por_alergeno[bit]
+            sin_alergeno = self.vivas & ~con_alergeno
+            conjuntos.append((
+                sin_alergeno.bit_count(),
+                lambda: posiciones_bitset(sin_alergeno),
+                lambda posicion: not self.mascaras_alergenos[posicion] & bits_excluidos
+            ))
+
+        # Intersección empezando por el conjunto más pequeño: el resto solo se consulta
+        # para las candidatas que quedan, sin recorrer sus listas
+        conjuntos.sort(key=lambda conjunto: conjunto[0])
+        if conjuntos:
+            candidatas = set(conjuntos[0][1]())
+            for _, _, contiene in conjuntos[1:]:
+                if not candidatas:
+                    break
+                candidatas = {posicion for posicion in candidatas if contiene(posicion)}
+        else:
+            candidatas = set(posiciones_bitset(self.vivas))
+        candidatas -= excluidas
+
+        resultado = []
+        for posicion in sorted(candidatas):
+            receta = self.recetas[posicion]
+            if excluir_autor is not None and receta.get("usuario", "") == excluir_autor:
+                continue
+            if all(comprobar(receta) for comprobar in comprobaciones):
+                resultado.append(receta)
+        return resultado
@@ -0,0 +1,390 @@
+"""
+Búsqueda de texto libre en las recetas (parámetro `q` de /api/recetas/buscar).
+
+Índice invertido sobre nombreReceta, descripcion e ingredientes:
+
+- Los textos se pasan a minúsculas y sin tildes y se descartan las palabras vacías
+  del español, así que "Azafrán" y "azafran" son el mismo término.
+- Las palabras del nombre cuentan más que las de los ingredientes, y estas más que
+  las de la descripción (PESOS_CAMPOS).
+- Las recetas deben contener todos los términos de la búsqueda y se ordenan por BM25.
+
+Para cada término se guardan sus documentos ordenados por número (para saber si una
+receta lo contiene) y, agrupados por frecuencia, de más corto a más largo: dentro de
+un grupo la puntuación del término solo puede bajar, así que sus mejores documentos
+se obtienen sin puntuar la lista entera. Las k mejores recetas se buscan con el
+algoritmo de umbral: se avanza por las listas de todos los términos a la vez y se
+para en cuanto ninguna receta sin ver puede superar a la k-ésima.
+
+El índice se mantiene al añadir, editar y borrar recetas desde IndicesRecetas
+(repositorio_recetas.py). Como el resto de índices, una vez publicado no se
+modifica: `copiar` comparte las listas y solo se copian las de los términos que cambian.
+"""
+
+import re
+import heapq
+import math
+import bisect
+import functools
+import unicodedata
+from array import array
+from typing import Optional, List, Dict, Any, Tuple, Callable, Iterator
+
+# Peso de las palabras de cada campo en la frecuencia de un término
+PESOS_CAMPOS = (("nombreReceta", 3), ("ingredientes", 2), ("descripcion", 1))
+
+# Parámetros de BM25
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# El total de coincidencias solo se cuenta si el término menos frecuente de la
+# consulta está en como mucho estas recetas (contarlas todas cuesta recorrer su lista)
+MAX_RECETAS_CONTEO = 10_000
+
+PATRON_TERMINO = re.compile(r"\w+")
+
+# Palabras vacías del español (sin tildes)
+PALABRAS_VACIAS = frozenset("""
+    a al algo algunas algunos ante antes como con contra cual cuando de del desde donde
+    durante e el ella ellas ellos en entre era es esa esas ese eso esos esta estan estas
+    este esto estos ha hasta hay la las le les lo los mas me mi mis muy nada ni no nos o
+    otra otras otro otros para pero poco por porque que quien se sea ser si sin sobre
+    su sus tambien tan tanto te todo todos tu tus un una uno unos unas y ya
+""".split())
+
+
+def quitar_tildes(palabra: str) -> str:
+    """Palabra sin tildes ni diéresis."""
+    if palabra.isascii():
+        return palabra
+    descompuesto = unicodedata.normalize("NFKD", palabra)
+    return "".join(caracter for caracter in descompuesto if not unicodedata.combining(caracter))
+
+
+@functools.lru_cache(maxsize=200_000)
+def termino_de(palabra: str) -> Optional[str]:
+    """Término de una palabra en minúsculas, o None si se descarta (las palabras se repiten mucho, de ahí la caché)."""
+    termino = quitar_tildes(palabra)
+    if termino in PALABRAS_VACIAS or (len(termino) < 2 and not termino.isdigit()):
+        return None
+    return termino
+
+
+def terminos_texto(texto: Any) -> List[str]:
+    """
+    Términos de un texto para el índice o para una búsqueda.
+
+    Args:
+        texto (Any): Texto a dividir
+
+    Returns:
+        List[str]: Términos normalizados, sin palabras vacías ni letras sueltas
+    """
+    terminos = []
+    for palabra in PATRON_TERMINO.findall(str(texto or "").casefold()):
+        termino = termino_de(palabra)
+        if termino is not None:
+            terminos.append(termino)
+    return terminos
+
+
+def frecuencias_receta(receta: Dict[str, Any]) -> Dict[str, int]:
+    """Frecuencia ponderada por campo de cada término de una receta."""
+    frecuencias: Dict[str, int] = {}
+    for campo, peso in PESOS_CAMPOS:
+        for termino in terminos_texto(receta.get(campo)):
+            frecuencias[termino] = frecuencias.get(termino, 0) + peso
+    return frecuencias
+
+
+def texto_receta(receta: Dict[str, Any]) -> tuple:
+    """Campos indexados de una receta (para saber si una edición cambia el índice)."""
+    return tuple(receta.get(campo) for campo, _ in PESOS_CAMPOS)
+
+
+class ListaTermino:
+    """
+    Documentos que contienen un término.
+
+    - documentos / frecuencias: números de documento en orden creciente y su frecuencia
+    - grupos: frecuencia → documentos ordenados por (longitud, número), guardados como
+      un solo entero `longitud << 32 | número` para ordenarlos sin función de clave
+    """
+
+    __slots__ = ("documentos", "frecuencias", "grupos")
+
+    def __init__(self):
+        self.documentos = array("I")
+        self.frecuencias = array("H")
+        self.grupos: Dict[int, array] = {}
+
+    def copiar(self) -> "ListaTermino":
+        copia = ListaTermino()
+        copia.documentos = array("I", self.documentos)
+        copia.frecuencias = array("H", self.frecuencias)
+        copia.grupos = {frecuencia: array("Q", grupo) for frecuencia, grupo in self.grupos.items()}
+        return copia
+
+    def frecuencia(self, numero: int) -> int:
+        """Frecuencia del término en un documento (0 si no lo contiene)."""
+        i = bisect.bisect_left(self.documentos, numero)
+        if i < len(self.documentos) and self.documentos[i] == numero:
+            return self.frecuencias[i]
+        return 0
+
+
+class IndiceTexto:
+    """
+    Índice invertido con ordenación BM25. Los documentos se numeran al añadirlos y
+    cada edición que cambia el texto de una receta le da un número nuevo, de modo
+    que las listas de documentos solo crecen por el final.
+    """
+
+    def __init__(self):
+        self.terminos: Dict[str, ListaTermino] = {}
+        # Por número: (receta, longitud ponderada), o None si se quitó
+        self.documentos: List[Optional[Tuple[Dict[str, Any], int]]] = []
+        # clave de la receta (id estable o, sin él, identidad del objeto) → número
+        self.numeros: Dict[Any, int] = {}
+        self.total_documentos = 0
+        self.longitud_total = 0
+        self._copiadas: set = set()
+
+    @classmethod
+    def construir(cls, recetas: List[Dict[str, Any]]) -> "IndiceTexto":
+        """Construye el índice de una vez: llena las listas sin ordenar los grupos y los ordena al final."""
+        indice = cls()
+        terminos = indice.terminos
+        for numero, receta in enumerate(recetas):
+            frecuencias = frecuencias_receta(receta)
+            longitud = sum(frecuencias.values())
+            indice.documentos.append((receta, longitud))
+            indice.numeros[cls._clave(receta)] = numero
+            indice.longitud_total += longitud
+            for termino, frecuencia in frecuencias.items():
+                frecuencia = min(frecuencia, 0xFFFF)
+                lista = terminos.get(termino)
+                if lista is None:
+                    lista = terminos[termino] = ListaTermino()
+                lista.documentos.append(numero)
+                lista.frecuencias.append(frecuencia)
+                grupo = lista.grupos.get(frecuencia)
+                if grupo is None:
+                    grupo = lista.grupos[frecuencia] = []
+                grupo.append(longitud << 32 | numero)
+        indice.total_documentos = len(recetas)
+
+        for lista in terminos.values():
+            for frecuencia, grupo in lista.grupos.items():
+                grupo.sort()
+                lista.grupos[frecuencia] = array("Q", grupo)
+        return indice
+
+    def copiar(self) -> "IndiceTexto":
+        """Crea un índice editable que comparte las listas de términos con este."""
+        copia = IndiceTexto()
+        copia.terminos = dict(self.terminos)
+        copia.documentos = list(self.documentos)
+        copia.numeros = dict(self.numeros)
+        copia.total_documentos = self.total_documentos
+        copia.longitud_total = self.longitud_total
+        return copia
+
+    @staticmethod
+    def _clave(receta: Dict[str, Any]) -> Any:
+        return receta.get("id") or id(receta)
+
+    def _lista_editable(self, termino: str) -> ListaTermino:
+        """Devuelve la lista de un término copiándola la primera vez que se modifica."""
+        if termino not in self._copiadas:
+            existente = self.terminos.get(termino)
+            self.terminos[termino] = existente.copiar() if existente is not None else ListaTermino()
+            self._copiadas.add(termino)
+        return self.terminos[termino]
+
+    def agregar(self, receta: Dict[str, Any]) -> None:
+        frecuencias = frecuencias_receta(receta)
+        numero = len(self.documentos)
+        longitud = sum(frecuencias.values())
+        self.documentos.append((receta, longitud))
+        self.numeros[self._clave(receta)] = numero
+        self.total_documentos += 1
+        self.longitud_total += longitud
+
+        for termino, frecuencia in frecuencias.items():
+            frecuencia = min(frecuencia, 0xFFFF)
+            lista = self._lista_editable(termino)
+            lista.documentos.append(numero)
+            lista.frecuencias.append(frecuencia)
+            bisect.insort(lista.grupos.setdefault(frecuencia, array("Q")), longitud << 32 | numero)
+
+    def quitar(self, receta: Dict[str, Any]) -> None:
+        numero = self.numeros.pop(self._clave(receta), None)
+        if numero is None:
+            return
+        _, longitud = self.documentos[numero]
+        for termino in frecuencias_receta(receta):
+            lista = self._lista_editable(termino)
+            i = bisect.bisect_left(lista.documentos, numero)
+            if i == len(lista.documentos) or lista.documentos[i] != numero:
+                continue
+            frecuencia = lista.frecuencias[i]
+            del lista.documentos[i]
+            del lista.frecuencias[i]
+            grupo = lista.grupos[frecuencia]
+            del grupo[bisect.bisect_left(grupo, longitud << 32 | numero)]
+            if not grupo:
+                del lista.grupos[frecuencia]
+            if not lista.documentos:
+                del self.terminos[termino]
+                self._copiadas.discard(termino)
+        self.documentos[numero] = None
+        self.total_documentos -= 1
+        self.longitud_total -= longitud
+
+    def sustituir(self, anterior: Dict[str, Any], nueva: Dict[str, Any]) -> None:
+        """Cambia una receta por otra; las listas solo se tocan si cambia el texto indexado."""
+        numero = self.numeros.get(self._clave(anterior))
+        if numero is not None and self._clave(anterior) == self._clave(nueva) \
+                and texto_receta(anterior) == texto_receta(nueva):
+            self.documentos[numero] = (nueva, self.documentos[numero][1])
+            return
+        self.quitar(anterior)
+        self.agregar(nueva)
+
+    def _puntuacion(self, frecuencia: int, longitud: int, idf: float, media: float) -> float:
+        return idf * frecuencia * (BM25_K1 + 1) / (frecuencia + BM25_K1 * (1 - BM25_B + BM25_B * longitud / media))
+
+    def _mejores_de(self, lista: ListaTermino, idf: float, media: float) -> Iterator[Tuple[float, int]]:
+        """Documentos de un término de mayor a menor puntuación, mezclando las cabezas de sus grupos."""
+        cabezas = []
+        for frecuencia, grupo in lista.grupos.items():
+            valor = grupo[0]
+            puntuacion = self._puntuacion(frecuencia, valor >> 32, idf, media)
+            cabezas.append((-puntuacion, valor & 0xFFFFFFFF, frecuencia, 0))
+        heapq.heapify(cabezas)
+        while cabezas:
+            puntuacion, numero, frecuencia, posicion = heapq.heappop(cabezas)
+            yield -puntuacion, numero
+            grupo = lista.grupos[frecuencia]
+            if posicion + 1 < len(grupo):
+                valor = grupo[posicion + 1]
+                heapq.heappush(cabezas, (
+                    -self._puntuacion(frecuencia, valor >> 32, idf, media),
+                    valor & 0xFFFFFFFF, frecuencia, posicion + 1
+                ))
+
+    def buscar(self, consulta: str, cantidad: int, admitir: Optional[Callable[[Dict[str, Any]], bool]] = None,
+               candidatas: Optional[List[Dict[str, Any]]] = None,
+               contar: bool = False) -> Tuple[List[Tuple[float, Dict[str, Any]]], Optional[int]]:
+        """
+        Recetas que contienen todos los términos de la consulta, de más a menos relevante.
+
+        Args:
+            consulta (str): Texto buscado
+            cantidad (int): Número de mejores recetas a devolver
+            admitir (Optional[Callable]): Solo se devuelven las recetas para las que devuelve True
+            candidatas (Optional[List[Dict[str, Any]]]): Solo se buscan estas recetas (p. ej. las que
+                cumplen otros filtros); además deben pasar `admitir` si se indica
+            contar (bool): Calcular también el total de recetas que coinciden (si no hay
+                que recorrer más de MAX_RECETAS_CONTEO)
+
+        Returns:
+            Tuple[List[Tuple[float, Dict[str, Any]]], Optional[int]]: (puntuación, receta) de las
+            mejores recetas y total de coincidencias (None si no se pidió o no se pudo contar)
+        """
+        terminos = list(dict.fromkeys(terminos_texto(consulta)))
+        listas = [self.terminos.get(termino) for termino in terminos]
+        if not terminos or any(lista is None for lista in listas) or cantidad < 1:
+            return [], 0 if contar else None
+
+        numero_documentos = self.total_documentos
+        media = self.longitud_total / numero_documentos
+        idfs = [
+            math.log(1 + (numero_documentos - len(lista.documentos) + 0.5) / (len(lista.documentos) + 0.5))
+            for lista in listas
+        ]
+
+        def puntuar(numero: int) -> Optional[float]:
+            """Puntuación BM25 de un documento o None si le falta algún término."""
+            longitud = self.documentos[numero][1]
+            total = 0.0
+            for lista, idf in zip(listas, idfs):
+                frecuencia = lista.frecuencia(numero)
+                if not frecuencia:
+                    return None
+                total += self._puntuacion(frecuencia, longitud, idf, media)
+            return total
+
+        if candidatas is not None:
+            permitidas = {id(receta) for receta in candidatas}
+            condicion = admitir
+            admitir = lambda receta: id(receta) in permitidas and (condicion is None or condicion(receta))
+
+        def admitido(numero: int) -> bool:
+            return admitir is None or admitir(self.documentos[numero][0])
+
+        # Lista más corta primero
+        orden = sorted(range(len(listas)), key=lambda i: len(listas[i].documentos))
+        listas = [listas[i] for i in orden]
+        idfs = [idfs[i] for i in orden]
+
+        total = None
+        if contar and len(listas[0].documentos) <= MAX_RECETAS_CONTEO:
+            total = sum(
+                1 for numero in listas[0].documentos
+                if all(lista.frecuencia(numero) for lista in listas[1:]) and admitido(numero)
+            )
+
+        # Pocas candidatas: se puntúan todas directamente
+        if candidatas is not None and len(candidatas) <= len(listas[0].documentos):
+            puntuadas = []
+            for receta in candidatas:
+                numero = self.numeros.get(self._clave(receta))
+                if numero is None or self.documentos[numero][0] is not receta or not admitido(numero):
+                    continue
+                puntuacion = puntuar(numero)
+                if puntuacion is not None:
+                    puntuadas.append((puntuacion, -numero))
+            mejores = heapq.nlargest(cantidad, puntuadas)
+            return [(puntuacion, self.documentos[-numero][0]) for puntuacion, numero in mejores], total
+
+        # Algoritmo de umbral sobre las listas de todos los términos
+        flujos = [self._mejores_de(lista, idf, media) for lista, idf in zip(listas, idfs)]
+        ultimas = [float("inf")] * len(flujos)
+        ultimos_numeros = [-1] * len(flujos)
+        vistos = set()
+        mejores: List[Tuple[float, int]] = []  # montículo de mínimos con (puntuación, -número)
+        activo = True
+        while activo:
+            for i, flujo in enumerate(flujos):
+                siguiente = next(flujo, None)
+                if siguiente is None:
+                    # Toda receta con todos los términos aparece en esta lista: ya se han visto todas
+                    activo = False
+                    break
+                ultimas[i], numero = siguiente
+                ultimos_numeros[i] = numero
+                if numero in vistos:
+                    continue
+                vistos.add(numero)
+                if not admitido(numero):
+                    continue
+                puntuacion = puntuar(numero)
+                if puntuacion is None:
+                    continue
+                if len(mejores) < cantidad:
+                    heapq.heappush(mejores, (puntuacion, -numero))
+                elif (puntuacion, -numero) > mejores[0]:
+                    heapq.heapreplace(mejores, (puntuacion, -numero))
+            if len(mejores) == cantidad:
+                # Una receta sin ver puntúa como mucho el umbral, y solo lo alcanza si en cada
+                # lista empata con la última vista; entonces su número es mayor que el de todas
+                # ellas y, a igualdad de puntuación, queda detrás (el orden no cambia entre páginas)
+                umbral = sum(ultimas)
+                peor, numero_peor = mejores[0]
+                if peor > umbral or (peor == umbral and max(ultimos_numeros) >= -numero_peor):
+                    break
+
+        mejores.sort(reverse=True)
+        return [(puntuacion, self.documentos[-numero][0]) for puntuacion, numero in mejores], total
@@ -0,0 +1,157 @@
+"""
+Almacén de comentarios de recetas.
+
+Los comentarios se guardan fuera de `recetas.json`, agrupados por el id estable
+de cada receta, y solo se añaden al final: publicar un comentario no reescribe
+las recetas. Los listados de recetas solo necesitan el número de comentarios,
+que se mantiene en memoria.
+
+- AlmacenComentarios: un archivo JSON Lines por receta en `datos/comentarios/`.
+- AlmacenComentariosSQLite (base_datos.py): tabla `comentarios_recetas`.
+"""
+
+import os
+import re
+import threading
+from typing import List, Dict, Any, Iterable, Tuple
+
+from constants import *
+from almacenamiento import serializar_json, deserializar_json
+
+# Los ids de receta se usan como nombre de archivo
+PATRON_ID_RECETA = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class AlmacenComentarios:
+    """
+    Comentarios en archivos de solo añadido, uno por receta (`{id}.jsonl`).
+    El total de cada receta se guarda en memoria junto al tamaño del archivo con
+    el que se calculó, de modo que cambios hechos por otro proceso lo invalidan.
+    """
+
+    def __init__(self, directorio: str = DIRECTORIO_COMENTARIOS):
+        self.directorio = directorio
+        self._totales: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._version = 0
+
+    def _ruta(self, id_receta: str) -> str:
+        if not PATRON_ID_RECETA.match(id_receta or ""):
+            raise ValueError(f"Id de receta no válido: {id_receta!r}")
+        return os.path.join(self.directorio, f"{id_receta}.jsonl")
+
+    def _leer_lineas(self, id_receta: str) -> List[bytes]:
+        """
+        Lee las líneas completas del archivo de una receta y actualiza su total.
+        Una última línea sin salto de línea (caída a mitad de escritura) se recorta.
+        """
+        ruta = self._ruta(id_receta)
+        try:
+            with open(ruta, 'rb') as archivo:
+                contenido = archivo.read()
+        except FileNotFoundError:
+            self._totales[id_receta] = (0, 0)
+            return []
+
+        fin = contenido.rfind(b"\n") + 1
+        if fin < len(contenido):
+            print(f"{LOG_WARNING} Comentario incompleto en {ruta}, se descarta")
+            os.truncate(ruta, fin)
+        lineas = contenido[:fin].splitlines()
+        self._totales[id_receta] = (fin, len(lineas))
+        return lineas
+
+    def contar(self, id_receta: str) -> int:
+        """Número de comentarios de una receta."""
+        try:
+            tamaño = os.path.getsize(self._ruta(id_receta))
+        except OSError:
+            tamaño = 0
+        with self._lock:
+            calculado = self._totales.get(id_receta)
+            if calculado is None or calculado[0] != tamaño:
+                self._leer_lineas(id_receta)
+            return self._totales[id_receta][1]
+
+    def contar_varios(self, ids_recetas: Iterable[str]) -> Dict[str, int]:
+        """Número de comentarios de cada receta indicada."""
+        return {id_receta: self.contar(id_receta) for id_receta in ids_recetas}
+
+    def anadir(self, id_receta: str, comentarios: List[Dict[str, Any]]) -> int:
+        """
+        Añade comentarios al final del archivo de la receta.
+
+        Args:
+            id_receta (str): Id estable de la receta
+            comentarios (List[Dict[str, Any]]): Comentarios en orden de publicación
+
+        Returns:
+            int: Total de comentarios de la receta tras añadirlos
+        """
+        ruta = self._ruta(id_receta)
+        lineas = b"".join(serializar_json(comentario, "compacto") + b"\n" for comentario in comentarios)
+        with self._lock:
+            # Validar el archivo (y recortar una línea incompleta) antes de añadir
+            self._leer_lineas(id_receta)
+            os.makedirs(self.directorio, exist_ok=True)
+            with open(ruta, 'ab') as archivo:
+                archivo.write(lineas)
+                archivo.flush()
+                os.fsync(archivo.fileno())
+            tamaño, total = self._totales[id_receta]
+            self._totales[id_receta] = (tamaño + len(lineas), total + len(comentarios))
+            self._version += 1
+            return total + len(comentarios)
+
+    def listar(self, id_receta: str, limite: int, desplazamiento: int = 0) -> List[Dict[str, Any]]:
+        """
+        Obtiene una página de comentarios, de más reciente a más antiguo.
+        Solo se parsean los comentarios de la página.
+
+        Args:
+            id_receta (str): Id estable de la receta
+            limite (int): Número máximo de comentarios
+            desplazamiento (int): Comentarios recientes que se saltan
+
+        Returns:
+            List[Dict[str, Any]]: Comentarios de la página
+        """
+        with self._lock:
+            lineas = self._leer_lineas(id_receta)
+        fin = len(lineas) - desplazamiento
+        inicio = max(fin - limite, 0)
+        return [deserializar_json(linea) for linea in reversed(lineas[inicio:max(fin, 0)])]
+
+    def eliminar(self, id_receta: str) -> None:
+        """Borra los comentarios de una receta eliminada."""
+        with self._lock:
+            try:
+                os.remove(self._ruta(id_receta))
+            except FileNotFoundError:
+                pass
+            self._totales.pop(id_receta, None)
+            self._version += 1
+
+    def version(self) -> int:
+        """Contador de escrituras del proceso, para las ETags de los listados (ver versiones.py)."""
+        return self._version
+
+
+def crear_almacen_comentarios(modo: str = MODO_ALMACENAMIENTO) -> Any:
+    """
+    Crea el almacén de comentarios que corresponde al modo de almacenamiento.
+
+    Args:
+        modo (str): "json", "registro" o "sqlite"
+
+    Returns:
+        Almacén de comentarios
+    """
+    if modo == "sqlite":
+        from base_datos import AlmacenComentariosSQLite, obtener_base_datos
+        return AlmacenComentariosSQLite(obtener_base_datos())
+    return AlmacenComentarios(DIRECTORIO_COMENTARIOS)
+
+
+# Almacén compartido por todo el proceso
+almacen_comentarios = crear_almacen_comentarios()
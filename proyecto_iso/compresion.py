@@ -0,0 +1,177 @@
+"""
+Compresión negociada (Accept-Encoding) de las respuestas: brotli si está instalado
+el paquete `brotli` y el navegador lo acepta, y si no gzip.
+
+- Páginas HTML, JS y CSS: se comprimen una vez, al máximo nivel, y las variantes se
+  guardan en memoria con el recurso (ver recursos_estaticos.py y RespuestaPrecomprimida).
+- Resto de respuestas (JSON de la API): CompresionMiddleware las comprime al vuelo,
+  con un nivel rápido, si superan TAMANO_MINIMO_COMPRESION.
+
+Al comprimir, una ETag fuerte se marca como débil (W/): la representación
+comprimida no es idéntica byte a byte, pero If-None-Match la sigue reconociendo
+(ver versiones.etag_coincide).
+"""
+
+import gzip
+from typing import Any, Dict, Iterable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+from constants import *
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Codificaciones disponibles, en orden de preferencia
+CODIFICACIONES = ("br", "gzip") if brotli else ("gzip",)
+
+
+def elegir_codificacion(accept_encoding: Optional[str], disponibles: Iterable[str] = CODIFICACIONES) -> Optional[str]:
+    """
+    Elige la codificación de la respuesta según la cabecera Accept-Encoding.
+
+    Args:
+        accept_encoding (Optional[str]): Cabecera de la petición (p. ej. "gzip, deflate, br;q=0.9")
+        disponibles (Iterable[str]): Codificaciones que puede enviar el servidor
+
+    Returns:
+        Optional[str]: Codificación elegida o None para enviar la respuesta sin comprimir
+    """
+    aceptadas: Dict[str, float] = {}
+    for parte in (accept_encoding or "").lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        calidad = 1.0
+        if parametros.strip().startswith("q="):
+            try:
+                calidad = float(parametros.strip()[2:])
+            except ValueError:
+                calidad = 0.0
+        if nombre:
+            aceptadas[nombre] = calidad
+    disponibles = set(disponibles)
+    for codificacion in CODIFICACIONES:
+        if codificacion in disponibles and aceptadas.get(codificacion, aceptadas.get("*", 0.0)) > 0:
+            return codificacion
+    return None
+
+
+def comprimir(contenido: bytes, codificacion: str, estatico: bool = False) -> bytes:
+    """
+    Comprime un cuerpo de respuesta.
+
+    Args:
+        contenido (bytes): Cuerpo sin comprimir
+        codificacion (str): "br" o "gzip"
+        estatico (bool): True para el nivel máximo (recursos que se comprimen una sola vez)
+
+    Returns:
+        bytes: Cuerpo comprimido
+    """
+    if codificacion == "br":
+        return brotli.compress(contenido, quality=CALIDAD_BROTLI_ESTATICO if estatico else CALIDAD_BROTLI_DINAMICO)
+    return gzip.compress(contenido, compresslevel=NIVEL_GZIP_ESTATICO if estatico else NIVEL_GZIP_DINAMICO, mtime=0)
+
+
+def es_comprimible(content_type: Optional[str]) -> bool:
+    """Indica si un tipo de contenido es texto (las imágenes ya van comprimidas)."""
+    tipo = (content_type or "").split(";")[0].strip().lower()
+    return tipo.startswith("text/") or tipo in TIPOS_CONTENIDO_COMPRIMIBLES
+
+
+def variantes_comprimidas(contenido: bytes) -> Dict[str, bytes]:
+    """
+    Variantes comprimidas al máximo nivel de un recurso estático.
+
+    Args:
+        contenido (bytes): Contenido servido
+
+    Returns:
+        Dict[str, bytes]: Codificación → contenido comprimido (vacío si es pequeño o no gana nada)
+    """
+    if len(contenido) < TAMANO_MINIMO_COMPRESION:
+        return {}
+    variantes = {codificacion: comprimir(contenido, codificacion, estatico=True) for codificacion in CODIFICACIONES}
+    return {codificacion: variante for codificacion, variante in variantes.items() if len(variante) < len(contenido)}
+
+
+def marcar_codificacion(cabeceras: MutableHeaders, codificacion: str, longitud: int) -> None:
+    """Cabeceras de una respuesta comprimida: Content-Encoding, Content-Length, Vary y ETag débil."""
+    cabeceras["Content-Encoding"] = codificacion
+    cabeceras["Content-Length"] = str(longitud)
+    etag = cabeceras.get("etag")
+    if etag and etag.startswith('"'):
+        cabeceras["ETag"] = f"W/{etag}"
+    anadir_vary(cabeceras)
+
+
+def anadir_vary(cabeceras: MutableHeaders) -> None:
+    vary = cabeceras.get("vary")
+    if not vary:
+        cabeceras["Vary"] = "Accept-Encoding"
+    elif "accept-encoding" not in vary.lower():
+        cabeceras["Vary"] = f"{vary}, Accept-Encoding"
+
+
+class RespuestaPrecomprimida(Response):
+    """Respuesta con variantes ya comprimidas: envía la que acepta el navegador."""
+
+    def __init__(self, contenido: bytes, variantes: Dict[str, bytes], status_code: int = HTTP_OK,
+                 headers: Optional[Dict[str, str]] = None, media_type: Optional[str] = None):
+        super().__init__(contenido, status_code=status_code, headers=headers, media_type=media_type)
+        self.variantes = variantes
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        if self.variantes:
+            codificacion = elegir_codificacion(Headers(scope=scope).get("accept-encoding"), self.variantes)
+            if codificacion:
+                self.body = self.variantes[codificacion]
+                marcar_codificacion(self.headers, codificacion, len(self.body))
+            else:
+                anadir_vary(self.headers)
+        await super().__call__(scope, receive, send)
+
+
+class CompresionMiddleware:
+    """
+    Middleware ASGI que comprime al vuelo las respuestas de texto de un solo bloque
+    (JSONResponse, HTMLResponse...). No toca las respuestas por partes (archivos,
+    imágenes) ni las que ya llevan Content-Encoding (RespuestaPrecomprimida).
+    """
+
+    def __init__(self, app: Any, minimo: int = TAMANO_MINIMO_COMPRESION):
+        self.app = app
+        self.minimo = minimo
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        codificacion = elegir_codificacion(Headers(scope=scope).get("accept-encoding"))
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio: Optional[dict] = None
+
+        async def enviar(mensaje: dict) -> None:
+            nonlocal inicio
+            if mensaje["type"] == "http.response.start":
+                # Se retiene hasta ver el cuerpo: las cabeceras dependen de si se comprime
+                inicio = mensaje
+                return
+            if mensaje["type"] == "http.response.body" and inicio is not None:
+                cabeceras = MutableHeaders(raw=inicio["headers"])
+                cuerpo = mensaje.get("body", b"")
+                if (not mensaje.get("more_body", False) and "content-encoding" not in cabeceras
+                        and len(cuerpo) >= self.minimo and es_comprimible(cabeceras.get("content-type"))):
+                    cuerpo = comprimir(cuerpo, codificacion)
+                    marcar_codificacion(cabeceras, codificacion, len(cuerpo))
+                    mensaje = {**mensaje, "body": cuerpo}
+                await send(inicio)
+                inicio = None
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
@@ -26,15 +26,98 @@ DIRECTORIO_DATOS = os.path.join(BASE_DIR, "datos")
 RUTA_CUENTAS_JSON = os.path.join(DIRECTORIO_DATOS, "cuentas.json")
 RUTA_RECETAS_JSON = os.path.join(DIRECTORIO_DATOS, "recetas.json")
 RUTA_MENUS_SEMANALES_JSON = os.path.join(DIRECTORIO_DATOS, "menus_semanales.json")
+RUTA_REGISTRO_RECETAS = os.path.join(DIRECTORIO_DATOS, "recetas.json.log")
+RUTA_BASE_DATOS = os.path.join(DIRECTORIO_DATOS, "saborea.db")
+DIRECTORIO_COMENTARIOS = os.path.join(DIRECTORIO_DATOS, "comentarios")
+
+# ==================== CONFIGURACIÓN DE ALMACENAMIENTO ====================
+
+# Backend de persistencia de recetas:
+# - "json": reescribe recetas.json completo en cada guardado
+# - "registro": añade cada cambio a recetas.json.log y compacta en segundo plano
+# - "sqlite": guarda cuentas, recetas y menús en saborea.db (se importa de los JSON la primera vez)
+MODO_ALMACENAMIENTO = os.environ.get("SABOREA_ALMACENAMIENTO", "json")
+
+# Formato de los archivos JSON de datos:
+# - "legible": indentado con 2 espacios (como hasta ahora)
+# - "compacto": sin espacios, más pequeño y rápido de escribir y leer
+# Ambos se leen siempre; al guardar se usa el formato configurado (ver tools/migrar_formato_datos.py)
+FORMATO_DATOS = os.environ.get("SABOREA_FORMATO", "legible")
+
+# Número de cambios acumulados en el registro que dispara una compactación
+UMBRAL_COMPACTACION_REGISTRO = 500
+
+# Agrupación de escrituras de recetas: las operaciones que llegan dentro de la ventana
+# (en segundos) se guardan juntas, hasta un máximo de operaciones por lote
+VENTANA_GRUPO_ESCRITURA = 0.005
+MAX_OPERACIONES_POR_LOTE = 64
+
+# Hilos del pool donde los endpoints ejecutan la E/S bloqueante (archivos de datos e imágenes)
+# (la mayoría solo esperan a que el escritor de recetas guarde su lote)
+MAX_HILOS_ALMACENAMIENTO = int(os.environ.get("SABOREA_HILOS_ALMACENAMIENTO", "16"))
+
+# Paginación por cursor de las recetas de la comunidad (/api/recetas-comunidad)
+LIMITE_RECETAS_COMUNIDAD_POR_DEFECTO = 20
+MAX_LIMITE_RECETAS_COMUNIDAD = 100
+
+# Campos de las recetas en los listados (/api/mis-recetas, /api/recetas-comunidad, /api/recetas/buscar,
+# /obtener-recetas-guardadas, /api/recetas/usuario): por defecto, el resumen que muestran las tarjetas;
+# con el parámetro fields= se pueden pedir otros. El detalle completo está en /api/receta/{id}
+CAMPOS_RESUMEN_RECETA = [
+    "id", "nombreReceta", "fotoReceta", "duracion", "dificultad", "turnoComida",
+    "usuario", "publicada", "valoracionMedia", "totalValoraciones", "totalComentarios"
+]
+CAMPOS_LISTADO_RECETA = CAMPOS_RESUMEN_RECETA + [
+    "descripcion", "fotosReceta", "ingredientes", "alergenos", "paisOrigen", "pasosAseguir"
+]
+
+# Paginación de comentarios (/api/comentarios-receta)
+LIMITE_COMENTARIOS_POR_DEFECTO = 50
+MAX_LIMITE_COMENTARIOS = 200
+
+# Recetas por petición en el resumen de valoraciones y comentarios de las tarjetas (/api/resumen-recetas)
+MAX_IDS_RESUMEN_RECETAS = MAX_LIMITE_RECETAS_COMUNIDAD
 
 # Configuración de imágenes
 DIRECTORIO_UPLOADS = os.path.join(BASE_DIR, "static", "uploads")
 DIRECTORIO_IMAGENES_RECETAS = os.path.join(BASE_DIR, "static", "uploads", "recetas")
 URL_BASE_IMAGENES = "/static/uploads/recetas"
+URL_UPLOADS = "/static/uploads"
 TIPOS_IMAGEN_PERMITIDOS = ["image/jpeg", "image/jpg", "image/png", "image/webp"]
 EXTENSIONES_PERMITIDAS = [".jpg", ".jpeg", ".png", ".webp"]
 TAMAÑO_MAXIMO_IMAGEN = 5 * 1024 * 1024  # 5MB en bytes
 
+# Imágenes subidas (recetas y perfiles), guardadas con el hash de su contenido en subdirectorios
+# (ab/cd/abcd…_tarjeta.webp, ver imagenes.py): la misma foto subida varias veces se guarda una vez
+DIRECTORIO_IMAGENES_CONTENIDO = os.path.join(BASE_DIR, "static", "uploads", "imagenes")
+URL_IMAGENES_CONTENIDO = "/static/uploads/imagenes"
+
+# Variantes WebP que se generan al subir una imagen (ver imagenes.py):
+# nombre → (lado mayor máximo en píxeles, calidad WebP)
+VARIANTES_IMAGEN = {
+    "miniatura": (160, 70),
+    "tarjeta": (480, 75),
+    "completa": (1600, 82),
+}
+# Máximo de píxeles al decodificar una imagen subida
+MAX_PIXELES_IMAGEN = 40_000_000
+
+# Recolector de imágenes huérfanas (ver recolector_imagenes.py): archivos de static/uploads que
+# no usa ninguna receta ni cuenta. Modo "cuarentena" (se mueven fuera de static y se borran pasada
+# la retención), "borrar" o "desactivado"
+MODO_RECOLECTOR_IMAGENES = os.environ.get("SABOREA_RECOLECTOR_IMAGENES", "cuarentena")
+DIRECTORIO_CUARENTENA_IMAGENES = os.path.join(DIRECTORIO_DATOS, "cuarentena_uploads")
+GRACIA_RECOLECTOR_SEGUNDOS = 24 * 60 * 60  # No se tocan archivos más recientes (subidas en curso)
+RETENCION_CUARENTENA_SEGUNDOS = 7 * 24 * 60 * 60
+INTERVALO_RECOLECTOR_SEGUNDOS = 6 * 60 * 60
+LOTE_RECOLECTOR = 200  # Archivos revisados entre pausas, para no saturar el disco
+PAUSA_RECOLECTOR_SEGUNDOS = 0.5
+
+# Subida de imágenes por partes (POST /api/subir-imagen, ver subidas.py): el archivo se escribe
+# a un temporal según llega y /crear-receta lo referencia con el token devuelto (tokenSubida)
+CAMPO_SUBIDA_IMAGEN = "imagen"
+CADUCIDAD_SUBIDAS_SEGUNDOS = 30 * 60
+
 # ==================== CONFIGURACIÓN DEL SERVIDOR ====================
 
 # Configuración por defecto del servidor
@@ -65,10 +148,12 @@ MENSAJE_INICIO_SESION_NO_SATISFACTORIO = "No se encuentra cuenta creada para ini
 HTTP_OK = 200
 HTTP_CREATED = 201
 HTTP_SEE_OTHER = 303
+HTTP_NOT_MODIFIED = 304
 
 # Códigos de error del cliente
 HTTP_BAD_REQUEST = 400
 HTTP_NOT_FOUND = 404
+HTTP_PAYLOAD_TOO_LARGE = 413
 HTTP_UNPROCESSABLE_ENTITY = 422
 
 # Códigos de error del servidor
@@ -78,6 +163,32 @@ HTTP_INTERNAL_SERVER_ERROR = 500
 
 CONTENT_TYPE_HTML = "text/html"
 CONTENT_TYPE_JSON = "application/json"
+CONTENT_TYPE_JS = "text/javascript"
+CONTENT_TYPE_CSS = "text/css"
+
+# ==================== CACHÉ DEL NAVEGADOR ====================
+
+# Imágenes subidas (nombres únicos) y recursos de /static pedidos con su versión (?v=, ver recursos_estaticos.py)
+CACHE_CONTROL_INMUTABLE = "public, max-age=31536000, immutable"
+# Resto de /static: se guarda en el navegador pero se revalida en cada uso
+CACHE_CONTROL_REVALIDAR = "no-cache"
+# Respuestas de la API con ETag (ver versiones.py): solo en la caché del navegador del usuario, revalidando
+CACHE_CONTROL_PRIVADA_REVALIDAR = "private, no-cache"
+# Páginas HTML y resto de respuestas de la API
+CACHE_CONTROL_SIN_CACHE = "no-store, no-cache, must-revalidate, max-age=0"
+
+# ==================== COMPRESIÓN DE RESPUESTAS ====================
+
+# Las respuestas más pequeñas se envían sin comprimir (ver compresion.py)
+TAMANO_MINIMO_COMPRESION = 1024
+# Tipos de contenido que se comprimen, además de text/*
+TIPOS_CONTENIDO_COMPRIMIBLES = ["application/json", "application/javascript", "image/svg+xml"]
+# Niveles de compresión: máximos para HTML, JS y CSS (se comprimen una vez al arrancar)
+# y rápidos para las respuestas de la API (se comprimen en cada petición)
+NIVEL_GZIP_ESTATICO = 9
+NIVEL_GZIP_DINAMICO = 6
+CALIDAD_BROTLI_ESTATICO = 11
+CALIDAD_BROTLI_DINAMICO = 5
 
 # ==================== CONFIGURACIÓN DE COOKIES ====================
 
@@ -0,0 +1,261 @@
+"""
+Cuentas y menús semanales: datos guardados por usuario (clave: email en minúsculas).
+
+Las lecturas van directamente al almacenamiento. Las escrituras son operaciones de
+leer-modificar-guardar sobre los datos de uno o varios usuarios y, como las de las
+recetas, pasan por un único hilo escritor por almacén (escritor_agrupado.py): las
+operaciones que coinciden se aplican una tras otra sobre el estado más reciente, así
+que ninguna pisa a otra, y cada lote se guarda con una sola escritura.
+
+- DocumentoCuentasJSON / DocumentoMenusJSON: un archivo JSON con todos los usuarios;
+  cada lote lo lee una vez y lo reescribe una vez (escritura atómica).
+- CuentasSQLite / MenusSQLite (base_datos.py): filas por email; cada lote es una
+  transacción que solo toca las filas de los usuarios que cambian.
+"""
+
+import copy
+from concurrent.futures import Future
+from typing import Optional, List, Dict, Any, Callable
+
+from constants import *
+from almacenamiento import leer_json, escribir_json
+from escritor_agrupado import EscritorAgrupado
+from versiones import versiones_recursos
+
+
+class LoteUsuarios:
+    """
+    Estado de trabajo de un lote de escrituras de un almacén por email.
+
+    Cada operación lee con `leer` (viendo ya los cambios de las operaciones anteriores
+    del lote) y registra sus cambios con `escribir`. Los cambios de una operación solo
+    se aplican si termina sin lanzar excepción.
+    """
+
+    def __init__(self, vista: Any):
+        self.vista = vista
+        self.cambios: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._pendientes: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    def leer(self, email: str) -> Optional[Dict[str, Any]]:
+        """Copia editable de los datos del usuario, o None si no tiene."""
+        clave = email.lower()
+        return copy.deepcopy(self.cambios[clave] if clave in self.cambios else self.vista.get(clave))
+
+    def claves(self) -> List[str]:
+        """Emails (en minúsculas) con datos, contando los cambios ya aplicados en el lote."""
+        claves = dict.fromkeys(self.vista.keys())
+        claves.update(dict.fromkeys(self.cambios))
+        return [clave for clave in claves if self.cambios.get(clave, True) is not None]
+
+    def escribir(self, email: str, datos: Optional[Dict[str, Any]]) -> None:
+        """Sustituye los datos del usuario, o los elimina si `datos` es None."""
+        self._pendientes[email.lower()] = datos
+
+    def _confirmar(self) -> None:
+        self.cambios.update(self._pendientes)
+        self._pendientes = {}
+
+    def _descartar(self) -> None:
+        self._pendientes = {}
+
+
+class AlmacenPorEmail:
+    """
+    Almacén de datos por usuario con un único hilo escritor que agrupa las escrituras.
+    """
+
+    def __init__(self, nombre: str, backend: Any, al_guardar: Callable[[List[str]], None]):
+        self.nombre = nombre
+        self.backend = backend
+        # Recibe los emails cambiados en cada lote (para las versiones de las ETags)
+        self.al_guardar = al_guardar
+        self._escritor = EscritorAgrupado(nombre, self._procesar_lote)
+
+    def todos(self) -> Any:
+        """Todos los datos, en la misma forma que el archivo JSON (solo lectura)."""
+        return self.backend.todos()
+
+    def leer(self, email: str) -> Optional[Dict[str, Any]]:
+        """
+        Datos de un usuario.
+
+        Args:
+            email (str): Email del usuario (sin distinguir mayúsculas)
+
+        Returns:
+            Optional[Dict[str, Any]]: Datos del usuario o None si no tiene
+        """
+        return self.backend.leer(email.lower())
+
+    def enviar(self, operacion: Callable[[LoteUsuarios], Any]) -> Future:
+        """Encola una operación de escritura para el hilo escritor (ver ejecutar)."""
+        return self._escritor.enviar(operacion)
+
+    def ejecutar(self, operacion: Callable[[LoteUsuarios], Any]) -> Any:
+        """
+        Ejecuta una operación de escritura y espera a que su lote esté guardado.
+        La operación lee y modifica sobre el estado más reciente, así que es atómica.
+
+        Args:
+            operacion (Callable[[LoteUsuarios], Any]): Función que recibe el lote y devuelve un resultado
+
+        Returns:
+            Any: Resultado de la operación
+
+        Raises:
+            IOError: Si no se pudo guardar el lote
+        """
+        return self.enviar(operacion).result()
+
+    def _procesar_lote(self, operaciones: List[tuple]) -> None:
+        """Aplica las operaciones de un lote sobre el estado actual y lo guarda con una sola escritura."""
+        vista = self.backend.abrir_lote()
+        lote = LoteUsuarios(vista)
+
+        resultados = []
+        for operacion, futuro in operaciones:
+            if not futuro.set_running_or_notify_cancel():
+                continue
+            try:
+                resultado = operacion(lote)
+                lote._confirmar()
+            except Exception as e:
+                lote._descartar()
+                futuro.set_exception(e)
+                continue
+            resultados.append((futuro, resultado))
+
+        error = None
+        if lote.cambios:
+            try:
+                self.backend.guardar(vista, lote.cambios)
+            except (ValueError, IOError) as e:
+                print(f"{LOG_ERROR} Error al guardar {self.nombre}: {e}")
+                error = e
+            finally:
+                # También si falla: el estado guardado es incierto
+                self.al_guardar(list(lote.cambios))
+
+        if len(resultados) > 1:
+            print(f"{LOG_INFO} {len(resultados)} escrituras de {self.nombre} agrupadas en un solo guardado")
+        for futuro, resultado in resultados:
+            if error is None:
+                futuro.set_result(resultado)
+            else:
+                futuro.set_exception(IOError(f"No se pudieron guardar {self.nombre}: {error}"))
+
+
+# ==================== BACKENDS JSON ====================
+
+class VistaCuentas:
+    """Lista de cuentas con su posición por email (la primera cuenta de cada email)."""
+
+    def __init__(self, cuentas: List[Dict[str, Any]]):
+        self.cuentas = cuentas
+        self.posiciones: Dict[str, int] = {}
+        for posicion, cuenta in enumerate(cuentas):
+            self.posiciones.setdefault(cuenta.get("email", "").lower(), posicion)
+
+    def get(self, email: str) -> Optional[Dict[str, Any]]:
+        posicion = self.posiciones.get(email)
+        return self.cuentas[posicion] if posicion is not None else None
+
+    def keys(self) -> List[str]:
+        return list(self.posiciones)
+
+
+class DocumentoCuentasJSON:
+    """Cuentas en `cuentas.json` (lista). Los cambios se aplican en su posición y las altas al final."""
+
+    def __init__(self, ruta: str = RUTA_CUENTAS_JSON):
+        self.ruta = ruta
+
+    def todos(self) -> List[Dict[str, Any]]:
+        return leer_json(self.ruta, [])
+
+    def leer(self, email: str) -> Optional[Dict[str, Any]]:
+        return VistaCuentas(self.todos()).get(email)
+
+    def abrir_lote(self) -> VistaCuentas:
+        return VistaCuentas(self.todos())
+
+    def guardar(self, vista: VistaCuentas, cambios: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        cuentas: List[Optional[Dict[str, Any]]] = list(vista.cuentas)
+        for email, cuenta in cambios.items():
+            posicion = vista.posiciones.get(email)
+            if posicion is not None:
+                cuentas[posicion] = cuenta
+            elif cuenta is not None:
+                cuentas.append(cuenta)
+        escribir_json(self.ruta, [cuenta for cuenta in cuentas if cuenta is not None])
+
+
+class DocumentoMenusJSON:
+    """Menús semanales en `menus_semanales.json` (diccionario email → menú)."""
+
+    def __init__(self, ruta: str = RUTA_MENUS_SEMANALES_JSON):
+        self.ruta = ruta
+
+    def todos(self) -> Dict[str, Dict[str, Any]]:
+        return leer_json(self.ruta, {})
+
+    def leer(self, email: str) -> Optional[Dict[str, Any]]:
+        return self.todos().get(email)
+
+    def abrir_lote(self) -> Dict[str, Dict[str, Any]]:
+        return self.todos()
+
+    def guardar(self, vista: Dict[str, Dict[str, Any]], cambios: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        menus = dict(vista)
+        for email, menu in cambios.items():
+            if menu is None:
+                menus.pop(email, None)
+            else:
+                menus[email] = menu
+        escribir_json(self.ruta, menus)
+
+
+def crear_almacen_cuentas(modo: str = MODO_ALMACENAMIENTO) -> AlmacenPorEmail:
+    """
+    Crea el almacén de cuentas que corresponde al modo de almacenamiento.
+
+    Args:
+        modo (str): "json", "registro" o "sqlite"
+
+    Returns:
+        AlmacenPorEmail: Almacén de cuentas
+    """
+    if modo == "sqlite":
+        from base_datos import CuentasSQLite, obtener_base_datos
+        backend = CuentasSQLite(obtener_base_datos())
+    else:
+        backend = DocumentoCuentasJSON(RUTA_CUENTAS_JSON)
+    return AlmacenPorEmail("cuentas", backend, lambda emails: versiones_recursos.incrementar("cuentas"))
+
+
+def crear_almacen_menus(modo: str = MODO_ALMACENAMIENTO) -> AlmacenPorEmail:
+    """
+    Crea el almacén de menús semanales que corresponde al modo de almacenamiento.
+
+    Args:
+        modo (str): "json", "registro" o "sqlite"
+
+    Returns:
+        AlmacenPorEmail: Almacén de menús semanales
+    """
+    if modo == "sqlite":
+        from base_datos import MenusSQLite, obtener_base_datos
+        backend = MenusSQLite(obtener_base_datos())
+    else:
+        backend = DocumentoMenusJSON(RUTA_MENUS_SEMANALES_JSON)
+
+    def al_guardar(emails: List[str]) -> None:
+        for email in emails:
+            versiones_recursos.incrementar("menu", email)
+    return AlmacenPorEmail("menús semanales", backend, al_guardar)
+
+
+# Almacenes compartidos por todo el proceso
+almacen_cuentas = crear_almacen_cuentas()
+almacen_menus = crear_almacen_menus()
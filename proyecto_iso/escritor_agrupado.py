@@ -0,0 +1,77 @@
+"""
+Hilo escritor único con escrituras agrupadas (group commit).
+
+Los almacenes que se modifican leyendo, cambiando y guardando (recetas, cuentas y
+menús semanales) no escriben desde el hilo de cada petición: encolan la operación
+en su EscritorAgrupado. Un solo hilo por almacén recoge las operaciones en lotes
+(todo lo que llega mientras se guarda el lote anterior y, después, lo que llega
+dentro de VENTANA_GRUPO_ESCRITURA, hasta MAX_OPERACIONES_POR_LOTE) y se las entrega
+al almacén, que aplica el lote sobre su estado más reciente y lo guarda con una
+sola escritura. Cada operación se resuelve cuando su lote ya está guardado.
+"""
+
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional, Tuple
+
+from constants import *
+
+
+class EscritorAgrupado:
+    """
+    Cola de operaciones de escritura de un almacén con un único hilo que las procesa por lotes.
+
+    `procesar_lote` recibe una lista de (operación, futuro) y debe resolver cada futuro
+    (set_result o set_exception) cuando el lote esté guardado.
+    """
+
+    def __init__(self, nombre: str, procesar_lote: Callable[[List[Tuple[Any, Future]]], None]):
+        self.nombre = nombre
+        self.procesar_lote = procesar_lote
+        self._cola: "queue.Queue[tuple]" = queue.Queue()
+        self._hilo: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def enviar(self, operacion: Any) -> Future:
+        """
+        Encola una operación para el hilo escritor.
+
+        Args:
+            operacion (Any): Operación que entiende el `procesar_lote` del almacén
+
+        Returns:
+            Future: Se resuelve con el resultado de la operación cuando el lote ya está guardado
+        """
+        futuro: Future = Future()
+        self._cola.put((operacion, futuro))
+        self._iniciar()
+        return futuro
+
+    def _iniciar(self) -> None:
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._bucle, name=f"escritor-{self.nombre}", daemon=True)
+                self._hilo.start()
+
+    def _bucle(self) -> None:
+        """Recoge operaciones de la cola en lotes y las procesa una tras otra."""
+        while True:
+            lote = [self._cola.get()]
+            limite = time.monotonic() + VENTANA_GRUPO_ESCRITURA
+            while len(lote) < MAX_OPERACIONES_POR_LOTE:
+                try:
+                    # Todo lo que ya está en cola entra sin esperar; después, hasta agotar la ventana
+                    lote.append(self._cola.get(timeout=max(0.0, limite - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                self.procesar_lote(lote)
+            except Exception as e:
+                print(f"{LOG_ERROR} Error inesperado en el escritor de {self.nombre}: {e}")
+                for _, futuro in lote:
+                    if not futuro.done():
+                        futuro.set_exception(e)
@@ -0,0 +1,191 @@
+"""
+Variantes de las imágenes subidas (fotos de recetas y de perfil).
+
+Al subir una imagen se generan las variantes de VARIANTES_IMAGEN (miniatura, tarjeta
+y completa), reducidas a su tamaño máximo y recodificadas a WebP. Al recodificar se
+descartan los metadatos (EXIF, con la ubicación o el modelo de cámara), después de
+aplicar la orientación que indicaba el EXIF para que la foto no salga girada.
+
+Los listados usan la variante "tarjeta" y el detalle la "completa" (ver
+guardar_imagen_con_variantes en utils.py, que guarda los archivos).
+
+Los archivos se nombran con el SHA-256 de la imagen original, repartidos en
+subdirectorios por sus primeros caracteres (ruta_por_contenido): subir otra vez la
+misma foto, al editar una receta o como foto de perfil, reutiliza los archivos ya
+generados, y el navegador los tiene ya en caché con la misma URL.
+
+Pillow es opcional: si no está instalado, generar_variantes devuelve None y se
+guarda la imagen original, a la que apuntan todas las variantes.
+"""
+
+import io
+import base64
+import binascii
+import hashlib
+from typing import Any, BinaryIO, Dict, Optional, Set, Union
+
+from constants import *
+
+try:
+    from PIL import Image, ImageOps
+    # Una imagen pequeña comprimida puede ocupar gigas al decodificarla
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELES_IMAGEN
+except ImportError:
+    Image = None
+
+
+# Tamaño de los bloques al leer una imagen de disco para calcular su hash
+TAMANO_BLOQUE_LECTURA = 64 * 1024
+
+# Bytes necesarios para reconocer el tipo de una imagen por su cabecera (ver detectar_tipo_imagen)
+LONGITUD_CABECERA_IMAGEN = 12
+
+
+def detectar_tipo_imagen(cabecera: bytes) -> Optional[str]:
+    """
+    Reconoce el tipo de una imagen por sus primeros bytes ("magic bytes"), sin fiarse
+    del tipo MIME que declara el cliente.
+
+    Args:
+        cabecera (bytes): Primeros LONGITUD_CABECERA_IMAGEN bytes del archivo
+
+    Returns:
+        Optional[str]: Tipo MIME (JPEG, PNG o WebP) o None si no es ninguno de ellos
+    """
+    if cabecera.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if cabecera.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if cabecera[:4] == b"RIFF" and cabecera[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+# Las funciones de Base64 reciben la posición donde empiezan los datos (`inicio`, tras la
+# coma de una data URL) para no copiar la cadena, que puede ocupar varios MB
+
+def tamano_decodificado_base64(datos: str, inicio: int = 0) -> int:
+    """Bytes que ocupará una cadena Base64 al decodificarla, calculado sin decodificarla."""
+    relleno = 2 if datos.endswith("==") else 1 if datos.endswith("=") else 0
+    return (len(datos) - inicio) // 4 * 3 - relleno
+
+
+def tipo_imagen_base64(datos: str, inicio: int = 0) -> Optional[str]:
+    """Tipo de la imagen de una cadena Base64, decodificando solo su cabecera (ver detectar_tipo_imagen)."""
+    try:
+        return detectar_tipo_imagen(base64.b64decode(datos[inicio:inicio + LONGITUD_CABECERA_IMAGEN // 3 * 4],
+                                                     validate=True))
+    except binascii.Error:
+        return None
+
+
+def decodificar_base64_a_archivo(datos: str, archivo: BinaryIO, tamano_maximo: int, inicio: int = 0) -> str:
+    """
+    Decodifica una imagen en Base64 por bloques y la escribe en un archivo, sin tener nunca
+    la imagen decodificada entera en memoria.
+
+    Args:
+        datos (str): Imagen en Base64
+        archivo (BinaryIO): Archivo abierto en modo binario donde se escribe
+        tamano_maximo (int): Tamaño máximo de la imagen decodificada
+        inicio (int): Posición de `datos` donde empieza el Base64 (p. ej. tras el prefijo data:)
+
+    Returns:
+        str: Tipo MIME reconocido por la cabecera de la imagen
+
+    Raises:
+        ValueError: Si el Base64 no es válido, la imagen es muy grande o no es JPEG, PNG o WebP
+    """
+    if tamano_decodificado_base64(datos, inicio) > tamano_maximo:
+        raise ValueError(f"La imagen es muy grande. Tamaño máximo: {tamano_maximo // (1024*1024)}MB")
+    tipo_mime = tipo_imagen_base64(datos, inicio)
+    if tipo_mime is None:
+        raise ValueError("El archivo no es una imagen JPEG, PNG o WebP")
+    # Bloques de caracteres múltiplo de 4: cada uno se decodifica por separado
+    caracteres_bloque = TAMANO_BLOQUE_LECTURA // 3 * 4
+    escritos = 0
+    for posicion in range(inicio, len(datos), caracteres_bloque):
+        try:
+            bloque = base64.b64decode(datos[posicion:posicion + caracteres_bloque], validate=True)
+        except binascii.Error as e:
+            raise ValueError(f"La imagen no está bien codificada en Base64: {e}")
+        escritos += len(bloque)
+        if escritos > tamano_maximo:
+            raise ValueError(f"La imagen es muy grande. Tamaño máximo: {tamano_maximo // (1024*1024)}MB")
+        archivo.write(bloque)
+    return tipo_mime
+
+
+def generar_variantes(imagen: Union[bytes, str]) -> Optional[Dict[str, bytes]]:
+    """
+    Genera las variantes WebP de una imagen, sin metadatos.
+
+    Args:
+        imagen (Union[bytes, str]): Imagen original (JPEG, PNG o WebP), en memoria o la ruta
+            de su archivo (Pillow la lee del disco sin cargar el archivo entero)
+
+    Returns:
+        Optional[Dict[str, bytes]]: Nombre de la variante → contenido WebP, o None si Pillow no está instalado
+
+    Raises:
+        ValueError: Si el contenido no es una imagen válida o es demasiado grande
+    """
+    if Image is None:
+        return None
+    try:
+        with Image.open(io.BytesIO(imagen) if isinstance(imagen, bytes) else imagen) as original:
+            # Orientación del EXIF aplicada a los píxeles: el EXIF no se copia a las variantes
+            imagen = ImageOps.exif_transpose(original)
+            tiene_alfa = imagen.mode in ("RGBA", "LA") or (imagen.mode == "P" and "transparency" in imagen.info)
+            imagen = imagen.convert("RGBA" if tiene_alfa else "RGB")
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise ValueError(f"La imagen no es válida: {e}")
+
+    variantes = {}
+    for nombre, (lado_maximo, calidad) in VARIANTES_IMAGEN.items():
+        variante = imagen.copy()
+        # thumbnail conserva la proporción y nunca amplía
+        variante.thumbnail((lado_maximo, lado_maximo), Image.LANCZOS)
+        salida = io.BytesIO()
+        variante.save(salida, "WEBP", quality=calidad, method=6)
+        variantes[nombre] = salida.getvalue()
+    return variantes
+
+
+def resumen_contenido(imagen: Union[bytes, str]) -> str:
+    """
+    SHA-256 del contenido de una imagen.
+
+    Args:
+        imagen (Union[bytes, str]): Imagen en memoria o ruta de su archivo (se lee por bloques)
+
+    Returns:
+        str: Hash en hexadecimal
+    """
+    if isinstance(imagen, bytes):
+        return hashlib.sha256(imagen).hexdigest()
+    resumen = hashlib.sha256()
+    with open(imagen, "rb") as archivo:
+        for bloque in iter(lambda: archivo.read(TAMANO_BLOQUE_LECTURA), b""):
+            resumen.update(bloque)
+    return resumen.hexdigest()
+
+
+def ruta_por_contenido(resumen: str, sufijo: str) -> str:
+    """Ruta relativa (con "/") de un archivo guardado por su hash: "ab/cd/abcd…" + sufijo."""
+    return f"{resumen[:2]}/{resumen[2:4]}/{resumen}{sufijo}"
+
+
+def url_variante(fotos: Optional[Dict[str, str]], variante: str, por_defecto: str = "") -> str:
+    """URL de una variante de una imagen, o `por_defecto` si la imagen no tiene variantes (subida antes)."""
+    return (fotos or {}).get(variante) or por_defecto
+
+
+def urls_imagenes(registro: Dict[str, Any]) -> Set[str]:
+    """URLs de las imágenes que usa una receta (fotoReceta y variantes) o una cuenta (fotoPerfil y variantes)."""
+    urls = {registro.get(campo) for campo in ("fotoReceta", "fotoPerfil")}
+    for campo in ("fotosReceta", "fotosPerfil"):
+        urls.update((registro.get(campo) or {}).values())
+    urls.discard(None)
+    urls.discard("")
+    return urls
@@ -41,8 +41,10 @@ class Receta(BaseModel):
     dificultad: str
     fotoReceta: str  # Campo para imagen en Base64 o URL
     usuariosGuardado: List[str] = []  # Lista de emails de usuarios que han guardado la receta
-    comentarios: List[Comentario] = []  # Lista de comentarios en la receta
-    valoraciones: List[Valoracion] = []  # Lista de valoraciones de la receta
+    comentarios: List[Comentario] = []  # Se ignora: los comentarios van al almacén de comentarios (comentarios.py)
+    valoraciones: List[Valoracion] = []  # Se ignora: se conservan las valoraciones recibidas por la receta
+    # Imagen subida antes por partes (/api/subir-imagen): sustituye a fotoReceta en Base64
+    tokenSubida: Optional[str] = ""
     # Campos opcionales para modo edición
     modoEdicion: Optional[str] = "false"
     nombreRecetaOriginal: Optional[str] = ""
\ No newline at end of file
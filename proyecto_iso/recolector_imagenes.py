@@ -0,0 +1,159 @@
+"""
+Recolector de imágenes huérfanas de static/uploads (marcar y barrer).
+
+Las imágenes se guardan por su contenido y pueden compartirlas varias recetas y
+cuentas (ver utils.guardar_imagen_con_variantes), así que al eliminar o editar una
+receta, o al cambiar la foto de perfil, no se borran sus archivos en ese momento.
+El recolector los recupera después:
+
+1. Marcar: recorre las recetas y las cuentas y reúne las imágenes que usan.
+2. Barrer: recorre static/uploads por lotes de LOTE_RECOLECTOR archivos, con una pausa
+   entre lotes para no saturar el disco, y retira los archivos que no se usan y que
+   tienen más de GRACIA_RECOLECTOR_SEGUNDOS. La gracia protege las subidas en curso
+   (imagen ya guardada, receta aún sin guardar) y las imágenes reutilizadas después
+   del marcado, a las que se les actualiza la fecha al reutilizarlas.
+
+En modo "cuarentena" los archivos se mueven a DIRECTORIO_CUARENTENA_IMAGENES, fuera
+de static, y se borran pasados RETENCION_CUARENTENA_SEGUNDOS; en modo "borrar" se
+borran directamente. Se ejecuta en un hilo al arrancar el servidor y luego cada
+INTERVALO_RECOLECTOR_SEGUNDOS.
+"""
+
+import os
+import time
+import shutil
+import itertools
+import posixpath
+import threading
+from typing import Iterator, Optional, Set
+
+from constants import *
+from repositorio_recetas import repositorio_recetas
+from utils import cargar_cuentas, urls_imagenes
+
+
+class ResultadoRecoleccion:
+    """Resumen de una pasada del recolector."""
+
+    def __init__(self):
+        self.revisados = 0
+        self.retirados = 0
+        self.bytes_recuperados = 0
+        self.borrados_cuarentena = 0
+
+    def __repr__(self) -> str:
+        return (f"{self.revisados} archivos revisados, {self.retirados} huérfanos retirados "
+                f"({self.bytes_recuperados} bytes), {self.borrados_cuarentena} borrados de la cuarentena")
+
+
+class RecolectorImagenes:
+    """Marca las imágenes en uso y retira los archivos huérfanos de static/uploads."""
+
+    def __init__(self, directorio: str = DIRECTORIO_UPLOADS, cuarentena: str = DIRECTORIO_CUARENTENA_IMAGENES,
+                 modo: str = MODO_RECOLECTOR_IMAGENES, gracia: float = GRACIA_RECOLECTOR_SEGUNDOS,
+                 lote: int = LOTE_RECOLECTOR, pausa: float = PAUSA_RECOLECTOR_SEGUNDOS):
+        self.directorio = directorio
+        self.cuarentena = cuarentena
+        self.modo = modo
+        self.gracia = gracia
+        self.lote = lote
+        self.pausa = pausa
+        self._detener = threading.Event()
+
+    def marcar(self) -> Set[str]:
+        """
+        Imágenes en uso por alguna receta o cuenta.
+
+        Returns:
+            Set[str]: Rutas relativas a static/uploads (con "/") de los archivos en uso
+        """
+        vivos = set()
+        for registro in itertools.chain(repositorio_recetas.obtener_recetas(), cargar_cuentas()):
+            for url in urls_imagenes(registro):
+                if isinstance(url, str) and url.startswith(URL_UPLOADS + "/"):
+                    vivos.add(posixpath.normpath(url[len(URL_UPLOADS) + 1:]))
+        return vivos
+
+    def archivos(self, directorio: Optional[str] = None) -> Iterator[os.DirEntry]:
+        """Recorre los archivos de un directorio y sus subdirectorios sin listarlos todos a la vez."""
+        try:
+            with os.scandir(directorio or self.directorio) as entradas:
+                for entrada in entradas:
+                    if entrada.is_dir(follow_symlinks=False):
+                        yield from self.archivos(entrada.path)
+                    elif entrada.is_file(follow_symlinks=False):
+                        yield entrada
+        except FileNotFoundError:
+            return
+
+    def recolectar(self) -> ResultadoRecoleccion:
+        """
+        Hace una pasada completa: marca, barre static/uploads y vacía la cuarentena caducada.
+
+        Returns:
+            ResultadoRecoleccion: Archivos revisados y retirados y bytes recuperados
+        """
+        resultado = ResultadoRecoleccion()
+        vivos = self.marcar()
+        limite = time.time() - self.gracia
+        for entrada in self.archivos():
+            if resultado.revisados and resultado.revisados % self.lote == 0 and self._detener.wait(self.pausa):
+                break
+            resultado.revisados += 1
+            relativa = os.path.relpath(entrada.path, self.directorio).replace(os.sep, "/")
+            try:
+                estado = entrada.stat(follow_symlinks=False)
+                if relativa in vivos or estado.st_mtime > limite:
+                    continue
+                self._retirar(entrada.path, relativa)
+            except OSError as e:
+                print(f"{LOG_WARNING} No se pudo retirar la imagen huérfana {entrada.path}: {e}")
+                continue
+            resultado.retirados += 1
+            resultado.bytes_recuperados += estado.st_size
+        resultado.borrados_cuarentena = self._vaciar_cuarentena()
+        print(f"{LOG_INFO} Recolector de imágenes ({self.modo}): {resultado}")
+        return resultado
+
+    def _retirar(self, ruta: str, relativa: str) -> None:
+        if self.modo == "borrar":
+            os.remove(ruta)
+            return
+        destino = os.path.join(self.cuarentena, *relativa.split("/"))
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        shutil.move(ruta, destino)
+        # La retención se cuenta desde la entrada en cuarentena
+        os.utime(destino)
+
+    def _vaciar_cuarentena(self) -> int:
+        limite = time.time() - RETENCION_CUARENTENA_SEGUNDOS
+        borrados = 0
+        for entrada in self.archivos(self.cuarentena):
+            try:
+                if entrada.stat(follow_symlinks=False).st_mtime < limite:
+                    os.remove(entrada.path)
+                    borrados += 1
+            except OSError as e:
+                print(f"{LOG_WARNING} No se pudo borrar {entrada.path} de la cuarentena: {e}")
+        return borrados
+
+    def iniciar_en_segundo_plano(self, intervalo: float = INTERVALO_RECOLECTOR_SEGUNDOS) -> None:
+        """Ejecuta el recolector en un hilo: ahora y después cada `intervalo` segundos."""
+        if self.modo == "desactivado":
+            return
+
+        def bucle() -> None:
+            while not self._detener.is_set():
+                try:
+                    self.recolectar()
+                except Exception as e:
+                    print(f"{LOG_ERROR} Error en el recolector de imágenes: {e}")
+                self._detener.wait(intervalo)
+
+        threading.Thread(target=bucle, name="recolector-imagenes", daemon=True).start()
+
+    def detener(self) -> None:
+        self._detener.set()
+
+
+recolector_imagenes = RecolectorImagenes()
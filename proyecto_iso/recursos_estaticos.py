@@ -0,0 +1,270 @@
+"""
+Caché del navegador para los archivos de /static.
+
+- Las imágenes subidas (`static/uploads/`) tienen nombres únicos
+  (generar_nombre_archivo_unico) y no se reescriben nunca: se sirven como inmutables.
+- Las páginas HTML enlazan sus recursos (CSS, JS, imágenes) con la versión de su
+  contenido en la URL (`/static/saborea.css?v=1a2b3c4d5e6f`). Una petición con la
+  versión actual se sirve como inmutable; al cambiar el archivo cambia la URL.
+- Los módulos JS importan otros módulos: al servirlos, cada import se reescribe con
+  la URL versionada del módulo importado. Así la versión de un módulo incluye la de
+  sus dependencias y cambiar un módulo cambia la URL de todos los que lo importan.
+- El resto (sin versión o con una versión antigua) se sirve con "no-cache": el
+  navegador lo guarda, pero lo revalida en cada uso (If-None-Match / If-Modified-Since).
+
+Las páginas HTML, el JS y el CSS se guardan en memoria ya reescritos y comprimidos
+(ver compresion.py); precalcular() los prepara al arrancar el servidor.
+
+Las páginas HTML y las respuestas de la API siguen sin guardarse (ver el middleware
+de server.py).
+"""
+
+import os
+import re
+import hashlib
+import posixpath
+import threading
+import urllib.parse
+from typing import Any, Dict, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+
+from constants import *
+from almacenamiento import obtener_firma_archivo
+from versiones import etag_coincide
+from compresion import RespuestaPrecomprimida, variantes_comprimidas
+
+# Especificadores de los imports de módulos JS: from "./x.js", import "./x.js", import("./x.js")
+PATRON_IMPORT_JS = re.compile(r"""(\bfrom\s*|\bimport\s*\(?\s*)(["'])([^"'\s]+\.js)\2""")
+# Recursos enlazados desde el HTML con src="/static/..." o href="/static/..."
+PATRON_RECURSO_HTML = re.compile(r"""(\b(?:src|href)\s*=\s*)(["'])(/static/[^"'?#]+)\2""")
+# Archivos de texto que se sirven desde memoria (reescritos y comprimidos) y su tipo de contenido
+TIPOS_ARCHIVOS_TEXTO = {".html": CONTENT_TYPE_HTML, ".js": CONTENT_TYPE_JS, ".css": CONTENT_TYPE_CSS}
+
+
+class RecursoServido:
+    """Contenido de un archivo de /static tal como se sirve, con su versión y sus variantes comprimidas."""
+
+    def __init__(self, firma: Any, dependencias: Dict[str, str], contenido: Optional[bytes], version: str,
+                 variantes: Dict[str, bytes]):
+        self.firma = firma
+        # URL → versión de los recursos que enlaza (imports o src/href); si cambia alguna, se recalcula
+        self.dependencias = dependencias
+        # Solo en los archivos de texto; el resto se sirve desde el disco
+        self.contenido = contenido
+        self.version = version
+        self.variantes = variantes
+
+
+class RecursosEstaticos:
+    """
+    Versiones (hash del contenido servido) de los archivos estáticos y contenido
+    servido de los archivos de texto, con los enlaces versionados. Se calculan una vez
+    por firma de archivo (mtime, tamaño, inodo), así que editar un archivo con el
+    servidor en marcha cambia su versión.
+    """
+
+    def __init__(self, directorio: str = DIRECTORIO_STATIC, prefijo: str = f"/{DIRECTORIO_STATIC}"):
+        self.directorio = directorio
+        self.prefijo = prefijo
+        self._cache: Dict[str, RecursoServido] = {}
+        self._lock = threading.Lock()
+
+    def ruta_archivo(self, url: str) -> Optional[str]:
+        """Archivo de una URL de /static, o None si no está dentro del directorio."""
+        if not url.startswith(self.prefijo + "/"):
+            return None
+        relativa = posixpath.normpath(url[len(self.prefijo) + 1:])
+        if relativa.startswith("..") or posixpath.isabs(relativa):
+            return None
+        return os.path.join(self.directorio, *relativa.split("/"))
+
+    def url_de_archivo(self, ruta: str) -> str:
+        """URL de /static de un archivo del directorio."""
+        relativa = os.path.relpath(os.path.realpath(ruta), os.path.realpath(self.directorio))
+        return f"{self.prefijo}/{relativa.replace(os.sep, '/')}"
+
+    def recurso(self, url: str, visitados: frozenset = frozenset()) -> Optional[RecursoServido]:
+        """
+        Recurso servido de una URL, recalculado si cambió el archivo o alguno de los que enlaza.
+
+        Args:
+            url (str): URL del archivo (p. ej. "/static/js/main.js")
+            visitados (frozenset): URLs que se están calculando (para imports circulares)
+
+        Returns:
+            Optional[RecursoServido]: Recurso o None si el archivo no existe
+        """
+        ruta = self.ruta_archivo(url)
+        firma = obtener_firma_archivo(ruta) if ruta else None
+        if firma is None:
+            return None
+        recurso = self._cache.get(url)
+        if recurso is not None and recurso.firma == firma and all(
+                self.version(dependencia, visitados | {url}) == version
+                for dependencia, version in recurso.dependencias.items()):
+            return recurso
+
+        with open(ruta, 'rb') as archivo:
+            contenido = archivo.read()
+        dependencias: Dict[str, str] = {}
+        servido = None
+        extension = posixpath.splitext(url)[1]
+        if extension in TIPOS_ARCHIVOS_TEXTO:
+            texto = contenido.decode("utf-8")
+            if extension == ".html":
+                texto = self.reescribir_enlaces(texto, dependencias, visitados | {url})
+                # Las páginas se sirven desde rutas como /recetas: sus imports son absolutos
+                texto = self.reescribir_imports(texto, "/", dependencias, visitados | {url})
+            elif extension == ".js":
+                texto = self.reescribir_imports(texto, url, dependencias, visitados | {url})
+            servido = contenido = texto.encode("utf-8")
+        recurso = RecursoServido(firma, dependencias, servido, hashlib.sha256(contenido).hexdigest()[:12],
+                                 variantes_comprimidas(servido) if servido is not None else {})
+        with self._lock:
+            self._cache[url] = recurso
+        return recurso
+
+    def version(self, url: str, visitados: frozenset = frozenset()) -> Optional[str]:
+        """
+        Versión actual de un archivo de /static.
+
+        Args:
+            url (str): URL del archivo (p. ej. "/static/js/main.js")
+            visitados (frozenset): URLs que se están calculando (para imports circulares)
+
+        Returns:
+            Optional[str]: Hash del contenido servido o None si el archivo no existe
+        """
+        if url in visitados:
+            return ""  # Import circular: la versión del ciclo la fija el primer módulo
+        recurso = self.recurso(url, visitados)
+        return recurso.version if recurso else None
+
+    def url_versionada(self, url: str, visitados: frozenset = frozenset()) -> str:
+        """URL con `?v=` y la versión del archivo (sin cambios si no existe)."""
+        version = self.version(url, visitados)
+        return f"{url}?v={version}" if version else url
+
+    def reescribir_imports(self, texto: str, url_base: str, dependencias: Optional[Dict[str, str]] = None,
+                           visitados: frozenset = frozenset()) -> str:
+        """
+        Sustituye los imports de módulos de /static por su URL absoluta versionada.
+
+        Args:
+            texto (str): Código JS (o HTML con scripts de tipo módulo)
+            url_base (str): URL del documento, para resolver las rutas relativas
+            dependencias (Optional[Dict[str, str]]): Si se indica, se anotan las URLs importadas y su versión
+            visitados (frozenset): URLs que se están calculando (para imports circulares)
+
+        Returns:
+            str: Texto con los imports reescritos
+        """
+        def sustituir(coincidencia: re.Match) -> str:
+            url = posixpath.normpath(urllib.parse.urljoin(url_base, coincidencia.group(3)))
+            return self.sustituir_url(coincidencia, url, dependencias, visitados)
+        return PATRON_IMPORT_JS.sub(sustituir, texto)
+
+    def reescribir_enlaces(self, texto: str, dependencias: Optional[Dict[str, str]] = None,
+                           visitados: frozenset = frozenset()) -> str:
+        """Sustituye los src="/static/..." y href="/static/..." de un HTML por su URL versionada."""
+        def sustituir(coincidencia: re.Match) -> str:
+            return self.sustituir_url(coincidencia, coincidencia.group(3), dependencias, visitados)
+        return PATRON_RECURSO_HTML.sub(sustituir, texto)
+
+    def sustituir_url(self, coincidencia: re.Match, url: str, dependencias: Optional[Dict[str, str]],
+                      visitados: frozenset) -> str:
+        """Texto de una coincidencia de PATRON_IMPORT_JS o PATRON_RECURSO_HTML con la URL versionada."""
+        if self.ruta_archivo(url) is None or url.startswith(URL_UPLOADS + "/"):
+            return coincidencia.group(0)
+        version = self.version(url, visitados)
+        if not version:
+            return coincidencia.group(0)
+        if dependencias is not None:
+            dependencias[url] = version
+        return f"{coincidencia.group(1)}{coincidencia.group(2)}{url}?v={version}{coincidencia.group(2)}"
+
+    def respuesta(self, url: str, headers: Optional[Dict[str, str]] = None) -> Optional[RespuestaPrecomprimida]:
+        """
+        Respuesta con el contenido servido de un archivo de texto y sus variantes comprimidas.
+
+        Args:
+            url (str): URL del archivo
+            headers (Optional[Dict[str, str]]): Cabeceras adicionales
+
+        Returns:
+            Optional[RespuestaPrecomprimida]: Respuesta o None si no es un archivo de texto o no existe
+        """
+        recurso = self.recurso(url)
+        if recurso is None or recurso.contenido is None:
+            return None
+        return RespuestaPrecomprimida(recurso.contenido, recurso.variantes, headers=headers,
+                                      media_type=TIPOS_ARCHIVOS_TEXTO[posixpath.splitext(url)[1]])
+
+    def pagina_html(self, ruta: str) -> Optional[RespuestaPrecomprimida]:
+        """
+        Respuesta de una página HTML del directorio con sus enlaces a /static versionados.
+
+        Args:
+            ruta (str): Ruta del archivo HTML (p. ej. RUTA_MIS_RECETAS)
+
+        Returns:
+            Optional[RespuestaPrecomprimida]: Respuesta o None si no existe
+        """
+        return self.respuesta(self.url_de_archivo(ruta))
+
+    def precalcular(self) -> None:
+        """Reescribe y comprime los archivos de texto (salvo las subidas) para que no espere la primera petición."""
+        for raiz, directorios, archivos in os.walk(self.directorio):
+            directorios[:] = [d for d in directorios if self.url_de_archivo(os.path.join(raiz, d)) != URL_UPLOADS]
+            for archivo in archivos:
+                if posixpath.splitext(archivo)[1] in TIPOS_ARCHIVOS_TEXTO:
+                    try:
+                        self.recurso(self.url_de_archivo(os.path.join(raiz, archivo)))
+                    except (OSError, UnicodeDecodeError) as e:
+                        print(f"{LOG_WARNING} No se pudo preparar {archivo}: {e}")
+
+
+recursos_estaticos = RecursosEstaticos()
+
+
+class ArchivosEstaticos(StaticFiles):
+    """
+    StaticFiles con la política de caché de recursos_estaticos: inmutables las
+    imágenes subidas y las URLs con la versión actual; "no-cache" el resto.
+    Los archivos de texto se sirven desde memoria, con los enlaces versionados y comprimidos.
+    """
+
+    def __init__(self, *args: Any, recursos: RecursosEstaticos = recursos_estaticos, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.recursos = recursos
+
+    def file_response(self, full_path: Any, stat_result: os.stat_result, scope: Any,
+                      status_code: int = HTTP_OK) -> Response:
+        url = self.recursos.url_de_archivo(str(full_path))
+        recurso = None
+        if posixpath.splitext(url)[1] in TIPOS_ARCHIVOS_TEXTO:
+            recurso = self.recursos.recurso(url)
+        response = None
+        if recurso is not None:
+            etag = f'"{recurso.version}"'
+            if etag_coincide(Headers(scope=scope).get("if-none-match"), etag):
+                response = Response(status_code=HTTP_NOT_MODIFIED, headers={"ETag": etag})
+            else:
+                # None si el archivo ha desaparecido desde que se leyó su versión
+                response = self.recursos.respuesta(url, headers={"ETag": etag})
+        if response is None:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+
+        consulta = urllib.parse.parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        if url.startswith(URL_UPLOADS + "/"):
+            inmutable = True
+        elif "v" in consulta:
+            version = recurso.version if recurso is not None else self.recursos.version(url)
+            inmutable = consulta["v"][0] == version
+        else:
+            inmutable = False
+        response.headers["Cache-Control"] = CACHE_CONTROL_INMUTABLE if inmutable else CACHE_CONTROL_REVALIDAR
+        return response
@@ -0,0 +1,774 @@
+"""
+Repositorio de recetas en memoria.
+
+Mantiene en memoria el contenido de `recetas.json` para que las lecturas no
+tengan que abrir y parsear el archivo en cada petición. El contenido se vuelve
+a cargar únicamente cuando cambia la firma del almacenamiento (mtime, tamaño e
+inodo de sus archivos) o cuando se escribe a través del propio repositorio.
+
+La lista compartida se trata como inmutable: las escrituras construyen una
+lista nueva y la sustituyen, de modo que un lector nunca ve una lista a medio
+modificar. La persistencia se delega en el backend de almacenamiento.py.
+
+Las escrituras pasan por un único hilo escritor (escritor_agrupado.py) que agrupa
+las operaciones concurrentes en lotes y guarda cada lote con una sola escritura
+(group commit).
+
+Junto a la lista se mantienen índices hash por id estable, por nombre, por
+autor, por (autor, nombre) y por usuario que guardó la receta, que se actualizan
+con cada cambio en lugar de recorrer todas las recetas en cada búsqueda. Las
+recetas publicadas se ordenan una vez por instantánea para paginarlas por cursor.
+Los índices de filtrado (busqueda_recetas.py) y el de texto libre (busqueda_texto.py)
+se construyen la primera vez que se necesitan y desde entonces se actualizan con
+cada cambio, como los índices hash.
+"""
+
+import bisect
+import threading
+from concurrent.futures import Future
+from typing import Optional, List, Dict, Any, Callable, Tuple
+
+from constants import *
+from almacenamiento import calcular_cambios, aplicar_cambio, crear_almacenamiento_recetas
+from busqueda_recetas import IndiceBusqueda
+from busqueda_texto import IndiceTexto
+from escritor_agrupado import EscritorAgrupado
+from imagenes import urls_imagenes
+
+
+def copiar_receta(receta: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copia una receta de forma que pueda modificarse sin afectar a la original.
+    Se copian el diccionario y sus listas y diccionarios de primer nivel
+    (usuariosGuardado, valoraciones, resumenValoraciones...).
+
+    Args:
+        receta (Dict[str, Any]): Receta a copiar
+
+    Returns:
+        Dict[str, Any]: Copia editable de la receta
+    """
+    return {
+        clave: list(valor) if isinstance(valor, list) else dict(valor) if isinstance(valor, dict) else valor
+        for clave, valor in receta.items()
+    }
+
+
+def normalizar_clave(texto: Optional[str]) -> str:
+    """Normaliza nombres y emails para usarlos como clave de índice (sin espacios extremos y en minúsculas)."""
+    return (texto or "").strip().lower()
+
+
+def clave_orden_receta(receta: Dict[str, Any]) -> Tuple[str, str]:
+    """Clave del orden estable de los listados paginados: nombre normalizado y, a igualdad, id estable."""
+    return (normalizar_clave(receta.get("nombreReceta")), receta.get("id") or "")
+
+
+class IndicesRecetas:
+    """
+    Índices hash sobre las recetas de una instantánea.
+
+    - por_id: id estable → receta (en una lista de un elemento, como el resto)
+    - por_nombre: nombre normalizado → recetas con ese nombre
+    - por_autor: email normalizado → recetas del autor
+    - por_autor_nombre: (email, nombre) normalizados → recetas
+    - guardadas_por: email → recetas que ese usuario tiene guardadas
+    - usuarios_guardado: id de la receta → conjunto de emails que la guardaron
+    - por_imagen: URL de una imagen (foto o variante) → recetas que la usan
+    - texto: índice de texto libre (None hasta la primera búsqueda, ver RepositorioRecetas.indice_texto)
+    - busqueda: índices de filtrado (None hasta el primer filtrado, ver RepositorioRecetas.indice_busqueda)
+
+    Cada índice guarda listas en el orden en que se añadieron las recetas. Al
+    igual que la lista de recetas, una vez publicados no se modifican: `copiar`
+    crea índices nuevos que comparten las listas y solo se copian las que se tocan.
+    """
+
+    def __init__(self):
+        self.por_id: Dict[str, List[Dict[str, Any]]] = {}
+        self.por_nombre: Dict[str, List[Dict[str, Any]]] = {}
+        self.por_autor: Dict[str, List[Dict[str, Any]]] = {}
+        self.por_autor_nombre: Dict[tuple, List[Dict[str, Any]]] = {}
+        self.guardadas_por: Dict[str, List[Dict[str, Any]]] = {}
+        self.usuarios_guardado: Dict[int, frozenset] = {}
+        self.por_imagen: Dict[str, List[Dict[str, Any]]] = {}
+        self.texto: Optional[IndiceTexto] = None
+        self.busqueda: Optional[IndiceBusqueda] = None
+        self._copiadas: set = set()
+
+    @classmethod
+    def construir(cls, recetas: List[Dict[str, Any]]) -> "IndicesRecetas":
+        indices = cls()
+        for receta in recetas:
+            indices.agregar(receta)
+        return indices
+
+    def copiar(self) -> "IndicesRecetas":
+        """Crea unos índices editables que comparten las listas con estos."""
+        copia = IndicesRecetas()
+        copia.por_id = dict(self.por_id)
+        copia.por_nombre = dict(self.por_nombre)
+        copia.por_autor = dict(self.por_autor)
+        copia.por_autor_nombre = dict(self.por_autor_nombre)
+        copia.guardadas_por = dict(self.guardadas_por)
+        copia.usuarios_guardado = dict(self.usuarios_guardado)
+        copia.por_imagen = dict(self.por_imagen)
+        copia.texto = self.texto.copiar() if self.texto is not None else None
+        copia.busqueda = self.busqueda.copiar() if self.busqueda is not None else None
+        return copia
+
+    def _claves(self, receta: Dict[str, Any]) -> List[tuple]:
+        """Pares (índice, claves de la receta en ese índice)."""
+        nombre = normalizar_clave(receta.get("nombreReceta"))
+        autor = normalizar_clave(receta.get("usuario"))
+        return [
+            (self.por_id, (receta["id"],) if receta.get("id") else ()),
+            (self.por_nombre, (nombre,)),
+            (self.por_autor, (autor,)),
+            (self.por_autor_nombre, ((autor, nombre),)),
+            # Los emails de usuariosGuardado se comparan tal cual, igual que en la lista original
+            (self.guardadas_por, tuple(dict.fromkeys(receta.get("usuariosGuardado") or ()))),
+            (self.por_imagen, tuple(sorted(urls_imagenes(receta)))),
+        ]
+
+    def _lista_editable(self, indice: Dict[Any, List[Dict[str, Any]]], clave: Any) -> List[Dict[str, Any]]:
+        """Devuelve la lista de una clave copiándola la primera vez que se modifica."""
+        marca = (id(indice), clave)
+        if marca not in self._copiadas:
+            indice[clave] = list(indice.get(clave, ()))
+            self._copiadas.add(marca)
+        return indice[clave]
+
+    def _quitar_de(self, indice: Dict[Any, List[Dict[str, Any]]], clave: Any, receta: Dict[str, Any]) -> None:
+        lista = self._lista_editable(indice, clave)
+        for i, existente in enumerate(lista):
+            if existente is receta:
+                del lista[i]
+                break
+        if not lista:
+            del indice[clave]
+
+    def agregar(self, receta: Dict[str, Any]) -> None:
+        for indice, claves in self._claves(receta):
+            for clave in claves:
+                self._lista_editable(indice, clave).append(receta)
+        self.usuarios_guardado[id(receta)] = frozenset(receta.get("usuariosGuardado") or ())
+        if self.texto is not None:
+            self.texto.agregar(receta)
+        if self.busqueda is not None:
+            self.busqueda.agregar(receta)
+
+    def quitar(self, receta: Dict[str, Any]) -> None:
+        for indice, claves in self._claves(receta):
+            for clave in claves:
+                self._quitar_de(indice, clave, receta)
+        self.usuarios_guardado.pop(id(receta), None)
+        if self.texto is not None:
+            self.texto.quitar(receta)
+        if self.busqueda is not None:
+            self.busqueda.quitar(receta)
+
+    def sustituir(self, anterior: Dict[str, Any], nueva: Dict[str, Any]) -> None:
+        """Cambia una receta por otra conservando su posición en las listas cuyas claves no cambian."""
+        for (indice, claves_anteriores), (_, claves_nuevas) in zip(self._claves(anterior), self._claves(nueva)):
+            for clave in claves_anteriores:
+                if clave in claves_nuevas:
+                    lista = self._lista_editable(indice, clave)
+                    for i, existente in enumerate(lista):
+                        if existente is anterior:
+                            lista[i] = nueva
+                            break
+                else:
+                    self._quitar_de(indice, clave, anterior)
+            for clave in claves_nuevas:
+                if clave not in claves_anteriores:
+                    self._lista_editable(indice, clave).append(nueva)
+        self.usuarios_guardado.pop(id(anterior), None)
+        self.usuarios_guardado[id(nueva)] = frozenset(nueva.get("usuariosGuardado") or ())
+        if self.texto is not None:
+            self.texto.sustituir(anterior, nueva)
+        if self.busqueda is not None:
+            self.busqueda.sustituir(anterior, nueva)
+
+    def buscar(self, nombre: str, autor: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Primera receta con ese nombre exacto y, si se indica, de ese autor (sin distinguir mayúsculas)."""
+        if autor is None:
+            candidatas = self.por_nombre.get(normalizar_clave(nombre), [])
+        else:
+            candidatas = self.por_autor_nombre.get((normalizar_clave(autor), normalizar_clave(nombre)), [])
+        for receta in candidatas:
+            if receta.get("nombreReceta") == nombre:
+                return receta
+        return None
+
+    def buscar_por_id(self, id_receta: str) -> Optional[Dict[str, Any]]:
+        """Receta con ese id estable o None."""
+        recetas = self.por_id.get(id_receta)
+        return recetas[0] if recetas else None
+
+    def esta_guardada_por(self, receta: Dict[str, Any], email: str) -> bool:
+        """Indica si el usuario tiene guardada la receta usando su conjunto de usuarios."""
+        usuarios = self.usuarios_guardado.get(id(receta))
+        if usuarios is None:
+            # Receta que no pertenece a esta instantánea: consultar su propia lista
+            return email in (receta.get("usuariosGuardado") or ())
+        return email in usuarios
+
+
+class LoteRecetas:
+    """
+    Estado de trabajo de un lote de escrituras agrupadas.
+
+    Cada operación del lote recibe este objeto, busca en él las recetas (viendo
+    ya los cambios de las operaciones anteriores del mismo lote) y registra sus
+    modificaciones con `anadir`, `reemplazar` o `eliminar`. Las modificaciones
+    de una operación solo se aplican si termina sin lanzar excepción.
+
+    Las recetas se identifican por identidad (las que devuelven las búsquedas del
+    lote), no por igualdad: dos recetas con el mismo contenido son recetas distintas.
+    """
+
+    def __init__(self, recetas: List[Dict[str, Any]], indices: IndicesRecetas):
+        self.recetas = recetas
+        self.indices = indices
+        self.cambios: List[Dict[str, Any]] = []
+        self._pendientes: List[tuple] = []
+        # id(receta) → posición en self.recetas; se construye al necesitarlo y se
+        # descarta cuando un cambio desplaza las posiciones (ver _actualizar_posiciones)
+        self._posiciones: Optional[Dict[int, int]] = None
+
+    def buscar_receta(self, nombre: str, autor: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        return self.indices.buscar(nombre, autor)
+
+    def buscar_por_id(self, id_receta: str) -> Optional[Dict[str, Any]]:
+        return self.indices.buscar_por_id(id_receta)
+
+    def esta_guardada_por(self, receta: Dict[str, Any], email: str) -> bool:
+        return self.indices.esta_guardada_por(receta, email)
+
+    def contiene(self, receta: Dict[str, Any]) -> bool:
+        # usuarios_guardado está indexado por id(receta) de las recetas del lote
+        return id(receta) in self.indices.usuarios_guardado
+
+    def anadir(self, receta: Dict[str, Any]) -> None:
+        self._pendientes.append(("insertar", None, receta))
+
+    def reemplazar(self, anterior: Dict[str, Any], nueva: Dict[str, Any]) -> None:
+        self._pendientes.append(("reemplazar", anterior, nueva))
+
+    def eliminar(self, receta: Dict[str, Any]) -> None:
+        self._pendientes.append(("eliminar", receta, None))
+
+    def aplicar_cambios(self, cambios: List[Dict[str, Any]]) -> None:
+        """Registra cambios posicionales ya calculados (p. ej. con calcular_cambios)."""
+        for cambio in cambios:
+            self._pendientes.append(("posicional", cambio, None))
+
+    def _posicion(self, receta: Dict[str, Any]) -> Optional[int]:
+        if self._posiciones is None:
+            self._posiciones = {id(r): i for i, r in enumerate(self.recetas)}
+        posicion = self._posiciones.get(id(receta))
+        if posicion is None or self.recetas[posicion] is not receta:
+            return None
+        return posicion
+
+    def _actualizar_posiciones(self, cambio: Dict[str, Any], anterior: Optional[Dict[str, Any]]) -> None:
+        """Mantiene el mapa de posiciones tras aplicar un cambio (solo se recalcula si se desplazan)."""
+        if self._posiciones is None:
+            return
+        posicion = cambio["pos"]
+        if cambio["op"] == "reemplazar":
+            self._posiciones.pop(id(anterior), None)
+            self._posiciones[id(cambio["receta"])] = posicion
+        elif cambio["op"] == "insertar" and posicion == len(self.recetas) - 1:
+            self._posiciones[id(cambio["receta"])] = posicion
+        else:
+            self._posiciones = None
+
+    def _validar(self, pendientes: List[tuple]) -> None:
+        """
+        Comprueba que todas las modificaciones de una operación se pueden aplicar, sin tocar
+        el estado de trabajo: si una falla, no se aplica ninguna.
+
+        Raises:
+            ValueError: Si una receta a reemplazar o eliminar ya no existe
+            IndexError: Si un cambio posicional está fuera de la lista
+        """
+        if any(tipo == "posicional" for tipo, _, _ in pendientes):
+            # Con cambios posicionales se aplican todos sobre una copia de la lista
+            recetas = list(self.recetas)
+            for tipo, receta, nueva in pendientes:
+                if tipo == "posicional":
+                    cambio = receta
+                elif tipo == "insertar":
+                    cambio = {"op": "insertar", "pos": len(recetas), "receta": nueva}
+                else:
+                    posicion = next((i for i, existente in enumerate(recetas) if existente is receta), None)
+                    if posicion is None:
+                        raise ValueError(f"La receta '{receta.get('nombreReceta')}' ya no existe")
+                    cambio = {"op": tipo, "pos": posicion, "receta": nueva}
+                aplicar_cambio(recetas, cambio)
+            return
+
+        # Sin ellos basta con seguir qué recetas añade y quita la operación
+        anadidas: set = set()
+        quitadas: set = set()
+        for tipo, receta, nueva in pendientes:
+            if tipo != "insertar":
+                existe = id(receta) in anadidas or (id(receta) not in quitadas and self._posicion(receta) is not None)
+                if not existe:
+                    raise ValueError(f"La receta '{receta.get('nombreReceta')}' ya no existe")
+                anadidas.discard(id(receta))
+                quitadas.add(id(receta))
+            if nueva is not None:
+                anadidas.add(id(nueva))
+
+    def _confirmar(self) -> None:
+        """Aplica al estado de trabajo las modificaciones de la operación que acaba de terminar."""
+        pendientes, self._pendientes = self._pendientes, []
+        self._validar(pendientes)
+        for tipo, receta, nueva in pendientes:
+            if tipo == "posicional":
+                cambio = receta
+            elif tipo == "insertar":
+                cambio = {"op": "insertar", "pos": len(self.recetas), "receta": nueva}
+            else:
+                posicion = self._posicion(receta)
+                if posicion is None:
+                    raise ValueError(f"La receta '{receta.get('nombreReceta')}' ya no existe")
+                cambio = {"op": tipo, "pos": posicion}
+                if tipo == "reemplazar":
+                    cambio["receta"] = nueva
+
+            posicion = cambio["pos"]
+            anterior = self.recetas[posicion] if cambio["op"] != "insertar" else None
+            if cambio["op"] == "reemplazar":
+                self.indices.sustituir(anterior, cambio["receta"])
+            elif cambio["op"] == "eliminar":
+                self.indices.quitar(anterior)
+            elif cambio["op"] == "insertar":
+                self.indices.agregar(cambio["receta"])
+            aplicar_cambio(self.recetas, cambio)
+            self._actualizar_posiciones(cambio, anterior)
+            self.cambios.append(cambio)
+
+    def _descartar(self) -> None:
+        self._pendientes = []
+
+
+class RepositorioRecetas:
+    """
+    Caché de proceso para las recetas con invalidación por firma del almacenamiento.
+    """
+
+    def __init__(self, almacenamiento: Any = None):
+        self.almacenamiento = almacenamiento or crear_almacenamiento_recetas()
+        self._recetas: List[Dict[str, Any]] = []
+        self._indices = IndicesRecetas()
+        self._firma: Any = None
+        self._cargado = False
+        # Cambia con cada instantánea publicada (ver version)
+        self._version = 0
+        self._lock = threading.RLock()
+        self._escritor = EscritorAgrupado("recetas", self._procesar_lote)
+        # (lista de recetas de la instantánea, claves de orden, recetas publicadas ordenadas)
+        self._publicadas: Optional[tuple] = None
+
+    def _cargar_desde_almacenamiento(self) -> None:
+        """Lee y parsea las recetas persistidas, actualizando la caché y su firma."""
+        firma = self.almacenamiento.firma()
+        try:
+            recetas = self.almacenamiento.cargar()
+        except (ValueError, IOError) as e:
+            print(f"{LOG_ERROR} Error al cargar recetas: {e}")
+            recetas = []
+
+        self._recetas = recetas
+        self._indices = IndicesRecetas.construir(recetas)
+        self._firma = firma
+        self._cargado = True
+        self._version += 1
+
+    def _recargar_si_cambio(self) -> None:
+        """Vuelve a cargar las recetas si no se han cargado aún o si su firma ha cambiado."""
+        if self._cargado and self.almacenamiento.firma() == self._firma:
+            return
+        with self._lock:
+            if not self._cargado or self.almacenamiento.firma() != self._firma:
+                self._cargar_desde_almacenamiento()
+
+    def obtener_recetas(self) -> List[Dict[str, Any]]:
+        """
+        Devuelve la lista compartida de recetas.
+        No debe modificarse: para editar se usa `copiar_recetas`.
+
+        Returns:
+            List[Dict[str, Any]]: Recetas en memoria (solo lectura)
+        """
+        self._recargar_si_cambio()
+        return self._recetas
+
+    def copiar_recetas(self) -> List[Dict[str, Any]]:
+        """
+        Devuelve una copia editable de las recetas, pensada para el ciclo cargar → modificar → guardar.
+
+        Returns:
+            List[Dict[str, Any]]: Copia de las recetas
+        """
+        return [copiar_receta(receta) for receta in self.obtener_recetas()]
+
+    def obtener_indices(self) -> IndicesRecetas:
+        """
+        Devuelve los índices de la instantánea actual (solo lectura).
+
+        Returns:
+            IndicesRecetas: Índices por nombre, autor y (autor, nombre)
+        """
+        self._recargar_si_cambio()
+        return self._indices
+
+    def recetas_con_nombre(self, nombre: str) -> List[Dict[str, Any]]:
+        """
+        Recetas cuyo nombre coincide sin distinguir mayúsculas ni espacios extremos.
+
+        Args:
+            nombre (str): Nombre de la receta
+
+        Returns:
+            List[Dict[str, Any]]: Recetas encontradas (solo lectura)
+        """
+        return self.obtener_indices().por_nombre.get(normalizar_clave(nombre), [])
+
+    def recetas_de_autor(self, email: str) -> List[Dict[str, Any]]:
+        """
+        Recetas creadas por un usuario, sin distinguir mayúsculas en el email.
+
+        Args:
+            email (str): Email del autor
+
+        Returns:
+            List[Dict[str, Any]]: Recetas del autor (solo lectura)
+        """
+        return self.obtener_indices().por_autor.get(normalizar_clave(email), [])
+
+    def buscar_receta(self, nombre: str, autor: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Busca la primera receta con ese nombre exacto y, si se indica, de ese autor.
+
+        Args:
+            nombre (str): Nombre exacto de la receta
+            autor (Optional[str]): Email del autor (sin distinguir mayúsculas)
+
+        Returns:
+            Optional[Dict[str, Any]]: Receta compartida (solo lectura) o None si no existe
+        """
+        return self.obtener_indices().buscar(nombre, autor)
+
+    def receta_por_id(self, id_receta: str) -> Optional[Dict[str, Any]]:
+        """
+        Busca una receta por su id estable.
+
+        Args:
+            id_receta (str): Id asignado al crear la receta
+
+        Returns:
+            Optional[Dict[str, Any]]: Receta compartida (solo lectura) o None si no existe
+        """
+        return self.obtener_indices().buscar_por_id(id_receta)
+
+    def recetas_con_imagen(self, url: str) -> List[Dict[str, Any]]:
+        """
+        Recetas que usan una imagen como foto o como variante de su foto.
+
+        Args:
+            url (str): URL de la imagen
+
+        Returns:
+            List[Dict[str, Any]]: Recetas que la usan (solo lectura)
+        """
+        return self.obtener_indices().por_imagen.get(url, [])
+
+    def recetas_guardadas_por(self, email: str) -> List[Dict[str, Any]]:
+        """
+        Recetas que un usuario tiene guardadas, desde el índice inverso.
+
+        Args:
+            email (str): Email del usuario
+
+        Returns:
+            List[Dict[str, Any]]: Recetas guardadas (solo lectura)
+        """
+        return self.obtener_indices().guardadas_por.get(email, [])
+
+    def recetas_publicadas_desde(self, clave: Optional[Tuple[str, str]] = None) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Recetas publicadas en orden estable (ver clave_orden_receta), a partir de una clave.
+        La lista ordenada se calcula una vez por instantánea y se reutiliza hasta el siguiente cambio.
+
+        Args:
+            clave (Optional[Tuple[str, str]]): Clave de la última receta ya vista (None para empezar)
+
+        Returns:
+            Tuple[List[Dict[str, Any]], int]: Recetas publicadas ordenadas (solo lectura) y
+            posición de la primera receta posterior a la clave
+        """
+        # Cada cambio publica una lista de recetas nueva, así que su identidad marca la instantánea
+        todas = self.obtener_recetas()
+        publicadas = self._publicadas
+        if publicadas is None or publicadas[0] is not todas:
+            recetas = sorted(
+                (receta for receta in todas if receta.get("publicada", False) == True),
+                key=clave_orden_receta
+            )
+            publicadas = (todas, [clave_orden_receta(receta) for receta in recetas], recetas)
+            self._publicadas = publicadas
+
+        _, claves, recetas = publicadas
+        inicio = bisect.bisect_right(claves, tuple(clave)) if clave is not None else 0
+        return recetas, inicio
+
+    def indice_busqueda(self) -> IndiceBusqueda:
+        """
+        Índices de filtrado de la instantánea actual. Se construyen la primera vez que se
+        piden y a partir de entonces las escrituras los actualizan en lugar de reconstruirlos.
+
+        Returns:
+            IndiceBusqueda: Índices por país, dificultad, turno, duración, ingredientes y alérgenos
+        """
+        indices = self.obtener_indices()
+        if indices.busqueda is not None:
+            return indices.busqueda
+        # Con el lock, la lista y los índices son de la misma instantánea
+        with self._lock:
+            self._recargar_si_cambio()
+            if self._indices.busqueda is None:
+                self._indices.busqueda = IndiceBusqueda(self._recetas)
+            return self._indices.busqueda
+
+    def indice_texto(self) -> IndiceTexto:
+        """
+        Índice de texto libre de la instantánea actual. Se construye la primera vez que se
+        pide y a partir de entonces las escrituras lo actualizan en lugar de reconstruirlo.
+
+        Returns:
+            IndiceTexto: Índice invertido sobre nombre, descripción e ingredientes (solo lectura)
+        """
+        indices = self.obtener_indices()
+        if indices.texto is not None:
+            return indices.texto
+        # Con el lock, la lista y los índices son de la misma instantánea
+        with self._lock:
+            self._recargar_si_cambio()
+            if self._indices.texto is None:
+                self._indices.texto = IndiceTexto.construir(self._recetas)
+            return self._indices.texto
+
+    def version(self) -> int:
+        """
+        Versión de la instantánea actual, para las ETags de las respuestas (ver versiones.py).
+        Cambia con cada escritura y con cada recarga por cambios en el almacenamiento.
+
+        Returns:
+            int: Contador de instantáneas del proceso
+        """
+        self._recargar_si_cambio()
+        return self._version
+
+    def esta_guardada_por(self, receta: Dict[str, Any], email: str) -> bool:
+        """
+        Indica si un usuario tiene guardada una receta obtenida del repositorio.
+
+        Args:
+            receta (Dict[str, Any]): Receta compartida
+            email (str): Email del usuario
+
+        Returns:
+            bool: True si el usuario la tiene guardada
+        """
+        return self.obtener_indices().esta_guardada_por(receta, email)
+
+    def enviar(self, operacion: Callable[[LoteRecetas], Any]) -> Future:
+        """
+        Encola una operación de escritura para el hilo escritor.
+
+        El escritor agrupa las operaciones que llegan mientras se guarda el lote
+        anterior (o dentro de VENTANA_GRUPO_ESCRITURA, hasta MAX_OPERACIONES_POR_LOTE)
+        y las persiste con una sola escritura. Cada operación se ejecuta sobre el
+        estado más reciente, así que leer y modificar dentro de ella es atómico.
+
+        Args:
+            operacion (Callable[[LoteRecetas], Any]): Función que recibe el lote y devuelve un resultado
+
+        Returns:
+            Future: Se resuelve con el resultado de la operación cuando el lote ya está guardado
+        """
+        return self._escritor.enviar(operacion)
+
+    def ejecutar(self, operacion: Callable[[LoteRecetas], Any]) -> Any:
+        """
+        Ejecuta una operación de escritura y espera a que su lote esté guardado.
+        No debe llamarse desde dentro de otra operación.
+
+        Args:
+            operacion (Callable[[LoteRecetas], Any]): Función que recibe el lote y devuelve un resultado
+
+        Returns:
+            Any: Resultado de la operación
+
+        Raises:
+            IOError: Si no se pudo guardar el lote
+        """
+        return self.enviar(operacion).result()
+
+    def guardar_recetas(self, recetas: List[Dict[str, Any]]) -> bool:
+        """
+        Persiste la lista completa de recetas y sustituye la caché por la nueva lista.
+        Se calculan las diferencias con el estado actual para actualizar los índices y,
+        si el backend lleva un registro de cambios, para escribir solo lo que ha cambiado.
+
+        Args:
+            recetas (List[Dict[str, Any]]): Lista completa de recetas
+
+        Returns:
+            bool: True si se guardó correctamente, False en caso contrario
+        """
+        recetas = list(recetas)
+
+        def operacion(lote: LoteRecetas) -> bool:
+            lote.aplicar_cambios(calcular_cambios(lote.recetas, recetas))
+            return True
+        return self._ejecutar_con_resultado(operacion)
+
+    def anadir_receta(self, receta: Dict[str, Any]) -> bool:
+        """
+        Añade una receta al final sin copiar ni comparar el resto.
+
+        Args:
+            receta (Dict[str, Any]): Receta nueva
+
+        Returns:
+            bool: True si se guardó correctamente, False en caso contrario
+        """
+        def operacion(lote: LoteRecetas) -> bool:
+            lote.anadir(receta)
+            return True
+        return self._ejecutar_con_resultado(operacion)
+
+    def reemplazar_receta(self, anterior: Dict[str, Any], nueva: Dict[str, Any]) -> bool:
+        """
+        Sustituye una receta obtenida del repositorio por una versión modificada.
+        Para leer y modificar sin riesgo de perder cambios concurrentes se usa `ejecutar`.
+
+        Args:
+            anterior (Dict[str, Any]): Receta compartida tal y como se leyó
+            nueva (Dict[str, Any]): Receta modificada (no debe ser el mismo objeto)
+
+        Returns:
+            bool: True si se guardó, False si la receta ya no existe o falla el guardado
+        """
+        def operacion(lote: LoteRecetas) -> bool:
+            if not lote.contiene(anterior):
+                return False
+            lote.reemplazar(anterior, nueva)
+            return True
+        return self._ejecutar_con_resultado(operacion)
+
+    def eliminar_receta(self, receta: Dict[str, Any]) -> bool:
+        """
+        Elimina una receta obtenida del repositorio.
+
+        Args:
+            receta (Dict[str, Any]): Receta compartida a eliminar
+
+        Returns:
+            bool: True si se eliminó, False si ya no existe o falla el guardado
+        """
+        def operacion(lote: LoteRecetas) -> bool:
+            if not lote.contiene(receta):
+                return False
+            lote.eliminar(receta)
+            return True
+        return self._ejecutar_con_resultado(operacion)
+
+    def _ejecutar_con_resultado(self, operacion: Callable[[LoteRecetas], bool]) -> bool:
+        """Ejecuta una operación que devuelve bool, convirtiendo los errores de guardado en False."""
+        try:
+            return self.ejecutar(operacion)
+        except (ValueError, IOError) as e:
+            print(f"{LOG_ERROR} Error al guardar recetas: {e}")
+            return False
+
+    # ==================== HILO ESCRITOR ====================
+
+    def _procesar_lote(self, operaciones: List[tuple]) -> None:
+        """Aplica las operaciones de un lote sobre el estado actual y lo guarda con una sola escritura."""
+        with self._lock:
+            self._recargar_si_cambio()
+            lote = LoteRecetas(list(self._recetas), self._indices.copiar())
+
+            resultados = []
+            for operacion, futuro in operaciones:
+                if not futuro.set_running_or_notify_cancel():
+                    continue
+                try:
+                    resultado = operacion(lote)
+                    lote._confirmar()
+                except Exception as e:
+                    lote._descartar()
+                    futuro.set_exception(e)
+                    continue
+                resultados.append((futuro, resultado))
+
+            guardado = not lote.cambios or self._persistir(lote.recetas, lote.cambios, lote.indices)
+
+        if len(resultados) > 1:
+            print(f"{LOG_INFO} {len(resultados)} escrituras de recetas agrupadas en un solo guardado")
+        for futuro, resultado in resultados:
+            if guardado:
+                futuro.set_result(resultado)
+            else:
+                futuro.set_exception(IOError("No se pudieron guardar las recetas"))
+
+    def _persistir(self, recetas: List[Dict[str, Any]], cambios: Optional[List[Dict[str, Any]]],
+                   indices: IndicesRecetas) -> bool:
+        """Guarda en el backend y, si todo va bien, publica la nueva instantánea con sus índices."""
+        if not self.almacenamiento.registra_cambios:
+            cambios = None
+        try:
+            self.almacenamiento.guardar(recetas, cambios)
+        except (ValueError, IOError) as e:
+            print(f"{LOG_ERROR} Error al guardar recetas: {e}")
+            # El estado persistido es incierto: forzar recarga en la próxima lectura
+            self.invalidar()
+            return False
+
+        self._recetas = recetas
+        self._indices = indices
+        self._firma = self.almacenamiento.firma()
+        self._cargado = True
+        self._version += 1
+
+        if getattr(self.almacenamiento, "necesita_compactar", lambda: False)():
+            threading.Thread(target=self._compactar, daemon=True).start()
+        return True
+
+    def _compactar(self) -> None:
+        """Integra el registro de cambios en una instantánea nueva (se ejecuta en segundo plano)."""
+        with self._lock:
+            if not self.almacenamiento.necesita_compactar():
+                return
+            try:
+                self.almacenamiento.compactar(self._recetas)
+                self._firma = self.almacenamiento.firma()
+            except (ValueError, IOError) as e:
+                # El registro sigue siendo válido: se reintentará en el próximo guardado
+                print(f"{LOG_ERROR} Error al compactar el registro de recetas: {e}")
+
+    def invalidar(self) -> None:
+        """Descarta la caché para que la próxima lectura vuelva a leer el almacenamiento."""
+        with self._lock:
+            self._cargado = False
+            self._firma = None
+
+
+# Repositorio compartido por todo el proceso
+repositorio_recetas = RepositorioRecetas()
@@ -9,13 +9,12 @@ Características principales:
 - Validación de formularios y manejo de errores consistente
 """
 
-from typing import Union
-import os
-import uuid
-from fastapi import FastAPI, Request, Response
+from typing import Union, Optional, List
+from contextlib import asynccontextmanager
+import threading
+from fastapi import FastAPI, Request, Response, Query
 from fastapi import UploadFile, File
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, RedirectResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
 
 # Importar módulos locales
 from constants import *
@@ -24,37 +23,83 @@ from utils import (
     verificar_archivo_existe, guardar_nueva_cuenta, email_ya_existe, 
     validar_cuenta, validar_password, guardar_nueva_receta, obtener_recetas_usuario,
     procesar_imagen_receta, guardar_receta_usuario, desguardar_receta_usuario,
-    obtener_recetas_guardadas_usuario, es_receta_guardada_por_usuario, obtener_receta_por_id,
-    obtener_recetas_usuario_con_ids, cargar_recetas, guardar_recetas, publicar_receta_usuario,
-    cargar_cuentas, hash_password, generar_menu_semanal_automatico,
-    obtener_menu_semanal, guardar_menu_semanal, eliminar_menu_semanal, generar_id_receta,
-    actualizar_menu_tras_edicion_receta, eliminar_receta_del_menu_semanal
+    obtener_recetas_guardadas_usuario, obtener_recetas_usuario_con_ids, listar_recetas, recetas_con_nombre,
+    editar_receta_usuario, eliminar_receta_usuario, anadir_comentario_receta,
+    registrar_valoracion_receta, publicar_receta_usuario, listar_comentarios_receta,
+    copiar_para_listado, campos_listado, pagina_recetas_comunidad, buscar_recetas, migrar_recetas,
+    resolver_id_receta, id_publico_receta, valoraciones_por_usuario, resumen_valoraciones, valoracion_media,
+    hash_password, generar_menu_semanal_automatico,
+    obtener_menu_semanal, guardar_menu_semanal, eliminar_menu_semanal,
+    actualizar_menu_tras_edicion_receta, eliminar_receta_del_menu_semanal, resumen_interacciones_recetas
 )
-from utils import obtener_cuenta_por_email, actualizar_cuenta, crear_directorio_si_no_existe, generar_nombre_archivo_unico, obtener_extension_desde_mime
+from repositorio_recetas import repositorio_recetas
+from utils import obtener_cuenta_por_email, actualizar_cuenta
+from utils import ejecutar_en_hilo, version_cuentas, version_menu_semanal
+from utils import guardar_imagen_con_variantes, urls_imagenes, liberar_imagenes
+from imagenes import url_variante
+from comentarios import almacen_comentarios
+from versiones import calcular_etag, etag_coincide
+from recursos_estaticos import ArchivosEstaticos, recursos_estaticos
+from compresion import CompresionMiddleware
+from subidas import SubidaRechazada, recibir_imagen, subidas_pendientes
+from recolector_imagenes import recolector_imagenes
 
 # ==================== CONFIGURACIÓN DE LA APLICACIÓN ====================
 
+@asynccontextmanager
+async def ciclo_de_vida(app: FastAPI):
+    """
+    Tareas de arranque del servidor: migra las recetas guardadas en formato antiguo
+    (comentarios dentro de la receta, valoraciones en lista) y empieza a construir en
+    segundo plano el índice de texto libre, para que la primera búsqueda no lo espere,
+    y las versiones comprimidas de las páginas HTML, el JS y el CSS. También arranca el
+    recolector de imágenes huérfanas, que se detiene al parar el servidor.
+    """
+    try:
+        await ejecutar_en_hilo(migrar_recetas)
+    except IOError as e:
+        print(f"{LOG_ERROR} No se pudieron migrar las recetas: {e}")
+    threading.Thread(target=repositorio_recetas.indice_texto, name="indice-texto", daemon=True).start()
+    threading.Thread(target=recursos_estaticos.precalcular, name="recursos-estaticos", daemon=True).start()
+    recolector_imagenes.iniciar_en_segundo_plano()
+    yield
+    recolector_imagenes.detener()
+
+
 app = FastAPI(
     title="Aplicación Web de Recetas",
     description="API para gestión de recetas y creación de cuentas de usuario con autenticación basada en cookies",
     version="1.0.0",
     docs_url="/docs",  # Documentación Swagger
-    redoc_url="/redoc"  # Documentación ReDoc
+    redoc_url="/redoc",  # Documentación ReDoc
+    lifespan=ciclo_de_vida
 )
 
+# Compresión gzip/brotli de las respuestas de la API (las páginas y /static ya van comprimidas).
+# Se añade antes que el middleware de cabeceras para recibir cada respuesta en un solo bloque
+app.add_middleware(CompresionMiddleware)
+
 @app.middleware("http")
 async def add_no_cache_headers(request: Request, call_next):
     """
     Middleware para añadir cabeceras que evitan el cacheo en el navegador.
+    Se respeta la política de /static (ver recursos_estaticos.py). Las respuestas
+    de la API con ETag (ver versiones.py) se pueden guardar en la caché del
+    navegador, pero deben revalidarse con If-None-Match en cada uso.
     """
     response = await call_next(request)
-    response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate, max-age=0"
+    if "Cache-Control" in response.headers:
+        return response
+    if "ETag" in response.headers:
+        response.headers["Cache-Control"] = CACHE_CONTROL_PRIVADA_REVALIDAR
+        return response
+    response.headers["Cache-Control"] = CACHE_CONTROL_SIN_CACHE
     response.headers["Pragma"] = "no-cache"
     response.headers["Expires"] = "0"
     return response
 
 # Montar archivos estáticos
-app.mount(f"/{DIRECTORIO_STATIC}", StaticFiles(directory=DIRECTORIO_STATIC), name=DIRECTORIO_STATIC)
+app.mount(f"/{DIRECTORIO_STATIC}", ArchivosEstaticos(directory=DIRECTORIO_STATIC), name=DIRECTORIO_STATIC)
 
 # ==================== FUNCIONES DE UTILIDAD PARA COOKIES Y AUTENTICACIÓN ====================
 
@@ -151,7 +196,8 @@ def requiere_autenticacion(request: Request) -> Union[None, RedirectResponse]:
 
 # ==================== FUNCIONES HELPER PARA RESPUESTAS ====================
 
-def crear_respuesta_exito(mensaje: str, data: dict = None, status_code: int = HTTP_OK) -> JSONResponse:
+def crear_respuesta_exito(mensaje: str, data: dict = None, status_code: int = HTTP_OK,
+                          etag: Optional[str] = None) -> JSONResponse:
     """
     Crea una respuesta JSON de éxito estandarizada.
     
@@ -159,6 +205,7 @@ def crear_respuesta_exito(mensaje: str, data: dict = None, status_code: int = HT
         mensaje: Mensaje de éxito
         data: Datos adicionales opcionales
         status_code: Código de estado HTTP
+        etag: ETag de la respuesta (ver respuesta_no_modificada)
         
     Returns:
         JSONResponse con formato estandarizado
@@ -170,7 +217,8 @@ def crear_respuesta_exito(mensaje: str, data: dict = None, status_code: int = HT
     if data:
         content.update(data)
     
-    return JSONResponse(content=content, status_code=status_code)
+    headers = {"ETag": etag} if etag else None
+    return JSONResponse(content=content, status_code=status_code, headers=headers)
 
 def crear_respuesta_error(mensaje: str, codigo_error: str = None, status_code: int = HTTP_BAD_REQUEST) -> JSONResponse:
     """
@@ -193,19 +241,38 @@ def crear_respuesta_error(mensaje: str, codigo_error: str = None, status_code: i
     
     return JSONResponse(content=content, status_code=status_code)
 
-def servir_pagina_html(ruta_archivo: str, mensaje_error: str = None) -> Union[FileResponse, HTMLResponse]:
+def respuesta_no_modificada(request: Request, etag: str) -> Optional[Response]:
+    """
+    Responde 304 si la petición ya tiene la versión actual (If-None-Match coincide con la ETag).
+    La ETag se calcula con las versiones de los datos (ver versiones.py), así que se
+    llama antes de construir la respuesta y, si coincide, no se construye ni se serializa.
+    
+    Args:
+        request: Objeto Request de FastAPI
+        etag: ETag de la respuesta que se enviaría
+        
+    Returns:
+        Response 304 sin cuerpo, o None si hay que construir la respuesta completa
+    """
+    if etag_coincide(request.headers.get("if-none-match"), etag):
+        return Response(status_code=HTTP_NOT_MODIFIED, headers={"ETag": etag})
+    return None
+
+def servir_pagina_html(ruta_archivo: str, mensaje_error: str = None) -> Response:
     """
     Sirve una página HTML si existe, o devuelve error 404.
+    Los enlaces a /static llevan la versión de cada recurso y la página se envía
+    comprimida desde memoria si el navegador lo acepta (ver recursos_estaticos.py).
     
     Args:
         ruta_archivo: Ruta al archivo HTML
         mensaje_error: Mensaje de error personalizado (opcional)
         
     Returns:
-        FileResponse si el archivo existe, HTMLResponse con error 404 si no existe
+        Respuesta con la página, o HTMLResponse con error 404 si no existe
     """
     if verificar_archivo_existe(ruta_archivo):
-        return FileResponse(ruta_archivo, media_type=CONTENT_TYPE_HTML)
+        return recursos_estaticos.pagina_html(ruta_archivo)
     else:
         error_msg = mensaje_error or MENSAJE_ERROR_ARCHIVO_NO_ENCONTRADO
         return HTMLResponse(
@@ -240,7 +307,7 @@ def get_pagina_principal(request: Request, response: Response, logout: bool = Fa
     # Solo aplicar logout si el usuario NO está registrado
     # Esto evita que el parámetro logout interfiera con un login reciente
     if logout and estado_actual != ESTADO_REGISTRADO:
-        file_response = FileResponse(RUTA_USUARIO_INVITADO, media_type=CONTENT_TYPE_HTML)
+        file_response = servir_pagina_html(RUTA_USUARIO_INVITADO)
         
         # Eliminar todas las cookies del usuario y establecer como invitado
         eliminar_cookies_usuario(file_response)
@@ -384,7 +451,7 @@ async def iniciar_sesion(login_data: LoginData) -> JSONResponse:
         # Solo verificar si las credenciales coinciden con una cuenta existente
         
         # Validar credenciales contra base de datos
-        cuenta_existente = validar_cuenta(login_data.email, login_data.password)   
+        cuenta_existente = await ejecutar_en_hilo(validar_cuenta, login_data.email, login_data.password)
         print(f"🔍 [LOGIN] Cuenta existente: {cuenta_existente}")
 
         if cuenta_existente:
@@ -463,7 +530,7 @@ async def crear_cuenta(cuenta: Cuenta) -> JSONResponse:
             return crear_respuesta_error(error_mensaje, "PASSWORD_INVALIDO")
         
         # Verificar si el email ya existe
-        if email_ya_existe(cuenta.email):
+        if await ejecutar_en_hilo(email_ya_existe, cuenta.email):
             return crear_respuesta_error(
                 MENSAJE_ERROR_EMAIL_DUPLICADO,
                 "EMAIL_DUPLICADO"
@@ -484,7 +551,7 @@ async def crear_cuenta(cuenta: Cuenta) -> JSONResponse:
         }
         
         # Intentar guardar la cuenta
-        if guardar_nueva_cuenta(cuenta_data):
+        if await ejecutar_en_hilo(guardar_nueva_cuenta, cuenta_data):
             return crear_respuesta_exito(
                 MENSAJE_CUENTA_CREADA,
                 {"usuario_creado": cuenta.nombreUsuario},
@@ -569,14 +636,20 @@ async def obtener_perfil_api(request: Request) -> JSONResponse:
                 HTTP_BAD_REQUEST
             )
 
+        # Las versiones se leen antes que los datos (ver versiones.py)
+        etag = calcular_etag("perfil", email, await ejecutar_en_hilo(repositorio_recetas.version),
+                             await ejecutar_en_hilo(version_cuentas))
+        no_modificada = respuesta_no_modificada(request, etag)
+        if no_modificada:
+            return no_modificada
+
         # Obtener cuenta para nombre de usuario y foto
-        cuenta = obtener_cuenta_por_email(email)
+        cuenta = await ejecutar_en_hilo(obtener_cuenta_por_email, email)
         nombre_usuario = cuenta.get('nombreUsuario') if cuenta else None
         foto_perfil = cuenta.get('fotoPerfil') if cuenta else None
 
         # Contar recetas propias y publicadas
-        todas_recetas = cargar_recetas()
-        recetas_propias = [r for r in todas_recetas if r.get('usuario', '').lower() == email.lower()]
+        recetas_propias = obtener_recetas_usuario(email)
         total_propias = len(recetas_propias)
         total_publicadas = sum(1 for r in recetas_propias if r.get('publicada', False) == True)
 
@@ -590,6 +663,7 @@ async def obtener_perfil_api(request: Request) -> JSONResponse:
         total_hechas = len(recetas_usuario_ids)
 
         # Calcular la valoración agregada del usuario (media ponderada por número de valoraciones)
+        # a partir del resumen de cada receta, sin recorrer las valoraciones individuales
         try:
             suma_puntos = 0
             total_valoraciones = 0
@@ -597,18 +671,14 @@ async def obtener_perfil_api(request: Request) -> JSONResponse:
                 # Solo considerar las recetas publicadas
                 if not r.get('publicada', False):
                     continue
-                vals = r.get('valoraciones', []) or []
-                for v in vals:
-                    try:
-                        suma_puntos += float(v.get('puntuacion', 0))
-                        total_valoraciones += 1
-                    except Exception:
-                        continue
+                resumen = resumen_valoraciones(r)
+                suma_puntos += resumen["suma"]
+                total_valoraciones += resumen["total"]
 
             valoracion_perfil = round((suma_puntos / total_valoraciones), 1) if total_valoraciones > 0 else 0.0
             # Persistir valoracion y el contador de valoraciones en la cuenta (si se puede)
             try:
-                actualizar_cuenta(email, {"valoracion": valoracion_perfil, "valoracion_count": total_valoraciones})
+                await ejecutar_en_hilo(actualizar_cuenta, email, {"valoracion": valoracion_perfil, "valoracion_count": total_valoraciones})
             except Exception as e:
                 print(f"{LOG_WARNING} No se pudo actualizar la cuenta con la valoración: {e}")
         except Exception as e:
@@ -619,6 +689,7 @@ async def obtener_perfil_api(request: Request) -> JSONResponse:
             "email": email,
             "nombreUsuario": nombre_usuario,
             "fotoPerfil": foto_perfil,
+            "fotosPerfil": cuenta.get('fotosPerfil') if cuenta else None,
             "totalPropias": total_propias,
             "totalPublicadas": total_publicadas,
             "totalGuardadas": total_guardadas,
@@ -626,7 +697,7 @@ async def obtener_perfil_api(request: Request) -> JSONResponse:
         }
 
         # Añadir valoracion almacenada en la cuenta (si existe) o la calculada
-        cuenta = obtener_cuenta_por_email(email)
+        cuenta = await ejecutar_en_hilo(obtener_cuenta_por_email, email)
         if cuenta and 'valoracion' in cuenta:
             data['valoracion'] = cuenta.get('valoracion', valoracion_perfil)
         else:
@@ -644,7 +715,7 @@ async def obtener_perfil_api(request: Request) -> JSONResponse:
             except Exception:
                 data['valoracion_count'] = 0
 
-        return crear_respuesta_exito("Perfil obtenido correctamente", {"perfil": data})
+        return crear_respuesta_exito("Perfil obtenido correctamente", {"perfil": data}, etag=etag)
 
     except Exception as e:
         print(f"{LOG_ERROR} Error inesperado en obtener_perfil_api: {e}")
@@ -669,32 +740,22 @@ async def subir_foto_perfil(request: Request, archivo: UploadFile = File(...)) -
         if archivo.content_type not in TIPOS_IMAGEN_PERMITIDOS:
             return crear_respuesta_error("Tipo de imagen no permitido", "TIPO_IMAGEN_NO_PERMITIDO", HTTP_BAD_REQUEST)
 
-        # Crear directorio de perfiles usando la misma lógica que para recetas
-        perfiles_dir = os.path.join(DIRECTORIO_UPLOADS, "perfiles")
-        crear_directorio_si_no_existe(DIRECTORIO_UPLOADS)
-        crear_directorio_si_no_existe(perfiles_dir)
-
-        # Determinar extensión a partir del content_type usando helper
-        ext = obtener_extension_desde_mime(archivo.content_type or "image/png")
-
-        # Generar nombre de archivo único consistente con recetas
-        nombre_archivo = generar_nombre_archivo_unico(email, ext)
-        ruta_guardado = os.path.join(perfiles_dir, nombre_archivo)
-
-        # Guardar archivo y validar tamaño
+        # Validar tamaño
         contenido = await archivo.read()
         if len(contenido) > TAMAÑO_MAXIMO_IMAGEN:
             return crear_respuesta_error("Imagen demasiado grande", "IMAGEN_TAMANIO_EXCEDIDO", HTTP_BAD_REQUEST)
 
-        with open(ruta_guardado, 'wb') as f:
-            f.write(contenido)
-
-        # URL accesible (misma base que recetas pero carpeta 'perfiles')
-        url_publica = f"/static/uploads/perfiles/{nombre_archivo}"
+        # Generar y escribir las variantes en el pool de almacenamiento para no bloquear el bucle de eventos
+        # (mismos tamaños y mismo almacén por contenido que las fotos de recetas)
+        try:
+            fotos = await ejecutar_en_hilo(guardar_imagen_con_variantes, contenido, archivo.content_type)
+        except ValueError as e:
+            return crear_respuesta_error(str(e), "IMAGEN_NO_VALIDA", HTTP_BAD_REQUEST)
+        url_publica = fotos["completa"]
 
         # Actualizar cuenta
-        if actualizar_cuenta(email, {"fotoPerfil": url_publica}):
-            return crear_respuesta_exito("Foto de perfil subida correctamente", {"fotoPerfil": url_publica})
+        if await ejecutar_en_hilo(actualizar_cuenta, email, {"fotoPerfil": url_publica, "fotosPerfil": fotos}):
+            return crear_respuesta_exito("Foto de perfil subida correctamente", {"fotoPerfil": url_publica, "fotosPerfil": fotos})
         else:
             return crear_respuesta_error("No se pudo actualizar la cuenta con la foto", "ERROR_ACTUALIZAR_CUENTA", HTTP_INTERNAL_SERVER_ERROR)
 
@@ -703,11 +764,38 @@ async def subir_foto_perfil(request: Request, archivo: UploadFile = File(...)) -
         return crear_respuesta_error(MENSAJE_ERROR_INTERNO, "INTERNAL_ERROR", HTTP_INTERNAL_SERVER_ERROR)
 
 
+@app.post("/api/subir-imagen")
+async def subir_imagen(request: Request) -> JSONResponse:
+    """
+    Sube la foto de una receta por partes (multipart/form-data, campo CAMPO_SUBIDA_IMAGEN).
+    La imagen se escribe a un archivo temporal según llega (ver subidas.py) y se devuelve
+    un token (tokenSubida) que /crear-receta usa en lugar de la imagen en Base64.
+    """
+    try:
+        if not es_usuario_registrado(request):
+            return crear_respuesta_error("Debes estar registrado para subir imágenes", "USUARIO_NO_AUTENTICADO", HTTP_BAD_REQUEST)
+
+        email = obtener_email_usuario(request)
+        if not email:
+            return crear_respuesta_error("No se pudo identificar al usuario", "EMAIL_NO_ENCONTRADO", HTTP_BAD_REQUEST)
+
+        try:
+            token = await recibir_imagen(request, email)
+        except SubidaRechazada as e:
+            return crear_respuesta_error(str(e), e.codigo, e.estado)
+
+        return crear_respuesta_exito("Imagen subida correctamente", {"tokenSubida": token})
+
+    except Exception as e:
+        print(f"{LOG_ERROR} Error inesperado en subir_imagen: {e}")
+        return crear_respuesta_error(MENSAJE_ERROR_INTERNO, "INTERNAL_ERROR", HTTP_INTERNAL_SERVER_ERROR)
+
+
 @app.post('/api/eliminar-foto-perfil')
 async def eliminar_foto_perfil(request: Request) -> JSONResponse:
     """
     Elimina (restaura) la foto de perfil del usuario autenticado a la imagen por defecto.
-    Si la foto actual está almacenada en `static/uploads/...` intentará eliminar el archivo físico.
+    Si la foto actual está almacenada en `static/uploads/...` y no la usa nadie más, elimina sus archivos.
     """
     try:
         if not es_usuario_registrado(request):
@@ -717,30 +805,20 @@ async def eliminar_foto_perfil(request: Request) -> JSONResponse:
         if not email:
             return crear_respuesta_error("No se pudo identificar al usuario", "EMAIL_NO_ENCONTRADO", HTTP_BAD_REQUEST)
 
-        cuenta = obtener_cuenta_por_email(email)
+        cuenta = await ejecutar_en_hilo(obtener_cuenta_por_email, email)
         foto_actual = cuenta.get('fotoPerfil') if cuenta else None
 
         # If there is no custom photo (None or default), refuse the operation
         if not foto_actual or (isinstance(foto_actual, str) and ('cocinero.png' in foto_actual or foto_actual.endswith('/cocinero.png'))):
             return crear_respuesta_error("No hay foto de perfil para eliminar", "NO_FOTO_PERFIL", HTTP_BAD_REQUEST)
 
-        # Intentar borrar archivo si está en uploads
-        try:
-            if foto_actual and isinstance(foto_actual, str) and '/static/uploads/' in foto_actual:
-                # mapear a ruta local segura
-                ruta_rel = foto_actual.lstrip('/')
-                ruta_abs = os.path.join(BASE_DIR, ruta_rel)
-                if os.path.exists(ruta_abs):
-                    try:
-                        os.remove(ruta_abs)
-                        print(f"{LOG_INFO} Archivo de foto eliminado: {ruta_abs}")
-                    except Exception as e:
-                        print(f"{LOG_WARNING} No se pudo eliminar archivo de foto {ruta_abs}: {e}")
-        except Exception as e:
-            print(f"{LOG_WARNING} Error tratando de eliminar archivo anterior de fotoPerfil: {e}")
-
         # Actualizar la cuenta para eliminar la referencia a la foto
-        if actualizar_cuenta(email, {"fotoPerfil": None}):
+        if await ejecutar_en_hilo(actualizar_cuenta, email, {"fotoPerfil": None, "fotosPerfil": None}):
+            # Borrar los archivos (la foto y sus variantes) si ya no los usa ninguna otra receta ni cuenta
+            try:
+                await ejecutar_en_hilo(liberar_imagenes, urls_imagenes(cuenta))
+            except Exception as e:
+                print(f"{LOG_WARNING} Error tratando de eliminar archivo anterior de fotoPerfil: {e}")
             # Devolver la URL de la imagen por defecto para que el frontend la use
             return crear_respuesta_exito("Foto de perfil restaurada a la predeterminada", {"fotoPerfil": "/static/cocinero.png"})
         else:
@@ -772,7 +850,7 @@ async def api_actualizar_usuario(request: Request) -> JSONResponse:
             return crear_respuesta_error("No se pudo identificar al usuario", "EMAIL_NO_ENCONTRADO", HTTP_BAD_REQUEST)
 
         # Actualizar en el archivo de cuentas
-        if actualizar_cuenta(email, {"nombreUsuario": nuevo_nombre}):
+        if await ejecutar_en_hilo(actualizar_cuenta, email, {"nombreUsuario": nuevo_nombre}):
             return crear_respuesta_exito("Nombre de usuario actualizado", {"nombreUsuario": nuevo_nombre})
         else:
             return crear_respuesta_error("No se pudo actualizar la cuenta", "ERROR_ACTUALIZAR_CUENTA", HTTP_INTERNAL_SERVER_ERROR)
@@ -809,7 +887,7 @@ async def api_cambiar_password(request: Request) -> JSONResponse:
             return crear_respuesta_error("No se pudo identificar al usuario", "EMAIL_NO_ENCONTRADO", HTTP_BAD_REQUEST)
 
         # Verificar que la contraseña actual coincide
-        if not validar_cuenta(email, current):
+        if not await ejecutar_en_hilo(validar_cuenta, email, current):
             return crear_respuesta_error("La contraseña actual es incorrecta", "PASSWORD_ACTUAL_INVALIDA", HTTP_BAD_REQUEST)
 
         # La nueva contraseña no puede ser igual a la actual
@@ -822,8 +900,8 @@ async def api_cambiar_password(request: Request) -> JSONResponse:
             return crear_respuesta_error(mensaje_validacion, "PASSWORD_INVALIDO", HTTP_BAD_REQUEST)
 
         # Actualizar cuenta (guardar contraseña hasheada si es posible)
-        pwd_to_store = hash_password(new) if 'hash_password' in globals() else new
-        if actualizar_cuenta(email, {"password": pwd_to_store}):
+        pwd_to_store = await ejecutar_en_hilo(hash_password, new) if 'hash_password' in globals() else new
+        if await ejecutar_en_hilo(actualizar_cuenta, email, {"password": pwd_to_store}):
             return crear_respuesta_exito("Contraseña actualizada correctamente")
         else:
             return crear_respuesta_error("No se pudo actualizar la contraseña", "ERROR_ACTUALIZAR_CUENTA", HTTP_INTERNAL_SERVER_ERROR)
@@ -875,91 +953,71 @@ async def crear_receta(receta: Receta, request: Request) -> JSONResponse:
         # Eliminar campos de control antes de procesar
         receta_data.pop("modoEdicion", None)
         receta_data.pop("nombreRecetaOriginal", None)
+        token_subida = receta_data.pop("tokenSubida", None)
+        
+        # Imagen subida antes por partes: generar sus variantes desde el archivo temporal
+        if token_subida:
+            subida = subidas_pendientes.tomar(token_subida, email_usuario)
+            if subida is None:
+                return crear_respuesta_error(
+                    "La imagen subida no existe o ha caducado. Vuelve a seleccionarla",
+                    "SUBIDA_NO_ENCONTRADA",
+                    HTTP_BAD_REQUEST
+                )
+            try:
+                fotos = await ejecutar_en_hilo(guardar_imagen_con_variantes, subida.ruta, subida.tipo_mime)
+            except ValueError as e:
+                return crear_respuesta_error(str(e), "IMAGEN_NO_VALIDA", HTTP_BAD_REQUEST)
+            receta_data["fotoReceta"] = fotos["completa"]
+            receta_data["fotosReceta"] = fotos
         
         # Procesar imagen Base64 si existe
-        receta_data = procesar_imagen_receta(receta_data, email_usuario)
+        receta_data = await ejecutar_en_hilo(procesar_imagen_receta, receta_data, email_usuario)
         
         if es_edicion and nombre_original:
             # MODO EDICIÓN: Actualizar receta existente
             print(f"✏️ [EDITAR RECETA] Usuario {email_usuario} editando receta '{nombre_original}' → '{receta.nombreReceta}'")
             
-            # Cargar todas las recetas
-            todas_recetas = cargar_recetas()
-            
-            # Buscar la receta original del usuario
-            receta_encontrada = False
-            turno_original = None
-            nombre_cambio = (nombre_original != receta.nombreReceta)
-            
-            for i, receta_existente in enumerate(todas_recetas):
-                if (receta_existente.get("nombreReceta") == nombre_original and 
-                    receta_existente.get("usuario", "").lower() == email_usuario.lower()):
-                    
-                    # Guardar el turno original para comparar
-                    turno_original = receta_existente.get("turnoComida")
-                    
-                    # Si se cambió el nombre de la receta
-                    if nombre_cambio:
-                        print(f"⚠️ [CAMBIO DE NOMBRE] '{nombre_original}' → '{receta.nombreReceta}'")
-                        
-                        # 1. Despublicar la receta automáticamente
-                        receta_data["publicada"] = False
-                        print(f"📋 Receta despublicada automáticamente por cambio de nombre")
-                        
-                        # 2. Eliminar de las listas de guardados
-                        usuarios_afectados = receta_existente.get("usuariosGuardado", [])
-                        if usuarios_afectados:
-                            print(f"🗑️ Receta eliminada de {len(usuarios_afectados)} usuarios que la tenían guardada")
-                        
-                        # 3. Vaciar la lista de usuariosGuardado (se eliminará de todos los guardados)
-                        receta_data["usuariosGuardado"] = []
-                    else:
-                        # Si no cambió el nombre, mantener los usuarios que guardaron la receta
-                        receta_data["usuariosGuardado"] = receta_existente.get("usuariosGuardado", [])
-                    
-                    # Actualizar la receta manteniendo el usuario
-                    receta_data["usuario"] = email_usuario
-                    todas_recetas[i] = receta_data
-                    receta_encontrada = True
-                    break
+            # Buscar y sustituir la receta original del usuario en una única operación
+            try:
+                edicion = await ejecutar_en_hilo(editar_receta_usuario, nombre_original, email_usuario, receta_data)
+            except IOError:
+                return crear_respuesta_error(
+                    "Error al actualizar la receta",
+                    "ERROR_GUARDADO",
+                    HTTP_INTERNAL_SERVER_ERROR
+                )
             
-            if not receta_encontrada:
+            if edicion is None:
                 return crear_respuesta_error(
                     "No se encontró la receta a editar",
                     "RECETA_NO_ENCONTRADA",
                     HTTP_BAD_REQUEST
                 )
             
-            # Guardar todas las recetas con la modificación
-            if guardar_recetas(todas_recetas):
-                # Actualizar el menú semanal del usuario si es necesario
-                actualizar_menu_tras_edicion_receta(
-                    email_usuario, 
-                    nombre_original, 
-                    receta.nombreReceta,
-                    turno_original,
-                    receta_data.get("turnoComida")
-                )
-                
-                return crear_respuesta_exito(
-                    "Receta actualizada correctamente",
-                    {
-                        "receta_actualizada": receta.nombreReceta,
-                        "usuario": email_usuario
-                    }
-                )
-            else:
-                return crear_respuesta_error(
-                    "Error al actualizar la receta",
-                    "ERROR_GUARDADO",
-                    HTTP_INTERNAL_SERVER_ERROR
-                )
+            # Actualizar el menú semanal del usuario si es necesario
+            await ejecutar_en_hilo(
+                actualizar_menu_tras_edicion_receta,
+                email_usuario, 
+                nombre_original, 
+                receta.nombreReceta,
+                edicion["turno_original"],
+                receta_data.get("turnoComida")
+            )
+            
+            return crear_respuesta_exito(
+                "Receta actualizada correctamente",
+                {
+                    "receta_actualizada": receta.nombreReceta,
+                    "usuario": email_usuario
+                }
+            )
         else:
             # MODO CREACIÓN: Nueva receta
             print(f"🍳 [CREAR RECETA] Usuario {email_usuario} creando receta '{receta.nombreReceta}'")
             
             # Guardar la receta con el email del usuario
-            if guardar_nueva_receta(receta_data, email_usuario):
+            if await ejecutar_en_hilo(guardar_nueva_receta, receta_data, email_usuario):
                 return crear_respuesta_exito(
                     MENSAJE_RECETA_CREADA,
                     {
@@ -983,12 +1041,13 @@ async def crear_receta(receta: Receta, request: Request) -> JSONResponse:
         )
 
 @app.get("/api/mis-recetas")
-async def obtener_mis_recetas(request: Request) -> JSONResponse:
+async def obtener_mis_recetas(request: Request, fields: Optional[str] = None) -> JSONResponse:
     """
     Endpoint API para obtener todas las recetas del usuario autenticado.
     
     Args:
         request: Objeto Request de FastAPI para obtener cookies
+        fields: Campos de cada receta separados por comas (por defecto, el resumen de las tarjetas)
         
     Returns:
         JSONResponse: Lista de recetas del usuario
@@ -1011,8 +1070,19 @@ async def obtener_mis_recetas(request: Request) -> JSONResponse:
                 HTTP_BAD_REQUEST
             )
         
+        try:
+            campos = campos_listado(fields)
+        except ValueError as e:
+            return crear_respuesta_error(str(e), "CAMPOS_INVALIDOS", HTTP_BAD_REQUEST)
+        
+        etag = calcular_etag("mis-recetas", email_usuario, campos, await ejecutar_en_hilo(repositorio_recetas.version),
+                             await ejecutar_en_hilo(almacen_comentarios.version))
+        no_modificada = respuesta_no_modificada(request, etag)
+        if no_modificada:
+            return no_modificada
+        
         # Obtener recetas del usuario con IDs únicos
-        recetas_usuario = obtener_recetas_usuario_con_ids(email_usuario)
+        recetas_usuario = obtener_recetas_usuario_con_ids(email_usuario, campos)
         
         return crear_respuesta_exito(
             f"Recetas obtenidas correctamente",
@@ -1020,7 +1090,8 @@ async def obtener_mis_recetas(request: Request) -> JSONResponse:
                 "recetas": recetas_usuario,
                 "total": len(recetas_usuario),
                 "usuario": email_usuario
-            }
+            },
+            etag=etag
         )
         
     except Exception as e:
@@ -1033,16 +1104,22 @@ async def obtener_mis_recetas(request: Request) -> JSONResponse:
 
 
 @app.get("/api/recetas-comunidad")
-async def obtener_recetas_comunidad(request: Request) -> JSONResponse:
+async def obtener_recetas_comunidad(request: Request, limit: int = LIMITE_RECETAS_COMUNIDAD_POR_DEFECTO,
+                                    cursor: Optional[str] = None, fields: Optional[str] = None) -> JSONResponse:
     """
-    Endpoint API para obtener todas las recetas publicadas de otros usuarios (comunidad).
+    Endpoint API para obtener las recetas publicadas de otros usuarios (comunidad), por páginas.
     Solo incluye recetas marcadas como publicadas y excluye las del usuario autenticado.
+    Las recetas se ordenan por nombre; para la página siguiente se envía el "nextCursor"
+    de la respuesta anterior, que es null cuando no quedan más recetas.
     
     Args:
         request: Objeto Request de FastAPI para obtener cookies
+        limit: Número máximo de recetas (hasta MAX_LIMITE_RECETAS_COMUNIDAD)
+        cursor: Cursor opaco devuelto en "nextCursor" por la página anterior
+        fields: Campos de cada receta separados por comas (por defecto, el resumen de las tarjetas)
         
     Returns:
-        JSONResponse: Lista de recetas publicadas de la comunidad (excluyendo las del usuario)
+        JSONResponse: Página de recetas publicadas de la comunidad (excluyendo las del usuario)
     """
     try:
         # Verificar autenticación
@@ -1062,35 +1139,49 @@ async def obtener_recetas_comunidad(request: Request) -> JSONResponse:
                 HTTP_BAD_REQUEST
             )
         
-        # Cargar todas las recetas del sistema
-        todas_recetas = cargar_recetas()
-        
-        # Filtrar las recetas: solo incluir las publicadas de otros usuarios
-        recetas_comunidad = []
-        for idx, receta in enumerate(todas_recetas):
-            # Solo incluir recetas publicadas de otros usuarios
-            if (receta.get("usuario", "") != email_usuario and 
-                receta.get("publicada", False) == True):
-                receta_con_id = receta.copy()
-                receta_con_id["id"] = f"receta-{idx}"
-                
-                # Calcular valoración media si hay valoraciones
-                valoraciones = receta.get("valoraciones", [])
-                if valoraciones and len(valoraciones) > 0:
-                    valoracion_media = sum(v.get("puntuacion", 0) for v in valoraciones) / len(valoraciones)
-                    receta_con_id["valoracionMedia"] = round(valoracion_media, 1)
-                else:
-                    receta_con_id["valoracionMedia"] = 0
-                
-                recetas_comunidad.append(receta_con_id)
+        if limit < 1:
+            return crear_respuesta_error(
+                "El parámetro limit debe ser mayor que 0",
+                "PAGINACION_INVALIDA",
+                HTTP_BAD_REQUEST
+            )
+        limit = min(limit, MAX_LIMITE_RECETAS_COMUNIDAD)
+        
+        try:
+            campos = campos_listado(fields)
+        except ValueError as e:
+            return crear_respuesta_error(str(e), "CAMPOS_INVALIDOS", HTTP_BAD_REQUEST)
+        
+        etag = calcular_etag("recetas-comunidad", email_usuario, limit, cursor, campos,
+                             await ejecutar_en_hilo(repositorio_recetas.version),
+                             await ejecutar_en_hilo(almacen_comentarios.version))
+        no_modificada = respuesta_no_modificada(request, etag)
+        if no_modificada:
+            return no_modificada
+        
+        # Página de recetas publicadas de otros usuarios a partir del cursor
+        try:
+            pagina, siguiente_cursor, total = pagina_recetas_comunidad(email_usuario, limit, cursor)
+        except ValueError:
+            return crear_respuesta_error(
+                "El cursor de paginación no es válido",
+                "CURSOR_INVALIDO",
+                HTTP_BAD_REQUEST
+            )
+        
+        # Copias con su ID y los campos pedidos (totales de comentarios y valoraciones en lugar de las listas)
+        recetas_comunidad = await ejecutar_en_hilo(copiar_para_listado, pagina, campos)
         
         return crear_respuesta_exito(
             f"Recetas de la comunidad obtenidas correctamente",
             {
                 "recetas": recetas_comunidad,
-                "total": len(recetas_comunidad),
+                "total": total,
+                "limit": limit,
+                "nextCursor": siguiente_cursor,
                 "usuario": email_usuario
-            }
+            },
+            etag=etag
         )
         
     except Exception as e:
@@ -1102,14 +1193,141 @@ async def obtener_recetas_comunidad(request: Request) -> JSONResponse:
         )
 
 
+@app.get("/api/recetas/buscar")
+async def buscar_recetas_filtradas(
+    request: Request,
+    ambito: str = "comunidad",
+    q: Optional[str] = None,
+    ingredientes: List[str] = Query(default=[]),
+    alergenos: List[str] = Query(default=[]),
+    paisOrigen: Optional[str] = None,
+    dificultad: Optional[str] = None,
+    turnoComida: Optional[str] = None,
+    duracion: Optional[int] = None,
+    publicada: Optional[str] = None,
+    usuario: Optional[str] = None,
+    valoracion: Optional[float] = None,
+    limit: int = LIMITE_RECETAS_COMUNIDAD_POR_DEFECTO,
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None
+) -> JSONResponse:
+    """
+    Endpoint API para filtrar recetas en el servidor con los filtros de FILTROS_RECETAS.md.
+    Devuelve solo las coincidencias, por páginas y en el mismo orden que /api/recetas-comunidad,
+    salvo si se busca un texto: entonces se ordenan de más a menos relevante.
+    
+    Args:
+        request: Objeto Request de FastAPI para obtener cookies
+        ambito: "comunidad" (publicadas de otros usuarios) o "mias" (recetas del usuario)
+        q: Texto a buscar en el nombre, la descripción y los ingredientes (sin distinguir tildes)
+        ingredientes: Textos que deben aparecer todos en los ingredientes (parámetro repetible)
+        alergenos: Se excluyen las recetas con alguno de estos alérgenos (parámetro repetible)
+        paisOrigen: País de origen exacto
+        dificultad: Dificultad exacta
+        turnoComida: Turno de comida exacto
+        duracion: Duración máxima en minutos
+        publicada: "si" o "no" (recetas propias)
+        usuario: Parte del email del autor
+        valoracion: Valoración media mínima (1 a 5)
+        limit: Número máximo de recetas (hasta MAX_LIMITE_RECETAS_COMUNIDAD)
+        cursor: Cursor opaco devuelto en "nextCursor" por la página anterior
+        fields: Campos de cada receta separados por comas (por defecto, el resumen de las tarjetas)
+        
+    Returns:
+        JSONResponse: Página de recetas que cumplen los filtros
+    """
+    try:
+        # Verificar autenticación
+        if not es_usuario_registrado(request):
+            return crear_respuesta_error(
+                "Debes estar registrado para buscar recetas",
+                "USUARIO_NO_AUTENTICADO",
+                HTTP_BAD_REQUEST
+            )
+        
+        # Obtener email del usuario desde la cookie
+        email_usuario = obtener_email_usuario(request)
+        if not email_usuario:
+            return crear_respuesta_error(
+                "No se pudo identificar al usuario",
+                "EMAIL_NO_ENCONTRADO",
+                HTTP_BAD_REQUEST
+            )
+        
+        if limit < 1:
+            return crear_respuesta_error(
+                "El parámetro limit debe ser mayor que 0",
+                "PAGINACION_INVALIDA",
+                HTTP_BAD_REQUEST
+            )
+        limit = min(limit, MAX_LIMITE_RECETAS_COMUNIDAD)
+        
+        if (duracion is not None and duracion < 0) or (publicada not in (None, "", "si", "no")) \
+                or (valoracion is not None and not 0 <= valoracion <= 5):
+            return crear_respuesta_error(
+                "Los filtros de búsqueda no son válidos",
+                "FILTROS_INVALIDOS",
+                HTTP_BAD_REQUEST
+            )
+        
+        try:
+            campos = campos_listado(fields)
+        except ValueError as e:
+            return crear_respuesta_error(str(e), "CAMPOS_INVALIDOS", HTTP_BAD_REQUEST)
+        
+        filtros = {
+            "q": q,
+            "ingredientes": ingredientes,
+            "alergenos": alergenos,
+            "paisOrigen": paisOrigen,
+            "dificultad": dificultad,
+            "turnoComida": turnoComida,
+            "duracion": duracion,
+            "publicada": publicada,
+            "usuario": usuario,
+            "valoracion": valoracion
+        }
+        
+        try:
+            pagina, siguiente_cursor, total = await ejecutar_en_hilo(
+                buscar_recetas, email_usuario, filtros, ambito, limit, cursor
+            )
+        except ValueError:
+            return crear_respuesta_error(
+                "El ámbito o el cursor de paginación no son válidos",
+                "BUSQUEDA_INVALIDA",
+                HTTP_BAD_REQUEST
+            )
+        
+        recetas = await ejecutar_en_hilo(copiar_para_listado, pagina, campos)
+        
+        return crear_respuesta_exito(
+            "Búsqueda de recetas realizada correctamente",
+            {
+                "recetas": recetas,
+                "total": total,
+                "limit": limit,
+                "nextCursor": siguiente_cursor,
+                "usuario": email_usuario
+            }
+        )
+        
+    except Exception as e:
+        print(f"{LOG_ERROR} Error inesperado en buscar_recetas_filtradas: {e}")
+        return crear_respuesta_error(
+            MENSAJE_ERROR_INTERNO,
+            "INTERNAL_ERROR",
+            HTTP_INTERNAL_SERVER_ERROR
+        )
+
+
 @app.get("/api/receta/{receta_id}")
 async def obtener_detalle_receta(receta_id: str, request: Request) -> JSONResponse:
     """
     Obtiene los detalles completos de una receta específica.
     Permite ver tanto recetas propias como de otros usuarios.
-    Acepta dos formatos de ID:
-    - "receta-{idx}": índice directo en el array de recetas
-    - Base64 encoded: nombre de receta codificado en base64
+    Acepta el id estable y los formatos antiguos "receta-{idx}" y nombre en base64
+    (ver resolver_id_receta); la respuesta siempre lleva el id estable.
     
     Args:
         receta_id (str): ID único de la receta
@@ -1136,49 +1354,26 @@ async def obtener_detalle_receta(receta_id: str, request: Request) -> JSONRespon
                 HTTP_BAD_REQUEST
             )
         
-        # Cargar todas las recetas
-        todas_recetas = cargar_recetas()
-        
-        receta_encontrada = None
+        etag = calcular_etag("receta", email_usuario, receta_id, await ejecutar_en_hilo(repositorio_recetas.version))
+        no_modificada = respuesta_no_modificada(request, etag)
+        if no_modificada:
+            return no_modificada
         
-        # Intentar primero con el formato "receta-{idx}"
-        if receta_id.startswith("receta-"):
-            try:
-                idx = int(receta_id.replace("receta-", ""))
-                if 0 <= idx < len(todas_recetas):
-                    receta_encontrada = todas_recetas[idx].copy()
-                    receta_encontrada["id"] = receta_id
-            except ValueError:
-                pass
-        
-        # Si no se encontró, intentar decodificar base64
-        if receta_encontrada is None:
-            try:
-                import urllib.parse
-                import base64
-                # Decodificar el ID para obtener el nombre de la receta
-                nombre_receta = base64.b64decode(urllib.parse.unquote(receta_id)).decode('utf-8')
-                
-                # Buscar la receta por nombre
-                for idx, receta in enumerate(todas_recetas):
-                    if receta.get("nombreReceta", "") == nombre_receta:
-                        receta_encontrada = receta.copy()
-                        receta_encontrada["id"] = receta_id
-                        break
-            except Exception:
-                pass
+        # Resolver el ID (estable o formato antiguo) con el índice por id
+        receta_original = resolver_id_receta(receta_id)
         
-        # Si no se encontró la receta con ninguno de los dos métodos
-        if receta_encontrada is None:
+        if receta_original is None:
             return crear_respuesta_error(
                 "Receta no encontrada",
                 "RECETA_NO_ENCONTRADA",
                 HTTP_NOT_FOUND
             )
         
-        # Verificar si el usuario tiene esta receta guardada
-        nombre_receta = receta_encontrada.get("nombreReceta", "")
-        receta_guardada = es_receta_guardada_por_usuario(nombre_receta, email_usuario)
+        receta_encontrada = receta_original.copy()
+        receta_encontrada["id"] = id_publico_receta(receta_original)
+        
+        # Verificar si el usuario tiene esta receta guardada (conjunto de usuarios de la receta)
+        receta_guardada = repositorio_recetas.esta_guardada_por(receta_original, email_usuario)
         
         return crear_respuesta_exito(
             f"Detalles de receta obtenidos correctamente",
@@ -1186,7 +1381,8 @@ async def obtener_detalle_receta(receta_id: str, request: Request) -> JSONRespon
                 "receta": receta_encontrada,
                 "usuario": email_usuario,
                 "guardada": receta_guardada
-            }
+            },
+            etag=etag
         )
         
     except Exception as e:
@@ -1244,7 +1440,7 @@ async def guardar_receta(request: Request) -> JSONResponse:
         print(f"🔖 [GUARDAR RECETA] Usuario {email_usuario} guardando receta '{nombre_receta}'")
         
         # Guardar la receta para el usuario
-        if guardar_receta_usuario(nombre_receta, email_usuario):
+        if await ejecutar_en_hilo(guardar_receta_usuario, nombre_receta, email_usuario):
             return crear_respuesta_exito(
                 f"Receta '{nombre_receta}' guardada correctamente",
                 {"nombreReceta": nombre_receta, "guardada": True}
@@ -1309,9 +1505,9 @@ async def desguardar_receta(request: Request) -> JSONResponse:
         print(f"🗑️ [DESGUARDAR RECETA] Usuario {email_usuario} desguardando receta '{nombre_receta}'")
         
         # Desguardar la receta para el usuario
-        if desguardar_receta_usuario(nombre_receta, email_usuario):
+        if await ejecutar_en_hilo(desguardar_receta_usuario, nombre_receta, email_usuario):
             # Eliminar la receta del menú semanal si está presente
-            eliminar_receta_del_menu_semanal(email_usuario, nombre_receta)
+            await ejecutar_en_hilo(eliminar_receta_del_menu_semanal, email_usuario, nombre_receta)
             
             return crear_respuesta_exito(
                 f"Receta '{nombre_receta}' desguardada correctamente",
@@ -1369,48 +1565,32 @@ async def eliminar_receta(request: Request) -> JSONResponse:
 
         print(f"🗑️ [ELIMINAR RECETA] Usuario {email_usuario} solicitando eliminar '{nombre_receta}'")
 
-        # Cargar todas las recetas
-        recetas = cargar_recetas()
-
-        # Buscar receta por nombre exacto y autor
-        receta_encontrada = False
-        for idx, receta in enumerate(recetas):
-            if receta.get("nombreReceta") == nombre_receta and receta.get("usuario") == email_usuario:
-                receta_encontrada = True
-                
-                # Obtener todos los usuarios que tenían esta receta guardada
-                usuarios_afectados = receta.get("usuariosGuardado", [])
-                # Añadir al autor también
-                if email_usuario not in usuarios_afectados:
-                    usuarios_afectados.append(email_usuario)
-                
-                # Eliminar la receta
-                recetas.pop(idx)
-                
-                # Guardar cambios
-                if guardar_recetas(recetas):
-                    # Eliminar la receta de los menús semanales de todos los usuarios afectados
-                    for usuario in usuarios_afectados:
-                        eliminar_receta_del_menu_semanal(usuario, nombre_receta)
-                    
-                    print(f"✅ Receta '{nombre_receta}' eliminada por {email_usuario} y removida de menús")
-                    return crear_respuesta_exito(
-                        f"Receta '{nombre_receta}' eliminada correctamente",
-                        {"nombreReceta": nombre_receta}
-                    )
-                else:
-                    return crear_respuesta_error(
-                        "Error al guardar cambios tras eliminar la receta",
-                        "ERROR_GUARDAR",
-                        HTTP_INTERNAL_SERVER_ERROR
-                    )
-
-        if not receta_encontrada:
+        # Buscar y eliminar la receta (nombre exacto y autor) en una única operación
+        try:
+            usuarios_afectados = await ejecutar_en_hilo(eliminar_receta_usuario, nombre_receta, email_usuario)
+        except IOError:
+            return crear_respuesta_error(
+                "Error al guardar cambios tras eliminar la receta",
+                "ERROR_GUARDAR",
+                HTTP_INTERNAL_SERVER_ERROR
+            )
+        
+        if usuarios_afectados is None:
             return crear_respuesta_error(
                 "Receta no encontrada o no tienes permisos para eliminarla",
                 "RECETA_NO_ENCONTRADA_O_SIN_PERMISOS",
                 HTTP_NOT_FOUND
             )
+        
+        # Eliminar la receta de los menús semanales de todos los usuarios afectados
+        for usuario in usuarios_afectados:
+            await ejecutar_en_hilo(eliminar_receta_del_menu_semanal, usuario, nombre_receta)
+        
+        print(f"✅ Receta '{nombre_receta}' eliminada por {email_usuario} y removida de menús")
+        return crear_respuesta_exito(
+            f"Receta '{nombre_receta}' eliminada correctamente",
+            {"nombreReceta": nombre_receta}
+        )
 
     except Exception as e:
         print(f"{LOG_ERROR} Error inesperado en eliminar_receta: {e}")
@@ -1465,7 +1645,7 @@ async def publicar_receta(request: Request) -> JSONResponse:
         print(f"📢 [PUBLICAR RECETA] Usuario {email_usuario} publicando receta ID '{receta_id}'")
         
         # Publicar la receta
-        if publicar_receta_usuario(receta_id, email_usuario):
+        if await ejecutar_en_hilo(publicar_receta_usuario, receta_id, email_usuario):
             return crear_respuesta_exito(
                 "Receta publicada en la comunidad correctamente",
                 {"recetaId": receta_id, "publicada": True}
@@ -1487,13 +1667,14 @@ async def publicar_receta(request: Request) -> JSONResponse:
 
 
 @app.get("/obtener-recetas-guardadas")
-async def obtener_recetas_guardadas(request: Request) -> JSONResponse:
+async def obtener_recetas_guardadas(request: Request, fields: Optional[str] = None) -> JSONResponse:
     """
     Endpoint para obtener todas las recetas guardadas por el usuario autenticado.
     Solo accesible para usuarios autenticados.
     
     Args:
         request: Objeto Request de FastAPI para obtener cookies
+        fields: Campos de cada receta separados por comas (por defecto, el resumen de las tarjetas)
 
     Returns:
         JSONResponse: Respuesta con las recetas guardadas del usuario
@@ -1516,6 +1697,11 @@ async def obtener_recetas_guardadas(request: Request) -> JSONResponse:
                 HTTP_BAD_REQUEST
             )
         
+        try:
+            campos = campos_listado(fields)
+        except ValueError as e:
+            return crear_respuesta_error(str(e), "CAMPOS_INVALIDOS", HTTP_BAD_REQUEST)
+        
         # Obtener recetas guardadas del usuario
         recetas_guardadas = obtener_recetas_guardadas_usuario(email_usuario)
         
@@ -1525,16 +1711,8 @@ async def obtener_recetas_guardadas(request: Request) -> JSONResponse:
             if receta.get("usuario", "") != email_usuario
         ]
         
-        # Cargar todas las recetas para obtener el índice real
-        todas_recetas = cargar_recetas()
-        
-        # Agregar IDs a las recetas usando el índice del array completo
-        for receta in recetas_guardadas_otros:
-            # Buscar el índice real de esta receta en el array completo
-            for idx, receta_completa in enumerate(todas_recetas):
-                if receta_completa.get("nombreReceta") == receta.get("nombreReceta"):
-                    receta["id"] = f"receta-{idx}"
-                    break
+        # Copias con su ID estable y los campos pedidos (sin buscar su posición en la lista completa)
+        recetas_guardadas_otros = await ejecutar_en_hilo(copiar_para_listado, recetas_guardadas_otros, campos)
         
         return crear_respuesta_exito(
             f"Recetas guardadas obtenidas correctamente",
@@ -1603,54 +1781,31 @@ async def comentar_receta(comentario_data: ComentarioRequest, request: Request)
         
         print(f"💬 [COMENTAR RECETA] Usuario {email_usuario} comentando en '{comentario_data.nombreReceta}'")
         
-        # Cargar recetas
-        recetas = cargar_recetas()
-        
-        # Buscar la receta
-        receta_encontrada = False
-        for receta in recetas:
-            if receta.get("nombreReceta") == comentario_data.nombreReceta:
-                receta_encontrada = True
-                
-                # Crear el comentario
-                from datetime import datetime
-                nuevo_comentario = {
-                    "usuario": email_usuario,
-                    "texto": comentario_data.texto.strip(),
-                    "fecha": datetime.now().isoformat()
-                }
-                
-                # Inicializar la lista de comentarios si no existe
-                if "comentarios" not in receta:
-                    receta["comentarios"] = []
-                
-                # Añadir el comentario
-                receta["comentarios"].append(nuevo_comentario)
-                
-                # Guardar cambios
-                if guardar_recetas(recetas):
-                    print(f"✅ Comentario añadido por {email_usuario} en '{comentario_data.nombreReceta}'")
-                    return crear_respuesta_exito(
-                        "Comentario publicado correctamente",
-                        {
-                            "comentario": nuevo_comentario,
-                            "totalComentarios": len(receta["comentarios"])
-                        }
-                    )
-                else:
-                    return crear_respuesta_error(
-                        "Error al guardar el comentario",
-                        "ERROR_GUARDAR",
-                        HTTP_INTERNAL_SERVER_ERROR
-                    )
+        # Añadir el comentario sobre el estado más reciente de la receta
+        try:
+            resultado = await ejecutar_en_hilo(
+                anadir_comentario_receta,
+                comentario_data.nombreReceta,
+                email_usuario,
+                comentario_data.texto.strip()
+            )
+        except IOError:
+            return crear_respuesta_error(
+                "Error al guardar el comentario",
+                "ERROR_GUARDAR",
+                HTTP_INTERNAL_SERVER_ERROR
+            )
         
-        if not receta_encontrada:
+        if resultado is None:
             return crear_respuesta_error(
                 "Receta no encontrada",
                 "RECETA_NO_ENCONTRADA",
                 HTTP_NOT_FOUND
             )
         
+        print(f"✅ Comentario añadido por {email_usuario} en '{comentario_data.nombreReceta}'")
+        return crear_respuesta_exito("Comentario publicado correctamente", resultado)
+        
     except Exception as e:
         print(f"{LOG_ERROR} Error inesperado en comentar_receta: {e}")
         return crear_respuesta_error(
@@ -1661,13 +1816,16 @@ async def comentar_receta(comentario_data: ComentarioRequest, request: Request)
 
 
 @app.get("/api/comentarios-receta/{receta_id}")
-async def obtener_comentarios_receta(receta_id: str, request: Request) -> JSONResponse:
+async def obtener_comentarios_receta(receta_id: str, request: Request,
+                                     limit: int = LIMITE_COMENTARIOS_POR_DEFECTO, offset: int = 0) -> JSONResponse:
     """
-    Endpoint para obtener todos los comentarios de una receta.
+    Endpoint para obtener los comentarios de una receta, de más reciente a más antiguo y paginados.
     
     Args:
-        receta_id: ID de la receta (formato: receta-{index})
+        receta_id: ID de la receta (id estable o formato antiguo, ver resolver_id_receta)
         request: Objeto Request de FastAPI
+        limit: Número máximo de comentarios (hasta MAX_LIMITE_COMENTARIOS)
+        offset: Número de comentarios recientes a saltar
 
     Returns:
         JSONResponse: Respuesta con los comentarios de la receta
@@ -1683,35 +1841,33 @@ async def obtener_comentarios_receta(receta_id: str, request: Request) -> JSONRe
         
         print(f"📖 [OBTENER COMENTARIOS] Obteniendo comentarios para receta ID '{receta_id}'")
         
-        # Extraer el índice del ID
-        try:
-            index = int(receta_id.replace("receta-", ""))
-        except ValueError:
-            return crear_respuesta_error(
-                "ID de receta inválido",
-                "ID_INVALIDO",
-                HTTP_BAD_REQUEST
-            )
-        
-        # Cargar recetas
-        recetas = cargar_recetas()
-        
-        # Verificar que el índice sea válido
-        if index < 0 or index >= len(recetas):
+        # Resolver el ID (estable o formato antiguo)
+        receta = resolver_id_receta(receta_id)
+        if receta is None:
             return crear_respuesta_error(
                 "Receta no encontrada",
                 "RECETA_NO_ENCONTRADA",
                 HTTP_NOT_FOUND
             )
         
-        receta = recetas[index]
-        comentarios = receta.get("comentarios", [])
+        if limit < 1 or offset < 0:
+            return crear_respuesta_error(
+                "Parámetros de paginación inválidos",
+                "PAGINACION_INVALIDA",
+                HTTP_BAD_REQUEST
+            )
+        limit = min(limit, MAX_LIMITE_COMENTARIOS)
+        
+        comentarios, total = await ejecutar_en_hilo(listar_comentarios_receta, receta, limit, offset)
         
         return crear_respuesta_exito(
             "Comentarios obtenidos correctamente",
             {
                 "comentarios": comentarios,
-                "total": len(comentarios),
+                "total": total,
+                "limit": limit,
+                "offset": offset,
+                "hayMas": offset + len(comentarios) < total,
                 "nombreReceta": receta.get("nombreReceta")
             }
         )
@@ -1767,69 +1923,32 @@ async def valorar_receta(valoracion_data: ValoracionRequest, request: Request) -
         
         print(f"⭐ [VALORAR RECETA] Usuario {email_usuario} valorando '{valoracion_data.nombreReceta}' con {valoracion_data.puntuacion} estrellas")
         
-        # Cargar recetas
-        recetas = cargar_recetas()
-        
-        # Buscar la receta
-        receta_encontrada = False
-        for receta in recetas:
-            if receta.get("nombreReceta") == valoracion_data.nombreReceta:
-                receta_encontrada = True
-                
-                # Inicializar la lista de valoraciones si no existe
-                if "valoraciones" not in receta:
-                    receta["valoraciones"] = []
-                
-                # Buscar si el usuario ya valoró esta receta
-                valoracion_existente = None
-                for idx, val in enumerate(receta["valoraciones"]):
-                    if val.get("usuario") == email_usuario:
-                        valoracion_existente = idx
-                        break
-                
-                # Crear/actualizar la valoración
-                nueva_valoracion = {
-                    "usuario": email_usuario,
-                    "puntuacion": valoracion_data.puntuacion
-                }
-                
-                if valoracion_existente is not None:
-                    # Actualizar valoración existente
-                    receta["valoraciones"][valoracion_existente] = nueva_valoracion
-                    accion = "actualizada"
-                else:
-                    # Añadir nueva valoración
-                    receta["valoraciones"].append(nueva_valoracion)
-                    accion = "añadida"
-                
-                # Calcular valoración media
-                valoracion_media = sum(v.get("puntuacion", 0) for v in receta["valoraciones"]) / len(receta["valoraciones"])
-                
-                # Guardar cambios
-                if guardar_recetas(recetas):
-                    print(f"✅ Valoración {accion} por {email_usuario} en '{valoracion_data.nombreReceta}'")
-                    return crear_respuesta_exito(
-                        f"Valoración {accion} correctamente",
-                        {
-                            "valoracion": nueva_valoracion,
-                            "totalValoraciones": len(receta["valoraciones"]),
-                            "valoracionMedia": round(valoracion_media, 1)
-                        }
-                    )
-                else:
-                    return crear_respuesta_error(
-                        "Error al guardar la valoración",
-                        "ERROR_GUARDAR",
-                        HTTP_INTERNAL_SERVER_ERROR
-                    )
+        # Añadir o actualizar la valoración sobre el estado más reciente de la receta
+        try:
+            resultado = await ejecutar_en_hilo(
+                registrar_valoracion_receta,
+                valoracion_data.nombreReceta,
+                email_usuario,
+                valoracion_data.puntuacion
+            )
+        except IOError:
+            return crear_respuesta_error(
+                "Error al guardar la valoración",
+                "ERROR_GUARDAR",
+                HTTP_INTERNAL_SERVER_ERROR
+            )
         
-        if not receta_encontrada:
+        if resultado is None:
             return crear_respuesta_error(
                 "Receta no encontrada",
                 "RECETA_NO_ENCONTRADA",
                 HTTP_NOT_FOUND
             )
         
+        accion = resultado.pop("accion")
+        print(f"✅ Valoración {accion} por {email_usuario} en '{valoracion_data.nombreReceta}'")
+        return crear_respuesta_exito(f"Valoración {accion} correctamente", resultado)
+        
     except Exception as e:
         print(f"{LOG_ERROR} Error inesperado en valorar_receta: {e}")
         return crear_respuesta_error(
@@ -1846,7 +1965,7 @@ async def obtener_valoracion_receta(receta_id: str, request: Request) -> JSONRes
     además de la valoración del usuario actual si existe.
     
     Args:
-        receta_id: ID de la receta (formato: receta-{index})
+        receta_id: ID de la receta (id estable o formato antiguo, ver resolver_id_receta)
         request: Objeto Request de FastAPI
 
     Returns:
@@ -1866,72 +1985,25 @@ async def obtener_valoracion_receta(receta_id: str, request: Request) -> JSONRes
         
         print(f"📊 [OBTENER VALORACIONES] Obteniendo valoraciones para receta ID '{receta_id}'")
         
-        # Cargar recetas
-        recetas = cargar_recetas()
-
-        receta = None
-
-        # Soportar dos formatos de ID:
-        # - "receta-{idx}" : índice directo en el array de recetas
-        # - cualquier otra cadena: se intenta interpretar como nombre codificado (base64 URL encoded)
-        if receta_id.startswith("receta-"):
-            try:
-                index = int(receta_id.replace("receta-", ""))
-                if 0 <= index < len(recetas):
-                    receta = recetas[index]
-                else:
-                    return crear_respuesta_error(
-                        "Receta no encontrada",
-                        "RECETA_NO_ENCONTRADA",
-                        HTTP_NOT_FOUND
-                    )
-            except ValueError:
-                return crear_respuesta_error(
-                    "ID de receta inválido",
-                    "ID_INVALIDO",
-                    HTTP_BAD_REQUEST
-                )
-        else:
-            # Intentar decodificar como base64 URL-encoded nombre de receta
-            try:
-                decoded = base64.b64decode(urllib.parse.unquote(receta_id)).decode('utf-8')
-                # Buscar receta por nombre (case insensitive)
-                for r in recetas:
-                    if r.get('nombreReceta', '').strip().lower() == decoded.strip().lower():
-                        receta = r
-                        break
-                if receta is None:
-                    return crear_respuesta_error(
-                        "Receta no encontrada por nombre codificado",
-                        "RECETA_NO_ENCONTRADA",
-                        HTTP_NOT_FOUND
-                    )
-            except Exception:
-                return crear_respuesta_error(
-                    "ID de receta inválido",
-                    "ID_INVALIDO",
-                    HTTP_BAD_REQUEST
-                )
+        # Resolver el ID (estable o formato antiguo)
+        receta = resolver_id_receta(receta_id)
+        if receta is None:
+            return crear_respuesta_error(
+                "Receta no encontrada",
+                "RECETA_NO_ENCONTRADA",
+                HTTP_NOT_FOUND
+            )
 
-        valoraciones = receta.get("valoraciones", [])
-        
-        # Calcular valoración media
-        valoracion_media = 0
-        if len(valoraciones) > 0:
-            valoracion_media = sum(v.get("puntuacion", 0) for v in valoraciones) / len(valoraciones)
-        
-        # Buscar valoración del usuario actual
-        valoracion_usuario = None
-        for val in valoraciones:
-            if val.get("usuario") == email_usuario:
-                valoracion_usuario = val.get("puntuacion")
-                break
+        # Media y total desde el resumen agregado; la del usuario, por su email
+        resumen = resumen_valoraciones(receta)
+        valoracion_usuario = valoraciones_por_usuario(receta).get(email_usuario)
         
         return crear_respuesta_exito(
             "Valoraciones obtenidas correctamente",
             {
-                "valoracionMedia": round(valoracion_media, 1),
-                "totalValoraciones": len(valoraciones),
+                "valoracionMedia": valoracion_media(receta),
+                "totalValoraciones": resumen["total"],
+                "histograma": resumen["histograma"],
                 "valoracionUsuario": valoracion_usuario,
                 "nombreReceta": receta.get("nombreReceta")
             }
@@ -1945,6 +2017,69 @@ async def obtener_valoracion_receta(receta_id: str, request: Request) -> JSONRes
             HTTP_INTERNAL_SERVER_ERROR
         )
 
+
+@app.get("/api/resumen-recetas")
+async def obtener_resumen_recetas(request: Request, ids: str = "") -> JSONResponse:
+    """
+    Endpoint para obtener en una sola petición la valoración media, el número de valoraciones,
+    la valoración del usuario actual y el número de comentarios de varias recetas (las tarjetas
+    de una página), en lugar de pedir /api/valoracion-receta y /api/comentarios-receta por cada una.
+    
+    Args:
+        request: Objeto Request de FastAPI
+        ids: IDs de las recetas separados por comas (hasta MAX_IDS_RESUMEN_RECETAS)
+
+    Returns:
+        JSONResponse: Respuesta con el resumen de cada receta encontrada, por su ID
+    """
+    try:
+        # Verificar autenticación
+        if not es_usuario_registrado(request):
+            return crear_respuesta_error(
+                "Debes estar registrado para ver valoraciones",
+                "USUARIO_NO_AUTENTICADO",
+                HTTP_BAD_REQUEST
+            )
+        
+        email_usuario = obtener_email_usuario(request)
+        
+        # IDs sin repetir, en el orden recibido
+        ids_recetas = list(dict.fromkeys(receta_id.strip() for receta_id in ids.split(",") if receta_id.strip()))
+        if not ids_recetas:
+            return crear_respuesta_error(
+                "Indica los IDs de las recetas en el parámetro ids",
+                "IDS_REQUERIDOS",
+                HTTP_BAD_REQUEST
+            )
+        if len(ids_recetas) > MAX_IDS_RESUMEN_RECETAS:
+            return crear_respuesta_error(
+                f"Como máximo {MAX_IDS_RESUMEN_RECETAS} recetas por petición",
+                "DEMASIADOS_IDS",
+                HTTP_BAD_REQUEST
+            )
+        
+        etag = calcular_etag("resumen-recetas", email_usuario, ids_recetas, await ejecutar_en_hilo(repositorio_recetas.version),
+                             await ejecutar_en_hilo(almacen_comentarios.version))
+        no_modificada = respuesta_no_modificada(request, etag)
+        if no_modificada:
+            return no_modificada
+        
+        resumenes = await ejecutar_en_hilo(resumen_interacciones_recetas, ids_recetas, email_usuario)
+        
+        return crear_respuesta_exito(
+            "Resúmenes obtenidos correctamente",
+            {"resumenes": resumenes},
+            etag=etag
+        )
+        
+    except Exception as e:
+        print(f"{LOG_ERROR} Error inesperado en obtener_resumen_recetas: {e}")
+        return crear_respuesta_error(
+            MENSAJE_ERROR_INTERNO,
+            "INTERNAL_ERROR",
+            HTTP_INTERNAL_SERVER_ERROR
+        )
+
 # ==================== ENDPOINTS DE MENÚ SEMANAL ====================
 
 def enriquecer_menu_con_recetas(menu_semanal):
@@ -1959,7 +2094,7 @@ def enriquecer_menu_con_recetas(menu_semanal):
     """
     try:
         # Cargar todas las recetas
-        todas_recetas = cargar_recetas()
+        todas_recetas = listar_recetas()
         
         # Crear un diccionario de búsqueda rápida por nombre de receta
         recetas_dict = {}
@@ -1967,7 +2102,8 @@ def enriquecer_menu_con_recetas(menu_semanal):
             nombre = receta.get('nombreReceta', '')
             recetas_dict[nombre] = {
                 'nombreReceta': nombre,
-                'fotoReceta': receta.get('fotoReceta', '')
+                # Las casillas del menú son pequeñas: basta la variante de tarjeta
+                'fotoReceta': url_variante(receta.get('fotosReceta'), 'tarjeta', receta.get('fotoReceta', ''))
             }
         
         # Enriquecer el menú
@@ -2008,8 +2144,15 @@ async def obtener_menu_semanal_endpoint(request: Request) -> JSONResponse:
         
         email_usuario = obtener_email_usuario(request)
         
+        # El menú se completa con datos de las recetas: depende también del catálogo
+        etag = calcular_etag("menu-semanal", email_usuario, await ejecutar_en_hilo(version_menu_semanal, email_usuario),
+                             await ejecutar_en_hilo(repositorio_recetas.version))
+        no_modificada = respuesta_no_modificada(request, etag)
+        if no_modificada:
+            return no_modificada
+        
         # Obtener menú semanal del archivo JSON separado
-        menu_semanal = obtener_menu_semanal(email_usuario)
+        menu_semanal = await ejecutar_en_hilo(obtener_menu_semanal, email_usuario)
         
         # Si hay menú, enriquecerlo con datos completos de las recetas
         if menu_semanal:
@@ -2019,7 +2162,8 @@ async def obtener_menu_semanal_endpoint(request: Request) -> JSONResponse:
         
         return crear_respuesta_exito(
             "Menú semanal obtenido correctamente",
-            {"menuSemanal": menu_enriquecido}
+            {"menuSemanal": menu_enriquecido},
+            etag=etag
         )
         
     except Exception as e:
@@ -2031,13 +2175,16 @@ async def obtener_menu_semanal_endpoint(request: Request) -> JSONResponse:
         )
 
 @app.post("/api/menu-semanal/crear-automatico")
-async def crear_menu_semanal_automatico(request: Request) -> JSONResponse:
+async def crear_menu_semanal_automatico(request: Request, alergenos: List[str] = Query(default=[])) -> JSONResponse:
     """
     Genera un menú semanal automático para el usuario (sin guardarlo).
     El usuario podrá revisarlo y confirmarlo desde el frontend.
     Genera el menú seleccionando aleatoriamente recetas del usuario y guardadas,
     filtrando por turno de comida apropiado.
     
+    Args:
+        alergenos: Alérgenos que no deben tener las recetas del menú (parámetro repetible)
+    
     Returns:
         JSONResponse: Menú generado (sin guardar)
     """
@@ -2058,7 +2205,7 @@ async def crear_menu_semanal_automatico(request: Request) -> JSONResponse:
         print(f"{LOG_INFO} Generando menú para usuario: {email_usuario}")
         
         # Generar menú semanal automático usando la función de utils
-        menu_semanal = generar_menu_semanal_automatico(email_usuario)
+        menu_semanal = await ejecutar_en_hilo(generar_menu_semanal_automatico, email_usuario, alergenos)
         print(f"{LOG_SUCCESS} Menú semanal generado (pendiente de confirmación)")
         
         # Enriquecer el menú con las fotos de las recetas
@@ -2112,7 +2259,7 @@ async def crear_menu_semanal_manual(request: Request) -> JSONResponse:
         }
         
         # Guardar menú semanal en el archivo JSON separado
-        exito = guardar_menu_semanal(email_usuario, menu_semanal)
+        exito = await ejecutar_en_hilo(guardar_menu_semanal, email_usuario, menu_semanal)
         
         if exito:
             return crear_respuesta_exito(
@@ -2159,7 +2306,7 @@ async def eliminar_menu_semanal_endpoint(request: Request) -> JSONResponse:
         print(f"{LOG_INFO} Eliminando menú para usuario: {email_usuario}")
         
         # Eliminar menú semanal del archivo JSON
-        exito = eliminar_menu_semanal(email_usuario)
+        exito = await ejecutar_en_hilo(eliminar_menu_semanal, email_usuario)
         
         if exito:
             print(f"{LOG_SUCCESS} Menú semanal eliminado correctamente")
@@ -2212,14 +2359,12 @@ async def obtener_id_receta_por_nombre(nombre_receta: str, request: Request) ->
         import urllib.parse
         nombre_decodificado = urllib.parse.unquote(nombre_receta)
         
-        # Cargar todas las recetas
-        todas_recetas = cargar_recetas()
-        
-        # Buscar la receta por nombre
-        for receta in todas_recetas:
+        # Buscar la receta por nombre en el índice (preferentemente una del propio usuario)
+        candidatas = sorted(recetas_con_nombre(nombre_decodificado),
+                            key=lambda r: r.get('usuario', '').lower() != (email_usuario or '').lower())
+        for receta in candidatas:
             if receta.get('nombreReceta', '').lower() == nombre_decodificado.lower():
-                # Generar ID de la receta
-                receta_id = generar_id_receta(receta['nombreReceta'])
+                receta_id = id_publico_receta(receta)
                 return crear_respuesta_exito(
                     "ID de receta obtenido correctamente",
                     {"receta_id": receta_id}
@@ -2240,10 +2385,13 @@ async def obtener_id_receta_por_nombre(nombre_receta: str, request: Request) ->
         )
 
 @app.get("/api/recetas/usuario")
-async def obtener_recetas_usuario_endpoint(request: Request) -> JSONResponse:
+async def obtener_recetas_usuario_endpoint(request: Request, fields: Optional[str] = None) -> JSONResponse:
     """
     Obtiene todas las recetas del usuario (propias y guardadas).
     
+    Args:
+        fields: Campos de cada receta separados por comas (por defecto, el resumen de las tarjetas)
+    
     Returns:
         JSONResponse: Recetas propias y guardadas del usuario
     """
@@ -2259,11 +2407,18 @@ async def obtener_recetas_usuario_endpoint(request: Request) -> JSONResponse:
         
         email_usuario = obtener_email_usuario(request)
         
+        try:
+            campos = campos_listado(fields)
+        except ValueError as e:
+            return crear_respuesta_error(str(e), "CAMPOS_INVALIDOS", HTTP_BAD_REQUEST)
+        
         # Obtener recetas propias
-        recetas_propias = obtener_recetas_usuario(email_usuario)
+        recetas_propias = await ejecutar_en_hilo(copiar_para_listado, obtener_recetas_usuario(email_usuario), campos)
         
         # Obtener recetas guardadas
-        recetas_guardadas = obtener_recetas_guardadas_usuario(email_usuario)
+        recetas_guardadas = await ejecutar_en_hilo(
+            copiar_para_listado, obtener_recetas_guardadas_usuario(email_usuario), campos
+        )
         
         return crear_respuesta_exito(
             "Recetas obtenidas correctamente",
@@ -2313,7 +2468,7 @@ async def guardar_menu_semanal_manual(request: Request) -> JSONResponse:
             )
         
         # Guardar menú semanal en el archivo JSON separado
-        exito = guardar_menu_semanal(email_usuario, menu_semanal)
+        exito = await ejecutar_en_hilo(guardar_menu_semanal, email_usuario, menu_semanal)
         
         if exito:
             return crear_respuesta_exito(
@@ -10,12 +10,26 @@ import {
   mostrarIngredientes,
   mostrarPasosAseguir,
   mostrarAlergenos,
-  mostrarImagenReceta
+  mostrarImagenReceta,
+  obtenerResumenRecetas,
+  mostrarResumenesEnCards
 } from './utils/recetas-utils.js';
 import { mostrarMensaje } from './components/message-handler.js';
 
-// Variable global para almacenar todas las recetas cargadas
-let todasLasRecetasComunidad = [];
+// Paginación por cursor de /api/recetas-comunidad (o de /api/recetas/buscar si hay filtros)
+const TAMANO_PAGINA_COMUNIDAD = 20;
+let cursorSiguienteComunidad = null;
+let cargandoPaginaComunidad = false;
+let totalRecetasComunidad = 0;
+
+// Resumen de valoraciones y comentarios de las recetas mostradas, por ID (ver cargarResumenesCards)
+const resumenesRecetas = {};
+
+// Filtros aplicados: se envían al servidor, que devuelve solo las recetas que los cumplen
+let filtrosComunidad = {};
+
+// Se incrementa con cada nueva consulta para descartar páginas de consultas anteriores
+let consultaComunidad = 0;
 
 // Arrays para almacenar los tags de ingredientes y alérgenos
 let ingredientesTagsComunidad = [];
@@ -347,9 +361,10 @@ function actualizarEstadoBotonGuardar(boton, estaGuardada) {
 
 /**
  * Configura los botones de guardar en las cards de recetas
+ * @param {ParentNode} raiz - Elemento en el que buscar los botones (por defecto todo el documento)
  */
-async function configurarBotonesGuardarCards() {
-  const botones = document.querySelectorAll('.btn-guardar-card');
+async function configurarBotonesGuardarCards(raiz = document) {
+  const botones = raiz.querySelectorAll('.btn-guardar-card');
   
   // Obtener lista de recetas guardadas del usuario
   const recetasGuardadas = await obtenerRecetasGuardadas();
@@ -505,30 +520,36 @@ function actualizarEstadoBotonCard(boton, estaGuardada) {
 }
 
 /**
- * Carga y muestra las recetas de la comunidad (todas excepto las del usuario actual)
+ * Carga la primera página de recetas de la comunidad (todas excepto las del usuario actual)
+ * que cumplen los filtros aplicados. Las páginas siguientes se cargan al llegar al final
+ * de la lista (ver cargarSiguientePaginaComunidad).
  */
 async function cargarRecetasComunidad() {
-  try {
-    const response = await fetch("/api/recetas-comunidad", {
-      method: "GET",
-      credentials: "include",
-      headers: {
-        Accept: "application/json",
-        "Cache-Control": "no-cache",
-      },
-    });
+  const consulta = ++consultaComunidad;
+  cursorSiguienteComunidad = null;
 
-    const resultado = await response.json();
+  try {
+    const resultado = await pedirPaginaComunidad(null);
+    if (consulta !== consultaComunidad) return;
     const contenedor = document.getElementById("contenedorRecetas");
     const totalRecetas = document.getElementById("totalRecetas");
 
     if (resultado.exito && resultado.recetas) {
       const recetas = resultado.recetas;
-      
-      // Guardar recetas en variable global para filtrado
-      todasLasRecetasComunidad = recetas;
+      totalRecetasComunidad = resultado.total ?? recetas.length;
+      cursorSiguienteComunidad = resultado.nextCursor || null;
 
-      if (recetas.length === 0) {
+      if (recetas.length === 0 && hayFiltrosComunidad()) {
+        contenedor.innerHTML = `
+          <div class="col-12">
+            <div class="alert alert-warning text-center" role="alert">
+              <i class="bi bi-exclamation-triangle-fill me-2"></i>
+              No se encontraron recetas que coincidan con los filtros seleccionados.
+            </div>
+          </div>
+        `;
+        totalRecetas.textContent = "Sin recetas";
+      } else if (recetas.length === 0) {
         contenedor.innerHTML = `
           <div class="col-12 text-center py-5">
             <div class="text-muted">
@@ -542,8 +563,8 @@ async function cargarRecetasComunidad() {
       } else {
         // Usar crearCardReceta con el parámetro mostrarAutor=true para comunidad
         contenedor.innerHTML = recetas.map(receta => crearCardReceta(receta, true)).join("");
-        totalRecetas.textContent = `${recetas.length} receta${
-          recetas.length !== 1 ? "s" : ""
+        totalRecetas.textContent = `${totalRecetasComunidad} receta${
+          totalRecetasComunidad !== 1 ? "s" : ""
         }`;
         
         // Agregar event listeners a las tarjetas de recetas
@@ -551,6 +572,9 @@ async function cargarRecetasComunidad() {
         
         // Configurar botones de guardar en las cards
         await configurarBotonesGuardarCards();
+
+        // Valoraciones y comentarios de todas las cards en una sola petición
+        cargarResumenesCards(recetas);
       }
     } else {
       contenedor.innerHTML = `
@@ -579,6 +603,156 @@ async function cargarRecetasComunidad() {
     `;
     document.getElementById("totalRecetas").textContent = "Error";
   }
+  
+  actualizarIndicadorSiguientePagina();
+}
+
+/**
+ * Indica si hay filtros aplicados a la lista de la comunidad
+ * @returns {boolean}
+ */
+function hayFiltrosComunidad() {
+  return Object.keys(filtrosComunidad).length > 0;
+}
+
+/**
+ * Pide una página de recetas de la comunidad al servidor. Con filtros aplicados
+ * se usa /api/recetas/buscar, que filtra en el servidor con sus índices.
+ * @param {string|null} cursor - nextCursor de la página anterior (null para la primera)
+ * @returns {Promise<Object>} Respuesta del servidor
+ */
+async function pedirPaginaComunidad(cursor) {
+  const parametros = new URLSearchParams({ limit: TAMANO_PAGINA_COMUNIDAD });
+  if (cursor) parametros.set("cursor", cursor);
+
+  let url = "/api/recetas-comunidad";
+  if (hayFiltrosComunidad()) {
+    url = "/api/recetas/buscar";
+    parametros.set("ambito", "comunidad");
+    for (const [clave, valor] of Object.entries(filtrosComunidad)) {
+      // Ingredientes y alérgenos se envían como parámetros repetidos
+      for (const v of Array.isArray(valor) ? valor : [valor]) {
+        parametros.append(clave, v);
+      }
+    }
+  }
+
+  const response = await fetch(`${url}?${parametros}`, {
+    method: "GET",
+    credentials: "include",
+    // Revalida con If-None-Match: si no ha cambiado, el servidor responde 304 sin cuerpo
+    cache: "no-cache",
+    headers: {
+      Accept: "application/json",
+    },
+  });
+  return response.json();
+}
+
+/**
+ * Carga la siguiente página de recetas y añade sus tarjetas al final de la lista
+ */
+async function cargarSiguientePaginaComunidad() {
+  if (!cursorSiguienteComunidad || cargandoPaginaComunidad) return;
+  const consulta = consultaComunidad;
+  cargandoPaginaComunidad = true;
+  actualizarIndicadorSiguientePagina();
+
+  try {
+    const resultado = await pedirPaginaComunidad(cursorSiguienteComunidad);
+    // Los filtros han cambiado mientras tanto: la página ya no corresponde a la lista
+    if (consulta !== consultaComunidad) return;
+    if (!resultado.exito || !resultado.recetas) {
+      throw new Error(resultado.mensaje || "Ha ocurrido un error inesperado");
+    }
+
+    totalRecetasComunidad = resultado.total ?? totalRecetasComunidad;
+    cursorSiguienteComunidad = resultado.nextCursor || null;
+
+    anadirCardsRecetas(resultado.recetas);
+    const totalRecetas = document.getElementById("totalRecetas");
+    if (totalRecetas) {
+      totalRecetas.textContent = `${totalRecetasComunidad} receta${
+        totalRecetasComunidad !== 1 ? "s" : ""
+      }`;
+    }
+  } catch (error) {
+    console.error("Error al cargar más recetas:", error);
+    mostrarMensaje("No se pudieron cargar más recetas", "error");
+  } finally {
+    cargandoPaginaComunidad = false;
+    actualizarIndicadorSiguientePagina();
+  }
+}
+
+/**
+ * Añade al final del contenedor las tarjetas de unas recetas, con sus event listeners
+ * @param {Array} recetas - Recetas a añadir
+ */
+function anadirCardsRecetas(recetas) {
+  const contenedor = document.getElementById("contenedorRecetas");
+  if (!contenedor || recetas.length === 0) return;
+
+  const plantilla = document.createElement("template");
+  plantilla.innerHTML = recetas.map(receta => crearCardReceta(receta, true)).join("");
+
+  // Los listeners se añaden solo a las tarjetas nuevas, antes de insertarlas
+  plantilla.content.querySelectorAll(".receta-card").forEach(card => {
+    card.addEventListener("click", function() {
+      const recetaId = this.getAttribute("data-receta-id");
+      if (recetaId) abrirModalDetalleReceta(recetaId);
+    });
+  });
+  configurarBotonesGuardarCards(plantilla.content);
+
+  contenedor.appendChild(plantilla.content);
+  cargarResumenesCards(recetas);
+}
+
+/**
+ * Pide en una sola petición el resumen de valoraciones y comentarios de unas recetas
+ * (incluida la valoración del usuario) y lo muestra en sus cards
+ * @param {Array} recetas - Recetas de las cards
+ */
+async function cargarResumenesCards(recetas) {
+  const resumenes = await obtenerResumenRecetas(recetas.map(receta => receta.id).filter(Boolean));
+  Object.assign(resumenesRecetas, resumenes);
+  mostrarResumenesEnCards(resumenes);
+}
+
+/**
+ * Actualiza el resumen guardado de una receta y su card
+ * @param {string} recetaId - ID de la receta
+ * @param {Object} cambios - Campos del resumen que cambian
+ */
+function actualizarResumenReceta(recetaId, cambios) {
+  if (!recetaId || !resumenesRecetas[recetaId]) return;
+  Object.assign(resumenesRecetas[recetaId], cambios);
+  mostrarResumenesEnCards({ [recetaId]: resumenesRecetas[recetaId] });
+}
+
+/**
+ * Muestra u oculta el indicador de carga del final de la lista según queden páginas
+ */
+function actualizarIndicadorSiguientePagina() {
+  const indicador = document.getElementById("finRecetasComunidad");
+  if (!indicador) return;
+  indicador.style.display = cursorSiguienteComunidad ? "block" : "none";
+}
+
+/**
+ * Observa el final de la lista para cargar la siguiente página al acercarse a él (scroll infinito)
+ */
+function configurarScrollInfinito() {
+  const indicador = document.getElementById("finRecetasComunidad");
+  if (!indicador || !("IntersectionObserver" in window)) return;
+
+  const observador = new IntersectionObserver(entradas => {
+    if (entradas.some(entrada => entrada.isIntersecting)) {
+      cargarSiguientePaginaComunidad();
+    }
+  }, { rootMargin: "400px 0px" });
+  observador.observe(indicador);
 }
 
 // Variables globales para almacenar la receta actual
@@ -613,14 +787,16 @@ async function cargarComentarios(recetaId) {
       console.log('💬 Comentarios encontrados:', comentarios.length, 'comentarios:', comentarios);
       mostrarComentarios(comentarios);
       
-      // Actualizar contador
+      // Actualizar contador (total de la receta; la respuesta solo trae la página más reciente)
+      const totalComentarios = resultado.total ?? comentarios.length;
       const contadorElement = document.getElementById('contadorComentarios');
       if (contadorElement) {
-        contadorElement.textContent = comentarios.length;
-        console.log('✅ Contador actualizado a:', comentarios.length);
+        contadorElement.textContent = totalComentarios;
+        console.log('✅ Contador actualizado a:', totalComentarios);
       } else {
         console.error('❌ No se encontró el elemento contadorComentarios');
       }
+      actualizarResumenReceta(recetaId, { totalComentarios });
     } else {
       console.error("❌ Error al cargar comentarios:", resultado.mensaje);
     }
@@ -823,6 +999,14 @@ async function cargarValoraciones(recetaId, nombreReceta) {
   recetaActualNombre = nombreReceta;
   recetaActualId = recetaId;
   
+  // Si la card ya trajo el resumen (/api/resumen-recetas), no hace falta pedirlo
+  const resumen = resumenesRecetas[recetaId];
+  if (resumen) {
+    mostrarValoraciones(resumen);
+    configurarEstrellas(resumen.valoracionUsuario || 0);
+    return;
+  }
+  
   try {
     const respuesta = await fetch(`/api/valoracion-receta/${recetaId}`, {
       method: 'GET',
@@ -969,6 +1153,11 @@ async function enviarValoracion(puntuacion) {
       
       // Actualizar configuración de estrellas
       configurarEstrellas(puntuacion);
+      actualizarResumenReceta(recetaActualId, {
+        valoracionMedia: resultado.valoracionMedia,
+        totalValoraciones: resultado.totalValoraciones,
+        valoracionUsuario: puntuacion
+      });
       
       // Mostrar mensaje de éxito
       mostrarMensaje('¡Valoración guardada!', "success");
@@ -986,85 +1175,6 @@ async function enviarValoracion(puntuacion) {
 // FUNCIONES DE FILTRADO
 // ============================================
 
-/**
- * Filtra las recetas según los criterios proporcionados
- * @param {Array} recetas - Array de recetas a filtrar
- * @param {Object} filtros - Objeto con los filtros a aplicar
- * @returns {Array} - Recetas filtradas
- */
-function filtrarRecetasComunidad(recetas, filtros) {
-  return recetas.filter(receta => {
-    // Filtro por ingredientes múltiples (búsqueda parcial, case-insensitive)
-    if (filtros.ingredientes && filtros.ingredientes.length > 0) {
-      const ingredientesReceta = (receta.ingredientes || '').toLowerCase();
-      const todosPresentres = filtros.ingredientes.every(ing => 
-        ingredientesReceta.includes(ing.toLowerCase())
-      );
-      if (!todosPresentres) return false;
-    }
-
-    // Filtro por alérgenos (excluir recetas que contengan alguno)
-    if (filtros.alergenos && filtros.alergenos.length > 0) {
-      const alergenosReceta = (receta.alergenos || '').toLowerCase().trim();
-      // Solo verificar si la receta tiene alérgenos especificados
-      if (alergenosReceta !== '') {
-        // Verificar si alguno de los alérgenos del filtro está presente en la receta
-        const contieneAlergeno = filtros.alergenos.some(alergeno => {
-          const alergenoLower = alergeno.toLowerCase().trim();
-          // Buscar el alérgeno como palabra completa o parte de una lista separada por comas
-          return alergenosReceta.split(',').some(alergenoReceta => 
-            alergenoReceta.trim().includes(alergenoLower)
-          );
-        });
-        if (contieneAlergeno) return false; // Excluir esta receta
-      }
-      // Si la receta no tiene alérgenos especificados, no la excluimos (continuar)
-    }
-
-    // Filtro por país (coincidencia exacta)
-    if (filtros.paisOrigen && receta.paisOrigen !== filtros.paisOrigen) {
-      return false;
-    }
-
-    // Filtro por usuario (búsqueda parcial en email)
-    if (filtros.usuario) {
-      const usuarioFiltro = filtros.usuario.toLowerCase();
-      const usuarioReceta = (receta.usuario || '').toLowerCase();
-      if (!usuarioReceta.includes(usuarioFiltro)) return false;
-    }
-
-    // Filtro por dificultad (coincidencia exacta)
-    if (filtros.dificultad && receta.dificultad !== filtros.dificultad) {
-      return false;
-    }
-
-    // Filtro por turno de comida (coincidencia exacta)
-    if (filtros.turnoComida && receta.turnoComida !== filtros.turnoComida) {
-      return false;
-    }
-
-    // Filtro por duración (menor o igual que el valor especificado)
-    if (filtros.duracion) {
-      const duracionMaxima = parseInt(filtros.duracion);
-      const duracionReceta = parseInt(receta.duracion || 0);
-      if (duracionReceta > duracionMaxima) return false;
-    }
-
-    // Filtro por valoración mínima
-    if (filtros.valoracion) {
-      const valoracionMinima = parseFloat(filtros.valoracion);
-      const valoracionReceta = receta.valoracionMedia || 0;
-      
-      // Solo considerar recetas con valoraciones
-      if (valoracionReceta === 0 || valoracionReceta < valoracionMinima) {
-        return false;
-      }
-    }
-
-    return true;
-  });
-}
-
 /**
  * Obtiene los valores de los filtros del formulario
  * @returns {Object} - Objeto con los valores de los filtros
@@ -1099,54 +1209,21 @@ function obtenerFiltrosDelFormulario() {
 }
 
 /**
- * Muestra las recetas filtradas en el contenedor
+ * Aplica los filtros del formulario: vuelve a cargar la lista desde el servidor
+ * con solo las recetas que los cumplen
  */
-function mostrarRecetasFiltradas() {
+async function mostrarRecetasFiltradas() {
   const filtros = obtenerFiltrosDelFormulario();
-  const recetasFiltradas = filtrarRecetasComunidad(todasLasRecetasComunidad, filtros);
-
-  const contenedor = document.getElementById('contenedorRecetas');
-  const totalRecetasElement = document.getElementById('totalRecetas');
+  filtrosComunidad = filtros;
 
-  if (!contenedor) return;
-
-  // Actualizar contador
-  if (totalRecetasElement) {
-    totalRecetasElement.textContent = recetasFiltradas.length;
-  }
-
-  // Limpiar contenedor
-  contenedor.innerHTML = '';
-
-  // Mostrar recetas filtradas
-  if (recetasFiltradas.length === 0) {
-    contenedor.innerHTML = `
-      <div class="col-12">
-        <div class="alert alert-warning text-center" role="alert">
-          <i class="bi bi-exclamation-triangle-fill me-2"></i>
-          No se encontraron recetas que coincidan con los filtros seleccionados.
-        </div>
-      </div>
-    `;
-  } else {
-    // Generar HTML de las cards filtradas usando innerHTML (crearCardReceta ya incluye el wrapper column)
-    contenedor.innerHTML = recetasFiltradas.map(receta => 
-      crearCardReceta(receta, true)
-    ).join('');
-
-    // Agregar event listeners a las nuevas cards
-    agregarEventListenersRecetas(abrirModalDetalleReceta);
-    
-    // Configurar botones de guardar en las cards filtradas
-    configurarBotonesGuardarCards();
-  }
+  // Cerrar el modal
+  const modal = bootstrap.Modal.getInstance(document.getElementById('filtrosRecetasModal'));
+  if (modal) modal.hide();
 
   // Mostrar filtros activos
   mostrarFiltrosActivos(filtros);
 
-  // Cerrar el modal
-  const modal = bootstrap.Modal.getInstance(document.getElementById('filtrosRecetasModal'));
-  if (modal) modal.hide();
+  await cargarRecetasComunidad();
 }
 
 /**
@@ -1168,6 +1245,7 @@ function mostrarFiltrosActivos(filtros) {
       listContainer.innerHTML = '';
 
       const nombresAmigables = {
+        q: 'Texto',
         ingredientes: 'Ingredientes',
         paisOrigen: 'País',
         usuario: 'Usuario',
@@ -1225,6 +1303,7 @@ function mostrarFiltrosActivosEnPagina(filtros) {
   pageList.innerHTML = '';
 
   const nombresAmigables = {
+    q: 'Texto',
     paisOrigen: 'País',
     usuario: 'Usuario',
     dificultad: 'Dificultad',
@@ -1308,6 +1387,7 @@ function mostrarFiltrosActivosEnModal(filtros) {
   listContainer.innerHTML = '';
 
   const nombresAmigables = {
+    q: 'Texto',
     paisOrigen: 'País',
     usuario: 'Usuario',
     dificultad: 'Dificultad',
@@ -1486,34 +1566,8 @@ window.limpiarTodosFiltros = function() {
   }
 
   // Mostrar todas las recetas
-  const contenedor = document.getElementById('contenedorRecetas');
-  const totalRecetasElement = document.getElementById('totalRecetas');
-
-  if (!contenedor) return;
-
-  if (totalRecetasElement) {
-    totalRecetasElement.textContent = todasLasRecetasComunidad.length;
-  }
-
-  contenedor.innerHTML = '';
-
-  if (todasLasRecetasComunidad.length === 0) {
-    contenedor.innerHTML = `
-      <div class="col-12">
-        <div class="alert alert-warning text-center" role="alert">
-          <i class="bi bi-exclamation-triangle-fill me-2"></i>
-          No hay recetas disponibles.
-        </div>
-      </div>
-    `;
-  } else {
-    contenedor.innerHTML = todasLasRecetasComunidad.map(receta => 
-      crearCardReceta(receta, true)
-    ).join('');
-
-    agregarEventListenersRecetas(abrirModalDetalleReceta);
-    configurarBotonesGuardarCards();
-  }
+  filtrosComunidad = {};
+  cargarRecetasComunidad();
 };
 
 // ============================================
@@ -1521,8 +1575,9 @@ window.limpiarTodosFiltros = function() {
 // ============================================
 
 document.addEventListener('DOMContentLoaded', () => {
-  // 1. Cargar recetas al iniciar
+  // 1. Cargar recetas al iniciar y las páginas siguientes al hacer scroll
   cargarRecetasComunidad();
+  configurarScrollInfinito();
   
   // 2. Event listeners de filtros
   const aplicarFiltrosBtn = document.getElementById('aplicarFiltrosBtn');
@@ -1565,6 +1620,17 @@ document.addEventListener('DOMContentLoaded', () => {
     });
   }
   
+  // Enter en la búsqueda de texto aplica los filtros en lugar de enviar el formulario
+  const inputTexto = document.getElementById('filtroTexto');
+  if (inputTexto) {
+    inputTexto.addEventListener('keypress', function(e) {
+      if (e.key === 'Enter') {
+        e.preventDefault();
+        mostrarRecetasFiltradas();
+      }
+    });
+  }
+
   // Event listener para cuando se abre el modal de filtros
   const modalFiltros = document.getElementById('filtrosRecetasModal');
   if (modalFiltros) {
@@ -10,6 +10,7 @@ export const ENDPOINTS = {
   INICIAR_SESION: "/iniciar-sesion",
   CERRAR_SESION: "/cerrar-sesion",
   CREAR_RECETA: "/crear-receta",
+  SUBIR_IMAGEN: "/api/subir-imagen",
   GUARDAR_RECETA: "/guardar-receta",
   DESGUARDAR_RECETA: "/desguardar-receta",
   PUBLICAR_RECETA: "/publicar-receta",
@@ -53,7 +53,7 @@ async function actualizarNavbarUsuario() {
     const nombre = perfilJson.data?.perfil?.nombreUsuario || perfilJson.perfil?.nombreUsuario || perfilJson?.perfil?.nombreUsuario || perfilJson?.data?.nombreUsuario;
     if (nombre) {
       // Mantener el href y clases; mostrar foto si existe
-      const foto = perfilJson.data?.perfil?.fotoPerfil || perfilJson.perfil?.fotoPerfil || perfilJson?.fotoPerfil || perfilJson?.data?.fotoPerfil;
+      const foto = perfilJson.perfil?.fotosPerfil?.miniatura || perfilJson.data?.perfil?.fotoPerfil || perfilJson.perfil?.fotoPerfil || perfilJson?.fotoPerfil || perfilJson?.data?.fotoPerfil;
       // Antes de insertar contenido, quitar clases de icono del propio enlace para evitar duplicados
       anchor.classList.remove('bi', 'bi-person-circle');
       if (foto) {
@@ -110,7 +110,17 @@ async function crearMenuAutomatico() {
     
     console.log('Enviando petición para crear menú automático...');
     
-    const response = await fetch('/api/menu-semanal/crear-automatico', {
+    // Alérgenos a excluir: se envían como parámetros repetidos
+    const parametros = new URLSearchParams();
+    const inputAlergenos = document.getElementById('alergenosExcluidosMenu');
+    if (inputAlergenos) {
+      inputAlergenos.value.split(',')
+        .map(alergeno => alergeno.trim())
+        .filter(alergeno => alergeno)
+        .forEach(alergeno => parametros.append('alergenos', alergeno));
+    }
+    
+    const response = await fetch(`/api/menu-semanal/crear-automatico?${parametros}`, {
       method: 'POST',
       credentials: 'include',
       headers: {
@@ -58,7 +58,7 @@ export async function cargarPerfil() {
     }
 
     if (p.fotoPerfil) {
-      applyHeroAvatar(p.fotoPerfil, true);
+      applyHeroAvatar(p.fotosPerfil?.tarjeta || p.fotoPerfil, true);
     } else {
       applyHeroAvatar('/static/cocinero.png', false);
     }
@@ -140,7 +140,7 @@ export async function subirFoto(archivo) {
       return;
     }
 
-    const fotoUrl = json.data?.fotoPerfil || json.fotoPerfil;
+    const fotoUrl = json.fotosPerfil?.tarjeta || json.data?.fotoPerfil || json.fotoPerfil;
     if (fotoUrl) {
       try {
         const heroAvatarEl = document.getElementById('heroAvatarImg');
@@ -598,7 +598,7 @@ export function inicializarPerfilModales() {
         const thumb = document.createElement('a');
         thumb.className = 'receta-thumb';
         thumb.href = `/receta/${r.id || ''}`;
-        const img = document.createElement('img'); img.src = r.fotoReceta || '/static/placeholder.png'; img.alt = r.nombreReceta || '';
+        const img = document.createElement('img'); img.src = r.fotosReceta?.miniatura || r.fotoReceta || '/static/placeholder.png'; img.alt = r.nombreReceta || '';
         const t = document.createElement('div'); t.className = 'r-title'; t.textContent = r.nombreReceta || '';
         thumb.appendChild(img); thumb.appendChild(t);
         cont.appendChild(thumb);
@@ -31,6 +31,29 @@ export async function crearReceta(recetaData) {
   }
 }
 
+/**
+ * Sube una imagen por partes (multipart) antes de crear la receta
+ * @param {File} archivo - Imagen seleccionada en el formulario
+ * @returns {Promise<string>} - Token de la subida, que se envía como tokenSubida al crear la receta
+ */
+export async function subirImagen(archivo) {
+  const formData = new FormData();
+  formData.append("imagen", archivo);
+
+  // Sin Content-Type: el navegador añade el boundary del multipart
+  const response = await fetch(ENDPOINTS.SUBIR_IMAGEN, {
+    method: "POST",
+    credentials: HTTP_CONFIG.CREDENTIALS,
+    body: formData,
+  });
+
+  const data = await response.json();
+  if (!response.ok || !data.exito) {
+    throw new Error(data.mensaje || "No se pudo subir la imagen");
+  }
+  return data.tokenSubida;
+}
+
 /**
  * Guarda una receta en la lista personal del usuario
  * @param {string} nombreReceta - Nombre de la receta a guardar
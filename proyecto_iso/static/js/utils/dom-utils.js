@@ -3,6 +3,8 @@
  * Funciones para manipulación del DOM y elementos de la interfaz
  */
 
+import { subirImagen } from "../services/api-service.js";
+
 /**
  * Obtiene los datos de un formulario basándose en su configuración
  * @param {HTMLElement} form - El elemento formulario
@@ -158,7 +160,8 @@ export function validarArchivoImagen(archivo) {
 }
 
 /**
- * Obtiene los datos de un formulario incluyendo archivos convertidos a Base64
+ * Obtiene los datos de un formulario subiendo antes sus imágenes
+ * La imagen se envía por partes a /api/subir-imagen y el formulario lleva su token (tokenSubida)
  * @param {HTMLElement} form - El elemento formulario
  * @param {Array} campos - Array de nombres de campos a extraer
  * @returns {Promise<Object>} - Promise que resuelve con los datos del formulario
@@ -180,9 +183,9 @@ export async function obtenerDatosFormularioConArchivos(form, campos) {
         }
 
         try {
-          // Convertir a Base64
-          const base64 = await convertirArchivoABase64(archivo);
-          formData[campo] = base64;
+          // Subir por partes: el JSON solo lleva el token de la subida
+          formData["tokenSubida"] = await subirImagen(archivo);
+          formData[campo] = "";
         } catch (error) {
           throw new Error(`Error al procesar la imagen: ${error.message}`);
         }
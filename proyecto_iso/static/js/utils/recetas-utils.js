@@ -36,7 +36,7 @@ export function crearCardReceta(receta, mostrarAutor = false) {
         <div class="card-img-top bg-light d-flex align-items-center justify-content-center position-relative" style="height: 200px;">
           ${
             receta.fotoReceta && receta.fotoReceta.trim() !== ""
-              ? `<img src="${receta.fotoReceta}" class="img-fluid rounded-top w-100 h-100" style="object-fit: cover;" alt="${receta.nombreReceta}" loading="lazy">`
+              ? `<img src="${receta.fotosReceta?.tarjeta || receta.fotoReceta}" class="img-fluid rounded-top w-100 h-100" style="object-fit: cover;" alt="${receta.nombreReceta}" loading="lazy">`
               : `<div class="d-flex flex-column align-items-center justify-content-center text-muted">
                    <i class="bi bi-image" style="font-size: 3rem;"></i>
                    <small class="mt-2">Sin imagen</small>
@@ -61,11 +61,18 @@ export function crearCardReceta(receta, mostrarAutor = false) {
               : ''
           }
           
-          <p class="card-text text-muted small mb-3" style="display: -webkit-box; -webkit-line-clamp: 3; -webkit-box-orient: vertical; overflow: hidden;">
-            ${receta.descripcion}
-          </p>
+          ${
+            receta.descripcion
+              ? `<p class="card-text text-muted small mb-3" style="display: -webkit-box; -webkit-line-clamp: 3; -webkit-box-orient: vertical; overflow: hidden;">
+                   ${receta.descripcion}
+                 </p>`
+              : ''
+          }
           
           <div class="mt-auto">
+            <div class="text-muted small mb-2 resumen-receta-card" data-receta-id="${receta.id || receta._id || ''}">
+              ${crearResumenReceta(receta)}
+            </div>
             <div class="d-flex justify-content-between align-items-center">
               <div class="d-flex align-items-center text-muted small">
                 <i class="bi bi-clock me-1"></i>
@@ -80,6 +87,65 @@ export function crearCardReceta(receta, mostrarAutor = false) {
   `;
 }
 
+/**
+ * Crea el HTML del resumen de valoraciones y comentarios de una card
+ * @param {Object} resumen - Receta del listado o resumen de /api/resumen-recetas
+ * @returns {string} - HTML del resumen (vacío si no hay datos)
+ */
+export function crearResumenReceta(resumen) {
+  if (resumen.valoracionMedia === undefined && resumen.totalComentarios === undefined) {
+    return '';
+  }
+  const valoracionUsuario = resumen.valoracionUsuario
+    ? `<span class="ms-2 text-primary">Tu valoración: ${resumen.valoracionUsuario}</span>`
+    : '';
+  return `
+    <i class="bi bi-star-fill text-warning me-1"></i>${(resumen.valoracionMedia || 0).toFixed(1)}
+    <span class="me-2">(${resumen.totalValoraciones || 0})</span>
+    <i class="bi bi-chat me-1"></i>${resumen.totalComentarios || 0}
+    ${valoracionUsuario}
+  `;
+}
+
+/**
+ * Obtiene en una sola petición el resumen de valoraciones y comentarios de varias recetas
+ * @param {Array<string>} ids - IDs de las recetas (las cards de una página)
+ * @returns {Promise<Object>} - Resumen de cada receta por su ID (vacío si falla)
+ */
+export async function obtenerResumenRecetas(ids) {
+  if (!ids || ids.length === 0) return {};
+  try {
+    const parametros = new URLSearchParams({ ids: ids.join(",") });
+    const response = await fetch(`/api/resumen-recetas?${parametros}`, {
+      method: "GET",
+      credentials: "include",
+      // Revalida con If-None-Match: si no ha cambiado, el servidor responde 304 sin cuerpo
+      cache: "no-cache",
+      headers: {
+        Accept: "application/json",
+      },
+    });
+    const resultado = await response.json();
+    return resultado.exito ? resultado.resumenes || {} : {};
+  } catch (error) {
+    console.error("Error al cargar el resumen de las recetas:", error);
+    return {};
+  }
+}
+
+/**
+ * Muestra el resumen de valoraciones y comentarios en las cards de las recetas indicadas
+ * @param {Object} resumenes - Resumen de cada receta por su ID
+ */
+export function mostrarResumenesEnCards(resumenes) {
+  document.querySelectorAll('.resumen-receta-card').forEach(elemento => {
+    const resumen = resumenes[elemento.getAttribute('data-receta-id')];
+    if (resumen) {
+      elemento.innerHTML = crearResumenReceta(resumen);
+    }
+  });
+}
+
 /**
  * Agrega event listeners a las tarjetas de recetas para abrir el modal
  * @param {Function} callbackAbrirModal - Función a llamar cuando se hace click en una receta
@@ -229,9 +295,10 @@ export async function obtenerDetalleReceta(recetaId) {
     const response = await fetch(`/api/receta/${recetaId}`, {
       method: "GET",
       credentials: "include",
+      // Revalida con If-None-Match: si no ha cambiado, el servidor responde 304 sin cuerpo
+      cache: "no-cache",
       headers: {
         Accept: "application/json",
-        "Cache-Control": "no-cache",
       },
     });
 
@@ -0,0 +1,282 @@
+"""
+Subida de imágenes por partes (multipart/form-data) sin cargarlas en memoria.
+
+POST /api/subir-imagen lee el cuerpo de la petición según llega y escribe la imagen
+a un archivo temporal, bloque a bloque:
+
+- El tamaño se comprueba a medida que llegan los datos: al pasar de TAMAÑO_MAXIMO_IMAGEN
+  se corta la subida sin leer el resto.
+- El tipo se reconoce por los primeros bytes del archivo (imagenes.detectar_tipo_imagen),
+  no por el Content-Type que declara el navegador.
+
+La subida queda pendiente con un token (tokenSubida) que /crear-receta usa en lugar de
+la imagen en Base64 dentro del JSON; al crear la receta se generan las variantes desde
+el archivo temporal (utils.guardar_imagen_con_variantes). Las subidas que no se usan
+caducan a los CADUCIDAD_SUBIDAS_SEGUNDOS y se borran.
+"""
+
+import os
+import time
+import secrets
+import tempfile
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import Request
+
+from constants import *
+from imagenes import detectar_tipo_imagen, LONGITUD_CABECERA_IMAGEN
+from utils import ejecutar_en_hilo
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:
+    # Versiones antiguas de python-multipart
+    from multipart.multipart import MultipartParser, parse_options_header
+
+# Margen sobre TAMAÑO_MAXIMO_IMAGEN para las cabeceras y separadores del multipart
+MARGEN_CUERPO_MULTIPART = 64 * 1024
+
+
+class SubidaRechazada(ValueError):
+    """Subida no válida: lleva el código de error y el estado HTTP de la respuesta."""
+
+    def __init__(self, mensaje: str, codigo: str, estado: int = HTTP_BAD_REQUEST):
+        super().__init__(mensaje)
+        self.codigo = codigo
+        self.estado = estado
+
+
+class ReceptorImagen:
+    """
+    Recibe por bloques un cuerpo multipart/form-data con una imagen en el campo
+    CAMPO_SUBIDA_IMAGEN. El análisis (recibir) no bloquea; la escritura de lo recibido
+    al archivo temporal (volcar) se hace en el pool de hilos.
+    """
+
+    def __init__(self, boundary: bytes, tamano_maximo: int = TAMAÑO_MAXIMO_IMAGEN):
+        self.tamano_maximo = tamano_maximo
+        self.tamano = 0
+        self.tipo_mime: Optional[str] = None
+        self.ruta: Optional[str] = None
+        self._archivo: Optional[Any] = None
+        self._cabecera = b""
+        self._pendiente: List[bytes] = []
+        self._cabeceras: Dict[bytes, bytes] = {}
+        self._campo = b""
+        self._valor = b""
+        self._en_imagen = False
+        self._imagen_recibida = False
+        self._parser = MultipartParser(boundary, {
+            "on_part_begin": self._al_empezar_parte,
+            "on_header_field": self._al_leer_campo_cabecera,
+            "on_header_value": self._al_leer_valor_cabecera,
+            "on_header_end": self._al_terminar_cabecera,
+            "on_headers_finished": self._al_terminar_cabeceras,
+            "on_part_data": self._al_leer_datos,
+            "on_part_end": self._al_terminar_parte,
+        })
+
+    @property
+    def hay_pendiente(self) -> bool:
+        return bool(self._pendiente)
+
+    def recibir(self, bloque: bytes) -> None:
+        """Analiza un bloque del cuerpo. Raises: SubidaRechazada"""
+        self._parser.write(bloque)
+
+    def volcar(self) -> None:
+        """Escribe al archivo temporal los datos de la imagen recibidos hasta ahora."""
+        if self._archivo is None:
+            descriptor, self.ruta = tempfile.mkstemp(prefix="subida_")
+            self._archivo = os.fdopen(descriptor, "wb")
+        for datos in self._pendiente:
+            self._archivo.write(datos)
+        self._pendiente = []
+
+    def terminar(self) -> Tuple[str, str, int]:
+        """
+        Termina la subida y cierra el archivo temporal.
+
+        Returns:
+            Tuple[str, str, int]: Ruta del archivo temporal, tipo MIME detectado y tamaño
+
+        Raises:
+            SubidaRechazada: Si el cuerpo no incluía ninguna imagen completa
+        """
+        self._parser.finalize()
+        if not self._imagen_recibida:
+            raise SubidaRechazada(f"No se recibió ninguna imagen en el campo '{CAMPO_SUBIDA_IMAGEN}'",
+                                  "IMAGEN_NO_RECIBIDA")
+        self.volcar()
+        self._archivo.close()
+        return self.ruta, self.tipo_mime, self.tamano
+
+    def descartar(self) -> None:
+        """Cierra y borra el archivo temporal de una subida que no se completó."""
+        if self._archivo is not None:
+            self._archivo.close()
+        if self.ruta and os.path.exists(self.ruta):
+            os.remove(self.ruta)
+
+    def _al_empezar_parte(self) -> None:
+        self._cabeceras = {}
+        self._en_imagen = False
+
+    def _al_leer_campo_cabecera(self, datos: bytes, inicio: int, fin: int) -> None:
+        self._campo += datos[inicio:fin]
+
+    def _al_leer_valor_cabecera(self, datos: bytes, inicio: int, fin: int) -> None:
+        self._valor += datos[inicio:fin]
+
+    def _al_terminar_cabecera(self) -> None:
+        self._cabeceras[self._campo.lower()] = self._valor
+        self._campo = b""
+        self._valor = b""
+
+    def _al_terminar_cabeceras(self) -> None:
+        _, opciones = parse_options_header(self._cabeceras.get(b"content-disposition", b""))
+        if opciones.get(b"name") != CAMPO_SUBIDA_IMAGEN.encode() or b"filename" not in opciones:
+            return  # Otros campos del formulario: se ignoran
+        if self._imagen_recibida or self.tamano:
+            raise SubidaRechazada("Solo se puede subir una imagen por petición", "VARIAS_IMAGENES")
+        self._en_imagen = True
+
+    def _al_leer_datos(self, datos: bytes, inicio: int, fin: int) -> None:
+        if not self._en_imagen:
+            return
+        fragmento = datos[inicio:fin]
+        self.tamano += len(fragmento)
+        if self.tamano > self.tamano_maximo:
+            raise SubidaRechazada(f"La imagen es muy grande. Tamaño máximo: {self.tamano_maximo // (1024*1024)}MB",
+                                  "IMAGEN_TAMANIO_EXCEDIDO", HTTP_PAYLOAD_TOO_LARGE)
+        if self.tipo_mime is None:
+            self._cabecera += fragmento[:LONGITUD_CABECERA_IMAGEN]
+            if len(self._cabecera) >= LONGITUD_CABECERA_IMAGEN:
+                self._comprobar_tipo()
+        self._pendiente.append(fragmento)
+
+    def _al_terminar_parte(self) -> None:
+        if not self._en_imagen:
+            return
+        if self.tipo_mime is None:
+            self._comprobar_tipo()
+        self._en_imagen = False
+        self._imagen_recibida = True
+
+    def _comprobar_tipo(self) -> None:
+        self.tipo_mime = detectar_tipo_imagen(self._cabecera[:LONGITUD_CABECERA_IMAGEN])
+        if self.tipo_mime is None:
+            raise SubidaRechazada("El archivo no es una imagen JPEG, PNG o WebP", "TIPO_IMAGEN_NO_PERMITIDO")
+
+
+class SubidaPendiente:
+    """Imagen subida a un archivo temporal, a la espera de que la use una receta."""
+
+    def __init__(self, ruta: str, tipo_mime: str, email: str):
+        self.ruta = ruta
+        self.tipo_mime = tipo_mime
+        self.email = email
+        self.creada = time.monotonic()
+
+
+class SubidasPendientes:
+    """Subidas por token. Cada token solo se puede usar una vez y solo por quien subió la imagen."""
+
+    def __init__(self, caducidad: float = CADUCIDAD_SUBIDAS_SEGUNDOS):
+        self.caducidad = caducidad
+        self._subidas: Dict[str, SubidaPendiente] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, ruta: str, tipo_mime: str, email: str) -> str:
+        """Registra una subida terminada y devuelve su token."""
+        self.eliminar_caducadas()
+        token = secrets.token_urlsafe(24)
+        with self._lock:
+            self._subidas[token] = SubidaPendiente(ruta, tipo_mime, email.lower())
+        return token
+
+    def tomar(self, token: str, email: str) -> Optional[SubidaPendiente]:
+        """
+        Retira una subida para usarla.
+
+        Args:
+            token (str): Token devuelto por /api/subir-imagen
+            email (str): Email del usuario que la usa
+
+        Returns:
+            Optional[SubidaPendiente]: La subida, o None si no existe, es de otro usuario o ha caducado
+        """
+        with self._lock:
+            subida = self._subidas.get(token)
+            if subida is None or subida.email != email.lower():
+                return None
+            del self._subidas[token]
+        if time.monotonic() - subida.creada > self.caducidad:
+            self._borrar(subida)
+            return None
+        return subida
+
+    def eliminar_caducadas(self) -> None:
+        ahora = time.monotonic()
+        with self._lock:
+            caducadas = [token for token, subida in self._subidas.items() if ahora - subida.creada > self.caducidad]
+            subidas = [self._subidas.pop(token) for token in caducadas]
+        for subida in subidas:
+            self._borrar(subida)
+
+    def _borrar(self, subida: SubidaPendiente) -> None:
+        try:
+            os.remove(subida.ruta)
+        except OSError as e:
+            print(f"{LOG_WARNING} No se pudo borrar la subida caducada {subida.ruta}: {e}")
+
+
+subidas_pendientes = SubidasPendientes()
+
+
+async def recibir_imagen(request: Request, email: str) -> str:
+    """
+    Recibe la imagen de una petición multipart/form-data por bloques y la deja pendiente.
+
+    Args:
+        request (Request): Petición con la imagen en el campo CAMPO_SUBIDA_IMAGEN
+        email (str): Email del usuario que la sube
+
+    Returns:
+        str: Token de la subida (ver SubidasPendientes.tomar)
+
+    Raises:
+        SubidaRechazada: Si la petición no es multipart, la imagen es muy grande o no es JPEG, PNG o WebP
+    """
+    tipo_contenido, opciones = parse_options_header(request.headers.get("content-type", ""))
+    if tipo_contenido != b"multipart/form-data" or not opciones.get(b"boundary"):
+        raise SubidaRechazada("La imagen debe enviarse como multipart/form-data", "FORMATO_SUBIDA_NO_VALIDO")
+
+    # Si el cliente declara un cuerpo demasiado grande se rechaza sin leerlo
+    longitud = request.headers.get("content-length", "")
+    if longitud.isdigit() and int(longitud) > TAMAÑO_MAXIMO_IMAGEN + MARGEN_CUERPO_MULTIPART:
+        raise SubidaRechazada(f"La imagen es muy grande. Tamaño máximo: {TAMAÑO_MAXIMO_IMAGEN // (1024*1024)}MB",
+                              "IMAGEN_TAMANIO_EXCEDIDO", HTTP_PAYLOAD_TOO_LARGE)
+
+    receptor = ReceptorImagen(opciones[b"boundary"])
+    try:
+        async for bloque in request.stream():
+            receptor.recibir(bloque)
+            if receptor.hay_pendiente:
+                await ejecutar_en_hilo(receptor.volcar)
+        ruta, tipo_mime, tamano = await ejecutar_en_hilo(receptor.terminar)
+    except SubidaRechazada:
+        await ejecutar_en_hilo(receptor.descartar)
+        raise
+    except ValueError as e:
+        # Errores de formato de python-multipart (MultipartParseError hereda de ValueError)
+        await ejecutar_en_hilo(receptor.descartar)
+        raise SubidaRechazada(f"El cuerpo multipart no es válido: {e}", "FORMATO_SUBIDA_NO_VALIDO")
+    except BaseException:
+        # Conexión cortada o cancelación: no dejar el temporal a medias
+        await ejecutar_en_hilo(receptor.descartar)
+        raise
+
+    print(f"{LOG_INFO} Imagen subida por partes ({tipo_mime}, {tamano} bytes) por {email}")
+    return subidas_pendientes.registrar(ruta, tipo_mime, email)
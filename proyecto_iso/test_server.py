@@ -683,4 +683,1258 @@ def test_critical_functionality_coverage():
         elif feature == "logout_redirect": 
             assert "/?logout=true" in content, f"Redirección de logout faltante en {feature}"
         elif feature == "url_parameter_handling":
-            assert "URLSearchParams" in content, f"Manejo de URL params faltante en {feature}"
\ No newline at end of file
+            assert "URLSearchParams" in content, f"Manejo de URL params faltante en {feature}"
+
+# =============================================================================
+# TESTS UNITARIOS - REPOSITORIO DE RECETAS EN MEMORIA
+# =============================================================================
+
+def test_repositorio_recetas_sirve_desde_memoria():
+    """Test que verifica que el repositorio no vuelve a parsear el archivo si no cambia."""
+    import json
+    from repositorio_recetas import RepositorioRecetas
+    from almacenamiento import AlmacenamientoJSON
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "recetas.json")
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump([{"nombreReceta": "Tortilla", "usuario": "a@example.com"}], f)
+
+        repositorio = RepositorioRecetas(AlmacenamientoJSON(ruta))
+        primera = repositorio.obtener_recetas()
+        segunda = repositorio.obtener_recetas()
+
+        assert primera is segunda
+        assert primera[0]["nombreReceta"] == "Tortilla"
+
+def test_repositorio_recetas_recarga_si_cambia_el_archivo():
+    """Test que verifica que un cambio externo en el archivo invalida la caché."""
+    import json
+    from repositorio_recetas import RepositorioRecetas
+    from almacenamiento import AlmacenamientoJSON
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "recetas.json")
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump([{"nombreReceta": "Tortilla"}], f)
+
+        repositorio = RepositorioRecetas(AlmacenamientoJSON(ruta))
+        assert len(repositorio.obtener_recetas()) == 1
+
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump([{"nombreReceta": "Tortilla"}, {"nombreReceta": "Gazpacho"}], f)
+
+        assert len(repositorio.obtener_recetas()) == 2
+
+def test_repositorio_recetas_copia_editable_no_altera_la_cache():
+    """Test que verifica que modificar la copia no cambia la caché hasta guardar."""
+    import json
+    from repositorio_recetas import RepositorioRecetas
+    from almacenamiento import AlmacenamientoJSON
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "recetas.json")
+        repositorio = RepositorioRecetas(AlmacenamientoJSON(ruta))
+        assert repositorio.guardar_recetas([{"nombreReceta": "Tortilla", "usuariosGuardado": []}])
+
+        copia = repositorio.copiar_recetas()
+        copia[0]["usuariosGuardado"].append("b@example.com")
+        assert repositorio.obtener_recetas()[0]["usuariosGuardado"] == []
+
+        assert repositorio.guardar_recetas(copia)
+        assert repositorio.obtener_recetas()[0]["usuariosGuardado"] == ["b@example.com"]
+        with open(ruta, encoding="utf-8") as f:
+            assert json.load(f)[0]["usuariosGuardado"] == ["b@example.com"]
+
+
+# =============================================================================
+# TESTS UNITARIOS - REGISTRO DE CAMBIOS DE RECETAS
+# =============================================================================
+
+def test_registro_recetas_solo_anade_cambios_y_se_recupera():
+    """Test que verifica que los cambios se añaden al registro sin reescribir la instantánea."""
+    import json
+    from repositorio_recetas import RepositorioRecetas
+    from almacenamiento import AlmacenamientoRegistro
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "recetas.json")
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump([{"nombreReceta": "Tortilla", "usuariosGuardado": []}], f)
+        instantanea_original = open(ruta, "rb").read()
+
+        repositorio = RepositorioRecetas(AlmacenamientoRegistro(ruta))
+        recetas = repositorio.copiar_recetas()
+        recetas[0]["usuariosGuardado"].append("b@example.com")
+        recetas.append({"nombreReceta": "Gazpacho", "usuariosGuardado": []})
+        assert repositorio.guardar_recetas(recetas)
+
+        assert open(ruta, "rb").read() == instantanea_original
+        with open(ruta + ".log", encoding="utf-8") as f:
+            assert len(f.read().splitlines()) == 3  # cabecera + 2 cambios
+
+        # Un proceso nuevo reconstruye el estado a partir de instantánea + registro
+        recuperado = RepositorioRecetas(AlmacenamientoRegistro(ruta)).obtener_recetas()
+        assert recuperado == recetas
+
+def test_registro_recetas_ignora_linea_incompleta():
+    """Test que verifica que una escritura interrumpida no corrompe el resto del registro."""
+    import json
+    from repositorio_recetas import RepositorioRecetas
+    from almacenamiento import AlmacenamientoRegistro
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "recetas.json")
+        repositorio = RepositorioRecetas(AlmacenamientoRegistro(ruta))
+        repositorio.obtener_recetas()
+        assert repositorio.guardar_recetas([{"nombreReceta": "Tortilla"}])
+        assert repositorio.guardar_recetas([{"nombreReceta": "Tortilla"}, {"nombreReceta": "Gazpacho"}])
+
+        with open(ruta + ".log", "a", encoding="utf-8") as f:
+            f.write('{"op": "insertar", "pos": 2, "rece')
+
+        nuevo = RepositorioRecetas(AlmacenamientoRegistro(ruta))
+        assert [r["nombreReceta"] for r in nuevo.obtener_recetas()] == ["Tortilla", "Gazpacho"]
+        assert nuevo.guardar_recetas(nuevo.copiar_recetas() + [{"nombreReceta": "Paella"}])
+
+        final = RepositorioRecetas(AlmacenamientoRegistro(ruta)).obtener_recetas()
+        assert [r["nombreReceta"] for r in final] == ["Tortilla", "Gazpacho", "Paella"]
+
+def test_registro_recetas_recorta_ultima_linea_sin_salto():
+    """Test que verifica que un último cambio sin salto de línea se descarta y no se pega al siguiente."""
+    from repositorio_recetas import RepositorioRecetas
+    from almacenamiento import AlmacenamientoRegistro
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "recetas.json")
+        repositorio = RepositorioRecetas(AlmacenamientoRegistro(ruta))
+        repositorio.obtener_recetas()
+        assert repositorio.guardar_recetas([{"nombreReceta": "a"}])
+        assert repositorio.guardar_recetas([{"nombreReceta": "a"}, {"nombreReceta": "b"}])
+
+        # Caída justo antes de escribir el salto de línea del último cambio
+        with open(ruta + ".log", "rb+") as f:
+            f.truncate(os.path.getsize(ruta + ".log") - 1)
+
+        nuevo = RepositorioRecetas(AlmacenamientoRegistro(ruta))
+        assert [r["nombreReceta"] for r in nuevo.obtener_recetas()] == ["a"]
+        assert nuevo.guardar_recetas(nuevo.copiar_recetas() + [{"nombreReceta": "c"}])
+
+        final = RepositorioRecetas(AlmacenamientoRegistro(ruta)).obtener_recetas()
+        assert [r["nombreReceta"] for r in final] == ["a", "c"]
+
+def test_registro_recetas_compacta_en_instantanea():
+    """Test que verifica que la compactación integra el registro en recetas.json."""
+    import json
+    from almacenamiento import AlmacenamientoRegistro
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "recetas.json")
+        almacenamiento = AlmacenamientoRegistro(ruta, umbral_compactacion=2)
+        almacenamiento.cargar()
+        almacenamiento.guardar([{"nombreReceta": "Tortilla"}], [{"op": "insertar", "pos": 0, "receta": {"nombreReceta": "Tortilla"}}])
+        almacenamiento.guardar([{"nombreReceta": "Tortilla"}, {"nombreReceta": "Gazpacho"}], [{"op": "insertar", "pos": 1, "receta": {"nombreReceta": "Gazpacho"}}])
+        assert almacenamiento.necesita_compactar()
+
+        almacenamiento.compactar([{"nombreReceta": "Tortilla"}, {"nombreReceta": "Gazpacho"}])
+
+        with open(ruta, encoding="utf-8") as f:
+            assert len(json.load(f)) == 2
+        with open(ruta + ".log", encoding="utf-8") as f:
+            assert len(f.read().splitlines()) == 1
+        assert len(AlmacenamientoRegistro(ruta).cargar()) == 2
+
+def test_escritura_atomica_concurrente_no_comparte_temporal():
+    """Test que verifica que escrituras simultáneas del mismo archivo no se pisan el temporal."""
+    from concurrent.futures import ThreadPoolExecutor
+    from almacenamiento import escribir_atomico
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "cuentas.json")
+        contenidos = [str(i).encode() * 10000 for i in range(10)]
+        with ThreadPoolExecutor(max_workers=10) as ejecutor:
+            list(ejecutor.map(lambda contenido: escribir_atomico(ruta, contenido), contenidos * 5))
+
+        assert open(ruta, "rb").read() in contenidos
+        assert os.listdir(directorio) == ["cuentas.json"]
+
+# =============================================================================
+# TESTS UNITARIOS - BACKEND SQLITE
+# =============================================================================
+
+def test_sqlite_recetas_se_guardan_por_fila():
+    """Test que verifica que el repositorio aplica los cambios fila a fila y se recupera igual."""
+    from repositorio_recetas import RepositorioRecetas
+    from base_datos import BaseDatosSQLite, AlmacenamientoSQLite
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "saborea.db")
+        base_datos = BaseDatosSQLite(ruta, importar_json=False)
+        repositorio = RepositorioRecetas(AlmacenamientoSQLite(base_datos))
+        repositorio.obtener_recetas()
+
+        recetas = [
+            {"nombreReceta": "Tortilla", "usuario": "a@example.com", "publicada": True, "duracion": 20,
+             "usuariosGuardado": ["b@example.com"], "comentarios": [], "campoNuevo": {"x": 1}},
+            {"nombreReceta": "Gazpacho", "usuario": "b@example.com", "usuariosGuardado": [],
+             "valoraciones": [{"usuario": "a@example.com", "puntuacion": 4}]},
+        ]
+        assert repositorio.guardar_recetas(recetas)
+
+        recetas = repositorio.copiar_recetas()
+        recetas.insert(1, {"nombreReceta": "Paella", "usuariosGuardado": []})
+        recetas[0]["comentarios"].append({"usuario": "b@example.com", "texto": "Rica", "fecha": "2025-01-01"})
+        del recetas[2]
+        assert repositorio.guardar_recetas(recetas)
+
+        recuperado = RepositorioRecetas(AlmacenamientoSQLite(base_datos)).obtener_recetas()
+        assert recuperado == recetas
+        base_datos.cerrar()
+
+def test_sqlite_cuentas_y_menus_semanales():
+    """Test que verifica el guardado de cuentas y menús semanales en SQLite."""
+    from base_datos import BaseDatosSQLite
+
+    with tempfile.TemporaryDirectory() as directorio:
+        base_datos = BaseDatosSQLite(os.path.join(directorio, "saborea.db"), importar_json=False)
+        cuentas = [{"nombreUsuario": "ana", "email": "a@example.com", "password": "x", "valoracion": 0}]
+        menus = {"a@example.com": {"lunes": {"desayuno": "Tortilla", "cena": None}}}
+
+        base_datos.guardar_cuentas(cuentas)
+        base_datos.guardar_menus_semanales(menus)
+
+        assert base_datos.cargar_cuentas() == cuentas
+        assert base_datos.cargar_menus_semanales() == menus
+        base_datos.cerrar()
+
+def test_sqlite_cuentas_y_menus_se_escriben_por_fila():
+    """Test que verifica que guardar una cuenta o un menú solo toca sus filas y se consulta por email."""
+    from base_datos import BaseDatosSQLite
+
+    with tempfile.TemporaryDirectory() as directorio:
+        base_datos = BaseDatosSQLite(os.path.join(directorio, "saborea.db"), importar_json=False)
+        base_datos.guardar_cuentas([{"email": f"u{i}@example.com", "password": "x"} for i in range(50)])
+        base_datos.guardar_menus_semanales({"u1@example.com": {"lunes": {"desayuno": "Tortilla", "cena": None}}})
+
+        cambios = base_datos._conexion.total_changes
+        base_datos.guardar_cuenta("U7@example.com", {"email": "u7@example.com", "password": "y", "valoracion": 4})
+        base_datos.guardar_menu_semanal("u1@example.com", {"lunes": {"desayuno": "Gazpacho"}})
+        # Una fila de cuenta actualizada; en el menú, una comida actualizada y otra borrada
+        assert base_datos._conexion.total_changes - cambios == 3
+
+        assert base_datos.cargar_cuenta("u7@EXAMPLE.com") == {"email": "u7@example.com", "password": "y", "valoracion": 4}
+        assert base_datos.cargar_cuenta("nadie@example.com") is None
+        assert base_datos.cargar_menu_semanal("u1@example.com") == {"lunes": {"desayuno": "Gazpacho"}}
+        base_datos.guardar_menu_semanal("u1@example.com", None)
+        assert base_datos.cargar_menu_semanal("u1@example.com") is None
+        base_datos.cerrar()
+
+def test_sqlite_crea_indices_de_consulta():
+    """Test que verifica que el esquema incluye índices para los campos consultados."""
+    from base_datos import BaseDatosSQLite
+
+    with tempfile.TemporaryDirectory() as directorio:
+        base_datos = BaseDatosSQLite(os.path.join(directorio, "saborea.db"), importar_json=False)
+        indices = {fila[0] for fila in base_datos._conexion.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {"idx_recetas_orden", "idx_guardadas_email", "idx_cuentas_email"} <= indices
+        base_datos.cerrar()
+
+# =============================================================================
+# TESTS UNITARIOS - ÍNDICES DE RECETAS
+# =============================================================================
+
+def test_indices_recetas_se_actualizan_al_escribir():
+    """Test que verifica que los índices por nombre y autor siguen a altas, ediciones y bajas."""
+    from repositorio_recetas import RepositorioRecetas, copiar_receta
+    from almacenamiento import AlmacenamientoJSON
+
+    with tempfile.TemporaryDirectory() as directorio:
+        repositorio = RepositorioRecetas(AlmacenamientoJSON(os.path.join(directorio, "recetas.json")))
+        assert repositorio.anadir_receta({"nombreReceta": "Tortilla", "usuario": "A@example.com"})
+        assert repositorio.anadir_receta({"nombreReceta": "Gazpacho", "usuario": "b@example.com"})
+
+        tortilla = repositorio.buscar_receta("Tortilla", "a@example.com")
+        assert tortilla is not None
+        assert repositorio.buscar_receta("Tortilla", "b@example.com") is None
+
+        # Renombrar: el nombre antiguo deja de encontrarse
+        renombrada = copiar_receta(tortilla)
+        renombrada["nombreReceta"] = "Tortilla de patatas"
+        assert repositorio.reemplazar_receta(tortilla, renombrada)
+        assert repositorio.buscar_receta("Tortilla") is None
+        assert repositorio.recetas_con_nombre(" tortilla DE patatas ") == [renombrada]
+        assert [r["nombreReceta"] for r in repositorio.obtener_recetas()] == ["Tortilla de patatas", "Gazpacho"]
+
+        # La receta ya sustituida no se puede volver a editar
+        assert not repositorio.reemplazar_receta(tortilla, renombrada)
+
+        assert repositorio.eliminar_receta(repositorio.buscar_receta("Gazpacho"))
+        assert repositorio.recetas_de_autor("b@example.com") == []
+        assert repositorio.recetas_de_autor("a@example.com") == [renombrada]
+
+def test_indices_recetas_no_alteran_la_instantanea_anterior():
+    """Test que verifica que un lector con los índices anteriores no ve cambios a medias."""
+    from repositorio_recetas import RepositorioRecetas
+    from almacenamiento import AlmacenamientoJSON
+
+    with tempfile.TemporaryDirectory() as directorio:
+        repositorio = RepositorioRecetas(AlmacenamientoJSON(os.path.join(directorio, "recetas.json")))
+        assert repositorio.guardar_recetas([{"nombreReceta": "Tortilla", "usuario": "a@example.com"}])
+        indices_anteriores = repositorio.obtener_indices()
+
+        assert repositorio.anadir_receta({"nombreReceta": "Paella", "usuario": "a@example.com"})
+
+        assert len(indices_anteriores.por_autor["a@example.com"]) == 1
+        assert len(repositorio.recetas_de_autor("a@example.com")) == 2
+
+def test_indice_inverso_de_recetas_guardadas():
+    """Test que verifica el índice usuario → recetas guardadas al guardar, desguardar, renombrar y eliminar."""
+    from repositorio_recetas import RepositorioRecetas, copiar_receta
+    from almacenamiento import AlmacenamientoJSON
+
+    with tempfile.TemporaryDirectory() as directorio:
+        repositorio = RepositorioRecetas(AlmacenamientoJSON(os.path.join(directorio, "recetas.json")))
+        assert repositorio.anadir_receta({"nombreReceta": "Tortilla", "usuario": "a@example.com", "usuariosGuardado": []})
+        assert repositorio.anadir_receta({"nombreReceta": "Gazpacho", "usuario": "a@example.com", "usuariosGuardado": ["b@example.com"]})
+        assert [r["nombreReceta"] for r in repositorio.recetas_guardadas_por("b@example.com")] == ["Gazpacho"]
+
+        tortilla = repositorio.buscar_receta("Tortilla")
+        guardada = copiar_receta(tortilla)
+        guardada["usuariosGuardado"].append("b@example.com")
+        assert repositorio.reemplazar_receta(tortilla, guardada)
+        assert repositorio.esta_guardada_por(repositorio.buscar_receta("Tortilla"), "b@example.com")
+        assert len(repositorio.recetas_guardadas_por("b@example.com")) == 2
+
+        # Renombrar vacía la lista de guardados, como hace la edición con cambio de nombre
+        gazpacho = repositorio.buscar_receta("Gazpacho")
+        renombrada = copiar_receta(gazpacho)
+        renombrada.update({"nombreReceta": "Gazpacho andaluz", "usuariosGuardado": []})
+        assert repositorio.reemplazar_receta(gazpacho, renombrada)
+        assert [r["nombreReceta"] for r in repositorio.recetas_guardadas_por("b@example.com")] == ["Tortilla"]
+
+        assert repositorio.eliminar_receta(repositorio.buscar_receta("Tortilla"))
+        assert repositorio.recetas_guardadas_por("b@example.com") == []
+
+def test_lote_recetas_localiza_por_identidad():
+    """Test que verifica que el lote distingue recetas con el mismo contenido por identidad."""
+    from repositorio_recetas import RepositorioRecetas, copiar_receta
+    from almacenamiento import AlmacenamientoJSON
+
+    with tempfile.TemporaryDirectory() as directorio:
+        repositorio = RepositorioRecetas(AlmacenamientoJSON(os.path.join(directorio, "recetas.json")))
+        assert repositorio.guardar_recetas([{"nombreReceta": "Tortilla", "orden": 1}, {"nombreReceta": "Gazpacho"},
+                                            {"nombreReceta": "Tortilla", "orden": 1}])
+        primera, _, segunda = repositorio.obtener_recetas()
+
+        editada = copiar_receta(segunda)
+        editada["orden"] = 2
+        assert repositorio.reemplazar_receta(segunda, editada)
+        assert [r.get("orden") for r in repositorio.obtener_recetas()] == [1, None, 2]
+
+        # Una copia con el mismo contenido no es una receta del repositorio
+        assert not repositorio.eliminar_receta(copiar_receta(primera))
+        assert repositorio.eliminar_receta(primera)
+        assert [r.get("orden") for r in repositorio.obtener_recetas()] == [None, 2]
+
+def test_lote_recetas_no_aplica_parte_de_una_operacion_fallida():
+    """Test que verifica que si un cambio de una operación falla no se aplica ni se guarda ninguno de los anteriores."""
+    import pytest
+    from repositorio_recetas import RepositorioRecetas, copiar_receta
+    from almacenamiento import AlmacenamientoJSON, leer_json
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "recetas.json")
+        repositorio = RepositorioRecetas(AlmacenamientoJSON(ruta))
+        assert repositorio.guardar_recetas([{"nombreReceta": "Tortilla"}, {"nombreReceta": "Gazpacho"}])
+        tortilla, gazpacho = repositorio.obtener_recetas()
+        assert repositorio.eliminar_receta(gazpacho)
+
+        def editar_y_borrar(lote):
+            lote.reemplazar(tortilla, {**copiar_receta(tortilla), "dificultad": "Facil"})
+            lote.anadir({"nombreReceta": "Paella"})
+            lote.eliminar(gazpacho)
+
+        def editar_y_cambio_fuera_de_rango(lote):
+            lote.reemplazar(tortilla, {**copiar_receta(tortilla), "dificultad": "Facil"})
+            lote.aplicar_cambios([{"op": "eliminar", "pos": 5}])
+
+        for operacion in (editar_y_borrar, editar_y_cambio_fuera_de_rango):
+            with pytest.raises((ValueError, IndexError)):
+                repositorio.ejecutar(operacion)
+            assert repositorio.obtener_recetas() == [tortilla]
+            assert leer_json(ruta) == [tortilla]
+
+# =============================================================================
+# TESTS UNITARIOS - E/S FUERA DEL BUCLE DE EVENTOS
+# =============================================================================
+
+def test_ejecutar_en_hilo_no_bloquea_el_bucle():
+    """Test que verifica que una operación bloqueante no impide atender otras tareas."""
+    import asyncio
+    import threading
+    import time
+    from utils import ejecutar_en_hilo
+
+    def escritura_lenta():
+        time.sleep(0.2)
+        return threading.current_thread().name
+
+    async def escenario():
+        inicio = time.monotonic()
+        tarea = asyncio.ensure_future(ejecutar_en_hilo(escritura_lenta))
+        await asyncio.sleep(0.01)
+        atendida_en = time.monotonic() - inicio
+        return atendida_en, await tarea
+
+    atendida_en, hilo = asyncio.run(escenario())
+    assert atendida_en < 0.15
+    assert hilo.startswith("almacenamiento")
+
+def test_escrituras_concurrentes_de_cuentas_y_menus_no_se_pierden(tmp_path, monkeypatch):
+    """Test que verifica que los guardados simultáneos en el pool no se pisan entre sí."""
+    import asyncio
+    import utils
+
+    from datos_usuarios import AlmacenPorEmail, DocumentoCuentasJSON, DocumentoMenusJSON
+
+    monkeypatch.setattr(utils, "almacen_cuentas", AlmacenPorEmail(
+        "cuentas", DocumentoCuentasJSON(str(tmp_path / "cuentas.json")), lambda emails: None))
+    monkeypatch.setattr(utils, "almacen_menus", AlmacenPorEmail(
+        "menús semanales", DocumentoMenusJSON(str(tmp_path / "menus.json")), lambda emails: None))
+    utils.guardar_cuentas([{"email": "yo@x.es", "password": "x"}])
+
+    async def escenario():
+        await asyncio.gather(
+            *(utils.ejecutar_en_hilo(utils.guardar_menu_semanal, f"u{i}@x.es", {"lunes": {"cena": "Tortilla"}})
+              for i in range(40)),
+            *(utils.ejecutar_en_hilo(utils.actualizar_cuenta, "yo@x.es", {f"campo{i}": i}) for i in range(20))
+        )
+
+    asyncio.run(escenario())
+    assert len(utils.cargar_menus_semanales()) == 40
+    assert all(utils.obtener_cuenta_por_email("yo@x.es")[f"campo{i}"] == i for i in range(20))
+
+# =============================================================================
+# TESTS UNITARIOS - ESCRITURAS AGRUPADAS
+# =============================================================================
+
+def test_escrituras_concurrentes_se_agrupan_sin_perder_cambios():
+    """Test que verifica que muchas escrituras simultáneas se guardan en pocos lotes y ninguna se pierde."""
+    import time
+    import threading
+    from repositorio_recetas import RepositorioRecetas, copiar_receta
+    from almacenamiento import AlmacenamientoJSON
+
+    class AlmacenamientoLento(AlmacenamientoJSON):
+        guardados = 0
+
+        def guardar(self, recetas, cambios=None):
+            time.sleep(0.02)
+            AlmacenamientoLento.guardados += 1
+            super().guardar(recetas, cambios)
+
+    with tempfile.TemporaryDirectory() as directorio:
+        repositorio = RepositorioRecetas(AlmacenamientoLento(os.path.join(directorio, "recetas.json")))
+        assert repositorio.anadir_receta({"nombreReceta": "Tortilla", "usuariosGuardado": []})
+        AlmacenamientoLento.guardados = 0
+
+        def guardar_para(email):
+            def operacion(lote):
+                receta = lote.buscar_receta("Tortilla")
+                actualizada = copiar_receta(receta)
+                actualizada["usuariosGuardado"].append(email)
+                lote.reemplazar(receta, actualizada)
+                return True
+            assert repositorio.ejecutar(operacion)
+
+        hilos = [threading.Thread(target=guardar_para, args=(f"u{i}@example.com",)) for i in range(30)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        assert len(repositorio.buscar_receta("Tortilla")["usuariosGuardado"]) == 30
+        assert AlmacenamientoLento.guardados < 30
+        recargado = RepositorioRecetas(AlmacenamientoJSON(os.path.join(directorio, "recetas.json")))
+        assert len(recargado.obtener_recetas()[0]["usuariosGuardado"]) == 30
+
+def test_operacion_fallida_no_afecta_al_resto_del_lote():
+    """Test que verifica que una operación que lanza excepción se descarta sin afectar a las demás."""
+    import pytest
+    from repositorio_recetas import RepositorioRecetas
+    from almacenamiento import AlmacenamientoJSON
+
+    with tempfile.TemporaryDirectory() as directorio:
+        repositorio = RepositorioRecetas(AlmacenamientoJSON(os.path.join(directorio, "recetas.json")))
+
+        def fallida(lote):
+            lote.anadir({"nombreReceta": "Fantasma"})
+            raise ValueError("operación inválida")
+
+        futuro_fallido = repositorio.enviar(fallida)
+        assert repositorio.anadir_receta({"nombreReceta": "Gazpacho"})
+        with pytest.raises(ValueError):
+            futuro_fallido.result()
+        assert [r["nombreReceta"] for r in repositorio.obtener_recetas()] == ["Gazpacho"]
+
+def test_escrituras_de_usuarios_se_agrupan_y_aplican_en_orden(tmp_path):
+    """Test que verifica que las escrituras simultáneas de menús se guardan en pocos lotes sin pisarse."""
+    import time
+    import threading
+    from datos_usuarios import AlmacenPorEmail, DocumentoMenusJSON
+    from almacenamiento import leer_json
+
+    guardados = []
+
+    class DocumentoLento(DocumentoMenusJSON):
+        def guardar(self, vista, cambios):
+            guardados.append(dict(cambios))
+            time.sleep(0.02)
+            super().guardar(vista, cambios)
+
+    cambiados = []
+    almacen = AlmacenPorEmail("menús semanales", DocumentoLento(str(tmp_path / "menus.json")), cambiados.extend)
+
+    def anadir_comida(i):
+        def operacion(lote):
+            menu = lote.leer("Yo@x.es") or {}
+            menu.setdefault("lunes", {})[f"turno{i}"] = f"Receta {i}"
+            lote.escribir("yo@x.es", menu)
+            return i
+        return operacion
+
+    def fallida(lote):
+        lote.escribir("otro@x.es", {"lunes": {}})
+        raise ValueError("falla")
+
+    hilos = [threading.Thread(target=almacen.ejecutar, args=(anadir_comida(i),)) for i in range(30)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    import pytest
+    with pytest.raises(ValueError):
+        almacen.ejecutar(fallida)
+
+    assert len(leer_json(str(tmp_path / "menus.json"))["yo@x.es"]["lunes"]) == 30
+    assert almacen.leer("otro@x.es") is None
+    assert len(guardados) < 30
+    assert set(cambiados) == {"yo@x.es"}
+
+# =============================================================================
+# TESTS UNITARIOS - FORMATO DE LOS ARCHIVOS DE DATOS
+# =============================================================================
+
+def test_formato_compacto_se_lee_igual_que_el_legible():
+    """Test que verifica que ambos formatos (con y sin orjson) producen los mismos datos al leerlos."""
+    import json
+    import almacenamiento
+    from almacenamiento import serializar_json, deserializar_json
+
+    datos = [{"nombreReceta": "Paella valenciana", "ingredientes": ["arroz", "azafrán"], "comentarios": []}]
+    orjson_original = almacenamiento.orjson
+    try:
+        for modulo in {orjson_original, None}:
+            almacenamiento.orjson = modulo
+            legible = serializar_json(datos, "legible")
+            compacto = serializar_json(datos, "compacto")
+            assert legible == json.dumps(datos, ensure_ascii=False, indent=2).encode("utf-8")
+            assert len(compacto) < len(legible)
+            assert b" " not in compacto.replace(b"Paella valenciana", b"")
+            assert deserializar_json(legible) == deserializar_json(compacto) == datos
+    finally:
+        almacenamiento.orjson = orjson_original
+
+def test_migracion_de_formato_integra_el_registro():
+    """Test que verifica que un archivo legible con registro pendiente se migra a compacto sin perder cambios."""
+    from almacenamiento import AlmacenamientoRegistro, leer_json
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "recetas.json")
+        almacenamiento_registro = AlmacenamientoRegistro(ruta)
+        almacenamiento_registro.guardar([{"nombreReceta": "Tortilla"}])
+        almacenamiento_registro.guardar(
+            [{"nombreReceta": "Tortilla"}, {"nombreReceta": "Gazpacho"}],
+            [{"op": "insertar", "pos": 1, "receta": {"nombreReceta": "Gazpacho"}}],
+        )
+
+        import tools.migrar_formato_datos as migrar_formato_datos
+        rutas = {"RUTA_CUENTAS_JSON": os.path.join(directorio, "cuentas.json"),
+                 "RUTA_RECETAS_JSON": ruta,
+                 "RUTA_MENUS_SEMANALES_JSON": os.path.join(directorio, "menus.json"),
+                 "RUTA_REGISTRO_RECETAS": almacenamiento_registro.ruta_registro}
+        originales = {clave: getattr(migrar_formato_datos, clave) for clave in rutas}
+        try:
+            for clave, valor in rutas.items():
+                setattr(migrar_formato_datos, clave, valor)
+            migrar_formato_datos.migrar("compacto")
+        finally:
+            for clave, valor in originales.items():
+                setattr(migrar_formato_datos, clave, valor)
+
+        assert not os.path.exists(almacenamiento_registro.ruta_registro)
+        with open(ruta, "rb") as archivo:
+            assert b"\n" not in archivo.read()
+        assert [r["nombreReceta"] for r in leer_json(ruta)] == ["Tortilla", "Gazpacho"]
+
+# =============================================================================
+# TESTS UNITARIOS - ALMACÉN DE COMENTARIOS
+# =============================================================================
+
+def test_almacen_comentarios_pagina_y_recupera_linea_incompleta():
+    """Test que verifica la paginación (más recientes primero), los totales y el recorte de una línea a medias."""
+    from comentarios import AlmacenComentarios
+
+    with tempfile.TemporaryDirectory() as directorio:
+        almacen = AlmacenComentarios(directorio)
+        assert almacen.contar("abc123") == 0
+        assert almacen.anadir("abc123", [{"usuario": "a@x.es", "texto": f"c{i}"} for i in range(5)]) == 5
+
+        assert [c["texto"] for c in almacen.listar("abc123", 2)] == ["c4", "c3"]
+        assert [c["texto"] for c in almacen.listar("abc123", 2, 4)] == ["c0"]
+        assert almacen.listar("abc123", 2, 10) == []
+
+        # Caída a mitad de escritura: la línea incompleta se descarta al volver a leer
+        with open(os.path.join(directorio, "abc123.jsonl"), "ab") as archivo:
+            archivo.write(b'{"usuario": "b@x')
+        assert almacen.contar("abc123") == 5
+        assert almacen.anadir("abc123", [{"usuario": "b@x.es", "texto": "c5"}]) == 6
+        assert AlmacenComentarios(directorio).contar_varios(["abc123", "otra"]) == {"abc123": 6, "otra": 0}
+
+        import pytest
+        with pytest.raises(ValueError):
+            almacen.contar("../cuentas")
+
+def test_migracion_de_comentarios_y_nuevo_comentario_sin_reescribir_recetas(monkeypatch):
+    """Test que verifica que los comentarios antiguos pasan al almacén y que comentar no reescribe recetas.json."""
+    import utils
+    from repositorio_recetas import RepositorioRecetas
+    from almacenamiento import AlmacenamientoJSON, escribir_json
+    from comentarios import AlmacenComentarios
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "recetas.json")
+        escribir_json(ruta, [{"nombreReceta": "Tortilla", "usuario": "a@x.es",
+                              "comentarios": [{"usuario": "b@x.es", "texto": "Rica", "fecha": "2025-01-01"}]}])
+        monkeypatch.setattr(utils, "repositorio_recetas", RepositorioRecetas(AlmacenamientoJSON(ruta)))
+        monkeypatch.setattr(utils, "almacen_comentarios", AlmacenComentarios(os.path.join(directorio, "comentarios")))
+
+        assert utils.migrar_recetas() == 1
+        assert utils.migrar_recetas() == 0
+        receta = utils.buscar_receta("Tortilla")
+        assert receta.get("id") and "comentarios" not in receta
+
+        firma = os.stat(ruta).st_mtime_ns
+        resultado = utils.anadir_comentario_receta("Tortilla", "c@x.es", "Buenísima")
+        assert resultado["totalComentarios"] == 2
+        assert os.stat(ruta).st_mtime_ns == firma
+
+        comentarios, total = utils.listar_comentarios_receta(receta, limite=1)
+        assert total == 2 and comentarios[0]["texto"] == "Buenísima"
+        assert utils.copiar_para_listado([receta])[0]["totalComentarios"] == 2
+
+# =============================================================================
+# TESTS UNITARIOS - VALORACIONES AGREGADAS
+# =============================================================================
+
+def test_resumen_de_valoraciones_se_mantiene_al_valorar_y_editar(monkeypatch):
+    """Test que verifica que suma, total e histograma se actualizan al añadir y cambiar valoraciones y sobreviven a una edición."""
+    import utils
+    from repositorio_recetas import RepositorioRecetas
+    from almacenamiento import AlmacenamientoJSON, escribir_json
+    from comentarios import AlmacenComentarios
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "recetas.json")
+        escribir_json(ruta, [{"nombreReceta": "Tortilla", "usuario": "a@x.es",
+                              "valoraciones": [{"usuario": "b@x.es", "puntuacion": 4}]}])
+        monkeypatch.setattr(utils, "repositorio_recetas", RepositorioRecetas(AlmacenamientoJSON(ruta)))
+        monkeypatch.setattr(utils, "almacen_comentarios", AlmacenComentarios(os.path.join(directorio, "comentarios")))
+
+        # Receta antigua: el resumen se calcula a partir de la lista
+        assert utils.valoracion_media(utils.buscar_receta("Tortilla")) == 4.0
+        assert utils.registrar_valoracion_receta("Tortilla", "c@x.es", 5)["accion"] == "añadida"
+        assert utils.migrar_recetas() == 1
+        resultado = utils.registrar_valoracion_receta("Tortilla", "b@x.es", 2)
+        assert resultado["accion"] == "actualizada"
+        assert resultado["totalValoraciones"] == 2 and resultado["valoracionMedia"] == 3.5
+
+        receta = utils.buscar_receta("Tortilla")
+        assert receta["valoraciones"] == {"b@x.es": 2, "c@x.es": 5}
+        assert receta["resumenValoraciones"] == {"suma": 7, "total": 2, "histograma": [0, 1, 0, 0, 1]}
+
+        # Editar la receta (el formulario envía valoraciones vacías) conserva id y valoraciones
+        utils.editar_receta_usuario("Tortilla", "a@x.es", {"nombreReceta": "Tortilla", "valoraciones": [], "comentarios": []})
+        editada = utils.buscar_receta("Tortilla")
+        assert editada["id"] == receta["id"]
+        assert editada["resumenValoraciones"]["total"] == 2
+        assert "comentarios" not in editada
+
+        copia = utils.copiar_para_listado([editada])[0]
+        assert "valoraciones" not in copia and copia["valoracionMedia"] == 3.5 and copia["totalValoraciones"] == 2
+
+# =============================================================================
+# TESTS UNITARIOS - IDS ESTABLES DE RECETAS
+# =============================================================================
+
+def test_id_estable_no_cambia_al_eliminar_y_acepta_formatos_antiguos(monkeypatch):
+    """Test que verifica que el id estable sobrevive a borrados y que los IDs antiguos se siguen resolviendo."""
+    import utils
+    from repositorio_recetas import RepositorioRecetas
+    from almacenamiento import AlmacenamientoJSON
+
+    with tempfile.TemporaryDirectory() as directorio:
+        repositorio = RepositorioRecetas(AlmacenamientoJSON(os.path.join(directorio, "recetas.json")))
+        monkeypatch.setattr(utils, "repositorio_recetas", repositorio)
+        assert utils.guardar_nueva_receta({"nombreReceta": "Tortilla"}, "a@x.es")
+        assert utils.guardar_nueva_receta({"nombreReceta": "Gazpacho"}, "b@x.es")
+        id_gazpacho = utils.buscar_receta("Gazpacho")["id"]
+
+        assert utils.resolver_id_receta("receta-1")["id"] == id_gazpacho
+        assert utils.resolver_id_receta(utils.generar_id_receta("Gazpacho"))["id"] == id_gazpacho
+
+        # Al borrar la primera receta cambia la posición pero no el id
+        assert utils.eliminar_receta_usuario("Tortilla", "a@x.es") is not None
+        assert utils.resolver_id_receta(id_gazpacho)["nombreReceta"] == "Gazpacho"
+        assert utils.resolver_id_receta("receta-1") is None
+        assert utils.resolver_id_receta("no-existe") is None
+        assert [r["id"] for r in utils.copiar_para_listado(repositorio.obtener_recetas())] == [id_gazpacho]
+
+# =============================================================================
+# TESTS UNITARIOS - PAGINACIÓN DE LA COMUNIDAD
+# =============================================================================
+
+def test_pagina_recetas_comunidad_recorre_todo_con_cursor(monkeypatch):
+    """Test que verifica que el cursor recorre las recetas publicadas de otros sin repetir ni saltar recetas."""
+    import utils
+    from repositorio_recetas import RepositorioRecetas
+    from almacenamiento import AlmacenamientoJSON
+
+    with tempfile.TemporaryDirectory() as directorio:
+        repositorio = RepositorioRecetas(AlmacenamientoJSON(os.path.join(directorio, "recetas.json")))
+        monkeypatch.setattr(utils, "repositorio_recetas", repositorio)
+        def publicar(nombre, autor):
+            assert utils.guardar_nueva_receta({"nombreReceta": nombre}, autor)
+            assert utils.publicar_receta_usuario(utils.buscar_receta(nombre)["id"], autor)
+
+        for i, nombre in enumerate(["Paella", "Fabada", "Gazpacho", "Cocido", "Tortilla"]):
+            publicar(nombre, "yo@x.es" if nombre == "Cocido" else f"autor{i}@x.es")
+        assert utils.guardar_nueva_receta({"nombreReceta": "Borrador"}, "otro@x.es")
+
+        pagina, cursor, total = utils.pagina_recetas_comunidad("yo@x.es", 2)
+        assert [r["nombreReceta"] for r in pagina] == ["Fabada", "Gazpacho"]
+        assert total == 4
+
+        # Una receta publicada antes del cursor no desplaza la página siguiente
+        publicar("Arroz", "autor9@x.es")
+        pagina, cursor, _ = utils.pagina_recetas_comunidad("yo@x.es", 2, cursor)
+        assert [r["nombreReceta"] for r in pagina] == ["Paella", "Tortilla"]
+        assert cursor is None
+
+        import pytest
+        with pytest.raises(ValueError):
+            utils.pagina_recetas_comunidad("yo@x.es", 2, "no-es-un-cursor")
+
+# =============================================================================
+# TESTS UNITARIOS - BÚSQUEDA DE RECETAS
+# =============================================================================
+
+def test_indice_busqueda_aplica_los_filtros_como_el_navegador():
+    """Test que verifica los filtros indexados: ingredientes parciales, alérgenos excluidos, valores exactos y duración."""
+    from busqueda_recetas import IndiceBusqueda
+
+    recetas = [
+        {"nombreReceta": "Pollo asado", "ingredientes": "Pollo, patatas", "alergenos": "", "dificultad": "Media", "duracion": 90},
+        {"nombreReceta": "Pollito frito", "ingredientes": "pollito, harina", "alergenos": "Glúten", "dificultad": "Facil", "duracion": 30},
+        {"nombreReceta": "Ensalada", "ingredientes": "Lechuga, tomate", "alergenos": "", "dificultad": "Facil", "duracion": "10"},
+    ]
+    indice = IndiceBusqueda(recetas)
+
+    def nombres(filtros):
+        return [r["nombreReceta"] for r in indice.buscar(filtros)]
+
+    assert nombres({"ingredientes": ["POLL"]}) == ["Pollo asado", "Pollito frito"]
+    assert nombres({"ingredientes": ["pollo, pat"]}) == ["Pollo asado"]
+    assert nombres({"ingredientes": ["poll"], "alergenos": ["GLÚ"]}) == ["Pollo asado"]
+    assert nombres({"dificultad": "Facil", "duracion": 30}) == ["Pollito frito", "Ensalada"]
+    assert nombres({"duracion": 20}) == ["Ensalada"]
+    assert nombres({"paisOrigen": "España"}) == []
+
+def test_indice_busqueda_se_actualiza_al_editar_y_borrar():
+    """Test que verifica que los índices de filtrado siguen las recetas añadidas, editadas y borradas sin tocar el original."""
+    from busqueda_recetas import IndiceBusqueda
+
+    tortilla = {"nombreReceta": "Tortilla", "ingredientes": "huevo, patata", "alergenos": "Huevo", "duracion": 30}
+    gazpacho = {"nombreReceta": "Gazpacho", "ingredientes": "tomate, pepino", "alergenos": "", "duracion": 10}
+    original = IndiceBusqueda([tortilla, gazpacho])
+    indice = original.copiar()
+
+    def nombres(indice, filtros):
+        return [r["nombreReceta"] for r in indice.buscar(filtros)]
+
+    editada = {**tortilla, "ingredientes": "huevo, cebolla", "duracion": 45}
+    indice.sustituir(tortilla, editada)
+    indice.quitar(gazpacho)
+    indice.agregar({"nombreReceta": "Salmorejo", "ingredientes": "tomate, pan", "alergenos": "Gluten", "duracion": 15})
+
+    assert nombres(indice, {"ingredientes": ["patat"]}) == []
+    assert nombres(indice, {"ingredientes": ["ebol"]}) == ["Tortilla"]
+    assert nombres(indice, {"ingredientes": ["toma"]}) == ["Salmorejo"]
+    assert nombres(indice, {"duracion": 40}) == ["Salmorejo"]
+    assert nombres(indice, {"alergenos": ["huevo"]}) == ["Salmorejo"]
+    assert nombres(indice, {}) == ["Tortilla", "Salmorejo"]
+    assert nombres(original, {"ingredientes": ["patat"], "duracion": 30}) == ["Tortilla"]
+    assert nombres(original, {"ingredientes": ["pepi"]}) == ["Gazpacho"]
+
+# =============================================================================
+# TESTS UNITARIOS - BÚSQUEDA DE TEXTO
+# =============================================================================
+
+def test_busqueda_texto_ignora_tildes_y_ordena_por_relevancia():
+    """Test que verifica que la búsqueda de texto ignora tildes y palabras vacías y pone primero las coincidencias en el nombre."""
+    from busqueda_texto import IndiceTexto
+
+    recetas = [
+        {"id": "a", "nombreReceta": "Paella", "ingredientes": "arroz, gambas, azafrán", "descripcion": ""},
+        {"id": "b", "nombreReceta": "Arroz con leche", "ingredientes": "arroz, leche", "descripcion": "Postre"},
+        {"id": "c", "nombreReceta": "Gazpacho", "ingredientes": "tomate", "descripcion": "Sin arroz"},
+    ]
+    indice = IndiceTexto.construir(recetas)
+
+    def ids(consulta, **opciones):
+        resultados, _ = indice.buscar(consulta, 10, **opciones)
+        return [receta["id"] for _, receta in resultados]
+
+    assert ids("AZAFRAN") == ["a"]
+    assert ids("arroz") == ["b", "a", "c"]
+    assert ids("arroz con gambas") == ["a"]
+    assert ids("con de la") == []
+    assert ids("arroz", admitir=lambda receta: receta["id"] != "b") == ["a", "c"]
+    assert indice.buscar("arroz", 1, contar=True)[1] == 3
+
+
+def test_busqueda_texto_se_actualiza_al_editar_y_borrar(monkeypatch):
+    """Test que verifica que el índice de texto del repositorio sigue las recetas creadas, editadas y borradas."""
+    import utils
+    from repositorio_recetas import RepositorioRecetas
+    from almacenamiento import AlmacenamientoJSON
+
+    with tempfile.TemporaryDirectory() as directorio:
+        repositorio = RepositorioRecetas(AlmacenamientoJSON(os.path.join(directorio, "recetas.json")))
+        monkeypatch.setattr(utils, "repositorio_recetas", repositorio)
+        assert utils.guardar_nueva_receta({"nombreReceta": "Tortilla", "ingredientes": "huevo, patata"}, "yo@x.es")
+
+        def nombres(consulta):
+            pagina, _, _ = utils.buscar_recetas("yo@x.es", {"q": consulta}, ambito="mias")
+            return [receta["nombreReceta"] for receta in pagina]
+
+        assert nombres("patata") == ["Tortilla"]
+        assert utils.editar_receta_usuario("Tortilla", "yo@x.es", {"nombreReceta": "Tortilla", "ingredientes": "huevo, cebolla"})
+        assert nombres("patata") == []
+        assert nombres("cebolla") == ["Tortilla"]
+        assert utils.eliminar_receta_usuario("Tortilla", "yo@x.es") is not None
+        assert nombres("huevo") == []
+
+# =============================================================================
+# TESTS UNITARIOS - ALÉRGENOS
+# =============================================================================
+
+def test_alergenos_se_normalizan_y_se_excluyen_con_mascaras():
+    """Test que verifica la normalización de alérgenos al vocabulario fijo y su exclusión por máscara."""
+    from alergenos import normalizar_alergenos, nombres_alergenos
+    from busqueda_recetas import IndiceBusqueda
+
+    texto, mascara = normalizar_alergenos("marisco, Glúten, huevos, picante, Picante")
+    assert texto == "Gluten, Crustáceos, Huevo, Moluscos, picante"
+    assert nombres_alergenos(mascara) == ["Gluten", "Crustáceos", "Huevo", "Moluscos"]
+
+    recetas = [
+        {"nombreReceta": "Paella", "alergenos": "Marisco"},
+        {"nombreReceta": "Tortilla", "alergenos": "Huevo", "mascaraAlergenos": normalizar_alergenos("Huevo")[1]},
+        {"nombreReceta": "Curry", "alergenos": "Picante"},
+        {"nombreReceta": "Ensalada", "alergenos": ""},
+    ]
+    indice = IndiceBusqueda(recetas)
+
+    def nombres(alergenos):
+        return [r["nombreReceta"] for r in indice.buscar({"alergenos": alergenos})]
+
+    assert nombres(["molusco"]) == ["Tortilla", "Curry", "Ensalada"]
+    assert nombres(["HUE", "gamba"]) == ["Curry", "Ensalada"]
+    assert nombres(["pica"]) == ["Paella", "Tortilla", "Ensalada"]
+
+# =============================================================================
+# TESTS UNITARIOS - CAMPOS DE LOS LISTADOS
+# =============================================================================
+
+def test_listados_devuelven_resumen_o_los_campos_pedidos():
+    """Test que verifica que los listados llevan el resumen por defecto y solo los campos pedidos con fields=."""
+    import utils
+    import pytest
+
+    receta = {"id": "abc", "nombreReceta": "Tortilla", "ingredientes": "huevo, patata", "pasosAseguir": "Batir...",
+              "duracion": 30, "usuariosGuardado": ["b@x.es"], "valoraciones": {"b@x.es": 4},
+              "resumenValoraciones": {"suma": 4, "total": 1, "histograma": [0, 0, 0, 1, 0]}}
+
+    resumen = utils.copiar_para_listado([receta])[0]
+    assert set(resumen) <= set(CAMPOS_RESUMEN_RECETA)
+    assert resumen["nombreReceta"] == "Tortilla" and resumen["valoracionMedia"] == 4.0
+    assert "ingredientes" not in resumen and "usuariosGuardado" not in resumen
+
+    campos = utils.campos_listado("nombreReceta, ingredientes")
+    assert utils.copiar_para_listado([receta], campos) == [{"id": "abc", "nombreReceta": "Tortilla", "ingredientes": "huevo, patata"}]
+    assert utils.campos_listado("") is None
+    with pytest.raises(ValueError):
+        utils.campos_listado("nombreReceta,usuariosGuardado")
+
+# =============================================================================
+# TESTS UNITARIOS - ETAGS
+# =============================================================================
+
+def test_detalle_receta_responde_304_hasta_que_cambia(monkeypatch):
+    """Test que verifica que If-None-Match con la ETag actual da 304 y que un cambio en la receta genera otra ETag."""
+    import utils
+    import server
+    from repositorio_recetas import RepositorioRecetas
+    from almacenamiento import AlmacenamientoJSON
+
+    with tempfile.TemporaryDirectory() as directorio:
+        repositorio = RepositorioRecetas(AlmacenamientoJSON(os.path.join(directorio, "recetas.json")))
+        monkeypatch.setattr(utils, "repositorio_recetas", repositorio)
+        monkeypatch.setattr(server, "repositorio_recetas", repositorio)
+        assert utils.guardar_nueva_receta({"nombreReceta": "Tortilla"}, "yo@x.es")
+        id_receta = utils.buscar_receta("Tortilla")["id"]
+
+        cliente = TestClient(app, cookies={COOKIE_ESTADO_USUARIO: ESTADO_REGISTRADO, COOKIE_EMAIL_USUARIO: "yo@x.es"})
+        respuesta = cliente.get(f"/api/receta/{id_receta}")
+        etag = respuesta.headers["ETag"]
+        assert respuesta.status_code == HTTP_OK
+        assert respuesta.headers["Cache-Control"] == "private, no-cache"
+
+        no_modificada = cliente.get(f"/api/receta/{id_receta}", headers={"If-None-Match": f'"otra", W/{etag}'})
+        assert no_modificada.status_code == HTTP_NOT_MODIFIED
+        assert no_modificada.content == b"" and no_modificada.headers["ETag"] == etag
+
+        assert utils.publicar_receta_usuario(id_receta, "yo@x.es")
+        respuesta = cliente.get(f"/api/receta/{id_receta}", headers={"If-None-Match": etag})
+        assert respuesta.status_code == HTTP_OK
+        assert respuesta.json()["receta"]["publicada"] is True
+        assert respuesta.headers["ETag"] != etag
+
+# =============================================================================
+# TESTS UNITARIOS - CACHÉ DE ARCHIVOS ESTÁTICOS
+# =============================================================================
+
+def test_version_de_un_modulo_cambia_con_sus_imports():
+    """Test que verifica que los imports se versionan y que cambiar un módulo cambia la URL de quien lo importa."""
+    import time
+    from recursos_estaticos import RecursosEstaticos
+
+    with tempfile.TemporaryDirectory() as directorio:
+        os.makedirs(os.path.join(directorio, "js", "utils"))
+        with open(os.path.join(directorio, "js", "utils", "a.js"), "w") as archivo:
+            archivo.write("export const A = 1;\n")
+        with open(os.path.join(directorio, "js", "main.js"), "w") as archivo:
+            archivo.write('import { A } from "./utils/a.js";\nimport { B } from "https://cdn.example/b.js";\n')
+        recursos = RecursosEstaticos(directorio, "/static")
+
+        recurso = recursos.recurso("/static/js/main.js")
+        contenido, version = recurso.contenido, recurso.version
+        version_a = recursos.version("/static/js/utils/a.js")
+        assert f'from "/static/js/utils/a.js?v={version_a}"'.encode() in contenido
+        assert b'from "https://cdn.example/b.js"' in contenido
+
+        time.sleep(0.01)
+        with open(os.path.join(directorio, "js", "utils", "a.js"), "w") as archivo:
+            archivo.write("export const A = 2;\n")
+        assert recursos.version("/static/js/utils/a.js") != version_a
+        assert recursos.version("/static/js/main.js") != version
+
+
+def test_recursos_versionados_se_sirven_como_inmutables():
+    """Test que verifica que la página enlaza el CSS con su versión y que solo esa URL es inmutable."""
+    import re
+    respuesta = client.get("/")
+    url_css = re.search(r'href="(/static/saborea\.css\?v=[0-9a-f]+)"', respuesta.text).group(1)
+    assert respuesta.headers["Cache-Control"] == CACHE_CONTROL_SIN_CACHE
+    assert client.get(url_css).headers["Cache-Control"] == CACHE_CONTROL_INMUTABLE
+    assert client.get("/static/saborea.css").headers["Cache-Control"] == CACHE_CONTROL_REVALIDAR
+
+
+def test_archivo_de_texto_sin_contenido_servido_se_lee_del_disco():
+    """Test que verifica que si no hay contenido servido para un archivo de texto se envía el del disco."""
+    from fastapi import FastAPI
+    from recursos_estaticos import RecursosEstaticos, ArchivosEstaticos
+
+    class RecursosSinRespuesta(RecursosEstaticos):
+        def respuesta(self, url, headers=None):
+            return None
+
+    with tempfile.TemporaryDirectory() as directorio:
+        with open(os.path.join(directorio, "main.js"), "w") as archivo:
+            archivo.write("export const A = 1;\n")
+        aplicacion = FastAPI()
+        aplicacion.mount("/static", ArchivosEstaticos(
+            directory=directorio, recursos=RecursosSinRespuesta(directorio, "/static")), name="static")
+
+        respuesta = TestClient(aplicacion).get("/static/main.js")
+        assert respuesta.status_code == HTTP_OK
+        assert respuesta.text == "export const A = 1;\n"
+        assert respuesta.headers["Cache-Control"] == CACHE_CONTROL_REVALIDAR
+
+# =============================================================================
+# TESTS UNITARIOS - COMPRESIÓN
+# =============================================================================
+
+def test_respuestas_se_comprimen_segun_accept_encoding():
+    """Test que verifica la negociación de la codificación y que las páginas y el CSS llegan comprimidos."""
+    import gzip
+    from compresion import elegir_codificacion
+
+    assert elegir_codificacion("gzip, deflate") == "gzip"
+    assert elegir_codificacion("gzip;q=0, identity") is None
+    assert elegir_codificacion("") is None
+
+    for url in ["/", "/static/saborea.css"]:
+        sin_comprimir = client.get(url, headers={"Accept-Encoding": "identity"})
+        respuesta = client.get(url, headers={"Accept-Encoding": "gzip"})
+        assert "Content-Encoding" not in sin_comprimir.headers
+        assert respuesta.headers["Content-Encoding"] == "gzip"
+        assert "Accept-Encoding" in respuesta.headers["Vary"]
+        assert int(respuesta.headers["Content-Length"]) < len(sin_comprimir.content) * 0.5
+        assert respuesta.content == sin_comprimir.content  # el cliente ya la descomprime
+
+# =============================================================================
+# TESTS UNITARIOS - VARIANTES DE IMÁGENES
+# =============================================================================
+
+def test_imagen_se_guarda_en_todas_sus_variantes(tmp_path, monkeypatch):
+    """Test que verifica que una imagen subida se guarda en cada variante y que los listados llevan sus URLs."""
+    import utils
+
+    variantes_falsas = {nombre: nombre.encode() for nombre in VARIANTES_IMAGEN}
+    monkeypatch.setattr(utils, "DIRECTORIO_IMAGENES_CONTENIDO", str(tmp_path))
+    monkeypatch.setattr(utils, "generar_variantes", lambda imagen_bytes: variantes_falsas)
+    fotos = utils.guardar_imagen_con_variantes(b"imagen", "image/png")
+
+    assert set(fotos) == set(VARIANTES_IMAGEN)
+    for nombre, url in fotos.items():
+        assert url.startswith(URL_IMAGENES_CONTENIDO) and url.endswith(f"_{nombre}.webp")
+        assert (tmp_path / url[len(URL_IMAGENES_CONTENIDO) + 1:]).read_bytes() == nombre.encode()
+
+    # Sin Pillow se guarda la original y todas las variantes apuntan a ella
+    monkeypatch.setattr(utils, "generar_variantes", lambda imagen_bytes: None)
+    fotos = utils.guardar_imagen_con_variantes(b"otra imagen", "image/png")
+    assert len(set(fotos.values())) == 1 and fotos["tarjeta"].endswith(".png")
+
+    receta = {"id": "abc", "nombreReceta": "Tortilla", "fotoReceta": fotos["completa"], "fotosReceta": fotos}
+    assert utils.copiar_para_listado([receta])[0]["fotoReceta"] == fotos["tarjeta"]
+    assert utils.copiar_para_listado([receta], ["fotosReceta"])[0]["fotosReceta"] == fotos
+
+def test_variantes_se_reducen_y_no_conservan_el_exif():
+    """Test que verifica el tamaño de cada variante, la orientación del EXIF y que no queda EXIF (requiere Pillow)."""
+    import io
+    import pytest
+    Image = pytest.importorskip("PIL.Image")
+    from imagenes import generar_variantes
+
+    exif = Image.Exif()
+    exif[0x0110] = "Modelo de cámara"
+    # Orientación 6: la foto se ve girada 90°, así que las variantes quedan en vertical
+    exif[0x0112] = 6
+    salida = io.BytesIO()
+    Image.new("RGB", (2400, 1200), "red").save(salida, "JPEG", exif=exif)
+
+    variantes = generar_variantes(salida.getvalue())
+    assert set(variantes) == set(VARIANTES_IMAGEN)
+    for nombre, contenido in variantes.items():
+        lado_maximo = VARIANTES_IMAGEN[nombre][0]
+        with Image.open(io.BytesIO(contenido)) as variante:
+            assert variante.format == "WEBP"
+            assert variante.size == (lado_maximo // 2, lado_maximo)
+            assert "exif" not in variante.info and not variante.getexif()
+
+    with pytest.raises(ValueError):
+        generar_variantes(b"no es una imagen")
+
+# =============================================================================
+# TESTS UNITARIOS - SUBIDA DE IMÁGENES POR PARTES
+# =============================================================================
+
+def test_subida_por_partes_devuelve_token_y_valida_tipo_y_tamano(tmp_path, monkeypatch):
+    """Test que verifica la subida multipart: tipo por magic bytes, límite de tamaño y uso único del token."""
+    import os
+    import utils
+    from subidas import subidas_pendientes
+
+    cliente = TestClient(app, cookies={COOKIE_ESTADO_USUARIO: ESTADO_REGISTRADO, COOKIE_EMAIL_USUARIO: "yo@x.es"})
+    png = b"\x89PNG\r\n\x1a\n" + b"\x00" * 4096
+
+    # El tipo se reconoce por el contenido, no por el Content-Type declarado
+    respuesta = cliente.post("/api/subir-imagen", files={CAMPO_SUBIDA_IMAGEN: ("foto.gif", png, "image/gif")})
+    assert respuesta.status_code == HTTP_OK
+    token = respuesta.json()["tokenSubida"]
+
+    falsa = cliente.post("/api/subir-imagen", files={CAMPO_SUBIDA_IMAGEN: ("foto.png", b"GIF89a" + b"\x00" * 64, "image/png")})
+    assert falsa.status_code == HTTP_BAD_REQUEST and falsa.json()["codigo_error"] == "TIPO_IMAGEN_NO_PERMITIDO"
+
+    grande = b"\xff\xd8\xff" + b"\x00" * TAMAÑO_MAXIMO_IMAGEN
+    respuesta = cliente.post("/api/subir-imagen", files={CAMPO_SUBIDA_IMAGEN: ("foto.jpg", grande, "image/jpeg")})
+    assert respuesta.status_code == HTTP_PAYLOAD_TOO_LARGE
+
+    # El token solo vale para quien subió la imagen y una sola vez
+    assert subidas_pendientes.tomar(token, "otro@x.es") is None
+    subida = subidas_pendientes.tomar(token, "yo@x.es")
+    assert subida.tipo_mime == "image/png" and subidas_pendientes.tomar(token, "yo@x.es") is None
+
+    # Las variantes se generan desde el archivo temporal, que no se queda en disco
+    monkeypatch.setattr(utils, "DIRECTORIO_IMAGENES_CONTENIDO", str(tmp_path))
+    monkeypatch.setattr(utils, "generar_variantes", lambda imagen: None)
+    fotos = utils.guardar_imagen_con_variantes(subida.ruta, subida.tipo_mime)
+    assert (tmp_path / fotos["completa"][len(URL_IMAGENES_CONTENIDO) + 1:]).read_bytes() == png
+    assert not os.path.exists(subida.ruta)
+
+# =============================================================================
+# TESTS UNITARIOS - ALMACÉN DE IMÁGENES POR CONTENIDO
+# =============================================================================
+
+def test_imagenes_iguales_se_guardan_una_vez_y_se_borran_sin_referencias(tmp_path, monkeypatch):
+    """Test que verifica la deduplicación por hash y que solo se borran las imágenes que no usa nadie."""
+    import time
+    import hashlib
+    import utils
+
+    generadas = []
+    def generar_variantes(imagen):
+        generadas.append(imagen)
+        return {nombre: imagen + nombre.encode() for nombre in VARIANTES_IMAGEN}
+
+    monkeypatch.setattr(utils, "DIRECTORIO_UPLOADS", str(tmp_path))
+    monkeypatch.setattr(utils, "DIRECTORIO_IMAGENES_CONTENIDO", str(tmp_path / "imagenes"))
+    monkeypatch.setattr(utils, "generar_variantes", generar_variantes)
+
+    fotos = utils.guardar_imagen_con_variantes(b"foto", "image/jpeg")
+    assert utils.guardar_imagen_con_variantes(b"foto", "image/jpeg") == fotos
+    assert len(generadas) == 1
+    resumen = hashlib.sha256(b"foto").hexdigest()
+    assert fotos["tarjeta"] == f"{URL_IMAGENES_CONTENIDO}/{resumen[:2]}/{resumen[2:4]}/{resumen}_tarjeta.webp"
+
+    # Una receta y una cuenta usan la misma foto: se borra cuando ya no la usa ninguna
+    from repositorio_recetas import RepositorioRecetas
+    from almacenamiento import AlmacenamientoJSON
+    repositorio = RepositorioRecetas(AlmacenamientoJSON(str(tmp_path / "recetas.json")))
+    repositorio.guardar_recetas([{"nombreReceta": "Tortilla", "fotoReceta": fotos["completa"], "fotosReceta": fotos}])
+    monkeypatch.setattr(utils, "repositorio_recetas", repositorio)
+    monkeypatch.setattr(utils, "cargar_cuentas", lambda: [{"email": "yo@x.es", "fotosPerfil": fotos}])
+
+    assert utils.contar_referencias_imagenes([fotos["miniatura"]]) == {fotos["miniatura"]: 2}
+    monkeypatch.setattr(utils, "cargar_cuentas", lambda: [{"email": "yo@x.es"}])
+    assert utils.liberar_imagenes(fotos.values()) == 0
+    assert os.path.exists(utils.ruta_local_upload(fotos["tarjeta"]))
+
+    # Sin referencias, los archivos recientes (una subida en curso) se dejan al recolector
+    repositorio.guardar_recetas([])
+    assert utils.contar_referencias_imagenes([fotos["miniatura"]]) == {fotos["miniatura"]: 0}
+    assert utils.liberar_imagenes(fotos.values()) == 0
+    antiguo = time.time() - 2 * GRACIA_RECOLECTOR_SEGUNDOS
+    for url in fotos.values():
+        os.utime(utils.ruta_local_upload(url), (antiguo, antiguo))
+    assert utils.liberar_imagenes(fotos.values()) == len(VARIANTES_IMAGEN)
+    assert not os.path.exists(utils.ruta_local_upload(fotos["tarjeta"]))
+    assert utils.ruta_local_upload("/static/uploads/../server.py") is None
+
+# =============================================================================
+# TESTS UNITARIOS - RECOLECTOR DE IMÁGENES HUÉRFANAS
+# =============================================================================
+
+def test_recolector_retira_solo_imagenes_huerfanas_antiguas(tmp_path, monkeypatch):
+    """Test que verifica que el recolector conserva las imágenes en uso y las recientes y pone en cuarentena el resto."""
+    import time
+    import recolector_imagenes
+    from recolector_imagenes import RecolectorImagenes
+
+    uploads = tmp_path / "uploads"
+    antiguo = time.time() - 2 * GRACIA_RECOLECTOR_SEGUNDOS
+    for nombre in ["recetas/usada.jpg", "perfiles/usada.webp", "imagenes/ab/cd/huerfana_tarjeta.webp", "reciente.png"]:
+        ruta = uploads / nombre
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        ruta.write_bytes(b"x" * 100)
+        if nombre != "reciente.png":
+            os.utime(ruta, (antiguo, antiguo))
+
+    class RepositorioFalso:
+        def obtener_recetas(self):
+            return [{"nombreReceta": "Tortilla", "fotoReceta": f"{URL_UPLOADS}/recetas/usada.jpg"}]
+    monkeypatch.setattr(recolector_imagenes, "repositorio_recetas", RepositorioFalso())
+    monkeypatch.setattr(recolector_imagenes, "cargar_cuentas",
+                        lambda: [{"email": "yo@x.es", "fotosPerfil": {"miniatura": f"{URL_UPLOADS}/perfiles/usada.webp"}}])
+
+    recolector = RecolectorImagenes(str(uploads), str(tmp_path / "cuarentena"), modo="cuarentena", lote=1, pausa=0)
+    resultado = recolector.recolectar()
+
+    assert resultado.revisados == 4 and resultado.retirados == 1 and resultado.bytes_recuperados == 100
+    assert (uploads / "recetas/usada.jpg").exists() and (uploads / "reciente.png").exists()
+    assert not (uploads / "imagenes/ab/cd/huerfana_tarjeta.webp").exists()
+    assert (tmp_path / "cuarentena/imagenes/ab/cd/huerfana_tarjeta.webp").exists()
+
+# =============================================================================
+# TESTS UNITARIOS - IMÁGENES EN BASE64
+# =============================================================================
+
+def test_imagen_base64_se_decodifica_por_bloques_y_rechaza_sin_decodificar(tmp_path, monkeypatch):
+    """Test que verifica la decodificación a disco de las data URL y el rechazo temprano por tamaño y tipo."""
+    import base64
+    import utils
+
+    monkeypatch.setattr(utils, "DIRECTORIO_IMAGENES_CONTENIDO", str(tmp_path))
+    monkeypatch.setattr(utils, "generar_variantes", lambda imagen: None)
+
+    # Varios bloques de decodificación: el archivo guardado es la imagen original
+    jpeg = b"\xff\xd8\xff\xe0" + bytes(range(256)) * 1000
+    exito, fotos = utils.guardar_imagen_base64("data:image/jpeg;base64," + base64.b64encode(jpeg).decode(), "yo@x.es")
+    assert exito and (tmp_path / fotos["completa"][len(URL_IMAGENES_CONTENIDO) + 1:]).read_bytes() == jpeg
+
+    # Demasiado grande: se rechaza por la longitud, sin decodificar
+    llamadas = []
+    monkeypatch.setattr(base64, "b64decode", lambda *args, **kwargs: llamadas.append(args))
+    grande = "data:image/png;base64," + "A" * ((TAMAÑO_MAXIMO_IMAGEN // 3 + 1) * 4)
+    exito, mensaje = utils.guardar_imagen_base64(grande, "yo@x.es")
+    assert not exito and "muy grande" in mensaje and llamadas == []
+    monkeypatch.undo()
+
+    # El tipo se comprueba con la cabecera de la imagen, no con el prefijo
+    falsa = "data:image/png;base64," + base64.b64encode(b"GIF89a" + b"\x00" * 64).decode()
+    assert utils.validar_base64_imagen(falsa) == (False, "El archivo no es una imagen JPEG, PNG o WebP")
+
+# =============================================================================
+# TESTS UNITARIOS - RESUMEN DE RECETAS
+# =============================================================================
+
+def test_resumen_recetas_agrupa_valoraciones_y_comentarios(monkeypatch):
+    """Test que verifica el resumen de valoraciones y comentarios de varias recetas en una sola petición."""
+    import utils
+    from comentarios import almacen_comentarios
+
+    recetas = {
+        "r1": {"id": "r1", "valoraciones": {"yo@x.es": 4, "otro@x.es": 5}},
+        "r2": {"id": "r2", "valoraciones": [{"usuario": "otro@x.es", "puntuacion": 2}],
+               "comentarios": [{"texto": "a"}, {"texto": "b"}]},
+    }
+    monkeypatch.setattr(utils.repositorio_recetas, "receta_por_id", lambda receta_id: recetas.get(receta_id))
+    monkeypatch.setattr(almacen_comentarios, "contar_varios", lambda ids: {receta_id: 3 for receta_id in ids})
+
+    resumenes = utils.resumen_interacciones_recetas(["r1", "r2", "no-existe"], "yo@x.es")
+    assert resumenes == {
+        "r1": {"valoracionMedia": 4.5, "totalValoraciones": 2, "valoracionUsuario": 4, "totalComentarios": 3},
+        "r2": {"valoracionMedia": 2.0, "totalValoraciones": 1, "valoracionUsuario": None, "totalComentarios": 2},
+    }
+
+    cliente = TestClient(app, cookies={COOKIE_ESTADO_USUARIO: ESTADO_REGISTRADO, COOKIE_EMAIL_USUARIO: "yo@x.es"})
+    assert cliente.get("/api/resumen-recetas?ids=").json()["codigo_error"] == "IDS_REQUERIDOS"
+    demasiados = ",".join(f"r{i}" for i in range(MAX_IDS_RESUMEN_RECETAS + 1))
+    assert cliente.get(f"/api/resumen-recetas?ids={demasiados}").json()["codigo_error"] == "DEMASIADOS_IDS"
+    respuesta = cliente.get("/api/resumen-recetas?ids=r1,r1,r2")
+    assert respuesta.json()["resumenes"] == resumenes
+    assert cliente.get("/api/resumen-recetas?ids=r1,r1,r2",
+                       headers={"If-None-Match": respuesta.headers["etag"]}).status_code == 304
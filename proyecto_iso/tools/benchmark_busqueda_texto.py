@@ -0,0 +1,85 @@
+"""
+Mide la construcción, las actualizaciones y las consultas del índice de texto libre.
+
+Escala las recetas de `datos/recetas.json` hasta el número indicado. Para que el
+vocabulario no sea solo el de las recetas de ejemplo, cada copia añade a sus
+ingredientes un par de palabras inventadas con frecuencias de tipo Zipf (unas
+pocas muy comunes y muchas raras). No modifica `datos/`.
+
+Uso:
+    python tools/benchmark_busqueda_texto.py [numero_recetas] [repeticiones]
+"""
+import os
+import sys
+import json
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import *
+from almacenamiento import leer_json
+from busqueda_texto import IndiceTexto
+
+CONSULTAS = ["sal", "azafran", "arroz gambas", "huevo patata cebolla", "ingrediente7", "ingrediente4321", "inexistente"]
+
+
+def generar_recetas(numero: int) -> list:
+    """Escala las recetas de ejemplo hasta `numero` recetas con vocabulario variado."""
+    base = leer_json(RUTA_RECETAS_JSON, [])
+    if not base:
+        raise SystemExit(f"{LOG_ERROR} No hay recetas en {RUTA_RECETAS_JSON}")
+    aleatorio = random.Random(0)
+    recetas = []
+    for i in range(numero):
+        receta = json.loads(json.dumps(base[i % len(base)]))
+        receta["id"] = f"r{i}"
+        receta["nombreReceta"] = f"{receta.get('nombreReceta', 'Receta')} {i}"
+        extras = [f"ingrediente{int(aleatorio.paretovariate(1.0))}" for _ in range(2)]
+        receta["ingredientes"] = f"{receta.get('ingredientes', '')}, {', '.join(extras)}"
+        receta["publicada"] = i % 2 == 0
+        recetas.append(receta)
+    return recetas
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Devuelve el mejor tiempo (en ms) de `repeticiones` ejecuciones."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000
+
+
+def ejecutar(numero: int, repeticiones: int) -> None:
+    recetas = generar_recetas(numero)
+    print(f"{LOG_INFO} {numero} recetas, mejor de {repeticiones} repeticiones")
+
+    inicio = time.perf_counter()
+    indice = IndiceTexto.construir(recetas)
+    print(f"construir: {(time.perf_counter() - inicio) * 1000:.0f} ms, {len(indice.terminos)} términos")
+
+    # Solo recetas publicadas (la mitad), como en la búsqueda de la comunidad
+    admitir = lambda receta: receta.get("publicada", False) == True and receta.get("usuario", "") != "yo@x.es"
+    print(f"{'consulta':<24} {'coinciden':>10} {'top 20 (ms)':>12} {'página 5 (ms)':>14} {'con total (ms)':>15}")
+    for consulta in CONSULTAS:
+        _, total = indice.buscar(consulta, 20, admitir=admitir, contar=True)
+        primera = medir(lambda: indice.buscar(consulta, 21, admitir=admitir), repeticiones)
+        quinta = medir(lambda: indice.buscar(consulta, 101, admitir=admitir), repeticiones)
+        con_total = medir(lambda: indice.buscar(consulta, 21, admitir=admitir, contar=True), repeticiones)
+        total = "-" if total is None else total  # sin contar: demasiadas recetas con el término
+        print(f"{consulta:<24} {total:>10} {primera:>12.2f} {quinta:>14.2f} {con_total:>15.2f}")
+
+    # Una escritura: copiar el índice publicado y editar una receta
+    def editar():
+        copia = indice.copiar()
+        nueva = dict(recetas[0], descripcion="Arroz meloso con azafrán y gambas")
+        copia.sustituir(recetas[0], nueva)
+    print(f"copiar + editar una receta: {medir(editar, repeticiones):.1f} ms")
+
+
+if __name__ == "__main__":
+    numero = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    ejecutar(numero, repeticiones)
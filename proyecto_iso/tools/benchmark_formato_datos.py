@@ -0,0 +1,71 @@
+"""
+Mide carga y guardado de recetas.json en cada formato y serializador.
+
+Replica las recetas de `datos/recetas.json` hasta el número indicado (con nombres
+distintos) y trabaja sobre un directorio temporal; no modifica `datos/`.
+
+Uso:
+    python tools/benchmark_formato_datos.py [numero_recetas] [repeticiones]
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import almacenamiento
+from constants import *
+from almacenamiento import leer_json, escribir_atomico, serializar_json, deserializar_json
+
+
+def generar_recetas(numero: int) -> list:
+    """Escala las recetas de ejemplo hasta `numero` recetas."""
+    base = leer_json(RUTA_RECETAS_JSON, [])
+    if not base:
+        raise SystemExit(f"{LOG_ERROR} No hay recetas en {RUTA_RECETAS_JSON}")
+    recetas = []
+    for i in range(numero):
+        receta = json.loads(json.dumps(base[i % len(base)]))
+        receta["nombre"] = f"{receta.get('nombre', 'Receta')} {i}"
+        recetas.append(receta)
+    return recetas
+
+
+def medir(funcion, repeticiones: int) -> float:
+    """Devuelve el mejor tiempo (en ms) de `repeticiones` ejecuciones."""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1000
+
+
+def ejecutar(numero: int, repeticiones: int) -> None:
+    recetas = generar_recetas(numero)
+    orjson_disponible = almacenamiento.orjson is not None
+    serializadores = [("json", None)] + ([("orjson", almacenamiento.orjson)] if orjson_disponible else [])
+
+    print(f"{LOG_INFO} {numero} recetas, mejor de {repeticiones} repeticiones")
+    print(f"{'formato':<10} {'librería':<8} {'tamaño':>12} {'guardar (ms)':>13} {'cargar (ms)':>12}")
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "recetas.json")
+        for formato in ("legible", "compacto"):
+            for nombre, modulo in serializadores:
+                almacenamiento.orjson = modulo
+                tiempo_guardar = medir(lambda: escribir_atomico(ruta, serializar_json(recetas, formato)), repeticiones)
+                tiempo_cargar = medir(lambda: leer_json(ruta), repeticiones)
+                assert deserializar_json(serializar_json(recetas, formato)) == recetas
+                print(f"{formato:<10} {nombre:<8} {os.path.getsize(ruta):>12} {tiempo_guardar:>13.1f} {tiempo_cargar:>12.1f}")
+    almacenamiento.orjson = serializadores[-1][1]
+
+    if not orjson_disponible:
+        print(f"{LOG_WARNING} orjson no está instalado: solo se mide la librería estándar")
+
+
+if __name__ == "__main__":
+    numero = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    repeticiones = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    ejecutar(numero, repeticiones)
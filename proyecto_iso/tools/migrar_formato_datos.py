@@ -0,0 +1,51 @@
+"""
+Reescribe los archivos JSON de `datos/` en el formato indicado.
+
+El servidor lee ambos formatos y reescribe cada archivo con FORMATO_DATOS en su
+siguiente guardado; este script hace la migración de una vez.
+
+Uso:
+    python tools/migrar_formato_datos.py compacto
+    python tools/migrar_formato_datos.py legible
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import *
+from almacenamiento import leer_json, escribir_atomico, serializar_json, AlmacenamientoRegistro
+
+
+def migrar(formato: str) -> None:
+    """
+    Reescribe cuentas, recetas y menús en el formato indicado.
+    Debe ejecutarse con el servidor parado.
+
+    Args:
+        formato (str): "legible" o "compacto"
+    """
+    for ruta in (RUTA_CUENTAS_JSON, RUTA_RECETAS_JSON, RUTA_MENUS_SEMANALES_JSON):
+        if not os.path.exists(ruta):
+            print(f"{LOG_WARNING} No existe {ruta}, se omite")
+            continue
+        if ruta == RUTA_RECETAS_JSON:
+            # Integrar antes los cambios pendientes del registro (modo "registro"): al
+            # cambiar los bytes de la instantánea el registro dejaría de ser válido
+            datos = AlmacenamientoRegistro(ruta, RUTA_REGISTRO_RECETAS).cargar()
+        else:
+            datos = leer_json(ruta)
+        tamaño_anterior = os.path.getsize(ruta)
+        escribir_atomico(ruta, serializar_json(datos, formato))
+        print(f"{LOG_SUCCESS} {os.path.basename(ruta)}: {tamaño_anterior} -> {os.path.getsize(ruta)} bytes")
+
+    if os.path.exists(RUTA_REGISTRO_RECETAS):
+        os.remove(RUTA_REGISTRO_RECETAS)
+        print(f"{LOG_INFO} Registro de recetas integrado en la instantánea")
+
+if __name__ == "__main__":
+    formato = sys.argv[1] if len(sys.argv) > 1 else "compacto"
+    if formato not in ("legible", "compacto"):
+        print(f"{LOG_ERROR} Formato no válido: {formato} (usa 'legible' o 'compacto')")
+        sys.exit(1)
+    migrar(formato)
@@ -0,0 +1,26 @@
+"""
+Ejecuta una pasada del recolector de imágenes huérfanas de static/uploads
+(ver recolector_imagenes.py) e informa de los bytes recuperados.
+
+Uso:
+    python tools/recolectar_imagenes.py              # modo configurado (cuarentena por defecto)
+    python tools/recolectar_imagenes.py borrar
+    python tools/recolectar_imagenes.py cuarentena
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import *
+from recolector_imagenes import RecolectorImagenes
+
+
+if __name__ == "__main__":
+    modo = sys.argv[1] if len(sys.argv) > 1 else MODO_RECOLECTOR_IMAGENES
+    if modo not in ("cuarentena", "borrar"):
+        print(f"{LOG_ERROR} Modo no válido: {modo} (usa 'cuarentena' o 'borrar')")
+        sys.exit(1)
+    # Sin pausas entre lotes: se ejecuta a mano, no compite con el servidor
+    resultado = RecolectorImagenes(modo=modo, pausa=0).recolectar()
+    print(f"{LOG_SUCCESS} {resultado.bytes_recuperados / (1024 * 1024):.1f} MB recuperados")
@@ -1,12 +1,28 @@
 import os
 import json
 import base64
+import bisect
+import asyncio
+import functools
 import uuid
+import tempfile
+import time
 import urllib.parse
 from datetime import datetime
-from typing import Optional, List, Dict, Any, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Tuple, Union, Callable, Iterable
 from constants import *
+from repositorio_recetas import repositorio_recetas, copiar_receta, clave_orden_receta
+from base_datos import obtener_base_datos
+from almacenamiento import obtener_firma_archivo, escribir_atomico, copiar_atomico
+from comentarios import almacen_comentarios
+from datos_usuarios import almacen_cuentas, almacen_menus
+from alergenos import normalizar_alergenos, mascara_alergenos, bits_alergenos_buscados
+from versiones import versiones_recursos
+from imagenes import generar_variantes, resumen_contenido, ruta_por_contenido, url_variante, urls_imagenes
+from imagenes import tamano_decodificado_base64, tipo_imagen_base64, decodificar_base64_a_archivo
 import re
+import sqlite3
 
 # Cryptography for passwords
 try:
@@ -60,31 +76,65 @@ def crear_directorio_si_no_existe(directorio: str) -> None:
         print(f"{LOG_ERROR} Error al crear directorio {directorio}: {e}")
         raise
 
+# ==================== EJECUCIÓN DE OPERACIONES BLOQUEANTES ====================
+
+# Pool acotado para la E/S de archivos: evita que una escritura lenta bloquee el bucle de eventos
+ejecutor_almacenamiento = ThreadPoolExecutor(
+    max_workers=MAX_HILOS_ALMACENAMIENTO,
+    thread_name_prefix="almacenamiento"
+)
+
+
+async def ejecutar_en_hilo(funcion: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Ejecuta una función bloqueante en el pool de almacenamiento y espera su resultado
+    sin bloquear el bucle de eventos. Se usa desde los endpoints `async def`.
+    
+    Args:
+        funcion (Callable[..., Any]): Función síncrona a ejecutar
+        *args, **kwargs: Argumentos de la función
+        
+    Returns:
+        Any: Valor devuelto por la función (las excepciones se propagan al llamador)
+    """
+    bucle = asyncio.get_running_loop()
+    return await bucle.run_in_executor(ejecutor_almacenamiento, functools.partial(funcion, *args, **kwargs))
+
+
+def eliminar_archivo(ruta: str) -> bool:
+    """
+    Elimina un archivo si existe.
+    
+    Args:
+        ruta (str): Ruta del archivo
+        
+    Returns:
+        bool: True si se eliminó, False si no existía
+    """
+    if not os.path.exists(ruta):
+        return False
+    os.remove(ruta)
+    return True
+
 
 def cargar_cuentas() -> List[Dict[str, Any]]:
     """
-    Carga las cuentas desde el archivo JSON.
+    Carga las cuentas del almacén de cuentas (ver datos_usuarios.py).
     
     Returns:
         List[Dict[str, Any]]: Lista de cuentas o lista vacía si no existe el archivo
     """
     try:
-        # Crear directorio de datos si no existe
-        crear_directorio_si_no_existe(DIRECTORIO_DATOS)
-        
-        if verificar_archivo_existe(RUTA_CUENTAS_JSON):
-            with open(RUTA_CUENTAS_JSON, 'r', encoding='utf-8') as archivo:
-                return json.load(archivo)
-        else:
-            return []
-    except (json.JSONDecodeError, IOError) as e:
+        return almacen_cuentas.todos()
+    except (ValueError, IOError) as e:
         print(f"{LOG_ERROR} Error al cargar cuentas: {e}")
         return []
 
 
 def guardar_cuentas(cuentas: List[Dict[str, Any]]) -> bool:
     """
-    Guarda las cuentas en el archivo JSON.
+    Sustituye todas las cuentas guardadas por `cuentas`. Pasa por el hilo escritor de las
+    cuentas, así que no pisa las escrituras que coincidan con ella.
     
     Args:
         cuentas (List[Dict[str, Any]]): Lista de cuentas a guardar
@@ -92,17 +142,40 @@ def guardar_cuentas(cuentas: List[Dict[str, Any]]) -> bool:
     Returns:
         bool: True si se guardó correctamente, False en caso contrario
     """
-    try:
-        # Crear directorio de datos si no existe
-        crear_directorio_si_no_existe(DIRECTORIO_DATOS)
-        
-        with open(RUTA_CUENTAS_JSON, 'w', encoding='utf-8') as archivo:
-            json.dump(cuentas, archivo, ensure_ascii=False, indent=2)
+    nuevas = {cuenta.get('email', '').lower(): cuenta for cuenta in reversed(cuentas)}
+
+    def sustituir(lote) -> bool:
+        for email in lote.claves():
+            if email not in nuevas:
+                lote.escribir(email, None)
+        for email, cuenta in nuevas.items():
+            if lote.leer(email) != cuenta:
+                lote.escribir(email, cuenta)
         return True
-    except IOError as e:
+
+    try:
+        return almacen_cuentas.ejecutar(sustituir)
+    except (ValueError, IOError) as e:
         print(f"{LOG_ERROR} Error al guardar cuentas: {e}")
         return False
 
+
+def firma_datos(ruta: str) -> Any:
+    """Firma de los datos guardados en `ruta` (o de la base de datos en modo sqlite) para detectar cambios externos."""
+    if MODO_ALMACENAMIENTO == "sqlite":
+        return obtener_base_datos().version_datos()
+    return obtener_firma_archivo(ruta)
+
+
+def version_cuentas() -> Any:
+    """
+    Versión de las cuentas para las ETags de las respuestas (ver versiones.py).
+
+    Returns:
+        Any: Contador de guardados del proceso y firma del almacenamiento
+    """
+    return (versiones_recursos.obtener("cuentas"), firma_datos(RUTA_CUENTAS_JSON))
+
 def validar_cuenta(email: str, password: str) -> bool:
     """
     Verifica si existe una cuenta que coincida con el email y passwords especificados por parametro
@@ -115,30 +188,29 @@ def validar_cuenta(email: str, password: str) -> bool:
         bool: True si existe una cuenta, False en caso contrario
     """
     try:
-        cuentas = cargar_cuentas()
         # Buscar la cuenta por email
-        for cuenta in cuentas:
-            if cuenta.get('email', '').lower() == email.lower():
-                stored = cuenta.get('password', '')
-                # If bcrypt is available and stored looks like a bcrypt hash, verify using bcrypt
-                if isinstance(stored, str) and stored.startswith('$2') and bcrypt:
-                    try:
-                        return bcrypt.checkpw(password.encode('utf-8'), stored.encode('utf-8'))
-                    except Exception:
-                        return False
-                else:
-                    # Fallback: plaintext comparison (legacy). If matches, migrate to hashed password when possible.
-                    if stored == password:
-                        # Attempt to migrate to hashed password for better security
-                        if bcrypt:
-                            try:
-                                hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-                                # Update stored account with hashed password
-                                actualizar_cuenta(email, {'password': hashed})
-                            except Exception:
-                                pass
-                        return True
+        cuenta = obtener_cuenta_por_email(email)
+        if cuenta is not None:
+            stored = cuenta.get('password', '')
+            # If bcrypt is available and stored looks like a bcrypt hash, verify using bcrypt
+            if isinstance(stored, str) and stored.startswith('$2') and bcrypt:
+                try:
+                    return bcrypt.checkpw(password.encode('utf-8'), stored.encode('utf-8'))
+                except Exception:
                     return False
+            else:
+                # Fallback: plaintext comparison (legacy). If matches, migrate to hashed password when possible.
+                if stored == password:
+                    # Attempt to migrate to hashed password for better security
+                    if bcrypt:
+                        try:
+                            hashed = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+                            # Update stored account with hashed password
+                            actualizar_cuenta(email, {'password': hashed})
+                        except Exception:
+                            pass
+                    return True
+                return False
         return False
     except Exception as e:
         print(f"{LOG_ERROR} Error al validar cuenta: {e}")
@@ -154,8 +226,7 @@ def email_ya_existe(email: str) -> bool:
     Returns:
         bool: True si el email ya existe, False en caso contrario
     """
-    cuentas = cargar_cuentas()
-    return any(cuenta['email'].lower() == email.lower() for cuenta in cuentas)
+    return obtener_cuenta_por_email(email) is not None
 
 
 def validar_password(password: str) -> Tuple[bool, str]:
@@ -205,14 +276,14 @@ def guardar_nueva_cuenta(cuenta_data: Dict[str, Any]) -> bool:
             except Exception:
                 pass
 
-        # Cargar cuentas existentes
-        cuentas = cargar_cuentas()
-
-        # Añadir la nueva cuenta
-        cuentas.append(cuenta_data)
+        # Añadir la nueva cuenta en el hilo escritor, comprobando de nuevo el email junto con la escritura
+        def anadir(lote) -> bool:
+            if lote.leer(cuenta_data['email']) is not None:
+                return False
+            lote.escribir(cuenta_data['email'], cuenta_data)
+            return True
 
-        # Guardar todas las cuentas
-        return guardar_cuentas(cuentas)
+        return almacen_cuentas.ejecutar(anadir)
         
     except Exception as e:
         print(f"{LOG_ERROR} Error al guardar nueva cuenta: {e}")
@@ -224,11 +295,7 @@ def obtener_cuenta_por_email(email: str) -> Optional[Dict[str, Any]]:
     Obtiene la cuenta (diccionario) correspondiente al email dado.
     Returns None si no existe.
     """
-    cuentas = cargar_cuentas()
-    for cuenta in cuentas:
-        if cuenta.get('email', '').lower() == email.lower():
-            return cuenta
-    return None
+    return almacen_cuentas.leer(email)
 
 
 def actualizar_cuenta(email: str, cambios: Dict[str, Any]) -> bool:
@@ -237,17 +304,17 @@ def actualizar_cuenta(email: str, cambios: Dict[str, Any]) -> bool:
     Devuelve True si se actualizó correctamente.
     """
     try:
-        cuentas = cargar_cuentas()
-        actualizado = False
-        for i, cuenta in enumerate(cuentas):
-            if cuenta.get('email', '').lower() == email.lower():
-                cuentas[i] = {**cuenta, **cambios}
-                actualizado = True
-                break
-
-        if actualizado:
-            return guardar_cuentas(cuentas)
-        return False
+        def actualizar(lote) -> bool:
+            cuenta = lote.leer(email)
+            if cuenta is None:
+                return False
+            if all(cuenta.get(campo) == valor for campo, valor in cambios.items()):
+                # Sin cambios: no reescribir ni cambiar la versión de las cuentas
+                return True
+            lote.escribir(email, {**cuenta, **cambios})
+            return True
+
+        return almacen_cuentas.ejecutar(actualizar)
     except Exception as e:
         print(f"{LOG_ERROR} Error al actualizar cuenta: {e}")
         return False
@@ -257,28 +324,29 @@ def actualizar_cuenta(email: str, cambios: Dict[str, Any]) -> bool:
 
 def cargar_recetas() -> List[Dict[str, Any]]:
     """
-    Carga las recetas desde el archivo JSON.
+    Carga una copia editable de las recetas.
+    Se usa en los flujos que modifican recetas y después llaman a guardar_recetas.
     
     Returns:
         List[Dict[str, Any]]: Lista de recetas o lista vacía si no existe el archivo
     """
-    try:
-        # Crear directorio de datos si no existe
-        crear_directorio_si_no_existe(DIRECTORIO_DATOS)
-        
-        if verificar_archivo_existe(RUTA_RECETAS_JSON):
-            with open(RUTA_RECETAS_JSON, 'r', encoding='utf-8') as archivo:
-                return json.load(archivo)
-        else:
-            return []
-    except (json.JSONDecodeError, IOError) as e:
-        print(f"{LOG_ERROR} Error al cargar recetas: {e}")
-        return []
+    return repositorio_recetas.copiar_recetas()
+
+
+def listar_recetas() -> List[Dict[str, Any]]:
+    """
+    Obtiene las recetas compartidas en memoria, sin copiarlas.
+    Solo para lectura: si se necesita modificar una receta hay que copiarla antes.
+    
+    Returns:
+        List[Dict[str, Any]]: Lista de recetas (solo lectura)
+    """
+    return repositorio_recetas.obtener_recetas()
 
 
 def guardar_recetas(recetas: List[Dict[str, Any]]) -> bool:
     """
-    Guarda las recetas en el archivo JSON.
+    Guarda las recetas en el archivo JSON y actualiza el repositorio en memoria.
     
     Args:
         recetas (List[Dict[str, Any]]): Lista de recetas a guardar
@@ -286,21 +354,40 @@ def guardar_recetas(recetas: List[Dict[str, Any]]) -> bool:
     Returns:
         bool: True si se guardó correctamente, False en caso contrario
     """
-    try:
-        # Crear directorio de datos si no existe
-        crear_directorio_si_no_existe(DIRECTORIO_DATOS)
+    return repositorio_recetas.guardar_recetas(recetas)
+
+
+def buscar_receta(nombre_receta: str, email_autor: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Busca una receta por nombre exacto (y autor, si se indica) usando los índices en memoria.
+    
+    Args:
+        nombre_receta (str): Nombre exacto de la receta
+        email_autor (Optional[str]): Email del autor, sin distinguir mayúsculas
         
-        with open(RUTA_RECETAS_JSON, 'w', encoding='utf-8') as archivo:
-            json.dump(recetas, archivo, ensure_ascii=False, indent=2)
-        return True
-    except IOError as e:
-        print(f"{LOG_ERROR} Error al guardar recetas: {e}")
-        return False
+    Returns:
+        Optional[Dict[str, Any]]: Receta compartida (solo lectura) o None si no existe
+    """
+    return repositorio_recetas.buscar_receta(nombre_receta, email_autor)
+
+
+def recetas_con_nombre(nombre_receta: str) -> List[Dict[str, Any]]:
+    """
+    Obtiene las recetas cuyo nombre coincide sin distinguir mayúsculas ni espacios extremos.
+    
+    Args:
+        nombre_receta (str): Nombre de la receta
+        
+    Returns:
+        List[Dict[str, Any]]: Recetas encontradas (solo lectura)
+    """
+    return repositorio_recetas.recetas_con_nombre(nombre_receta)
 
 
 def preparar_datos_receta(receta_data: Dict[str, Any], email_usuario: str) -> Dict[str, Any]:
     """
     Prepara los datos de la receta para guardar, incluyendo campos vacíos para opcionales.
+    Los alérgenos se llevan al vocabulario fijo y se guarda su máscara (alergenos.py).
     
     Args:
         receta_data (Dict[str, Any]): Datos de la receta del formulario
@@ -309,6 +396,8 @@ def preparar_datos_receta(receta_data: Dict[str, Any], email_usuario: str) -> Di
     Returns:
         Dict[str, Any]: Datos de la receta preparados con todos los campos
     """
+    alergenos, mascara_alergenos_receta = normalizar_alergenos(receta_data.get("alergenos", ""))
+    
     # Estructura completa de una receta con campos opcionales vacíos
     receta_completa = {
         # Campos obligatorios
@@ -318,9 +407,12 @@ def preparar_datos_receta(receta_data: Dict[str, Any], email_usuario: str) -> Di
         "pasosAseguir": receta_data.get("pasosAseguir", ""),
         "duracion": receta_data.get("duracion", ""),
         "fotoReceta": receta_data.get("fotoReceta", ""),
+        # URLs de las variantes de la foto (ver guardar_imagen_con_variantes)
+        "fotosReceta": receta_data.get("fotosReceta", {}),
         
         # Campos opcionales (vacíos si no se proporcionan)
-        "alergenos": receta_data.get("alergenos", ""),
+        "alergenos": alergenos,
+        "mascaraAlergenos": mascara_alergenos_receta,
         "paisOrigen": receta_data.get("paisOrigen", ""),
         "turnoComida": receta_data.get("turnoComida", ""),
         "dificultad": receta_data.get("dificultad", ""),
@@ -347,17 +439,12 @@ def guardar_nueva_receta(receta_data: Dict[str, Any], email_usuario: str) -> boo
         bool: True si se guardó correctamente, False en caso contrario
     """
     try:
-        # Cargar recetas existentes
-        recetas = cargar_recetas()
-        
-        # Preparar datos completos de la receta
+        # Preparar datos completos de la receta con su id estable
         receta_completa = preparar_datos_receta(receta_data, email_usuario)
+        receta_completa["id"] = nuevo_id_receta()
         
-        # Añadir la nueva receta
-        recetas.append(receta_completa)
-        
-        # Guardar todas las recetas
-        exito = guardar_recetas(recetas)
+        # Añadir la nueva receta al final
+        exito = repositorio_recetas.anadir_receta(receta_completa)
         
         if exito:
             print(f"{LOG_SUCCESS} Receta '{receta_completa['nombreReceta']}' guardada para usuario {email_usuario}")
@@ -369,6 +456,98 @@ def guardar_nueva_receta(receta_data: Dict[str, Any], email_usuario: str) -> boo
         return False
 
 
+def editar_receta_usuario(nombre_original: str, email_usuario: str, receta_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Sustituye una receta del usuario por sus nuevos datos en una única operación atómica.
+    Si cambia el nombre, la receta se despublica y se vacía su lista de usuarios que la guardaron.
+    
+    Args:
+        nombre_original (str): Nombre de la receta antes de editarla
+        email_usuario (str): Email del autor
+        receta_data (Dict[str, Any]): Datos nuevos de la receta (se modifican con usuario y guardados)
+        
+    Returns:
+        Optional[Dict[str, Any]]: {"turno_original": ...} o None si el usuario no tiene esa receta
+        
+    Raises:
+        IOError: Si no se pudo guardar la receta
+    """
+    def operacion(lote):
+        receta_existente = lote.buscar_receta(nombre_original, email_usuario)
+        if receta_existente is None:
+            return None
+        
+        if nombre_original != receta_data.get("nombreReceta"):
+            print(f"⚠️ [CAMBIO DE NOMBRE] '{nombre_original}' → '{receta_data.get('nombreReceta')}'")
+            
+            # 1. Despublicar la receta automáticamente
+            receta_data["publicada"] = False
+            print(f"📋 Receta despublicada automáticamente por cambio de nombre")
+            
+            # 2. Eliminar de las listas de guardados
+            usuarios_afectados = receta_existente.get("usuariosGuardado", [])
+            if usuarios_afectados:
+                print(f"🗑️ Receta eliminada de {len(usuarios_afectados)} usuarios que la tenían guardada")
+            receta_data["usuariosGuardado"] = []
+        else:
+            # Si no cambió el nombre, mantener los usuarios que guardaron la receta
+            receta_data["usuariosGuardado"] = list(receta_existente.get("usuariosGuardado", []))
+        
+        # Actualizar la receta manteniendo el usuario, el id (del que cuelgan sus comentarios)
+        # y las valoraciones recibidas
+        receta_data["usuario"] = email_usuario
+        receta_data["alergenos"], receta_data["mascaraAlergenos"] = normalizar_alergenos(receta_data.get("alergenos", ""))
+        for clave in ("id", "comentarios", "valoraciones", "resumenValoraciones"):
+            if clave in receta_existente:
+                receta_data[clave] = receta_existente[clave]
+            else:
+                receta_data.pop(clave, None)
+        # Si la foto no cambia, el formulario solo reenvía su URL: conservar sus variantes
+        if "fotosReceta" not in receta_data and receta_data.get("fotoReceta") == receta_existente.get("fotoReceta"):
+            receta_data["fotosReceta"] = receta_existente.get("fotosReceta", {})
+        lote.reemplazar(receta_existente, receta_data)
+        return {"turno_original": receta_existente.get("turnoComida")}
+    
+    return repositorio_recetas.ejecutar(operacion)
+
+
+def eliminar_receta_usuario(nombre_receta: str, email_usuario: str) -> Optional[List[str]]:
+    """
+    Elimina una receta del usuario en una única operación atómica y después sus comentarios.
+    
+    Args:
+        nombre_receta (str): Nombre exacto de la receta
+        email_usuario (str): Email del autor
+        
+    Returns:
+        Optional[List[str]]: Usuarios que tenían la receta guardada más el autor, o None si no existe
+        
+    Raises:
+        IOError: Si no se pudo guardar el cambio
+    """
+    eliminada = {}
+    
+    def operacion(lote):
+        receta = lote.buscar_receta(nombre_receta, email_usuario)
+        if receta is None or receta.get("usuario") != email_usuario:
+            return None
+        
+        usuarios_afectados = list(receta.get("usuariosGuardado", []))
+        if email_usuario not in usuarios_afectados:
+            usuarios_afectados.append(email_usuario)
+        lote.eliminar(receta)
+        eliminada["id"] = receta.get("id")
+        return usuarios_afectados
+    
+    usuarios_afectados = repositorio_recetas.ejecutar(operacion)
+    if usuarios_afectados is not None and eliminada.get("id"):
+        try:
+            almacen_comentarios.eliminar(eliminada["id"])
+        except (IOError, ValueError, sqlite3.Error) as e:
+            print(f"{LOG_WARNING} No se pudieron borrar los comentarios de '{nombre_receta}': {e}")
+    return usuarios_afectados
+
+
 def obtener_recetas_usuario(email_usuario: str) -> List[Dict[str, Any]]:
     """
     Obtiene todas las recetas de un usuario específico.
@@ -380,12 +559,9 @@ def obtener_recetas_usuario(email_usuario: str) -> List[Dict[str, Any]]:
         List[Dict[str, Any]]: Lista de recetas del usuario
     """
     try:
-        # Cargar todas las recetas
-        todas_las_recetas = cargar_recetas()
-        
-        # Filtrar solo las recetas del usuario
+        # Recetas del usuario desde el índice por autor
         recetas_usuario = [
-            receta for receta in todas_las_recetas 
+            receta for receta in repositorio_recetas.recetas_de_autor(email_usuario)
             if receta.get("usuario", "").lower() == email_usuario.lower()
         ]
         
@@ -397,12 +573,13 @@ def obtener_recetas_usuario(email_usuario: str) -> List[Dict[str, Any]]:
         return []
 
 
-def obtener_recetas_usuario_con_ids(email_usuario: str) -> List[Dict[str, Any]]:
+def obtener_recetas_usuario_con_ids(email_usuario: str, campos: Optional[List[str]] = None) -> List[Dict[str, Any]]:
     """
     Obtiene todas las recetas de un usuario específico con IDs únicos agregados.
     
     Args:
         email_usuario (str): Email del usuario
+        campos (Optional[List[str]]): Campos de cada receta (por defecto, el resumen; ver copiar_para_listado)
         
     Returns:
         List[Dict[str, Any]]: Lista de recetas del usuario con IDs únicos
@@ -411,11 +588,10 @@ def obtener_recetas_usuario_con_ids(email_usuario: str) -> List[Dict[str, Any]]:
         # Obtener recetas del usuario usando la función original
         recetas_usuario = obtener_recetas_usuario(email_usuario)
         
-        # Agregar ID único a cada receta
-        for receta in recetas_usuario:
-            receta["id"] = generar_id_receta(receta.get("nombreReceta", ""))
+        # Copias de las recetas (las originales son compartidas) con su ID público
+        recetas_con_ids = copiar_para_listado(recetas_usuario, campos)
         
-        return recetas_usuario
+        return recetas_con_ids
         
     except Exception as e:
         print(f"{LOG_ERROR} Error al obtener recetas del usuario con IDs: {e}")
@@ -424,49 +600,86 @@ def obtener_recetas_usuario_con_ids(email_usuario: str) -> List[Dict[str, Any]]:
 
 def obtener_receta_por_id(receta_id: str, email_usuario: str) -> Union[Dict[str, Any], None]:
     """
-    Obtiene una receta específica por su ID (combinación de nombre y usuario).
+    Obtiene una receta del usuario por su ID (id estable o formato antiguo, ver resolver_id_receta).
     
     Args:
-        receta_id (str): ID de la receta (nombre de la receta codificado)
+        receta_id (str): ID de la receta
         email_usuario (str): Email del usuario que solicita la receta
         
     Returns:
-        Union[Dict[str, Any], None]: Datos completos de la receta o None si no se encuentra
+        Union[Dict[str, Any], None]: Copia de la receta o None si no existe o no es del usuario
     """
     try:
-        # Decodificar el ID para obtener el nombre de la receta
-        try:
-            nombre_receta = urllib.parse.unquote(base64.b64decode(receta_id).decode('utf-8'))
-        except:
-            # Si no se puede decodificar, usar el ID directamente
-            nombre_receta = receta_id
-        
-        # Cargar todas las recetas
-        todas_las_recetas = cargar_recetas()
+        receta = resolver_id_receta(receta_id, email_usuario)
+        if receta is None or receta.get("usuario", "").lower() != email_usuario.lower():
+            print(f"{LOG_WARNING} Receta no encontrada: {receta_id} para usuario {email_usuario}")
+            return None
         
-        # Buscar la receta específica
-        for receta in todas_las_recetas:
-            if (receta.get("nombreReceta", "").lower() == nombre_receta.lower() and 
-                receta.get("usuario", "").lower() == email_usuario.lower()):
-                
-                # Agregar un ID único para la respuesta
-                receta_completa = receta.copy()
-                receta_completa["id"] = generar_id_receta(receta["nombreReceta"])
-                
-                # No necesitamos procesar ingredientes ni pasos, los devolvemos como están
-                # porque el frontend ya los maneja correctamente como strings
-                
-                print(f"{LOG_INFO} Receta encontrada: {nombre_receta} para usuario {email_usuario}")
-                return receta_completa
-        
-        print(f"{LOG_WARNING} Receta no encontrada: {nombre_receta} para usuario {email_usuario}")
-        return None
+        receta_completa = receta.copy()
+        receta_completa["id"] = id_publico_receta(receta)
+        print(f"{LOG_INFO} Receta encontrada: {receta.get('nombreReceta')} para usuario {email_usuario}")
+        return receta_completa
         
     except Exception as e:
         print(f"{LOG_ERROR} Error al obtener receta por ID: {e}")
         return None
 
 
+def nuevo_id_receta() -> str:
+    """
+    Genera el id estable de una receta nueva. No cambia al editarla ni al moverse en la lista.
+    
+    Returns:
+        str: Id hexadecimal aleatorio
+    """
+    return uuid.uuid4().hex
+
+
+def id_publico_receta(receta: Dict[str, Any]) -> str:
+    """
+    ID con el que la API expone una receta: su id estable o, si aún no lo tiene
+    (receta sin migrar), el nombre codificado de generar_id_receta.
+    """
+    return receta.get("id") or generar_id_receta(receta.get("nombreReceta", ""))
+
+
+def resolver_id_receta(receta_id: str, email_autor: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Obtiene la receta a la que se refiere un ID recibido por la API.
+    Además del id estable acepta, por compatibilidad, los formatos antiguos:
+    - "receta-{idx}": posición en la lista de recetas
+    - nombre de la receta en base64 (URL-encoded), como lo genera generar_id_receta
+    
+    Args:
+        receta_id (str): ID recibido
+        email_autor (Optional[str]): Si se indica, con un ID de nombre se prefiere la receta de este autor
+        
+    Returns:
+        Optional[Dict[str, Any]]: Receta compartida (solo lectura) o None si no existe
+    """
+    receta = repositorio_recetas.receta_por_id(receta_id)
+    if receta is not None:
+        return receta
+    
+    if receta_id.startswith("receta-"):
+        try:
+            posicion = int(receta_id[len("receta-"):])
+        except ValueError:
+            return None
+        recetas = listar_recetas()
+        return recetas[posicion] if 0 <= posicion < len(recetas) else None
+    
+    try:
+        nombre_receta = base64.b64decode(urllib.parse.unquote(receta_id), validate=True).decode('utf-8')
+    except ValueError:
+        return None
+    candidatas = recetas_con_nombre(nombre_receta)
+    if email_autor:
+        propias = [r for r in candidatas if r.get("usuario", "").lower() == email_autor.lower()]
+        candidatas = propias or candidatas
+    return candidatas[0] if candidatas else None
+
+
 def generar_id_receta(nombre_receta: str) -> str:
     """
     Genera un ID único para una receta basado en su nombre.
@@ -491,7 +704,9 @@ def generar_id_receta(nombre_receta: str) -> str:
 
 def validar_base64_imagen(base64_string: str) -> Tuple[bool, str]:
     """
-    Valida si una cadena Base64 representa una imagen válida.
+    Valida si una cadena Base64 representa una imagen válida, sin decodificarla entera:
+    el tamaño se calcula a partir de la longitud de la cadena y el tipo se comprueba
+    con la cabecera de la imagen. El resto se valida al decodificarla (guardar_imagen_base64).
     
     Args:
         base64_string (str): Cadena Base64 a validar
@@ -504,26 +719,29 @@ def validar_base64_imagen(base64_string: str) -> Tuple[bool, str]:
         if not base64_string.startswith('data:image/'):
             return False, "La imagen debe estar en formato Base64 con prefijo data:image/"
         
-        # Extraer tipo MIME y datos Base64
-        header, data = base64_string.split(',', 1)
-        tipo_mime = header.split(':')[1].split(';')[0]
+        # Extraer tipo MIME y posición de los datos Base64 (sin copiar la cadena)
+        inicio = base64_string.index(',') + 1
+        tipo_mime = base64_string[:inicio].split(':')[1].split(';')[0]
         
         # Validar tipo MIME
         if tipo_mime not in TIPOS_IMAGEN_PERMITIDOS:
             return False, f"Tipo de imagen no permitido. Tipos válidos: {', '.join(TIPOS_IMAGEN_PERMITIDOS)}"
         
-        # Decodificar Base64 para verificar validez
-        imagen_bytes = base64.b64decode(data)
-        
-        # Verificar tamaño
-        if len(imagen_bytes) > TAMAÑO_MAXIMO_IMAGEN:
+        # Verificar tamaño (sin decodificar)
+        tamano = tamano_decodificado_base64(base64_string, inicio)
+        if tamano > TAMAÑO_MAXIMO_IMAGEN:
             return False, f"La imagen es muy grande. Tamaño máximo: {TAMAÑO_MAXIMO_IMAGEN // (1024*1024)}MB"
         
         # Verificar que no esté vacía
-        if len(imagen_bytes) == 0:
+        if tamano == 0:
             return False, "La imagen está vacía"
         
-        return True, tipo_mime
+        # Verificar el tipo real por la cabecera de la imagen
+        tipo_real = tipo_imagen_base64(base64_string, inicio)
+        if tipo_real is None:
+            return False, "El archivo no es una imagen JPEG, PNG o WebP"
+        
+        return True, tipo_real
         
     except Exception as e:
         return False, f"Error al validar imagen: {str(e)}"
@@ -566,16 +784,148 @@ def generar_nombre_archivo_unico(email_usuario: str, extension: str) -> str:
     return f"{timestamp}_{usuario_limpio}_{id_unico}{extension}"
 
 
-def guardar_imagen_base64(base64_string: str, email_usuario: str) -> Tuple[bool, str]:
+def guardar_imagen_con_variantes(imagen: Union[bytes, str], tipo_mime: str) -> Dict[str, str]:
+    """
+    Guarda las variantes WebP de una imagen subida (ver imagenes.py) con el hash de su
+    contenido como nombre. Si la misma imagen ya estaba guardada (otra receta, la misma
+    receta al editarla o una foto de perfil) se reutilizan sus archivos sin generarlos.
+    Si Pillow no está instalado, guarda la imagen original y todas las variantes apuntan a ella.
+    
+    Args:
+        imagen (Union[bytes, str]): Imagen original, en memoria o la ruta del archivo temporal
+            de una subida por partes (ver subidas.py), que se borra al terminar
+        tipo_mime (str): Tipo MIME de la imagen
+        
+    Returns:
+        Dict[str, str]: Nombre de la variante (VARIANTES_IMAGEN) → URL
+        
+    Raises:
+        ValueError: Si el contenido no es una imagen válida
+    """
+    es_temporal = isinstance(imagen, str)
+    try:
+        resumen = resumen_contenido(imagen)
+        nombres = {nombre: ruta_por_contenido(resumen, f"_{nombre}.webp") for nombre in VARIANTES_IMAGEN}
+        original = ruta_por_contenido(resumen, obtener_extension_desde_mime(tipo_mime))
+        for guardadas in (nombres, dict.fromkeys(VARIANTES_IMAGEN, original)):
+            if all(os.path.exists(ruta_imagen_contenido(nombre)) for nombre in guardadas.values()):
+                # Fecha actual: ni el recolector (recolector_imagenes.py) ni liberar_imagenes
+                # borran archivos recientes
+                try:
+                    for nombre in set(guardadas.values()):
+                        os.utime(ruta_imagen_contenido(nombre))
+                except FileNotFoundError:
+                    # Se acaban de borrar: se vuelven a guardar
+                    continue
+                print(f"{LOG_INFO} Imagen ya guardada ({resumen[:12]}): se reutilizan sus archivos")
+                return {variante: f"{URL_IMAGENES_CONTENIDO}/{nombre}" for variante, nombre in guardadas.items()}
+        
+        variantes = generar_variantes(imagen)
+        if variantes is None:
+            if es_temporal:
+                copiar_atomico(imagen, ruta_imagen_contenido(original))
+            else:
+                escribir_atomico(ruta_imagen_contenido(original), imagen)
+            return {nombre: f"{URL_IMAGENES_CONTENIDO}/{original}" for nombre in VARIANTES_IMAGEN}
+    finally:
+        if es_temporal and os.path.exists(imagen):
+            os.remove(imagen)
+    
+    for nombre, contenido in variantes.items():
+        escribir_atomico(ruta_imagen_contenido(nombres[nombre]), contenido)
+    print(f"{LOG_INFO} Variantes generadas: "
+          + ", ".join(f"{nombre} {len(contenido)} bytes" for nombre, contenido in variantes.items()))
+    return {nombre: f"{URL_IMAGENES_CONTENIDO}/{nombres[nombre]}" for nombre in VARIANTES_IMAGEN}
+
+
+def ruta_imagen_contenido(nombre: str) -> str:
+    """Ruta local de un archivo de DIRECTORIO_IMAGENES_CONTENIDO (nombre relativo con "/")."""
+    return os.path.join(DIRECTORIO_IMAGENES_CONTENIDO, *nombre.split("/"))
+
+
+def ruta_local_upload(url: str) -> Optional[str]:
+    """
+    Ruta local del archivo de una URL de static/uploads.
+    
+    Args:
+        url (str): URL pública (p. ej. "/static/uploads/imagenes/ab/cd/abcd…_tarjeta.webp")
+        
+    Returns:
+        Optional[str]: Ruta dentro de DIRECTORIO_UPLOADS, o None si la URL no es de uploads
+    """
+    if not isinstance(url, str) or not url.startswith(URL_UPLOADS + "/"):
+        return None
+    ruta = os.path.normpath(os.path.join(DIRECTORIO_UPLOADS, *url[len(URL_UPLOADS) + 1:].split("/")))
+    if not ruta.startswith(DIRECTORIO_UPLOADS + os.sep):
+        return None
+    return ruta
+
+
+def contar_referencias_imagenes(urls: Iterable[str]) -> Dict[str, int]:
+    """
+    Cuenta cuántas recetas y cuentas usan cada imagen. Como las imágenes se guardan por su
+    contenido, un mismo archivo puede ser la foto de varias recetas y cuentas. Las recetas
+    se cuentan con el índice por imagen del repositorio; las cuentas se recorren todas.
+    
+    Args:
+        urls (Iterable[str]): URLs de las imágenes
+        
+    Returns:
+        Dict[str, int]: URL → número de recetas y cuentas que la usan
+    """
+    referencias = {url: len(repositorio_recetas.recetas_con_imagen(url)) for url in urls}
+    for cuenta in cargar_cuentas():
+        for url in urls_imagenes(cuenta) & referencias.keys():
+            referencias[url] += 1
+    return referencias
+
+
+def liberar_imagenes(urls: Iterable[str]) -> int:
     """
-    Guarda una imagen Base64 como archivo en el servidor.
+    Borra los archivos de static/uploads de las imágenes que ya no usa ninguna receta ni cuenta.
+    Se llama después de quitar la referencia (p. ej. al eliminar la foto de perfil).
+    
+    Los archivos modificados hace menos de GRACIA_RECOLECTOR_SEGUNDOS no se borran: pueden
+    ser de una subida en curso de la misma imagen (guardada o reutilizada, pero aún sin
+    receta ni cuenta que la use). Si siguen sin usarse los retirará el recolector.
+    
+    Args:
+        urls (Iterable[str]): URLs de las imágenes que se han dejado de usar
+        
+    Returns:
+        int: Número de archivos borrados
+    """
+    borrados = 0
+    limite = time.time() - GRACIA_RECOLECTOR_SEGUNDOS
+    for url, referencias in contar_referencias_imagenes(urls).items():
+        ruta = ruta_local_upload(url)
+        if referencias or ruta is None:
+            continue
+        try:
+            if os.path.getmtime(ruta) > limite:
+                print(f"{LOG_INFO} Imagen sin referencias pero reciente, se deja al recolector: {ruta}")
+                continue
+            if eliminar_archivo(ruta):
+                borrados += 1
+                print(f"{LOG_INFO} Imagen sin referencias eliminada: {ruta}")
+        except FileNotFoundError:
+            continue
+        except OSError as e:
+            print(f"{LOG_WARNING} No se pudo eliminar la imagen {ruta}: {e}")
+    return borrados
+
+
+def guardar_imagen_base64(base64_string: str, email_usuario: str) -> Tuple[bool, Union[Dict[str, str], str]]:
+    """
+    Guarda una imagen Base64 en el servidor, en sus variantes (ver guardar_imagen_con_variantes).
     
     Args:
         base64_string (str): Imagen en formato Base64
         email_usuario (str): Email del usuario que sube la imagen
         
     Returns:
-        Tuple[bool, str]: (True, url_imagen) si se guardó correctamente, (False, mensaje_error) si falló
+        Tuple[bool, Union[Dict[str, str], str]]: (True, urls_variantes) si se guardó correctamente,
+        (False, mensaje_error) si falló
     """
     try:
         # Validar imagen Base64
@@ -583,33 +933,24 @@ def guardar_imagen_base64(base64_string: str, email_usuario: str) -> Tuple[bool,
         if not es_valida:
             return False, resultado
         
-        tipo_mime = resultado
-        
-        # Crear directorios si no existen
-        crear_directorio_si_no_existe(DIRECTORIO_UPLOADS)
-        crear_directorio_si_no_existe(DIRECTORIO_IMAGENES_RECETAS)
-        
-        # Extraer datos Base64
-        header, data = base64_string.split(',', 1)
-        imagen_bytes = base64.b64decode(data)
-        
-        # Generar nombre de archivo único
-        extension = obtener_extension_desde_mime(tipo_mime)
-        nombre_archivo = generar_nombre_archivo_unico(email_usuario, extension)
-        
-        # Ruta completa del archivo
-        ruta_archivo = os.path.join(DIRECTORIO_IMAGENES_RECETAS, nombre_archivo)
-        
-        # Guardar archivo
-        with open(ruta_archivo, 'wb') as archivo:
-            archivo.write(imagen_bytes)
-        
-        # Generar URL de la imagen
-        url_imagen = f"{URL_BASE_IMAGENES}/{nombre_archivo}"
-        
-        print(f"{LOG_SUCCESS} Imagen guardada: {nombre_archivo} para usuario {email_usuario}")
-        return True, url_imagen
-        
+        # Decodificar por bloques a un temporal (una sola pasada, sin la imagen entera en memoria)
+        # y guardar las variantes desde él; guardar_imagen_con_variantes borra el temporal
+        descriptor, ruta_temporal = tempfile.mkstemp(prefix="subida_")
+        try:
+            with os.fdopen(descriptor, 'wb') as temporal:
+                tipo_mime = decodificar_base64_a_archivo(base64_string, temporal, TAMAÑO_MAXIMO_IMAGEN,
+                                                         base64_string.index(',') + 1)
+        except BaseException:
+            os.remove(ruta_temporal)
+            raise
+        urls = guardar_imagen_con_variantes(ruta_temporal, tipo_mime)
+        
+        print(f"{LOG_SUCCESS} Imagen guardada: {urls['completa']} para usuario {email_usuario}")
+        return True, urls
+        
+    except ValueError as e:
+        print(f"{LOG_ERROR} Imagen no válida: {e}")
+        return False, str(e)
     except Exception as e:
         print(f"{LOG_ERROR} Error al guardar imagen: {e}")
         return False, f"Error interno al guardar imagen: {str(e)}"
@@ -648,9 +989,10 @@ def procesar_imagen_receta(receta_data: Dict[str, Any], email_usuario: str) -> D
         exito, resultado = guardar_imagen_base64(foto_receta, email_usuario)
         
         if exito:
-            # Actualizar con la URL de la imagen guardada
-            receta_data["fotoReceta"] = resultado
-            print(f"{LOG_SUCCESS} Imagen procesada correctamente: {resultado}")
+            # Actualizar con la URL de la imagen completa y las de todas sus variantes
+            receta_data["fotoReceta"] = resultado["completa"]
+            receta_data["fotosReceta"] = resultado
+            print(f"{LOG_SUCCESS} Imagen procesada correctamente: {resultado['completa']}")
         else:
             # En caso de error, dejar vacío y loggear el error
             print(f"{LOG_ERROR} Error al procesar imagen de receta: {resultado}")
@@ -677,30 +1019,29 @@ def guardar_receta_usuario(nombre_receta: str, email_usuario: str) -> bool:
     Returns:
         bool: True si se guardó correctamente, False en caso contrario
     """
+    def operacion(lote):
+        receta = lote.buscar_receta(nombre_receta)
+        if receta is None:
+            return None
+        # Verificar si el usuario ya guardó esta receta
+        if lote.esta_guardada_por(receta, email_usuario):
+            return False
+        receta_actualizada = copiar_receta(receta)
+        receta_actualizada.setdefault("usuariosGuardado", []).append(email_usuario)
+        lote.reemplazar(receta, receta_actualizada)
+        return True
+    
     try:
-        recetas = cargar_recetas()
-        receta_encontrada = False
-        
-        for receta in recetas:
-            if receta["nombreReceta"] == nombre_receta:
-                receta_encontrada = True
-                # Verificar si el usuario ya guardó esta receta
-                if "usuariosGuardado" not in receta:
-                    receta["usuariosGuardado"] = []
-                
-                if email_usuario not in receta["usuariosGuardado"]:
-                    receta["usuariosGuardado"].append(email_usuario)
-                    guardar_recetas(recetas)
-                    print(f"{LOG_SUCCESS} Usuario {email_usuario} guardó la receta '{nombre_receta}'")
-                    return True
-                else:
-                    print(f"{LOG_INFO} Usuario {email_usuario} ya tenía guardada la receta '{nombre_receta}'")
-                    return True
-        
-        if not receta_encontrada:
+        resultado = repositorio_recetas.ejecutar(operacion)
+        if resultado is None:
             print(f"{LOG_ERROR} No se encontró la receta '{nombre_receta}'")
             return False
-            
+        if resultado:
+            print(f"{LOG_SUCCESS} Usuario {email_usuario} guardó la receta '{nombre_receta}'")
+        else:
+            print(f"{LOG_INFO} Usuario {email_usuario} ya tenía guardada la receta '{nombre_receta}'")
+        return True
+        
     except Exception as e:
         print(f"{LOG_ERROR} Error al guardar receta para usuario: {e}")
         return False
@@ -717,27 +1058,29 @@ def desguardar_receta_usuario(nombre_receta: str, email_usuario: str) -> bool:
     Returns:
         bool: True si se desguardó correctamente, False en caso contrario
     """
+    def operacion(lote):
+        receta = lote.buscar_receta(nombre_receta)
+        if receta is None:
+            return None
+        # Verificar si el usuario tenía guardada esta receta
+        if not lote.esta_guardada_por(receta, email_usuario):
+            return False
+        receta_actualizada = copiar_receta(receta)
+        receta_actualizada["usuariosGuardado"].remove(email_usuario)
+        lote.reemplazar(receta, receta_actualizada)
+        return True
+    
     try:
-        recetas = cargar_recetas()
-        receta_encontrada = False
-        
-        for receta in recetas:
-            if receta["nombreReceta"] == nombre_receta:
-                receta_encontrada = True
-                # Verificar si el usuario tenía guardada esta receta
-                if "usuariosGuardado" in receta and email_usuario in receta["usuariosGuardado"]:
-                    receta["usuariosGuardado"].remove(email_usuario)
-                    guardar_recetas(recetas)
-                    print(f"{LOG_SUCCESS} Usuario {email_usuario} desguardó la receta '{nombre_receta}'")
-                    return True
-                else:
-                    print(f"{LOG_INFO} Usuario {email_usuario} no tenía guardada la receta '{nombre_receta}'")
-                    return True
-        
-        if not receta_encontrada:
+        resultado = repositorio_recetas.ejecutar(operacion)
+        if resultado is None:
             print(f"{LOG_ERROR} No se encontró la receta '{nombre_receta}'")
             return False
-            
+        if resultado:
+            print(f"{LOG_SUCCESS} Usuario {email_usuario} desguardó la receta '{nombre_receta}'")
+        else:
+            print(f"{LOG_INFO} Usuario {email_usuario} no tenía guardada la receta '{nombre_receta}'")
+        return True
+        
     except Exception as e:
         print(f"{LOG_ERROR} Error al desguardar receta para usuario: {e}")
         return False
@@ -754,12 +1097,8 @@ def obtener_recetas_guardadas_usuario(email_usuario: str) -> List[Dict[str, Any]
         List[Dict[str, Any]]: Lista de recetas guardadas por el usuario
     """
     try:
-        recetas = cargar_recetas()
-        recetas_guardadas = []
-        
-        for receta in recetas:
-            if "usuariosGuardado" in receta and email_usuario in receta["usuariosGuardado"]:
-                recetas_guardadas.append(receta)
+        # Índice inverso usuario → recetas guardadas
+        recetas_guardadas = list(repositorio_recetas.recetas_guardadas_por(email_usuario))
         
         print(f"{LOG_INFO} Usuario {email_usuario} tiene {len(recetas_guardadas)} recetas guardadas")
         return recetas_guardadas
@@ -781,12 +1120,9 @@ def es_receta_guardada_por_usuario(nombre_receta: str, email_usuario: str) -> bo
         bool: True si la receta está guardada por el usuario, False en caso contrario
     """
     try:
-        recetas = cargar_recetas()
-        
-        for receta in recetas:
+        for receta in recetas_con_nombre(nombre_receta):
             if (receta["nombreReceta"] == nombre_receta and 
-                "usuariosGuardado" in receta and 
-                email_usuario in receta["usuariosGuardado"]):
+                repositorio_recetas.esta_guardada_por(receta, email_usuario)):
                 return True
         
         return False
@@ -801,74 +1137,596 @@ def publicar_receta_usuario(receta_id: str, email_usuario: str) -> bool:
     Publica una receta en la comunidad. Marca una receta del usuario como publicada.
     
     Args:
-        receta_id (str): ID de la receta a publicar (puede ser ID, _id o nombreReceta)
+        receta_id (str): ID de la receta a publicar (id estable, nombreReceta o nombre en base64)
         email_usuario (str): Email del usuario que intenta publicar la receta
         
     Returns:
         bool: True si se publicó correctamente, False en caso contrario
     """
     try:
-        recetas = cargar_recetas()
-        receta_encontrada = False
-        
-        for receta in recetas:
-            # Buscar receta por ID generado, nombre, o si el ID decodificado coincide
-            receta_match = False
+        # Candidatas por nombre para los formatos antiguos: el nombre o el nombre en base64 (URL-encoded)
+        nombres_posibles = [receta_id]
+        try:
+            receta_id_decoded = urllib.parse.unquote(receta_id)
+            nombres_posibles.append(base64.b64decode(receta_id_decoded.encode('utf-8')).decode('utf-8'))
+        except:
+            pass
+        
+        def operacion(lote):
+            receta = lote.buscar_por_id(receta_id)
+            for nombre in nombres_posibles:
+                if receta is not None:
+                    break
+                # Primero la del propio usuario, si no cualquiera con ese nombre (para informar del autor)
+                receta = lote.buscar_receta(nombre, email_usuario) or lote.buscar_receta(nombre)
             
-            # Intentar diferentes formas de identificar la receta
-            if (receta.get("id") == receta_id or 
-                receta.get("_id") == receta_id or 
-                receta.get("nombreReceta") == receta_id):
-                receta_match = True
-            else:
-                # Intentar decodificar el receta_id si es un ID generado
-                try:
-                    # Decodificar URL
-                    receta_id_decoded = urllib.parse.unquote(receta_id)
-                    # Decodificar base64
-                    nombre_decoded = base64.b64decode(receta_id_decoded.encode('utf-8')).decode('utf-8')
-                    if receta.get("nombreReceta") == nombre_decoded:
-                        receta_match = True
-                except:
-                    pass
+            if receta is None:
+                print(f"{LOG_ERROR} No se encontró la receta con ID '{receta_id}'")
+                return False
             
-            if receta_match:
-                receta_encontrada = True
-                
-                # Debug: Imprimir información de la receta encontrada
-                print(f"{LOG_INFO} Receta encontrada: '{receta.get('nombreReceta')}' de usuario '{receta.get('usuario')}'")
-                print(f"{LOG_INFO} Usuario solicitante: '{email_usuario}'")
-                
-                # Verificar que el usuario es el autor de la receta
-                if receta.get("usuario") != email_usuario:
-                    print(f"{LOG_ERROR} Usuario {email_usuario} no es el autor de la receta '{receta.get('nombreReceta')}' (autor: {receta.get('usuario')})")
-                    return False
-                
-                # Marcar la receta como publicada
-                receta["publicada"] = True
-                
-                # Guardar cambios
-                guardar_recetas(recetas)
-                print(f"{LOG_SUCCESS} Receta '{receta.get('nombreReceta')}' publicada en la comunidad por {email_usuario}")
-                return True
-        
-        if not receta_encontrada:
-            print(f"{LOG_ERROR} No se encontró la receta con ID '{receta_id}'")
-            return False
+            # Debug: Imprimir información de la receta encontrada
+            print(f"{LOG_INFO} Receta encontrada: '{receta.get('nombreReceta')}' de usuario '{receta.get('usuario')}'")
+            print(f"{LOG_INFO} Usuario solicitante: '{email_usuario}'")
             
+            # Verificar que el usuario es el autor de la receta
+            if receta.get("usuario") != email_usuario:
+                print(f"{LOG_ERROR} Usuario {email_usuario} no es el autor de la receta '{receta.get('nombreReceta')}' (autor: {receta.get('usuario')})")
+                return False
+            
+            # Marcar la receta como publicada
+            receta_actualizada = copiar_receta(receta)
+            receta_actualizada["publicada"] = True
+            lote.reemplazar(receta, receta_actualizada)
+            print(f"{LOG_SUCCESS} Receta '{receta.get('nombreReceta')}' publicada en la comunidad por {email_usuario}")
+            return True
+        
+        return repositorio_recetas.ejecutar(operacion)
+        
     except Exception as e:
         print(f"{LOG_ERROR} Error al publicar receta: {e}")
         return False
 
 
-def generar_menu_semanal_automatico(email_usuario: str) -> Dict[str, Dict[str, Optional[str]]]:
+# ==================== FUNCIONES DE COMENTARIOS Y VALORACIONES ====================
+
+def receta_necesita_migracion(receta: Dict[str, Any]) -> bool:
+    """Indica si una receta conserva el formato antiguo (sin id, con comentarios dentro, valoraciones en lista o sin máscara de alérgenos)."""
+    return (not receta.get("id") or "comentarios" in receta or isinstance(receta.get("valoraciones"), list)
+            or not isinstance(receta.get("mascaraAlergenos"), int))
+
+
+def migrar_receta(receta: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Convierte una receta antigua al formato actual: le asigna un id estable, mueve al
+    almacén los comentarios que llevaba dentro, pasa sus valoraciones a un diccionario
+    por usuario con su resumen agregado y normaliza sus alérgenos con su máscara.
+    
+    Args:
+        receta (Dict[str, Any]): Receta tal como está en el repositorio
+        
+    Returns:
+        Optional[Dict[str, Any]]: Copia de la receta a guardar, o None si ya estaba migrada
+        
+    Raises:
+        IOError: Si no se pudieron guardar los comentarios en el almacén
+    """
+    if not receta_necesita_migracion(receta):
+        return None
+    
+    receta_migrada = copiar_receta(receta)
+    if not receta_migrada.get("id"):
+        receta_migrada["id"] = nuevo_id_receta()
+    comentarios = receta_migrada.pop("comentarios", None) or []
+    # Si el almacén ya tiene comentarios, se copiaron en un intento que no llegó a guardar la receta
+    if comentarios and almacen_comentarios.contar(receta_migrada["id"]) == 0:
+        almacen_comentarios.anadir(receta_migrada["id"], comentarios)
+    
+    if isinstance(receta_migrada.get("valoraciones"), list):
+        valoraciones = valoraciones_por_usuario(receta_migrada)
+        receta_migrada["valoraciones"] = valoraciones
+        receta_migrada["resumenValoraciones"] = calcular_resumen_valoraciones(valoraciones)
+    
+    if not isinstance(receta_migrada.get("mascaraAlergenos"), int):
+        receta_migrada["alergenos"], receta_migrada["mascaraAlergenos"] = normalizar_alergenos(receta_migrada.get("alergenos", ""))
+    return receta_migrada
+
+
+def migrar_recetas() -> int:
+    """
+    Migra al formato actual todas las recetas que lo necesiten (ver migrar_receta).
+    Se ejecuta al arrancar el servidor; si no hay nada que migrar no escribe nada.
+    
+    Returns:
+        int: Número de recetas migradas
+        
+    Raises:
+        IOError: Si no se pudo guardar la migración
+    """
+    if not any(receta_necesita_migracion(receta) for receta in listar_recetas()):
+        return 0
+    
+    def operacion(lote):
+        cambios = []
+        for posicion, receta in enumerate(lote.recetas):
+            receta_migrada = migrar_receta(receta)
+            if receta_migrada is not None:
+                cambios.append({"op": "reemplazar", "pos": posicion, "receta": receta_migrada})
+        lote.aplicar_cambios(cambios)
+        return len(cambios)
+    
+    migradas = repositorio_recetas.ejecutar(operacion)
+    print(f"{LOG_SUCCESS} {migradas} recetas migradas al formato actual (id estable, comentarios, valoraciones y alérgenos)")
+    return migradas
+
+
+def anadir_comentario_receta(nombre_receta: str, email_usuario: str, texto: str) -> Optional[Dict[str, Any]]:
+    """
+    Añade un comentario al almacén de comentarios de una receta, sin reescribir las recetas
+    (salvo la primera vez en una receta antigua, que se migra antes).
+    
+    Args:
+        nombre_receta (str): Nombre exacto de la receta
+        email_usuario (str): Email del usuario que comenta
+        texto (str): Texto del comentario
+        
+    Returns:
+        Optional[Dict[str, Any]]: {"comentario", "totalComentarios"} o None si la receta no existe
+        
+    Raises:
+        IOError: Si no se pudo guardar el comentario
+    """
+    nuevo_comentario = {
+        "usuario": email_usuario,
+        "texto": texto,
+        "fecha": datetime.now().isoformat()
+    }
+    
+    receta = buscar_receta(nombre_receta)
+    if receta is None:
+        return None
+    
+    if not receta.get("id") or "comentarios" in receta:
+        def operacion(lote):
+            receta_actual = lote.buscar_receta(nombre_receta)
+            if receta_actual is None:
+                return None
+            receta_migrada = migrar_receta(receta_actual)
+            if receta_migrada is None:
+                return receta_actual["id"]
+            lote.reemplazar(receta_actual, receta_migrada)
+            return receta_migrada["id"]
+        
+        id_receta = repositorio_recetas.ejecutar(operacion)
+        if id_receta is None:
+            return None
+    else:
+        id_receta = receta["id"]
+    
+    total = almacen_comentarios.anadir(id_receta, [nuevo_comentario])
+    return {"comentario": nuevo_comentario, "totalComentarios": total}
+
+
+def listar_comentarios_receta(receta: Dict[str, Any], limite: int = LIMITE_COMENTARIOS_POR_DEFECTO,
+                              desplazamiento: int = 0) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Obtiene una página de comentarios de una receta, de más reciente a más antiguo.
+    
+    Args:
+        receta (Dict[str, Any]): Receta del repositorio
+        limite (int): Número máximo de comentarios a devolver
+        desplazamiento (int): Número de comentarios recientes a saltar
+        
+    Returns:
+        Tuple[List[Dict[str, Any]], int]: (comentarios de la página, total de comentarios)
+    """
+    if "comentarios" in receta:
+        # Receta aún sin migrar: los comentarios siguen dentro de la receta
+        comentarios = list(reversed(receta.get("comentarios") or []))
+        return comentarios[desplazamiento:desplazamiento + limite], len(comentarios)
+    if not receta.get("id"):
+        return [], 0
+    return (almacen_comentarios.listar(receta["id"], limite, desplazamiento),
+            almacen_comentarios.contar(receta["id"]))
+
+
+def campos_listado(fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Obtiene los campos pedidos con el parámetro fields= de los listados de recetas.
+    
+    Args:
+        fields (Optional[str]): Campos separados por comas (p. ej. "nombreReceta,ingredientes")
+        
+    Returns:
+        Optional[List[str]]: Campos pedidos, o None si no se pidió ninguno (resumen por defecto)
+        
+    Raises:
+        ValueError: Si algún campo no está en CAMPOS_LISTADO_RECETA
+    """
+    if not fields or not fields.strip():
+        return None
+    campos = [campo.strip() for campo in fields.split(",") if campo.strip()]
+    no_validos = [campo for campo in campos if campo not in CAMPOS_LISTADO_RECETA]
+    if no_validos:
+        raise ValueError(f"Campos no válidos: {', '.join(no_validos)}")
+    return campos
+
+
+def copiar_para_listado(recetas: List[Dict[str, Any]], campos: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Copia recetas para un listado con solo los campos pedidos: por defecto el resumen de
+    las tarjetas (CAMPOS_RESUMEN_RECETA), cuya foto es la variante "tarjeta". Los comentarios y
+    valoraciones se sustituyen por sus totales, de modo que el tamaño de la respuesta no crece
+    con la actividad de cada receta.
+    
+    Args:
+        recetas (List[Dict[str, Any]]): Recetas del repositorio
+        campos (Optional[List[str]]): Campos de CAMPOS_LISTADO_RECETA a incluir (ver campos_listado)
+        
+    Returns:
+        List[Dict[str, Any]]: Copias con su ID público y los campos pedidos que tenga cada
+        receta, en el mismo orden
+    """
+    resumen = campos is None
+    if resumen:
+        campos = CAMPOS_RESUMEN_RECETA
+    totales = {}
+    if "totalComentarios" in campos:
+        totales = almacen_comentarios.contar_varios([r["id"] for r in recetas if r.get("id")])
+    copias = []
+    for receta in recetas:
+        copia = {"id": id_publico_receta(receta)}
+        for campo in campos:
+            if campo == "totalComentarios":
+                comentarios_sin_migrar = receta.get("comentarios") or []
+                copia[campo] = totales.get(receta.get("id"), 0) + len(comentarios_sin_migrar)
+            elif campo == "valoracionMedia":
+                copia[campo] = valoracion_media(receta)
+            elif campo == "totalValoraciones":
+                copia[campo] = resumen_valoraciones(receta)["total"]
+            elif campo == "fotoReceta" and resumen and campo in receta:
+                copia[campo] = url_variante(receta.get("fotosReceta"), "tarjeta", receta[campo])
+            elif campo != "id" and campo in receta:
+                copia[campo] = receta[campo]
+        copias.append(copia)
+    return copias
+
+
+def codificar_cursor(clave: Tuple[str, str]) -> str:
+    """
+    Convierte la clave de orden de la última receta de una página en un cursor opaco.
+    
+    Args:
+        clave (Tuple[str, str]): Clave de clave_orden_receta
+        
+    Returns:
+        str: Cursor en base64 apto para URLs
+    """
+    return base64.urlsafe_b64encode(json.dumps(list(clave)).encode('utf-8')).decode('ascii').rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Recupera la clave de orden guardada en un cursor de codificar_cursor.
+    
+    Args:
+        cursor (str): Cursor recibido del cliente
+        
+    Returns:
+        Tuple[str, str]: Clave de orden
+        
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        clave = json.loads(base64.urlsafe_b64decode(cursor + relleno).decode('utf-8'))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Cursor no válido: {cursor!r}") from e
+    if not (isinstance(clave, list) and len(clave) == 2 and all(isinstance(parte, str) for parte in clave)):
+        raise ValueError(f"Cursor no válido: {cursor!r}")
+    return (clave[0], clave[1])
+
+
+def pagina_recetas_comunidad(email_usuario: str, limite: int = LIMITE_RECETAS_COMUNIDAD_POR_DEFECTO,
+                             cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str], int]:
+    """
+    Obtiene una página de las recetas publicadas por otros usuarios, ordenadas por nombre.
+    El cursor guarda la última receta devuelta, así que las páginas siguientes no se
+    desplazan aunque entretanto se publiquen o borren recetas.
+    
+    Args:
+        email_usuario (str): Email del usuario, cuyas recetas se excluyen
+        limite (int): Número máximo de recetas de la página
+        cursor (Optional[str]): nextCursor de la página anterior (None para la primera)
+        
+    Returns:
+        Tuple[List[Dict[str, Any]], Optional[str], int]: Recetas de la página (del repositorio,
+        solo lectura), cursor de la página siguiente (None si no hay más) y total de recetas
+        
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    clave = decodificar_cursor(cursor) if cursor else None
+    publicadas, inicio = repositorio_recetas.recetas_publicadas_desde(clave)
+
+    pagina = []
+    siguiente_cursor = None
+    for posicion in range(inicio, len(publicadas)):
+        receta = publicadas[posicion]
+        if receta.get("usuario", "") == email_usuario:
+            continue
+        if len(pagina) == limite:
+            # Queda al menos una receta más: la página siguiente empieza tras la última devuelta
+            siguiente_cursor = codificar_cursor(clave_orden_receta(pagina[-1]))
+            break
+        pagina.append(receta)
+
+    propias = sum(
+        1 for receta in repositorio_recetas.recetas_de_autor(email_usuario)
+        if receta.get("usuario", "") == email_usuario and receta.get("publicada", False) == True
+    )
+    return pagina, siguiente_cursor, len(publicadas) - propias
+
+
+def buscar_recetas(email_usuario: str, filtros: Dict[str, Any], ambito: str = "comunidad",
+                   limite: int = LIMITE_RECETAS_COMUNIDAD_POR_DEFECTO,
+                   cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str], Optional[int]]:
+    """
+    Filtra en el servidor las recetas de la comunidad o las del usuario con los índices de
+    busqueda_recetas.py, y devuelve una página de resultados en el mismo orden y con el mismo
+    cursor que pagina_recetas_comunidad. Si se busca un texto ("q"), las recetas que lo
+    contienen se ordenan por relevancia con el índice de busqueda_texto.py.
+    
+    Args:
+        email_usuario (str): Email del usuario autenticado
+        filtros (Dict[str, Any]): Filtros de IndiceBusqueda.buscar y, además:
+            - q (str): texto a buscar en el nombre, la descripción y los ingredientes
+            - usuario (str): parte del email del autor
+            - valoracion (float): valoración media mínima (solo recetas valoradas)
+        ambito (str): "comunidad" (publicadas de otros usuarios) o "mias" (recetas del usuario)
+        limite (int): Número máximo de recetas de la página
+        cursor (Optional[str]): nextCursor de la página anterior (None para la primera)
+        
+    Returns:
+        Tuple[List[Dict[str, Any]], Optional[str], Optional[int]]: Recetas de la página (del
+        repositorio, solo lectura), cursor de la página siguiente (None si no hay más) y total
+        de coincidencias (en las búsquedas de texto puede ser None, ver pagina_busqueda_texto)
+        
+    Raises:
+        ValueError: Si el ámbito o el cursor no son válidos
+    """
+    if ambito == "comunidad":
+        alcance = {"excluir_autor": email_usuario, "solo_publicadas": True}
+    elif ambito == "mias":
+        alcance = {"autor": email_usuario}
+    else:
+        raise ValueError(f"Ámbito de búsqueda no válido: {ambito!r}")
+    clave = decodificar_cursor(cursor) if cursor else None
+
+    consulta = (filtros.get("q") or "").strip()
+    hay_filtros = any(valor not in (None, "", []) for campo, valor in filtros.items() if campo != "q")
+    if consulta and ambito == "comunidad" and not hay_filtros:
+        # Toda la comunidad: el índice de texto comprueba el ámbito receta a receta
+        return pagina_busqueda_texto(consulta, clave, limite, admitir=lambda receta: (
+            receta.get("publicada", False) == True and receta.get("usuario", "") != email_usuario
+        ))
+
+    encontradas = repositorio_recetas.indice_busqueda().buscar(filtros, **alcance)
+
+    # Filtros sin índice: se comprueban solo sobre las recetas ya filtradas
+    if filtros.get("usuario"):
+        parte_email = filtros["usuario"].lower()
+        encontradas = [r for r in encontradas if parte_email in (r.get("usuario") or "").lower()]
+    if filtros.get("valoracion"):
+        # Con una valoración mínima positiva quedan fuera también las recetas sin valorar (media 0)
+        encontradas = [r for r in encontradas if valoracion_media(r) >= filtros["valoracion"]]
+
+    if consulta:
+        return pagina_busqueda_texto(consulta, clave, limite, candidatas=encontradas)
+
+    encontradas.sort(key=clave_orden_receta)
+    inicio = bisect.bisect_right([clave_orden_receta(r) for r in encontradas], clave) if clave else 0
+    pagina = encontradas[inicio:inicio + limite]
+    siguiente_cursor = None
+    if inicio + limite < len(encontradas):
+        siguiente_cursor = codificar_cursor(clave_orden_receta(pagina[-1]))
+    return pagina, siguiente_cursor, len(encontradas)
+
+
+def pagina_busqueda_texto(consulta: str, clave: Optional[Tuple[str, str]], limite: int,
+                          admitir: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                          candidatas: Optional[List[Dict[str, Any]]] = None
+                          ) -> Tuple[List[Dict[str, Any]], Optional[str], Optional[int]]:
+    """
+    Obtiene una página de una búsqueda de texto, de más a menos relevante. El cursor
+    guarda cuántas recetas se han devuelto ya (con la marca "relevancia").
+    
+    Args:
+        consulta (str): Texto buscado
+        clave (Optional[Tuple[str, str]]): Cursor decodificado de la página anterior
+        limite (int): Número máximo de recetas de la página
+        admitir (Optional[Callable]): Condición que deben cumplir las recetas
+        candidatas (Optional[List[Dict[str, Any]]]): Recetas entre las que buscar
+        
+    Returns:
+        Tuple[List[Dict[str, Any]], Optional[str], Optional[int]]: Recetas de la página, cursor
+        de la página siguiente y total de coincidencias (solo en la primera página y si el
+        índice puede contarlas, ver IndiceTexto.buscar)
+        
+    Raises:
+        ValueError: Si el cursor no es de una búsqueda de texto
+    """
+    if clave is None:
+        inicio = 0
+    elif clave[0] == "relevancia" and clave[1].isdigit():
+        inicio = int(clave[1])
+    else:
+        raise ValueError("El cursor no corresponde a una búsqueda de texto")
+
+    resultados, total = repositorio_recetas.indice_texto().buscar(
+        consulta, inicio + limite + 1, admitir=admitir, candidatas=candidatas, contar=inicio == 0
+    )
+    pagina = [receta for _, receta in resultados[inicio:inicio + limite]]
+    siguiente_cursor = None
+    if len(resultados) > inicio + limite:
+        siguiente_cursor = codificar_cursor(("relevancia", str(inicio + limite)))
+    return pagina, siguiente_cursor, total
+
+
+def valoraciones_por_usuario(receta: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Obtiene las valoraciones de una receta como diccionario email → puntuación.
+    Acepta también el formato antiguo (lista de {"usuario", "puntuacion"}).
+    
+    Returns:
+        Dict[str, int]: Valoraciones por usuario (solo lectura si la receta ya estaba migrada)
+    """
+    valoraciones = receta.get("valoraciones") or {}
+    if isinstance(valoraciones, list):
+        return {v.get("usuario"): v.get("puntuacion", 0) for v in valoraciones}
+    return valoraciones
+
+
+def calcular_resumen_valoraciones(valoraciones: Dict[str, int]) -> Dict[str, Any]:
+    """
+    Calcula desde cero el resumen agregado de unas valoraciones.
+    
+    Returns:
+        Dict[str, Any]: {"suma", "total", "histograma"}, donde histograma[i] es el número
+        de valoraciones de i + 1 estrellas
+    """
+    histograma = [0] * 5
+    for puntuacion in valoraciones.values():
+        if 1 <= puntuacion <= 5:
+            histograma[puntuacion - 1] += 1
+    return {"suma": sum(valoraciones.values()), "total": len(valoraciones), "histograma": histograma}
+
+
+def resumen_valoraciones(receta: Dict[str, Any]) -> Dict[str, Any]:
+    """Resumen agregado de las valoraciones de una receta (se calcula solo si aún no se ha migrado)."""
+    resumen = receta.get("resumenValoraciones")
+    if resumen is None:
+        resumen = calcular_resumen_valoraciones(valoraciones_por_usuario(receta))
+    return resumen
+
+
+def valoracion_media(receta: Dict[str, Any]) -> float:
+    """Valoración media de una receta redondeada a un decimal (0 si no tiene valoraciones)."""
+    resumen = resumen_valoraciones(receta)
+    return round(resumen["suma"] / resumen["total"], 1) if resumen["total"] else 0
+
+
+def resumen_interacciones_recetas(ids_recetas: List[str], email_usuario: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Valoración media, número de valoraciones, valoración del usuario y número de comentarios
+    de varias recetas a la vez, para las tarjetas de un listado (ver /api/resumen-recetas).
+    
+    Args:
+        ids_recetas (List[str]): IDs recibidos (id estable o formato antiguo, ver resolver_id_receta)
+        email_usuario (Optional[str]): Email del usuario cuya valoración se incluye
+        
+    Returns:
+        Dict[str, Dict[str, Any]]: ID recibido → resumen; los IDs que no existen se omiten
+    """
+    recetas = {}
+    for receta_id in ids_recetas:
+        receta = resolver_id_receta(receta_id)
+        if receta is not None:
+            recetas[receta_id] = receta
+    # Como en listar_comentarios_receta: las recetas sin migrar aún guardan sus comentarios dentro
+    totales_comentarios = almacen_comentarios.contar_varios(
+        {r["id"] for r in recetas.values() if r.get("id") and "comentarios" not in r})
+    
+    resumenes = {}
+    for receta_id, receta in recetas.items():
+        if "comentarios" in receta:
+            total_comentarios = len(receta.get("comentarios") or [])
+        else:
+            total_comentarios = totales_comentarios.get(receta.get("id"), 0)
+        resumenes[receta_id] = {
+            "valoracionMedia": valoracion_media(receta),
+            "totalValoraciones": resumen_valoraciones(receta)["total"],
+            "valoracionUsuario": valoraciones_por_usuario(receta).get(email_usuario),
+            "totalComentarios": total_comentarios,
+        }
+    return resumenes
+
+
+def registrar_valoracion_receta(nombre_receta: str, email_usuario: str, puntuacion: int) -> Optional[Dict[str, Any]]:
+    """
+    Añade o actualiza la valoración de un usuario sobre una receta en una única operación atómica.
+    El resumen agregado (suma, total e histograma) se actualiza con la diferencia, sin recorrer
+    el resto de valoraciones.
+    
+    Args:
+        nombre_receta (str): Nombre exacto de la receta
+        email_usuario (str): Email del usuario que valora
+        puntuacion (int): Puntuación de 1 a 5
+        
+    Returns:
+        Optional[Dict[str, Any]]: {"valoracion", "accion", "totalValoraciones", "valoracionMedia"}
+        o None si la receta no existe
+        
+    Raises:
+        ValueError: Si la puntuación no está entre 1 y 5
+        IOError: Si no se pudo guardar la valoración
+    """
+    if not 1 <= puntuacion <= 5:
+        raise ValueError(f"Puntuación fuera de rango: {puntuacion}")
+    
+    nueva_valoracion = {
+        "usuario": email_usuario,
+        "puntuacion": puntuacion
+    }
+    
+    def operacion(lote):
+        receta = lote.buscar_receta(nombre_receta)
+        if receta is None:
+            return None
+        receta_actualizada = copiar_receta(receta)
+        valoraciones = valoraciones_por_usuario(receta_actualizada)
+        resumen = resumen_valoraciones(receta_actualizada)
+        histograma = list(resumen["histograma"])
+        suma, total = resumen["suma"], resumen["total"]
+        
+        # Si el usuario ya valoró esta receta se descuenta su puntuación anterior
+        anterior = valoraciones.get(email_usuario)
+        if anterior is not None:
+            suma -= anterior
+            if 1 <= anterior <= 5:
+                histograma[anterior - 1] -= 1
+            accion = "actualizada"
+        else:
+            total += 1
+            accion = "añadida"
+        
+        valoraciones[email_usuario] = puntuacion
+        suma += puntuacion
+        histograma[puntuacion - 1] += 1
+        receta_actualizada["valoraciones"] = valoraciones
+        receta_actualizada["resumenValoraciones"] = {"suma": suma, "total": total, "histograma": histograma}
+        
+        lote.reemplazar(receta, receta_actualizada)
+        return {
+            "valoracion": nueva_valoracion,
+            "accion": accion,
+            "totalValoraciones": total,
+            "valoracionMedia": valoracion_media(receta_actualizada)
+        }
+    
+    return repositorio_recetas.ejecutar(operacion)
+
+
+def generar_menu_semanal_automatico(email_usuario: str, alergenos_excluidos: Optional[List[str]] = None) -> Dict[str, Dict[str, Optional[str]]]:
     """
     Genera un menú semanal automático para un usuario.
     Selecciona recetas aleatorias de las recetas creadas por el usuario y sus recetas guardadas,
-    filtrando por turno de comida apropiado.
+    filtrando por turno de comida apropiado y descartando las que tienen alérgenos excluidos.
     
     Args:
         email_usuario (str): Email del usuario
+        alergenos_excluidos (Optional[List[str]]): Alérgenos que no deben tener las recetas
+            (se reconocen como en el filtro de la comunidad, ver bits_alergenos_buscados)
         
     Returns:
         Dict[str, Dict[str, Optional[str]]]: Menú semanal con 7 días y 5 comidas por día
@@ -887,6 +1745,14 @@ def generar_menu_semanal_automatico(email_usuario: str) -> Dict[str, Dict[str, O
         
         print(f"{LOG_INFO} Recetas disponibles: {len(recetas_propias)} propias + {len(recetas_guardadas)} guardadas = {len(todas_recetas)} total")
         
+        # Excluir alérgenos: AND-NOT de la máscara de cada receta
+        bits_excluidos = 0
+        for alergeno in alergenos_excluidos or []:
+            bits_excluidos |= bits_alergenos_buscados(alergeno)
+        if bits_excluidos:
+            todas_recetas = [receta for receta in todas_recetas if not mascara_alergenos(receta) & bits_excluidos]
+            print(f"{LOG_INFO} {len(todas_recetas)} recetas sin los alérgenos excluidos")
+        
         # Clasificar recetas por turno de comida (normalizado a minúsculas)
         recetas_por_turno = {
             'desayuno': [],
@@ -946,27 +1812,22 @@ def generar_menu_semanal_automatico(email_usuario: str) -> Dict[str, Dict[str, O
 
 def cargar_menus_semanales() -> Dict[str, Dict[str, Any]]:
     """
-    Carga los menús semanales desde el archivo JSON.
+    Carga los menús semanales del almacén de menús (ver datos_usuarios.py).
     
     Returns:
         Dict[str, Dict[str, Any]]: Diccionario con email como clave y menú semanal como valor
     """
     try:
-        crear_directorio_si_no_existe(DIRECTORIO_DATOS)
-        
-        if verificar_archivo_existe(RUTA_MENUS_SEMANALES_JSON):
-            with open(RUTA_MENUS_SEMANALES_JSON, 'r', encoding='utf-8') as archivo:
-                return json.load(archivo)
-        else:
-            return {}
-    except (json.JSONDecodeError, IOError) as e:
+        return almacen_menus.todos()
+    except (ValueError, IOError) as e:
         print(f"{LOG_ERROR} Error al cargar menús semanales: {e}")
         return {}
 
 
 def guardar_menus_semanales(menus: Dict[str, Dict[str, Any]]) -> bool:
     """
-    Guarda los menús semanales en el archivo JSON.
+    Sustituye todos los menús semanales guardados por `menus`. Solo cambia la versión de
+    los menús que cambian (ver version_menu_semanal).
     
     Args:
         menus (Dict[str, Dict[str, Any]]): Diccionario con email como clave y menú semanal como valor
@@ -974,17 +1835,60 @@ def guardar_menus_semanales(menus: Dict[str, Dict[str, Any]]) -> bool:
     Returns:
         bool: True si se guardó correctamente, False en caso contrario
     """
+    def sustituir(lote) -> bool:
+        for email in lote.claves():
+            if email not in menus:
+                lote.escribir(email, None)
+        for email, menu in menus.items():
+            if lote.leer(email) != menu:
+                lote.escribir(email, menu)
+        return True
+
     try:
-        crear_directorio_si_no_existe(DIRECTORIO_DATOS)
+        return almacen_menus.ejecutar(sustituir)
+    except (ValueError, IOError) as e:
+        print(f"{LOG_ERROR} Error al guardar menús semanales: {e}")
+        return False
+
+
+def escribir_menu_semanal(email_usuario: str, menu_semanal: Optional[Dict[str, Dict[str, Optional[str]]]]) -> bool:
+    """
+    Guarda el menú semanal de un usuario o lo elimina si `menu_semanal` es None.
+    Pasa por el hilo escritor de los menús (ver datos_usuarios.py).
+    
+    Args:
+        email_usuario (str): Email del usuario
+        menu_semanal (Optional[Dict]): Menú semanal completo
         
-        with open(RUTA_MENUS_SEMANALES_JSON, 'w', encoding='utf-8') as archivo:
-            json.dump(menus, archivo, ensure_ascii=False, indent=2)
+    Returns:
+        bool: True si se guardó correctamente, False en caso contrario
+    """
+    def escribir(lote) -> bool:
+        if menu_semanal is not None or lote.leer(email_usuario) is not None:
+            lote.escribir(email_usuario, menu_semanal)
         return True
-    except IOError as e:
-        print(f"{LOG_ERROR} Error al guardar menús semanales: {e}")
+
+    try:
+        return almacen_menus.ejecutar(escribir)
+    except (ValueError, IOError) as e:
+        print(f"{LOG_ERROR} Error al guardar el menú semanal de {email_usuario}: {e}")
         return False
 
 
+def version_menu_semanal(email_usuario: str) -> Any:
+    """
+    Versión del menú semanal de un usuario para las ETags de las respuestas (ver versiones.py).
+
+    Args:
+        email_usuario (str): Email del usuario
+
+    Returns:
+        Any: Contadores de guardados del proceso y firma del almacenamiento
+    """
+    return (versiones_recursos.obtener("menu", email_usuario.lower()), versiones_recursos.obtener("menu", "todos"),
+            firma_datos(RUTA_MENUS_SEMANALES_JSON))
+
+
 def obtener_menu_semanal(email_usuario: str) -> Optional[Dict[str, Dict[str, Optional[str]]]]:
     """
     Obtiene el menú semanal de un usuario específico.
@@ -996,8 +1900,7 @@ def obtener_menu_semanal(email_usuario: str) -> Optional[Dict[str, Dict[str, Opt
         Optional[Dict]: Menú semanal del usuario o None si no existe
     """
     try:
-        menus = cargar_menus_semanales()
-        return menus.get(email_usuario.lower(), None)
+        return almacen_menus.leer(email_usuario)
     except Exception as e:
         print(f"{LOG_ERROR} Error al obtener menú semanal: {e}")
         return None
@@ -1015,9 +1918,7 @@ def guardar_menu_semanal(email_usuario: str, menu_semanal: Dict[str, Dict[str, O
         bool: True si se guardó correctamente, False en caso contrario
     """
     try:
-        menus = cargar_menus_semanales()
-        menus[email_usuario.lower()] = menu_semanal
-        exito = guardar_menus_semanales(menus)
+        exito = escribir_menu_semanal(email_usuario, menu_semanal)
         
         if exito:
             print(f"{LOG_SUCCESS} Menú semanal guardado para {email_usuario}")
@@ -1039,14 +1940,8 @@ def eliminar_menu_semanal(email_usuario: str) -> bool:
         bool: True si se eliminó correctamente, False en caso contrario
     """
     try:
-        menus = cargar_menus_semanales()
-        email_lower = email_usuario.lower()
-        
-        if email_lower in menus:
-            del menus[email_lower]
-            return guardar_menus_semanales(menus)
-        
-        return True  # No existía, así que técnicamente está "eliminado"
+        # Si no existía, técnicamente ya está "eliminado"
+        return escribir_menu_semanal(email_usuario, None)
     except Exception as e:
         print(f"{LOG_ERROR} Error al eliminar menú semanal: {e}")
         return False
@@ -1075,40 +1970,41 @@ def actualizar_menu_tras_edicion_receta(
         bool: True si se actualizó correctamente
     """
     try:
-        menus = cargar_menus_semanales()
-        email_lower = email_usuario.lower()
-        
-        # Si el usuario no tiene menú, no hay nada que actualizar
-        if email_lower not in menus:
-            return True
-        
-        menu = menus[email_lower]
-        menu_modificado = False
-        
-        # Recorrer todos los días y comidas del menú
-        for dia in menu:
-            for turno_comida in menu[dia]:
-                receta_actual = menu[dia][turno_comida]
+        # Leer y guardar en el hilo escritor de los menús: ninguna otra escritura se cuela entre medias
+        def operacion(lote) -> bool:
+            menu = lote.leer(email_usuario)
+            
+            # Si el usuario no tiene menú, no hay nada que actualizar
+            if menu is None:
+                return True
+            
+            menu_modificado = False
+            
+            # Recorrer todos los días y comidas del menú
+            for dia in menu:
+                for turno_comida in menu[dia]:
+                    receta_actual = menu[dia][turno_comida]
                 
-                # Si hay una receta en este slot
-                if receta_actual and receta_actual == nombre_original:
-                    # Si el turno de comida cambió y ya no coincide, eliminar la receta
-                    if turno_original != turno_nuevo and turno_comida.lower() != turno_nuevo.lower():
-                        print(f"{LOG_INFO} Eliminando '{nombre_original}' de {dia}-{turno_comida} (turno cambió de {turno_original} a {turno_nuevo})")
-                        menu[dia][turno_comida] = None
-                        menu_modificado = True
-                    # Si el nombre cambió pero el turno sigue siendo compatible, actualizar el nombre
-                    elif nombre_original != nombre_nuevo:
-                        print(f"{LOG_INFO} Actualizando nombre en menú: '{nombre_original}' → '{nombre_nuevo}' en {dia}-{turno_comida}")
-                        menu[dia][turno_comida] = nombre_nuevo
-                        menu_modificado = True
-        
-        # Guardar el menú si hubo cambios
-        if menu_modificado:
-            menus[email_lower] = menu
-            return guardar_menus_semanales(menus)
-        
-        return True
+                    # Si hay una receta en este slot
+                    if receta_actual and receta_actual == nombre_original:
+                        # Si el turno de comida cambió y ya no coincide, eliminar la receta
+                        if turno_original != turno_nuevo and turno_comida.lower() != turno_nuevo.lower():
+                            print(f"{LOG_INFO} Eliminando '{nombre_original}' de {dia}-{turno_comida} (turno cambió de {turno_original} a {turno_nuevo})")
+                            menu[dia][turno_comida] = None
+                            menu_modificado = True
+                        # Si el nombre cambió pero el turno sigue siendo compatible, actualizar el nombre
+                        elif nombre_original != nombre_nuevo:
+                            print(f"{LOG_INFO} Actualizando nombre en menú: '{nombre_original}' → '{nombre_nuevo}' en {dia}-{turno_comida}")
+                            menu[dia][turno_comida] = nombre_nuevo
+                            menu_modificado = True
+            
+            # Guardar el menú si hubo cambios
+            if menu_modificado:
+                lote.escribir(email_usuario, menu)
+            
+            return True
+
+        return almacen_menus.ejecutar(operacion)
         
     except Exception as e:
         print(f"{LOG_ERROR} Error al actualizar menú tras edición de receta: {e}")
@@ -1128,33 +2024,34 @@ def eliminar_receta_del_menu_semanal(email_usuario: str, nombre_receta: str) ->
         bool: True si se eliminó correctamente
     """
     try:
-        menus = cargar_menus_semanales()
-        email_lower = email_usuario.lower()
-        
-        # Si el usuario no tiene menú, no hay nada que eliminar
-        if email_lower not in menus:
-            return True
-        
-        menu = menus[email_lower]
-        menu_modificado = False
-        
-        # Recorrer todos los días y comidas del menú
-        for dia in menu:
-            for turno_comida in menu[dia]:
-                receta_actual = menu[dia][turno_comida]
+        # Leer y guardar en el hilo escritor de los menús: ninguna otra escritura se cuela entre medias
+        def operacion(lote) -> bool:
+            menu = lote.leer(email_usuario)
+            
+            # Si el usuario no tiene menú, no hay nada que eliminar
+            if menu is None:
+                return True
+            
+            menu_modificado = False
+            
+            # Recorrer todos los días y comidas del menú
+            for dia in menu:
+                for turno_comida in menu[dia]:
+                    receta_actual = menu[dia][turno_comida]
                 
-                # Si la receta está en este slot, eliminarla
-                if receta_actual and receta_actual == nombre_receta:
-                    print(f"{LOG_INFO} Eliminando '{nombre_receta}' del menú semanal en {dia}-{turno_comida}")
-                    menu[dia][turno_comida] = None
-                    menu_modificado = True
-        
-        # Guardar el menú si hubo cambios
-        if menu_modificado:
-            menus[email_lower] = menu
-            return guardar_menus_semanales(menus)
-        
-        return True
+                    # Si la receta está en este slot, eliminarla
+                    if receta_actual and receta_actual == nombre_receta:
+                        print(f"{LOG_INFO} Eliminando '{nombre_receta}' del menú semanal en {dia}-{turno_comida}")
+                        menu[dia][turno_comida] = None
+                        menu_modificado = True
+            
+            # Guardar el menú si hubo cambios
+            if menu_modificado:
+                lote.escribir(email_usuario, menu)
+            
+            return True
+
+        return almacen_menus.ejecutar(operacion)
         
     except Exception as e:
         print(f"{LOG_ERROR} Error al eliminar receta del menú semanal: {e}")
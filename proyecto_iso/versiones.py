@@ -0,0 +1,72 @@
+"""
+Versiones de los recursos y ETags de las respuestas GET de la API.
+
+Cada recurso tiene un contador que cambia con cada escritura:
+
+- Catálogo de recetas (incluye quién guardó cada receta y sus valoraciones):
+  RepositorioRecetas.version(), que cambia con cada instantánea nueva, también
+  al recargar cambios hechos por otro proceso.
+- Comentarios: version() del almacén de comentarios.
+- Cuentas y menús semanales (por usuario): versiones_recursos.
+
+La ETag de una respuesta resume las versiones de los recursos de los que depende
+y los parámetros de la petición. Se calcula antes de construir la respuesta: si
+coincide con If-None-Match se responde 304 sin construir ni serializar el cuerpo.
+Las versiones se leen antes de leer los datos, así que una escritura a mitad de
+petición solo puede dejar una ETag más antigua que el cuerpo, nunca al revés.
+"""
+
+import uuid
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+# Los contadores vuelven a empezar en cada arranque: las ETags llevan un
+# identificador del proceso para no coincidir con las de un arranque anterior
+ID_PROCESO = uuid.uuid4().hex[:8]
+
+
+class VersionesRecursos:
+    """Contadores de versión por clave (p. ej. ("menu", email)); empiezan en 0."""
+
+    def __init__(self):
+        self._contadores: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, *clave: Any) -> int:
+        return self._contadores.get(clave, 0)
+
+    def incrementar(self, *clave: Any) -> None:
+        with self._lock:
+            self._contadores[clave] = self._contadores.get(clave, 0) + 1
+
+
+versiones_recursos = VersionesRecursos()
+
+
+def calcular_etag(*partes: Any) -> str:
+    """
+    ETag fuerte a partir de las versiones y parámetros de los que depende una respuesta.
+
+    Args:
+        *partes (Any): Nombre del recurso, versiones y parámetros de la petición
+
+    Returns:
+        str: ETag entre comillas
+    """
+    resumen = hashlib.sha256(repr((ID_PROCESO,) + partes).encode("utf-8")).hexdigest()[:32]
+    return f'"{resumen}"'
+
+
+def etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Indica si la cabecera If-None-Match de una petición incluye la ETag (o es "*").
+    Como indica HTTP para If-None-Match, la comparación es débil (se ignora "W/").
+    """
+    if not if_none_match:
+        return False
+    for candidata in if_none_match.split(","):
+        candidata = candidata.strip()
+        if candidata == "*" or candidata.removeprefix("W/") == etag:
+            return True
+    return False